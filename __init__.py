@@ -9,7 +9,31 @@ from .strategy import StrategyEngine
 from .executor import OrderExecutor
 from .position import PositionManager
 from .market_data import MarketDataProvider
+from .features import FeaturePipeline
+from .fvg import FVGIndex
+from .zones import ZoneEngine
+from .regime import RegimeClassifier
+from .status import StatusWriter, StatusServer, atomic_write_json
+from .trades import CVDAggregator, AggTradeStream, AggTradeReplay
+from .reconcile import PositionReconciler
+from .ratelimit import WeightScheduler, ScheduledExchange, request_priority
+from .io_policy import IOPolicy, ResilientExchange, CircuitOpenError
+from .shm_ring import ShmRing
+from .candle_bus import CandleBus, bus_name
+from .montecarlo import MonteCarloRisk
+from .risk import RiskEngine
+from .history import CandleArchive, HistoryDownloader
+from .candle_store import CandleStore, BinaryCandleArchive
+from .continuity import ContinuityIndex, IntervalSet
+from .synthetic import SyntheticMarket
+from .rules import Rule, Condition, Param, Field
+from .ledger import TradeLedger
 from .utils import safe_float, safe_int
+from .telemetry import metrics, MetricsRegistry, MetricsServer
+from .logger import get_logger, setup_logging, shutdown_logging
+from .profiler import ProfilingHooks
+from .execution import ExecutionEngine, estimate_impact
+from .sim_exchange import SimulatedExchange, SimulatedOrderBook
 
 __version__ = "2.1.0"
 __all__ = [
@@ -19,6 +43,51 @@ __all__ = [
     'OrderExecutor',
     'PositionManager',
     'MarketDataProvider',
+    'FeaturePipeline',
+    'FVGIndex',
+    'ZoneEngine',
+    'RegimeClassifier',
+    'StatusWriter',
+    'StatusServer',
+    'atomic_write_json',
+    'CVDAggregator',
+    'AggTradeStream',
+    'AggTradeReplay',
+    'PositionReconciler',
+    'WeightScheduler',
+    'ScheduledExchange',
+    'request_priority',
+    'IOPolicy',
+    'ResilientExchange',
+    'CircuitOpenError',
+    'ShmRing',
+    'CandleBus',
+    'bus_name',
+    'MonteCarloRisk',
+    'RiskEngine',
+    'CandleArchive',
+    'HistoryDownloader',
+    'CandleStore',
+    'BinaryCandleArchive',
+    'ContinuityIndex',
+    'IntervalSet',
+    'SyntheticMarket',
+    'Rule',
+    'Condition',
+    'Param',
+    'Field',
+    'TradeLedger',
     'safe_float',
-    'safe_int'
+    'safe_int',
+    'metrics',
+    'MetricsRegistry',
+    'MetricsServer',
+    'get_logger',
+    'setup_logging',
+    'shutdown_logging',
+    'ProfilingHooks',
+    'ExecutionEngine',
+    'estimate_impact',
+    'SimulatedExchange',
+    'SimulatedOrderBook'
 ]
\ No newline at end of file
@@ -9,6 +9,10 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 
+from config import LEVERAGE, ENTRY_PERCENT, TRADING_FEE_RATE
+from modules.montecarlo import MonteCarloRisk, print_report
+from modules.rules import NIGHT_LONG, SHORT_FORCE
+
 
 class ThresholdOptimizer:
     """최적 임계값 탐색기"""
@@ -26,8 +30,8 @@ class ThresholdOptimizer:
         print("🌙 야간 롱 최적 임계값 분석")
         print("="*60)
         
-        night_trades = [t for t in self.trade_data['trade_history'] 
-                        if self._is_night_time(t['time'])]
+        trades = self._trade_arrays(self.trade_data['trade_history'])
+        night_long = self._night(trades['hour']) & (trades['side'] == 'LONG')
         
         rsi_thresholds = [25, 26, 27, 28, 30]
         bb_thresholds = [0.12, 0.14, 0.15, 0.16, 0.18]
@@ -36,28 +40,9 @@ class ThresholdOptimizer:
         
         for rsi_th in rsi_thresholds:
             for bb_th in bb_thresholds:
-                wins = 0
-                losses = 0
-                total_pnl = 0
-                
-                for trade in night_trades:
-                    if trade.get('side') != 'LONG':
-                        continue
-                    
-                    # 조건 충족 체크
-                    trade_rsi, trade_bb = self._extract_trade_metrics(trade)
-                    
-                    if trade_rsi is None:
-                        continue
-                    
-                    if trade_rsi < rsi_th and trade_bb < bb_th:
-                        # 이 조건에서는 진입 가능
-                        pnl = trade.get('pnl_pct', 0)
-                        if pnl > 0:
-                            wins += 1
-                        else:
-                            losses += 1
-                        total_pnl += pnl
+                # 실시간과 같은 규칙 (StrategyEngine.check_night_long_conditions) 벡터 평가
+                rule = NIGHT_LONG.compile({'night_rsi_threshold': rsi_th, 'night_bb_threshold': bb_th})
+                wins, losses, total_pnl = self._tally(trades['pnl'], night_long & rule.mask(trades))
                 
                 total = wins + losses
                 win_rate = (wins / total * 100) if total > 0 else 0
@@ -111,27 +96,14 @@ class ThresholdOptimizer:
         rsi_thresholds = [60, 62, 65, 68, 70]
         bb_thresholds = [0.70, 0.72, 0.75, 0.78, 0.80]
         
+        trades = self._trade_arrays(all_trades)
         results = []
         
         for rsi_th in rsi_thresholds:
             for bb_th in bb_thresholds:
-                wins = 0
-                losses = 0
-                total_pnl = 0
-                
-                for trade in all_trades:
-                    trade_rsi, trade_bb = self._extract_trade_metrics(trade)
-                    
-                    if trade_rsi is None:
-                        continue
-                    
-                    if trade_rsi > rsi_th and trade_bb > bb_th:
-                        pnl = trade.get('pnl_pct', 0)
-                        if pnl > 0:
-                            wins += 1
-                        else:
-                            losses += 1
-                        total_pnl += pnl
+                # 실시간과 같은 규칙 (StrategyEngine.check_enhanced_short_signal) 벡터 평가
+                rule = SHORT_FORCE.compile({'short_force_rsi': rsi_th, 'short_force_bb': bb_th})
+                wins, losses, total_pnl = self._tally(trades['pnl'], rule.mask(trades))
                 
                 total = wins + losses
                 win_rate = (wins / total * 100) if total > 0 else 0
@@ -188,51 +160,17 @@ class ThresholdOptimizer:
         print(f"   승률: {old_win_rate:.1f}%")
         print(f"   총 수익: {old_total_pnl:.2f}%")
         
-        # 새로운 전략 예측
-        new_wins = 0
-        new_losses = 0
-        new_total_pnl = 0
-        skipped = 0
+        # 새로운 전략 예측 (실시간과 같은 규칙을 전체 거래에 벡터 평가)
+        trades = self._trade_arrays(all_trades)
+        night_ok = NIGHT_LONG.compile({'night_rsi_threshold': night_rsi, 'night_bb_threshold': night_bb}).mask(trades)
+        short_ok = SHORT_FORCE.compile({'short_force_rsi': short_rsi, 'short_force_bb': short_bb}).mask(trades)
         
-        for trade in all_trades:
-            time_str = trade.get('time', '')
-            side = trade.get('side', '')
-            pnl = trade.get('pnl_pct', 0)
-            
-            trade_rsi, trade_bb = self._extract_trade_metrics(trade)
-            hour = self._extract_hour(time_str)
-            
-            # 새로운 규칙 적용
-            if side == 'LONG' and (23 <= hour or hour < 7):
-                # 야간 롱
-                if trade_rsi and trade_rsi < night_rsi and trade_bb and trade_bb < night_bb:
-                    # 진입 가능
-                    if pnl > 0:
-                        new_wins += 1
-                    else:
-                        new_losses += 1
-                    new_total_pnl += pnl
-                else:
-                    # 진입 불가 → 관망
-                    skipped += 1
-            elif side == 'SHORT':
-                # 숏은 항상 카운트 (새로운 규칙이 숏을 늘리므로)
-                if trade_rsi and trade_rsi > short_rsi and trade_bb and trade_bb > short_bb:
-                    if pnl > 0:
-                        new_wins += 1
-                    else:
-                        new_losses += 1
-                    new_total_pnl += pnl
-                else:
-                    # 원래 숏이었는데 조건 미달 → 관망
-                    skipped += 1
-            else:
-                # 그 외 (주간 롱 등)
-                if pnl > 0:
-                    new_wins += 1
-                else:
-                    new_losses += 1
-                new_total_pnl += pnl
+        is_night_long = (trades['side'] == 'LONG') & self._night(trades['hour'])
+        is_short = trades['side'] == 'SHORT'
+        # 야간 롱 / 숏은 조건 충족 시에만 진입, 그 외 (주간 롱 등)는 그대로
+        taken = np.where(is_night_long, night_ok, np.where(is_short, short_ok, True))
+        skipped = int((~taken).sum())
+        new_wins, new_losses, new_total_pnl = self._tally(trades['pnl'], taken)
         
         new_total = new_wins + new_losses
         new_win_rate = (new_wins / new_total * 100) if new_total > 0 else 0
@@ -256,10 +194,28 @@ class ThresholdOptimizer:
             'improvement': {'win_rate': improvement, 'pnl': pnl_improvement}
         }
     
-    def _is_night_time(self, time_str):
-        """야간 시간대 확인"""
-        hour = self._extract_hour(time_str)
-        return hour is not None and (23 <= hour or hour < 7)
+    def _trade_arrays(self, trades):
+        """거래 목록 → 규칙 평가용 배열 (rules 필드 이름: rsi, bb_pct + pnl, side, hour)"""
+        metrics = [self._extract_trade_metrics(t) for t in trades]
+        hours = [self._extract_hour(t.get('time', '')) for t in trades]
+        return {
+            'rsi': np.array([np.nan if rsi is None else rsi for rsi, _ in metrics], dtype=float),
+            'bb_pct': np.array([np.nan if bb is None else bb for _, bb in metrics], dtype=float),
+            'pnl': np.array([t.get('pnl_pct', 0) for t in trades], dtype=float),
+            'side': np.array([t.get('side', '') for t in trades], dtype=object),
+            'hour': np.array([np.nan if h is None else h for h in hours], dtype=float),
+        }
+    
+    @staticmethod
+    def _night(hours):
+        """야간 시간대 (23:00-07:00) 마스크"""
+        return (hours >= 23) | (hours < 7)
+    
+    @staticmethod
+    def _tally(pnl, taken):
+        """진입한 거래의 (승, 패, 총 수익)"""
+        wins = int((taken & (pnl > 0)).sum())
+        return wins, int(taken.sum()) - wins, float(pnl[taken].sum())
     
     def _extract_hour(self, time_str):
         """시간 추출"""
@@ -318,6 +274,15 @@ def main():
         short_bb=optimal_short_bb
     )
     
+    # 몬테카를로 리스크 (실현 손익 재표집 → 파산 확률/낙폭/회복 시간)
+    pnl = [t['pnl_pct'] for t in trade_data['trade_history']
+           if t.get('type') == 'exit' and t.get('pnl_pct') is not None]
+    risk = None
+    if pnl:
+        risk = MonteCarloRisk(pnl, leverage=LEVERAGE, entry_percent=ENTRY_PERCENT,
+                              fee_rate=TRADING_FEE_RATE).simulate()
+        print_report(risk)
+    
     # 결과 저장
     report = {
         'analysis_date': datetime.now().isoformat(),
@@ -331,7 +296,8 @@ def main():
                 'bb_pct': optimal_short_bb
             }
         },
-        'simulation_results': results
+        'simulation_results': results,
+        'risk_simulation': risk
     }
     
     with open('logs/threshold_optimization_report.json', 'w', encoding='utf-8') as f:
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+benchmarks/bench_features.py - 피처 파이프라인 처리량 벤치마크
+
+실행:
+    python benchmarks/bench_features.py                  # baseline 대비 회귀 검사
+    python benchmarks/bench_features.py --save-baseline  # baseline 갱신
+
+비교 대상:
+- features.compute: 37컬럼 배치 계산 (공유 중간값 + 벡터 연산)
+- reference.per_column: 기존 방식 (ta/pandas 컬럼별 호출, 같은 컬럼 집합)
+- features.sync_tick: 실시간 틱 1회 (진행 중인 봉 임시 계산 + DataFrame 생성)
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+import ta
+
+from harness import case, run, temp_workdir, synthetic_ohlcv
+
+WORKDIR = temp_workdir()
+
+from modules.features import FeaturePipeline  # noqa: E402
+
+_OHLCV_100 = synthetic_ohlcv(100)
+_OHLCV_10K = synthetic_ohlcv(10_000)
+
+
+def per_column_reference(ohlcv):
+    """컬럼마다 ta/pandas를 따로 호출하는 방식 (파이프라인 이전 구조)"""
+    df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+    close = df['close']
+    df['rsi'] = ta.momentum.rsi(close, 14)
+    df['rsi_6'] = ta.momentum.rsi(close, 6)
+    df['rsi_21'] = ta.momentum.rsi(close, 21)
+    bb = ta.volatility.BollingerBands(close, 20, 2)
+    df['bb_upper'] = bb.bollinger_hband()
+    df['bb_lower'] = bb.bollinger_lband()
+    df['bb_mid'] = bb.bollinger_mavg()
+    df['bb_pct_b'] = (close - df['bb_lower']) / (df['bb_upper'] - df['bb_lower'])
+    df['bb_bandwidth'] = (df['bb_upper'] - df['bb_lower']) / df['bb_mid']
+    for name, span in (('ema8', 8), ('ema_9', 9), ('ema21', 21), ('ema_50', 50), ('ema_200', 200)):
+        df[name] = ta.trend.ema_indicator(close, span)
+    df['trend'] = np.where(df['ema8'] > df['ema21'], 'UP', 'DOWN')
+    macd = ta.trend.MACD(close, 26, 12, 9)
+    df['macd'] = macd.macd()
+    df['macd_signal'] = macd.macd_signal()
+    df['macd_hist'] = macd.macd_diff()
+    df['volume_sma'] = df['volume'].rolling(20).mean()
+    df['volume_ratio'] = df['volume'] / df['volume_sma']
+    df['vwap'] = ta.volume.volume_weighted_average_price(df['high'], df['low'], close, df['volume'], 14)
+    df['atr'] = ta.volatility.average_true_range(df['high'], df['low'], close, 14)
+    df['adx'] = ta.trend.adx(df['high'], df['low'], close, 14)
+    dt = pd.to_datetime(df['timestamp'], unit='ms')
+    for tf, rule in (('15m', '15min'), ('1h', '1h')):
+        resampled = close.groupby(dt.dt.floor(rule)).transform('last')
+        df[f'trend_{tf}'] = np.where(ta.trend.ema_indicator(resampled, 8) > ta.trend.ema_indicator(resampled, 21),
+                                     'UP', 'DOWN')
+    df['fvg_bull'] = (df['low'] > df['high'].shift(2)).astype(int)
+    df['fvg_bear'] = (df['high'] < df['low'].shift(2)).astype(int)
+    df['fvg_size'] = (df['low'] - df['high'].shift(2)).clip(lower=0) / close * 100
+    clv = ((close - df['low']) - (df['high'] - close)) / (df['high'] - df['low'])
+    df['cvd'] = (clv.fillna(0) * df['volume']).cumsum()
+    df['cvd_slope'] = df['cvd'].diff(5) / 5
+    df['session'] = dt.dt.hour.map(lambda h: 'asia' if h < 7 else 'london' if h < 13 else 'newyork' if h < 21 else 'late')
+    return df
+
+
+@case('features.compute[100]')
+def bench_compute_100():
+    pipeline = FeaturePipeline('5m')
+    return lambda: pipeline.compute(_OHLCV_100)
+
+
+@case('reference.per_column[100]')
+def bench_reference_100():
+    return lambda: per_column_reference(_OHLCV_100)
+
+
+@case('features.compute[10k]', repeat=3)
+def bench_compute_10k():
+    pipeline = FeaturePipeline('5m')
+    return lambda: pipeline.compute(_OHLCV_10K)
+
+
+@case('reference.per_column[10k]', repeat=3)
+def bench_reference_10k():
+    return lambda: per_column_reference(_OHLCV_10K)
+
+
+@case('features.update[1 bar]')
+def bench_update():
+    pipeline = FeaturePipeline('5m', capacity=100)
+    for candle in _OHLCV_10K[:200]:
+        pipeline.update(candle)
+    forming = list(_OHLCV_10K[200])
+    return lambda: pipeline.peek(forming)
+
+
+@case('features.sync_tick[100]')
+def bench_sync_tick():
+    pipeline = FeaturePipeline('5m')
+    window = _OHLCV_100
+    pipeline.sync(window, 100)
+    return lambda: pipeline.sync(window, 100)
+
+
+if __name__ == "__main__":
+    sys.exit(run())
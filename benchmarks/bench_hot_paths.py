@@ -0,0 +1,585 @@
+# -*- coding: utf-8 -*-
+"""
+benchmarks/bench_hot_paths.py - 틱/학습 핫패스 벤치마크
+
+실행:
+    python benchmarks/bench_hot_paths.py                  # baseline 대비 회귀 검사
+    python benchmarks/bench_hot_paths.py --save-baseline  # baseline 갱신
+
+대상:
+- MarketDataProvider 지표 계산 (fetch_data의 REST 이후 부분) / 연속성 검사 (빈 봉 없는 평상시) / get_current_market_state
+- StrategyEngine.check_long_signal / check_short_signal / should_exit / calculate_dynamic_sl
+- StrategyEngine.entry_masks (같은 진입 규칙의 벡터 평가, 백테스트 1만 봉)
+- FVGIndex.update / locate (FVG 필터의 틱당 비용)
+- RegimeClassifier.update / classify (봉당 국면 분류, 백테스트 벡터 버전)
+- PositionManager._save_history / get_stats (리스트 / 거래 원장 인덱스 쿼리)
+- TradeLedger 진입+청산 기록 (틱 경로는 큐만, 기록은 원장 스레드)
+- StatusWriter.publish (틱마다 상태 갱신: 값이 바뀐 틱 / 그대로인 틱)
+- RiskEngine.on_tick / can_enter (틱마다 한도 검사, 예산 RISK_LATENCY_BUDGET_US)
+- DataCollector.record_price_data / _flush_buffer
+- CollectorFeed.record_features (사이드카 모드에서 트레이딩 루프가 부담하는 몫: 링 버퍼 복사)
+- CandleBus 발행 (마감 봉 + 진행 중인 봉 기록) / 소비자 읽기 (REST 대신 드는 비용)
+- CandleStore 구간 읽기 (memmap, 20만 봉 중 하루치) / 봉 1개 append, 같은 구간 CSV 아카이브 읽기 (비교)
+- SelfLearningSystem.learn_from_trades (1k / 100k 거래, 100k는 CSV / 거래 원장)
+- MonteCarloRisk.simulate (100k 경로 × 100거래)
+- SyntheticMarket.generate (1M 봉, 데모 모드/부하 테스트 데이터 생성 처리량)
+- kernels 지표 / 포지션 청산 커널 (numba 있으면 jit, 없으면 numpy) vs 봉마다 should_exit를 부르는 파이썬 기준
+"""
+
+import atexit
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from harness import case, run, temp_workdir, synthetic_ohlcv
+
+WORKDIR = temp_workdir()
+
+from modules import MarketDataProvider, StrategyEngine, PositionManager  # noqa: E402
+from modules.fvg import FVGIndex  # noqa: E402
+from modules.features import FeaturePipeline  # noqa: E402
+from modules.regime import RegimeClassifier  # noqa: E402
+from modules.candle_bus import CandleBus  # noqa: E402
+from modules.candle_store import BinaryCandleArchive  # noqa: E402
+from modules.synthetic import SyntheticMarket  # noqa: E402
+from modules import kernels  # noqa: E402
+from modules.history import CandleArchive  # noqa: E402
+from modules.risk import RiskEngine  # noqa: E402
+from modules.ledger import TradeLedger  # noqa: E402
+from modules.status import StatusWriter  # noqa: E402
+from modules.logger import get_logger  # noqa: E402
+from data_collector import DataCollector, CollectorFeed  # noqa: E402
+from self_learning import SelfLearningSystem  # noqa: E402
+from modules.montecarlo import MonteCarloRisk  # noqa: E402
+
+get_logger('position').disabled = True
+
+
+def market_states(df):
+    """최근 봉들의 market_state 목록"""
+    provider = MarketDataProvider()
+    return [provider.get_current_market_state(df.iloc[:i]) for i in range(60, len(df))]
+
+
+STRATEGY_CONFIG = {
+    'RSI_LONG_THRESHOLD': 30, 'RSI_SHORT_THRESHOLD': 60,
+    'BB_PCT_B_LOW': 0.15, 'BB_PCT_B_HIGH': 0.85,
+    'TF_RSI_MIN': 50, 'TF_RSI_MAX': 70, 'TF_BB_PCT_MIN': 0.40, 'TF_BB_PCT_MAX': 0.80,
+    'SL_PERCENT': 0.012, 'TP_PERCENT': 0.025, 'TF_TP_PERCENT': 0.035,
+}
+
+_OHLCV = synthetic_ohlcv(100)
+_DF = MarketDataProvider()._compute_indicators(_OHLCV)
+_STATES = market_states(_DF)
+
+
+# ------------------------------------------------------------------ 시장 데이터
+
+@case('market_data.indicators[100]')
+def bench_indicators():
+    provider = MarketDataProvider()
+    return lambda: provider._compute_indicators(_OHLCV)
+
+
+@case('market_data.continuity[100]')
+def bench_continuity():
+    provider = MarketDataProvider()
+    last_ts = _OHLCV[-2][0]
+    provider._ensure_continuity('5m', _OHLCV, None)
+    return lambda: provider._ensure_continuity('5m', _OHLCV, last_ts)
+
+
+@case('market_data.get_current_market_state')
+def bench_market_state():
+    provider = MarketDataProvider()
+    return lambda: provider.get_current_market_state(_DF)
+
+
+# ------------------------------------------------------------------ 전략
+
+@case('strategy.check_long_signal[x40]')
+def bench_check_long():
+    engine = StrategyEngine(STRATEGY_CONFIG)
+
+    def fn():
+        for state in _STATES:
+            engine.check_long_signal(state)
+    return fn
+
+
+@case('strategy.check_short_signal[x40]')
+def bench_check_short():
+    engine = StrategyEngine(STRATEGY_CONFIG)
+
+    def fn():
+        for state in _STATES:
+            engine.check_short_signal(state)
+    return fn
+
+
+@case('strategy.check_long_signal+fvg[x40]')
+def bench_check_long_fvg():
+    engine = StrategyEngine(dict(STRATEGY_CONFIG, FVG_FILTER_ENABLED=True))
+    engine.fvg_index = _fvg_index(5000)
+
+    def fn():
+        for state in _STATES:
+            engine.check_long_signal(state)
+    return fn
+
+
+def _fvg_index(n_bars):
+    index = FVGIndex(min_size_pct=0.0)
+    for ts, _, high, low, close, _ in synthetic_ohlcv(n_bars, seed=3):
+        index.update(ts, high, low, close)
+    return index
+
+
+@case('fvg.update[1 bar]')
+def bench_fvg_update():
+    bars = synthetic_ohlcv(10_000, seed=3)
+    index = FVGIndex(min_size_pct=0.0)
+    state = {'i': 0}
+
+    def fn():
+        i = state['i']
+        if i == len(bars):
+            index.__init__(min_size_pct=0.0)
+            i = 0
+        ts, _, high, low, close, _ = bars[i]
+        index.update(ts, high, low, close)
+        state['i'] = i + 1
+    return fn
+
+
+@case('fvg.locate')
+def bench_fvg_locate():
+    index = _fvg_index(5000)
+    price = synthetic_ohlcv(5000, seed=3)[-1][4]
+    return lambda: index.locate(price)
+
+
+_FEATURES_10K = FeaturePipeline('5m').compute(synthetic_ohlcv(10_000, seed=3))
+
+
+@case('regime.update[1 bar]')
+def bench_regime_update():
+    rows = _FEATURES_10K.to_dict('records')
+    regime = RegimeClassifier()
+    state = {'i': 0}
+
+    def fn():
+        i = state['i']
+        if i == len(rows):
+            regime.reset()
+            i = 0
+        regime.on_bar(rows[i])
+        state['i'] = i + 1
+    return fn
+
+
+@case('regime.classify[10k]', repeat=3)
+def bench_regime_classify():
+    regime = RegimeClassifier()
+    return lambda: regime.classify(_FEATURES_10K)
+
+
+@case('strategy.determine_mode+regime[x40]')
+def bench_determine_mode():
+    engine = StrategyEngine(STRATEGY_CONFIG)
+    engine.regime = RegimeClassifier()
+    for row in _FEATURES_10K.tail(500).to_dict('records'):
+        engine.regime.on_bar(row)
+
+    def fn():
+        for state in _STATES:
+            engine.determine_mode(state)
+    return fn
+
+
+@case('strategy.entry_masks[10k]', repeat=3)
+def bench_entry_masks():
+    engine = StrategyEngine(STRATEGY_CONFIG)
+    return lambda: engine.entry_masks(_FEATURES_10K)
+
+
+@case('strategy.should_exit[x40]')
+def bench_should_exit():
+    engine = StrategyEngine(STRATEGY_CONFIG)
+    entry = _STATES[0]['price']
+
+    def fn():
+        engine.peak_profit_tracker.clear()
+        for state in _STATES:
+            engine.should_exit('LONG', entry, state['price'], state)
+    return fn
+
+
+@case('strategy.calculate_dynamic_sl[x40]')
+def bench_dynamic_sl():
+    engine = StrategyEngine(STRATEGY_CONFIG)
+    entry = _STATES[0]['price']
+
+    def fn():
+        for state in _STATES:
+            engine.calculate_dynamic_sl(entry, state, (state['price'] / entry - 1) * 100)
+    return fn
+
+
+# ------------------------------------------------------------------ 포지션 기록
+
+def _position_manager(n_trades):
+    pm = PositionManager(history_file=str(WORKDIR / f"logs/bench_history_{n_trades}.json"))
+    pm.trade_history = []
+    for i in range(n_trades):
+        pm.open_position('LONG', 2000 + i % 50, 1.0, 'TREND', 1980, 2050)
+        pm.close_position(2000 + (i * 7) % 61 - 30, 'TP')
+    return pm
+
+
+@case('position._save_history[1k]', repeat=3)
+def bench_save_history():
+    pm = _position_manager(1000)
+    return pm._save_history
+
+
+@case('position.get_stats[1k]')
+def bench_get_stats():
+    pm = _position_manager(1000)
+    return pm.get_stats
+
+
+def _ledger(name, trades):
+    """거래 DataFrame(trade_analysis 형식) → 청산 거래로 채운 원장"""
+    ledger = TradeLedger(WORKDIR / f"logs/{name}.db", batch_size=10 ** 9)
+    for row in trades.to_dict('records'):
+        ledger.record_trade(row.pop('trade_id'), status='CLOSED', **row)
+    ledger.flush()
+    return ledger
+
+
+@case('position.get_stats+ledger[100k]')
+def bench_get_stats_ledger():
+    ledger = _ledger('bench_stats_100k', synthetic_trades(100_000))
+    pm = PositionManager(history_file=str(WORKDIR / "logs/bench_history_ledger.json"), ledger=ledger)
+
+    def fn():
+        ledger._stats_key = None          # 매번 청산 직후처럼 캐시 없이 쿼리
+        return pm.get_stats()
+    return fn
+
+
+@case('ledger.open+close (enqueue)')
+def bench_ledger_record():
+    ledger = TradeLedger(WORKDIR / "logs/bench_ledger_live.db")
+    ledger.start()
+    state = {'id': 0}
+
+    def fn():
+        state['id'] += 1
+        ledger.open_trade(state['id'], 'LONG', 2000.0, 1.0, 'TREND', 1980.0, 2050.0)
+        ledger.close_trade(state['id'], 'LONG', 2000.0, 2010.0, 1.0, 'TP (목표 익절)')
+    return fn
+
+
+def _status_fields(price):
+    return dict(
+        last_update='12:00:00', price=price, delta=1.5, cvd_history=[float(i) for i in range(60)],
+        position='LONG', entry_price=2000.0, pnl_pct=round((price / 2000.0 - 1) * 100, 3), mode='TREND',
+        indicators={'rsi': 55.0, 'bb_pct': 0.6, 'trend': 'UP'},
+        cooldown={'exit_until': None, 'last_exit_reason': None},
+        zones=[{'price': 2000.0 + i * 10, 'kind': 'support', 'touches': 3} for i in range(10)],
+        loop={'lag_ms': 2, 'tick_ms': 40}
+    )
+
+
+@case('status.publish (changed)')
+def bench_status_publish():
+    writer = StatusWriter(WORKDIR / "status.json", volatile=('last_update', 'loop'))
+    state = {'i': 0}
+
+    def fn():
+        state['i'] += 1
+        writer.publish(**_status_fields(2000.0 + (state['i'] & 15) * 0.1))
+    return fn
+
+
+@case('status.publish (unchanged)')
+def bench_status_publish_same():
+    writer = StatusWriter(WORKDIR / "status.json", volatile=('last_update', 'loop'))
+    writer.publish(**_status_fields(2000.0))
+    return lambda: writer.publish(**_status_fields(2000.0))
+
+
+# ------------------------------------------------------------------ 데이터 수집
+
+def _risk_engine():
+    risk = RiskEngine()
+    risk.sync_equity(1000.0)
+    risk.replay(_position_manager(1_000).trade_history)
+    risk.paused_until = 0.0
+    risk.on_entry('LONG', 2000.0, 8.0)
+    return risk
+
+
+@case('risk.on_tick')
+def bench_risk_tick():
+    risk = _risk_engine()
+    risk.timeout_bars = 0
+    state = {'bar': 0}
+
+    def fn():
+        state['bar'] += 1
+        risk.on_tick(2000.0 + (state['bar'] & 7) * 0.1, state['bar'] >> 6)
+    return fn
+
+
+@case('risk.can_enter')
+def bench_risk_can_enter():
+    return _risk_engine().can_enter
+
+
+def _collector():
+    return DataCollector()
+
+
+def _price_kwargs(i):
+    row = _OHLCV[i % len(_OHLCV)]
+    return dict(symbol="ETH/USDT", open=row[1], high=row[2], low=row[3], close=row[4], volume=row[5],
+                rsi=45.5, bb_pct=0.45, trend_5m="UP", market_mode="trend")
+
+
+@case('data_collector.record_price_data')
+def bench_record_price():
+    collector = _collector()
+    collector.buffer_size = 10 ** 9   # 플러시 제외, 기록 경로만 측정
+    kwargs = _price_kwargs(0)
+
+    def fn():
+        collector.record_price_data(**kwargs)
+        if len(collector.price_buffer) > 10000:
+            collector.price_buffer.clear()
+    return fn
+
+
+@case('data_collector._flush_buffer[100]', repeat=3)
+def bench_flush_buffer():
+    collector = _collector()
+    rows = []
+    for i in range(100):
+        row = {col: _price_kwargs(i).get(col) for col in collector.price_columns}
+        row['timestamp'] = datetime.now().isoformat()
+        rows.append(row)
+
+    def fn():
+        collector.price_buffer = list(rows)
+        collector._flush_buffer()
+    return fn
+
+
+@case('data_collector.feed.record_features')
+def bench_feed_record():
+    feed = CollectorFeed(capacity=1024)
+    atexit.register(feed.close)
+    row = _DF.iloc[-2]
+
+    def fn():
+        if not feed.record_features(row, market_mode='TREND'):
+            feed.ring.pop_many(1024)     # 소비자 대신 비움
+    return fn
+
+
+def _bus():
+    bus = CandleBus('lumi-bench-bus', list(_DF.columns), capacity=500, create=True)
+    atexit.register(bus.close)
+    return bus
+
+
+@case('candle_bus.publish')
+def bench_bus_publish():
+    bus = _bus()
+    rows = _DF.to_dict('records')
+    state = {'ts': 0}
+
+    def fn():
+        state['ts'] += 1
+        bus.on_bar(dict(rows[-2], timestamp=state['ts']))
+        bus.set_forming(rows[-1])
+    return fn
+
+
+@case('candle_bus.read[100]')
+def bench_bus_read():
+    bus = _bus()
+    for i, row in enumerate(_DF.to_dict('records')[:-1]):
+        bus.on_bar(dict(row, timestamp=i + 1))
+    bus.set_forming(_DF.iloc[-1].to_dict())
+    consumer = CandleBus.attach(bus.name)
+    atexit.register(consumer.close)
+    return lambda: consumer.read(100)
+
+
+# ------------------------------------------------------------------ 캔들 저장소
+
+_ARCHIVE_ROWS = np.array(synthetic_ohlcv(200_000, tf_ms=60_000), dtype=np.float64)
+_DAY = (_ARCHIVE_ROWS[100_000, 0], _ARCHIVE_ROWS[100_000 + 1440, 0])
+
+
+@case('candle_store.view[1 day of 200k]')
+def bench_store_view():
+    writer = BinaryCandleArchive("bench_bin", "ETH/USDT")
+    if writer.last_timestamp('1m') is None:
+        writer.append('1m', _ARCHIVE_ROWS)
+    writer.close()
+    reader = BinaryCandleArchive("bench_bin", "ETH/USDT")
+    return lambda: reader.view('1m', *_DAY)[:, 4].mean()
+
+
+@case('candle_store.append[1 bar]')
+def bench_store_append():
+    archive = BinaryCandleArchive("bench_bin_append", "ETH/USDT")
+    row = _ARCHIVE_ROWS[:1].copy()
+
+    def fn():
+        row[0, 0] += 60_000
+        archive.append('1m', row)
+    return fn
+
+
+@case('reference.csv_archive.read[1 day of 200k]', repeat=3)
+def bench_csv_archive_read():
+    archive = CandleArchive("bench_csv", "ETH/USDT")
+    if archive.last_timestamp('1m') is None:
+        archive.append('1m', _ARCHIVE_ROWS)
+    return lambda: archive.read('1m', *_DAY)['close'].mean()
+
+
+@case('synthetic.generate[1M]', repeat=3)
+def bench_synthetic():
+    market = SyntheticMarket(seed=1)
+    return lambda: market.generate(1_000_000, start_ts=0)
+
+
+# ------------------------------------------------------------------ 백테스트 커널
+
+_BT_ENTRIES = np.arange(30, len(_FEATURES_10K) - 1, 5)
+_BT_SIDES = np.where(np.arange(len(_BT_ENTRIES)) % 2, 'SHORT', 'LONG')
+
+
+def reference_exits(engine, df, entries, sides):
+    """커널 비교 기준: 봉마다 실거래 경로 (calculate_dynamic_sl_price → should_exit) 호출"""
+    close = df['close'].to_numpy()
+    states = [{'price': r['close'], 'rsi': r['rsi'], 'bb_pct': r['bb_pct_b'], 'bb_width': r['bb_bandwidth'],
+               'trend': r['trend'], 'ema8': r['ema8'], 'ema21': r['ema21']} for r in df.to_dict('records')]
+    strategy_log = get_logger('strategy')
+
+    def fn():
+        strategy_log.disabled = True
+        exits = []
+        for entry_index, side in zip(entries, sides):
+            entry = close[entry_index]
+            direction = 1 if side == 'LONG' else -1
+            engine.peak_profit_tracker[side] = 0
+            exit_index = -1
+            for j in range(entry_index + 1, len(close)):
+                price, state = close[j], states[j]
+                pnl = (price / entry - 1) * 100 * direction
+                sl_price = engine.calculate_dynamic_sl_price(entry, side, state, pnl)
+                if (price <= sl_price) if direction > 0 else (price >= sl_price):
+                    exit_index = j
+                    break
+                if engine.should_exit(side, entry, price, state)[0]:
+                    exit_index = j
+                    break
+            engine.peak_profit_tracker.pop(side, None)
+            exits.append(exit_index)
+        strategy_log.disabled = False
+        return exits
+    return fn
+
+
+@case('kernels.indicators[10k]', repeat=3)
+def bench_kernel_indicators():
+    close = _FEATURES_10K['close'].to_numpy()
+    return lambda: kernels.indicators(close)
+
+
+@case('kernels.simulate_exits[2k positions of 10k]', repeat=3)
+def bench_kernel_exits():
+    engine = StrategyEngine(STRATEGY_CONFIG)
+    return lambda: engine.simulate_exits(_FEATURES_10K, _BT_ENTRIES, _BT_SIDES)
+
+
+@case('reference.should_exit_loop[2k positions of 10k]', repeat=1, min_time=0)
+def bench_reference_exits():
+    return reference_exits(StrategyEngine(STRATEGY_CONFIG), _FEATURES_10K, _BT_ENTRIES, _BT_SIDES)
+
+
+# ------------------------------------------------------------------ 자기 학습
+
+def synthetic_trades(n, seed=7):
+    """trade_analysis_*.csv 형식 거래 데이터"""
+    rng = np.random.default_rng(seed)
+    start = datetime(2026, 1, 1)
+    pnl = rng.normal(0.5, 10, n)
+    return pd.DataFrame({
+        'trade_id': np.arange(1, n + 1),
+        'timestamp': [(start + timedelta(minutes=int(m))).isoformat() for m in rng.integers(0, 60 * 24 * 90, n)],
+        'type': rng.choice(['LONG', 'SHORT'], n),
+        'mode': rng.choice(['TREND', 'REVERSAL'], n),
+        'entry_price': rng.normal(2000, 50, n),
+        'pnl': pnl,
+        'pnl_pct': pnl / 20,
+        'entry_rsi': rng.uniform(20, 80, n),
+        'entry_bb_pct': rng.uniform(0, 1, n),
+        'duration_seconds': rng.integers(60, 7200, n),
+        'exit_reason': rng.choice(['SL', 'TP', 'TS', 'PG'], n),
+        'market_regime': rng.choice(['trend', 'range', 'volatile'], n),
+    })
+
+
+def _learner(n_trades):
+    learner = SelfLearningSystem()
+    learner.data_dir = WORKDIR / f"learn_{n_trades}"
+    learner.data_dir.mkdir(parents=True, exist_ok=True)
+    learner.insights_file = learner.data_dir / "strategy_insights.json"
+    synthetic_trades(n_trades).to_csv(learner.data_dir / "trade_analysis_202601.csv", index=False)
+    return learner
+
+
+@case('montecarlo.simulate[100k x 100]', repeat=3)
+def bench_montecarlo():
+    sim = MonteCarloRisk(synthetic_trades(200)['pnl_pct'].to_numpy(), seed=1)
+    return lambda: sim.simulate(100_000, 100)
+
+
+@case('self_learning.learn_from_trades[1k]', repeat=3)
+def bench_learn_1k():
+    return _learner(1_000).learn_from_trades
+
+
+@case('self_learning.learn_from_trades[100k]', repeat=1, min_time=0)
+def bench_learn_100k():
+    return _learner(100_000).learn_from_trades
+
+
+def _ledger_learner(n_trades):
+    learner = _learner(n_trades)
+    learner.ledger_file = _ledger(f"bench_learn_{n_trades}", synthetic_trades(n_trades)).path
+    return learner
+
+
+@case('self_learning.learn_from_trades[1k ledger]', repeat=3)
+def bench_learn_1k_ledger():
+    return _ledger_learner(1_000).learn_from_trades
+
+
+@case('self_learning.learn_from_trades[100k ledger]', repeat=1, min_time=0)
+def bench_learn_100k_ledger():
+    return _ledger_learner(100_000).learn_from_trades
+
+
+if __name__ == "__main__":
+    sys.exit(run())
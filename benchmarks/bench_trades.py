@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+benchmarks/bench_trades.py - 체결 CVD 처리량 벤치마크
+
+실행:
+    python benchmarks/bench_trades.py                  # baseline 대비 회귀 검사 + 처리량 확인
+    python benchmarks/bench_trades.py --save-baseline  # baseline 갱신
+
+목표: ETH 선물 최대 체결 속도(청산 연쇄 시 초당 수만 건)를 코어 1개로 처리
+- trades.add_batch: 폴링 1회분(1000건) 반영 (5m + 15m 두 시간대)
+- trades.add_trade: 1건씩 반영 (웹소켓 메시지 단위 처리 시 최악의 경우)
+- trades.replay: 덤프 CSV 재생 (파싱 포함)
+"""
+
+import csv
+import sys
+
+import numpy as np
+
+from harness import case, run, temp_workdir, measure, quiet
+
+WORKDIR = temp_workdir()
+
+from modules.trades import CVDAggregator, AggTradeReplay  # noqa: E402
+
+PEAK_TRADES_PER_SEC = 20_000
+BATCH = 1000
+
+
+def synthetic_agg_trades(n, seed=7, start_ts=1_770_000_000_000, rate=2000):
+    """시드 고정 aggTrades (평균 초당 rate건)"""
+    rng = np.random.default_rng(seed)
+    ids = np.arange(1, n + 1, dtype=np.int64)
+    ts = start_ts + np.cumsum(rng.exponential(1000 / rate, n)).astype(np.int64)
+    price = 2000 * np.exp(np.cumsum(rng.normal(0, 2e-5, n)))
+    qty = rng.lognormal(-1.5, 1.2, n)
+    maker = rng.random(n) < 0.5
+    return ids, ts, price, qty, maker
+
+
+_TRADES = synthetic_agg_trades(200_000)
+_REPLAY_FILE = WORKDIR / "ETHUSDT-aggTrades.csv"
+with open(_REPLAY_FILE, 'w', newline='') as f:
+    writer = csv.writer(f)
+    writer.writerow(['agg_trade_id', 'price', 'quantity', 'first_trade_id', 'last_trade_id',
+                     'transact_time', 'is_buyer_maker'])
+    for i, t, p, q, m in zip(*(a[:50_000].tolist() for a in _TRADES)):
+        writer.writerow([i, f"{p:.2f}", f"{q:.3f}", i, i, t, 'true' if m else 'false'])
+
+
+def _batches():
+    ids, ts, price, qty, maker = _TRADES
+    return [(ids[i:i + BATCH], ts[i:i + BATCH], price[i:i + BATCH], qty[i:i + BATCH], maker[i:i + BATCH])
+            for i in range(0, len(ids), BATCH)]
+
+
+@case('trades.add_batch[1000]')
+def bench_add_batch():
+    batches = _batches()
+    state = {'agg': CVDAggregator(('5m', '15m')), 'i': 0}
+
+    def step():
+        if state['i'] == len(batches):
+            state['agg'], state['i'] = CVDAggregator(('5m', '15m')), 0
+        state['agg'].add_trades(*batches[state['i']])
+        state['i'] += 1
+    return step
+
+
+@case('trades.add_trade[1]')
+def bench_add_trade():
+    ids, ts, price, qty, maker = (a.tolist() for a in _TRADES)
+    state = {'agg': CVDAggregator(('5m', '15m')), 'i': 0}
+
+    def step():
+        i = state['i']
+        if i == len(ids):
+            state['agg'], i = CVDAggregator(('5m', '15m')), 0
+        state['agg'].add_trade(ids[i], ts[i], price[i], qty[i], maker[i])
+        state['i'] = i + 1
+    return step
+
+
+@case('trades.replay[50k]', repeat=3)
+def bench_replay():
+    def step():
+        agg = CVDAggregator(('5m', '15m'))
+        AggTradeReplay(_REPLAY_FILE, agg.add_trades).run()
+    return step
+
+
+def throughput_check():
+    """배치 처리량이 목표 체결 속도의 몇 배인지"""
+    with quiet():
+        per_batch, _ = measure(bench_add_batch())
+        per_trade, _ = measure(bench_add_trade())
+    batch_rate = BATCH / per_batch
+    single_rate = 1 / per_trade
+    print(f"\n처리량: 배치 {batch_rate:,.0f}건/s, 단건 {single_rate:,.0f}건/s "
+          f"(목표 {PEAK_TRADES_PER_SEC:,}건/s)")
+    if batch_rate < PEAK_TRADES_PER_SEC:
+        print("❌ 배치 처리량이 목표 미달")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    code = run()
+    if '--save-baseline' not in sys.argv and '--only' not in ' '.join(sys.argv):
+        code = code or throughput_check()
+    sys.exit(code)
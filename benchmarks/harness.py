@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+benchmarks/harness.py - 마이크로 벤치마크 공용 실행기
+
+- @case('이름')으로 벤치마크 등록, setup 함수가 반환한 callable을 반복 측정
+- 호출당 시간 = 반복(repeat) 측정의 중앙값 (루프 수는 min_time 기준 자동 조정)
+  최소값은 운 좋은 한 번에 좌우됨 → 기록/비교 모두 중앙값
+- 반복마다 교정(calibration) 워크로드와 케이스를 번갈아 측정 → 상대 시간(= 호출당 / 교정)의 중앙값으로 기록/비교
+  장비 속도 차이와 측정 중 CPU 부하 변동이 나눠져 없어짐 → baseline.json은 장비와 무관
+- baseline 대비 상대 시간이 threshold 배 이상이면 1회 재측정, 그래도 넘으면 실패 (exit code 1)
+  baseline이 SMALL_CASE_SECONDS 미만인 케이스는 타이머/스케줄러 노이즈 비중이 커서 SMALL_CASE_THRESHOLD 적용
+
+Python/numpy 버전이 바뀌면 교정 워크로드와 케이스의 속도비도 바뀔 수 있음 → --save-baseline으로 다시 생성
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+BASELINE_FILE = Path(__file__).resolve().parent / "baseline.json"
+DEFAULT_THRESHOLD = 1.5    # 50% 이상 느려지면 회귀
+SMALL_CASE_SECONDS = 50e-6  # 이보다 짧은 케이스는
+SMALL_CASE_THRESHOLD = 2.0  # 2배까지 허용 (단일 CPU 장비에서 같은 코드가 1.5배 넘게 흔들림)
+CALIBRATION_MIN_TIME = 0.02
+
+CASES = []
+
+_CALIBRATION_ARRAY = np.random.default_rng(0).random(20_000)
+
+
+def _calibration_workload():
+    """교정용 고정 작업 (순수 파이썬 루프 + numpy 정렬 - 핫패스 구성과 비슷하게)"""
+    total = 0.0
+    for value in _CALIBRATION_ARRAY[:2000].tolist():
+        total += value * value
+    return total + float(np.sort(_CALIBRATION_ARRAY)[0])
+
+
+def case(name, repeat=5, min_time=0.2):
+    """
+    벤치마크 등록 데코레이터
+
+    데코레이트된 함수는 setup 역할: 측정할 무인자 callable을 반환
+    """
+    def decorator(setup):
+        CASES.append({'name': name, 'setup': setup, 'repeat': repeat, 'min_time': min_time})
+        return setup
+    return decorator
+
+
+@contextlib.contextmanager
+def quiet():
+    """측정 대상의 print 출력 차단"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def _timed(fn, loops):
+    """loops회 호출의 호출당 시간 (초)"""
+    start = time.perf_counter()
+    for _ in range(loops):
+        fn()
+    return (time.perf_counter() - start) / loops
+
+
+def _autorange(fn, min_time):
+    """min_time 이상 걸리는 루프 수 (timeit.autorange 방식) + 마지막 측정의 호출당 시간"""
+    loops = 1
+    while True:
+        per_call = _timed(fn, loops)
+        elapsed = per_call * loops
+        if elapsed >= min_time or loops >= 1_000_000:
+            return loops, per_call
+        loops *= 2 if elapsed > min_time / 10 else 10
+
+
+def measure(fn, repeat=5, min_time=0.2):
+    """호출당 시간 (초, repeat회 측정의 중앙값)"""
+    loops, first = _autorange(fn, min_time)
+    results = [first] + [_timed(fn, loops) for _ in range(repeat - 1)]
+    return float(np.median(results)), loops
+
+
+_calibration_loops = None
+
+
+def _calibrate():
+    """교정 워크로드 호출당 시간 (초, 약 CALIBRATION_MIN_TIME 동안 측정)"""
+    global _calibration_loops
+    if _calibration_loops is None:
+        _calibration_loops, _ = _autorange(_calibration_workload, CALIBRATION_MIN_TIME)
+    return _timed(_calibration_workload, _calibration_loops)
+
+
+def measure_relative(fn, repeat=5, min_time=0.2):
+    """
+    교정 워크로드 대비 상대 시간 (반복마다 교정 → 케이스 순으로 번갈아 측정)
+
+    Returns:
+        (float, float, float): 호출당 시간 (초), 교정 시간 (초), 상대 시간 - 각각 repeat회 중앙값
+    """
+    references = [_calibrate()]
+    loops, first = _autorange(fn, min_time)
+    per_calls = [first]
+    for _ in range(repeat - 1):
+        references.append(_calibrate())
+        per_calls.append(_timed(fn, loops))
+    ratios = [p / r for p, r in zip(per_calls, references)]
+    return float(np.median(per_calls)), float(np.median(references)), float(np.median(ratios))
+
+
+def load_baseline(path=BASELINE_FILE):
+    """케이스별 상대 시간 (절대 시간으로 저장된 옛 형식은 무시)"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('relative', {})
+    except (OSError, ValueError):
+        return {}
+
+
+def save_baseline(results, path=BASELINE_FILE):
+    """기존 baseline에 병합 저장 (다른 스위트 결과 보존)"""
+    cases = load_baseline(path)
+    cases.update(results)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'python': sys.version.split()[0],
+            'numpy': np.__version__,
+            'unit': 'calibration',
+            'relative': dict(sorted(cases.items()))
+        }, f, indent=2, ensure_ascii=False)
+
+
+def _format_time(seconds):
+    if seconds >= 1:
+        return f"{seconds:8.3f} s "
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:8.3f} ms"
+    return f"{seconds * 1e6:8.2f} us"
+
+
+def run(argv=None):
+    """CLI 진입점: python benchmarks/bench_xxx.py [--save-baseline] [--only 패턴]"""
+    parser = argparse.ArgumentParser(description="LUMI 핫패스 벤치마크")
+    parser.add_argument('--save-baseline', action='store_true', help="결과를 baseline.json에 저장")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help="회귀 판정 배수")
+    parser.add_argument('--small-threshold', type=float, default=SMALL_CASE_THRESHOLD,
+                        help=f"baseline {SMALL_CASE_SECONDS * 1e6:.0f}us 미만 케이스의 회귀 판정 배수")
+    parser.add_argument('--only', default='', help="이름에 포함된 케이스만 실행")
+    args = parser.parse_args(argv)
+
+    baseline = load_baseline()
+    results = {}
+    regressions = []
+
+    # baseline 열 = baseline 상대 시간 × 이번 교정 시간 (이 장비/이 순간 기준 기대 시간)
+    print(f"{'케이스':<44} {'호출당':>11} {'baseline':>11} {'비율':>7}")
+    print("-" * 78)
+    for item in CASES:
+        if args.only and args.only not in item['name']:
+            continue
+        with quiet():
+            fn = item['setup']()
+            per_call, reference, relative = measure_relative(fn, item['repeat'], item['min_time'])
+        base = baseline.get(item['name'])
+        if base:
+            expected = base * reference
+            threshold = args.small_threshold if expected < SMALL_CASE_SECONDS else args.threshold
+            if relative / base > threshold:
+                # 일시적 부하일 수 있음 → 1회 재측정해서 나은 쪽
+                with quiet():
+                    retry = measure_relative(fn, item['repeat'], item['min_time'])
+                if retry[2] < relative:
+                    per_call, reference, relative = retry
+                    expected = base * reference
+            ratio = relative / base
+            flag = "  ❌" if ratio > threshold else ""
+            if ratio > threshold:
+                regressions.append((item['name'], ratio, threshold))
+            print(f"{item['name']:<44} {_format_time(per_call)} {_format_time(expected)} {ratio:6.2f}x{flag}")
+        else:
+            print(f"{item['name']:<44} {_format_time(per_call)} {'-':>11} {'-':>7}")
+        results[item['name']] = relative
+
+    if args.save_baseline:
+        save_baseline(results)
+        print(f"\n💾 baseline 저장: {BASELINE_FILE}")
+        return 0
+
+    if regressions:
+        print(f"\n❌ 성능 회귀 {len(regressions)}건 (기준 {args.threshold:.2f}x, "
+              f"{SMALL_CASE_SECONDS * 1e6:.0f}us 미만 {args.small_threshold:.2f}x)")
+        for name, ratio, threshold in regressions:
+            print(f"   {name}: {ratio:.2f}x (기준 {threshold:.2f}x)")
+        return 1
+
+    print("\n✅ 회귀 없음")
+    return 0
+
+
+def temp_workdir():
+    """logs/ 등을 생성하는 코드용 임시 작업 디렉토리로 이동"""
+    import tempfile
+    path = tempfile.mkdtemp(prefix='lumi_bench_')
+    os.chdir(path)
+    return Path(path)
+
+
+def synthetic_ohlcv(n=100, seed=42, start_price=2000.0, tf_ms=300_000):
+    """시드 고정 랜덤워크 OHLCV (fetch_ohlcv 반환 형식)"""
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0, 0.003, n)
+    close = start_price * np.exp(np.cumsum(returns))
+    open_ = np.concatenate([[start_price], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.002, n)) * close
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+    volume = rng.lognormal(7, 0.5, n)
+    ts = 1_770_000_000_000 + np.arange(n, dtype=np.int64) * tf_ms
+    return [[int(t), o, h, l, c, v] for t, o, h, l, c, v in zip(ts, open_, high, low, close, volume)]
@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""
+modules/candle_bus.py - 공유 메모리 캔들 버스 (발행자 1 → 로컬 소비자 N, seqlock)
+
+라이브 봇/섀도 변형/수집기가 각자 fetch_ohlcv를 폴링하면 소비자 수만큼 거래소 부하가 늘어남
+→ 발행자(라이브 봇의 MarketDataProvider) 하나가 마감 봉 + 진행 중인 봉의 피처를
+  이름 있는 공유 메모리 NumPy 배열에 쓰고, 소비자는 이름으로 연결해서 읽기만 함
+
+버스 1개 = 심볼 1개 × 시간대 1개 (이름: lumi-bus-ETHUSDT-5m)
+- 헤더 (int64): magic, capacity, 컬럼 수, 스키마 길이 | seq, 마감 봉 누적 수, 진행 중 봉 유무,
+  갱신 시각(ms), 마지막 마감 봉 시각, 세대(발행자 재시작마다 +1)
+- 스키마: 컬럼 이름 JSON (소비자는 버스 이름만 알면 연결 가능)
+- 데이터 (float64): 마감 봉 링 [capacity × 컬럼] + 진행 중인 봉 1행
+  문자열 피처(trend, session 등)는 CATEGORIES 코드, 없음은 NaN
+
+seqlock
+- 발행자: seq를 홀수로(쓰는 중) → 행 기록 → seq를 짝수로
+- 소비자: seq 읽기(홀수면 재시도) → 복사 → seq 재확인, 같으면 일관된 스냅샷
+  view()는 복사 없는 뷰와 seq를 반환 → 사용 후 valid(seq)로 확인 (False면 다시 읽기)
+"""
+
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from .shm_ring import adopt_shared_memory, attach_shared_memory, create_shared_memory
+
+MAGIC = 0x4C554D4942555331        # 'LUMIBUS1'
+HEADER_BYTES = 256
+SCHEMA_BYTES = 4096
+_MAGIC, _CAPACITY, _NCOLS, _SCHEMA_LEN = 0, 1, 2, 3
+_SEQ, _CLOSED, _FORMING, _UPDATED, _LAST_TS, _GENERATION = 8, 9, 10, 11, 12, 13
+
+# 문자열 피처 → 코드 (목록 순서가 코드)
+CATEGORIES = {
+    'trend': ('UP', 'DOWN'),
+    'trend_15m': ('UP', 'DOWN'),
+    'trend_1h': ('UP', 'DOWN'),
+    'session': ('asia', 'london', 'newyork', 'late'),
+}
+INT_COLUMNS = ('timestamp', 'fvg_bull', 'fvg_bear')
+
+
+def bus_name(symbol, timeframe):
+    return f"lumi-bus-{symbol.replace('/', '').replace(':', '')}-{timeframe}"
+
+
+class CandleBus:
+    """공유 메모리 캔들 버스 (한 심볼 × 한 시간대)"""
+
+    def __init__(self, name, columns=None, capacity=500, create=False):
+        """
+        Args:
+            name: 공유 메모리 이름 (bus_name(symbol, timeframe))
+            columns: 컬럼 목록 (발행자만, 보통 FEATURE_COLUMNS)
+            capacity: 보관할 마감 봉 수
+            create: True면 발행자 (같은 이름의 이전 버스가 있으면 재사용/재생성)
+        """
+        self.name = name
+        self.owner = create
+        if create:
+            self._create(name, list(columns), capacity)
+        else:
+            self.shm = attach_shared_memory(name)
+            if int(np.ndarray(1, dtype=np.int64, buffer=self.shm.buf)[0]) != MAGIC:
+                self.shm.close()
+                raise ValueError(f"캔들 버스 형식 불일치: {name}")
+            self._map()
+        self.codes = {col: {value: float(i) for i, value in enumerate(values)}
+                      for col, values in CATEGORIES.items() if col in self.index}
+        self.lookups = {col: np.array(list(values) + [None], dtype=object)
+                        for col, values in CATEGORIES.items() if col in self.index}
+
+    # ------------------------------------------------------------------ 메모리
+
+    @staticmethod
+    def _size(ncols, capacity):
+        return HEADER_BYTES + SCHEMA_BYTES + (capacity + 1) * ncols * 8
+
+    def _create(self, name, columns, capacity):
+        schema = json.dumps(columns).encode('utf-8')
+        if len(schema) > SCHEMA_BYTES:
+            raise ValueError("컬럼 스키마가 너무 큼")
+        size = self._size(len(columns), capacity)
+        generation = 0
+        try:
+            self.shm = create_shared_memory(name, size)
+        except FileExistsError:
+            # 이전 발행자가 남긴 버스: 형식이 같으면 재사용 (연결된 소비자 유지), 다르면 새로 만듦
+            old = adopt_shared_memory(name)
+            header = np.ndarray(HEADER_BYTES // 8, dtype=np.int64, buffer=old.buf)
+            same = (old.size >= size and int(header[_MAGIC]) == MAGIC and int(header[_CAPACITY]) == capacity
+                    and bytes(old.buf[HEADER_BYTES:HEADER_BYTES + int(header[_SCHEMA_LEN])]) == schema)
+            generation = int(header[_GENERATION]) + 1 if same else 0
+            del header
+            if same:
+                self.shm = old
+            else:
+                old.close()
+                old.unlink()
+                self.shm = create_shared_memory(name, size)
+        header = np.ndarray(HEADER_BYTES // 8, dtype=np.int64, buffer=self.shm.buf)
+        header[_SEQ] += 1 if header[_SEQ] % 2 == 0 else 0      # 재사용 중이면 읽기 차단
+        header[_MAGIC], header[_CAPACITY], header[_NCOLS], header[_SCHEMA_LEN] = MAGIC, capacity, len(columns), len(schema)
+        header[_CLOSED] = header[_FORMING] = header[_UPDATED] = 0
+        header[_LAST_TS] = -1
+        header[_GENERATION] = generation
+        self.shm.buf[HEADER_BYTES:HEADER_BYTES + len(schema)] = schema
+        del header
+        self._map()
+        self.header[_SEQ] += 1
+
+    def _map(self):
+        self.header = np.ndarray(HEADER_BYTES // 8, dtype=np.int64, buffer=self.shm.buf)
+        self.capacity = int(self.header[_CAPACITY])
+        schema_len = int(self.header[_SCHEMA_LEN])
+        self.columns = json.loads(bytes(self.shm.buf[HEADER_BYTES:HEADER_BYTES + schema_len]).decode('utf-8'))
+        self.index = {col: i for i, col in enumerate(self.columns)}
+        self._ts_col = self.index['timestamp']
+        self.data = np.ndarray((self.capacity + 1, len(self.columns)), dtype=np.float64,
+                               buffer=self.shm.buf, offset=HEADER_BYTES + SCHEMA_BYTES)
+
+    @classmethod
+    def attach(cls, name):
+        """소비자 측 연결"""
+        return cls(name)
+
+    # ------------------------------------------------------------------ 발행자
+
+    def _encode(self, row):
+        values = []
+        for col in self.columns:
+            value = row.get(col)
+            codes = self.codes.get(col)
+            if codes is not None:
+                value = codes.get(value)
+            values.append(np.nan if value is None else value)
+        return values
+
+    def on_bar(self, row):
+        """마감된 봉 1개 (FeaturePipeline 리스너)"""
+        ts = row['timestamp']
+        header = self.header
+        if ts <= header[_LAST_TS]:
+            return
+        values = self._encode(row)
+        header[_SEQ] += 1
+        self.data[header[_CLOSED] % self.capacity] = values
+        header[_CLOSED] += 1
+        header[_LAST_TS] = ts
+        if header[_FORMING] and self.data[self.capacity, self._ts_col] <= ts:
+            header[_FORMING] = 0            # 방금 마감된 봉 → 다음 set_forming까지 진행 중인 봉 없음
+        header[_UPDATED] = int(time.time() * 1000)
+        header[_SEQ] += 1
+
+    def set_forming(self, row):
+        """진행 중인 봉 갱신 (None이면 없음)"""
+        values = self._encode(row) if row is not None else None
+        header = self.header
+        header[_SEQ] += 1
+        if values is not None:
+            self.data[self.capacity] = values
+        header[_FORMING] = values is not None
+        header[_UPDATED] = int(time.time() * 1000)
+        header[_SEQ] += 1
+
+    # ------------------------------------------------------------------ 소비자
+
+    @property
+    def seq(self):
+        return int(self.header[_SEQ])
+
+    @property
+    def generation(self):
+        return int(self.header[_GENERATION])
+
+    def age(self):
+        """마지막 갱신 후 경과 시간 (초, 갱신 전이면 None)"""
+        updated = int(self.header[_UPDATED])
+        return time.time() - updated / 1000 if updated else None
+
+    def view(self):
+        """
+        복사 없는 뷰 (seq, 마감 봉 링, 진행 중인 봉 행, 마감 봉 누적 수)
+
+        링의 순서는 (누적 수 % capacity)부터 시작 - 사용 후 valid(seq) 확인
+        """
+        while True:
+            seq = int(self.header[_SEQ])
+            if not seq & 1:
+                return seq, self.data[:self.capacity], self.data[self.capacity], int(self.header[_CLOSED])
+
+    def valid(self, seq):
+        """view() 이후 발행자가 쓰지 않았는지"""
+        return int(self.header[_SEQ]) == seq
+
+    def read_block(self, limit=None, retries=1000):
+        """
+        일관된 스냅샷 복사 (오래된 → 최신, 진행 중인 봉 포함)
+
+        Returns:
+            (ndarray, bool): (행 × 컬럼, 마지막 행이 진행 중인 봉인지) / 실패 시 (None, False)
+        """
+        header = self.header
+        for _ in range(retries):
+            seq = int(header[_SEQ])
+            if seq & 1:
+                continue
+            total = int(header[_CLOSED])
+            forming = bool(header[_FORMING])
+            closed = min(total, self.capacity)
+            if limit:
+                closed = min(closed, max(limit - forming, 0))
+            idx = np.arange(total - closed, total) % self.capacity
+            if forming:
+                idx = np.append(idx, self.capacity)
+            block = self.data[idx]
+            if int(header[_SEQ]) == seq:
+                return block, forming
+        return None, False
+
+    def read(self, limit=None):
+        """FeaturePipeline.sync와 같은 형식의 DataFrame (실패/빈 버스면 None)"""
+        block, _ = self.read_block(limit)
+        if block is None or not len(block):
+            return None
+        return self.decode(block)
+
+    def decode(self, block):
+        """float 블록 → 피처 DataFrame (문자열/정수 컬럼 복원)"""
+        # 컬럼별로 한 번에 만들어서 DataFrame 생성 (생성 후 컬럼 교체는 느림)
+        columns = {}
+        for col, i in self.index.items():
+            values = block[:, i]
+            lookup = self.lookups.get(col)
+            if lookup is not None:
+                values = lookup[np.where(np.isnan(values), len(lookup) - 1, values).astype(np.int64)]
+            elif col in INT_COLUMNS and not np.isnan(values).any():
+                values = values.astype(np.int64)
+            columns[col] = values
+        return pd.DataFrame(columns)
+
+    def stats(self):
+        return {
+            'name': self.name,
+            'closed': int(self.header[_CLOSED]),
+            'forming': bool(self.header[_FORMING]),
+            'last_ts': int(self.header[_LAST_TS]),
+            'generation': self.generation,
+            'age': self.age(),
+        }
+
+    def close(self):
+        """매핑 해제 (발행자면 공유 메모리도 삭제)"""
+        if getattr(self, 'shm', None) is None:
+            return
+        self.header = None
+        self.data = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+        self.shm = None
@@ -0,0 +1,622 @@
+# -*- coding: utf-8 -*-
+"""
+modules/candle_store.py - 고정 폭 바이너리 캔들 저장소 (np.memmap, 복사 없는 구간 읽기)
+
+CSV는 읽을 때마다 파싱 비용 + 디스크 약 5배 → 봉 1개 = float64 고정 폭 레코드 1개
+파일 1개 = 심볼 1개 × 시간대 1개 (data/ohlcv/ETHUSDT/5m.candles)
+
+파일 배치
+- 헤더 4096바이트: magic 'LUMICNDL' | int64 [버전, 레코드 수, 컬럼 수, 메타 길이, 메타 개정,
+  첫 봉 시각, 마지막 봉 시각] | 메타 JSON (컬럼 이름, 문자열 컬럼 코드표, 시간대 등)
+- 레코드: float64 × 컬럼 수 (첫 컬럼 timestamp, ms - 2^53 미만이라 정확히 표현됨)
+  문자열 컬럼(trend, session 등)은 메타의 코드표 인덱스, 없음은 NaN
+
+시간 인덱스 = 정렬된 timestamp 컬럼 (append가 증가 순서만 허용) → searchsorted로 구간 찾기
+view(start, end)는 memmap 위의 슬라이스 → 백테스트가 몇 달치에서 필요한 구간만 복사 없이 사용
+
+append: 레코드를 먼저 쓰고 헤더의 레코드 수를 나중에 갱신 → 읽는 쪽은 레코드 수까지만 봄
+(쓰다가 죽으면 다음에 쓰기로 열 때 레코드 수 뒤의 잔여 바이트를 잘라냄)
+쓰기는 버퍼 없는 파일의 seek + write (os.pwrite는 POSIX 전용 → Windows에서도 동작)
+"""
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+MAGIC = b'LUMICNDL'
+VERSION = 1
+HEADER_BYTES = 4096
+_FIELDS = 8                       # magic 뒤 int64 필드 수
+_META_OFFSET = 8 + _FIELDS * 8
+_VERSION, _COUNT, _NCOLS, _META_LEN, _META_REV, _FIRST_TS, _LAST_TS = range(7)
+
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+# 수집기 price_data_*.csv의 문자열 컬럼 (나머지는 숫자)
+PRICE_TEXT_COLUMNS = ('symbol', 'trend_5m', 'trend_15m', 'trend_1h', 'market_mode', 'session')
+# trade_log.csv → 거래 레코드 (Note는 자유 문장이라 제외)
+TRADE_LOG_COLUMNS = ['timestamp', 'type', 'price', 'invested', 'avg_price', 'profit', 'balance', 'roi']
+
+
+class CandleStore:
+    """심볼 × 시간대 1개의 바이너리 캔들 파일"""
+
+    def __init__(self, path, columns=None, categories=None, meta=None, unique=True, writable=False):
+        """
+        Args:
+            path: 파일 경로 (.candles)
+            columns: 컬럼 목록 (첫 컬럼 timestamp) - 새 파일을 만들 때 필요, 기존 파일이면 일치 검사
+            categories: {문자열 컬럼: [값, ...]} 초기 코드표 (새 값은 append 때 추가)
+            meta: 헤더에 함께 저장할 정보 (symbol, timeframe 등)
+            unique: True면 같은 시각 중복 불가 (캔들), False면 같은 시각 허용 (거래 기록)
+            writable: True면 쓰기 (없으면 생성)
+        """
+        self.path = Path(path)
+        self.writable = writable
+        self.file = None
+        self._mm = None
+        self._mapped = 0
+        self._meta_dirty = False
+        if not self.path.exists():
+            if not writable or not columns:
+                raise FileNotFoundError(f"캔들 파일 없음: {self.path}")
+            self._create(list(columns), categories or {}, meta or {}, unique)
+        if writable:
+            self.file = open(self.path, 'r+b', buffering=0)
+        self._load_header()
+        if columns and list(columns) != self.columns:
+            self.close()
+            raise ValueError(f"컬럼 불일치: {self.path}")
+        if writable:
+            # 마지막 append가 중간에 끊겼으면 잔여 레코드 제거
+            end = HEADER_BYTES + self.count * self.itemsize
+            if os.path.getsize(self.path) != end:
+                self.file.truncate(end)
+
+    # ------------------------------------------------------------------ 헤더
+
+    def _create(self, columns, categories, meta, unique):
+        if columns[0] != 'timestamp':
+            raise ValueError("첫 컬럼은 timestamp")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        header = np.zeros(_FIELDS, dtype='<i8')
+        header[_VERSION] = VERSION
+        header[_NCOLS] = len(columns)
+        header[_FIRST_TS] = header[_LAST_TS] = -1
+        self.meta = dict(meta, columns=columns, unique=unique,
+                         categories={col: [str(v) for v in values] for col, values in categories.items()})
+        body = self._meta_bytes()
+        header[_META_LEN] = len(body)
+        with open(self.path, 'wb') as f:
+            f.write(MAGIC + header.tobytes() + body)
+            f.truncate(HEADER_BYTES)
+
+    def _meta_bytes(self):
+        body = json.dumps(self.meta, ensure_ascii=False).encode('utf-8')
+        if _META_OFFSET + len(body) > HEADER_BYTES:
+            raise ValueError("메타(컬럼/코드표)가 헤더보다 큼")
+        return body
+
+    def _read_fields(self):
+        with open(self.path, 'rb') as f:
+            raw = f.read(_META_OFFSET)
+        if raw[:8] != MAGIC:
+            raise ValueError(f"캔들 파일 형식 아님: {self.path}")
+        return np.frombuffer(raw, dtype='<i8', offset=8, count=_FIELDS)
+
+    def _load_header(self):
+        fields = self._read_fields()
+        if int(fields[_VERSION]) != VERSION:
+            raise ValueError(f"지원하지 않는 버전: {int(fields[_VERSION])}")
+        with open(self.path, 'rb') as f:
+            f.seek(_META_OFFSET)
+            self.meta = json.loads(f.read(int(fields[_META_LEN])).decode('utf-8'))
+        self.columns = self.meta['columns']
+        self.index = {col: i for i, col in enumerate(self.columns)}
+        self.itemsize = len(self.columns) * 8
+        self.meta_rev = int(fields[_META_REV])
+        self.codes = {col: {value: float(i) for i, value in enumerate(values)}
+                      for col, values in self.meta['categories'].items()}
+        self._set_counts(fields)
+
+    def _set_counts(self, fields):
+        self.count = int(fields[_COUNT])
+        self.first = int(fields[_FIRST_TS]) if fields[_FIRST_TS] >= 0 else None
+        self.last = int(fields[_LAST_TS]) if fields[_LAST_TS] >= 0 else None
+
+    def _write_fields(self, values):
+        """헤더 필드 갱신 ({필드 인덱스: 값})"""
+        fields = np.frombuffer(self._pread(8, _FIELDS * 8), dtype='<i8').copy()
+        for name, value in values.items():
+            fields[name] = value
+        self._pwrite(fields.tobytes(), 8)
+
+    def _pread(self, offset, size):
+        self.file.seek(offset)
+        return self.file.read(size)
+
+    def _pwrite(self, data, offset):
+        """offset 위치에 기록 (버퍼 없는 FileIO라 바로 OS로 - 다른 프로세스의 refresh가 봄)"""
+        self.file.seek(offset)
+        view = memoryview(data)
+        while len(view):
+            view = view[self.file.write(view):]
+
+    def refresh(self):
+        """다른 프로세스가 append한 레코드 반영 (읽기 전용 쪽, merge로 교체됐으면 다시 매핑)"""
+        fields = self._read_fields()
+        if int(fields[_META_REV]) != self.meta_rev:
+            self._mm = None
+            self._load_header()
+        else:
+            self._set_counts(fields)
+        return self.count
+
+    # ------------------------------------------------------------------ 쓰기
+
+    def _code(self, col, value):
+        """문자열 → 코드 (처음 보는 값이면 코드표에 추가)"""
+        if value is None or value != value:
+            return np.nan
+        value = str(value)
+        codes = self.codes[col]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = float(len(codes))
+            self.meta['categories'][col].append(value)
+            self._meta_dirty = True
+        return code
+
+    def encode_frame(self, df):
+        """DataFrame (timestamp는 ms 정수) → float64 레코드 [n × 컬럼 수] (없는 컬럼은 NaN)"""
+        out = np.full((len(df), len(self.columns)), np.nan)
+        dtypes = df.dtypes
+        position = {col: j for j, col in enumerate(df.columns)}
+        other = []
+        for col, i in self.index.items():
+            if col not in position:
+                continue
+            if col not in self.codes and dtypes[col].kind in 'biuf':
+                out[:, i] = df[col].to_numpy()
+            else:
+                other.append((col, i))
+        if not other:
+            return out
+        # 문자열/None 섞인 컬럼은 프레임 전체를 object 배열로 한 번에 (컬럼 선택은 pandas 호출 비용이 큼)
+        block = df.to_numpy(dtype=object)
+        convert = []
+        for col, i in other:
+            values = block[:, position[col]]
+            if col in self.codes:
+                # 고유값만 코드표 조회 (행마다 dict 조회 대신)
+                codes, uniques = pd.factorize(values, use_na_sentinel=True)
+                out[:, i] = np.array([self._code(col, v) for v in uniques] + [np.nan])[codes]
+            else:
+                convert.append((position[col], i))
+        if convert:
+            # None → NaN, 숫자 문자열 허용 (숫자가 아닌 값이 있으면 컬럼별 to_numeric)
+            try:
+                out[:, [i for _, i in convert]] = block[:, [j for j, _ in convert]].astype(np.float64)
+            except (TypeError, ValueError):
+                for j, i in convert:
+                    out[:, i] = pd.to_numeric(pd.Series(block[:, j]), errors='coerce').to_numpy(
+                        dtype=np.float64, na_value=np.nan)
+        return out
+
+    def append(self, rows):
+        """
+        레코드 추가 (timestamp 증가 순서, 마지막 저장 시각 이후만)
+
+        Args:
+            rows: float64 [n × 컬럼 수] 또는 DataFrame (encode_frame으로 변환)
+
+        Returns:
+            int: 기록한 행 수
+        """
+        if not self.writable:
+            raise PermissionError("읽기 전용으로 연 캔들 파일")
+        if isinstance(rows, pd.DataFrame):
+            rows = self.encode_frame(rows)
+        rows = np.ascontiguousarray(rows, dtype=np.float64)
+        if rows.ndim != 2 or rows.shape[1] != len(self.columns):
+            raise ValueError(f"레코드 폭 불일치: {rows.shape} (컬럼 {len(self.columns)})")
+        ts = rows[:, 0]
+        keep = ~np.isnan(ts)
+        if self.last is not None:
+            keep &= (ts > self.last) if self.meta['unique'] else (ts >= self.last)
+        rows = rows[keep]
+        if len(rows) > 1:
+            order = np.argsort(rows[:, 0], kind='stable')
+            rows = rows[order]
+            if self.meta['unique']:
+                rows = rows[np.r_[True, np.diff(rows[:, 0]) != 0]]
+        if not len(rows):
+            return 0
+
+        self._pwrite(rows.tobytes(), HEADER_BYTES + self.count * self.itemsize)
+        updates = {_COUNT: self.count + len(rows), _LAST_TS: int(rows[-1, 0])}
+        if self.first is None:
+            updates[_FIRST_TS] = int(rows[0, 0])
+        if self._meta_dirty:
+            body = self._meta_bytes()
+            self._pwrite(body, _META_OFFSET)
+            updates[_META_LEN] = len(body)
+            updates[_META_REV] = self.meta_rev + 1
+            self.meta_rev += 1
+            self._meta_dirty = False
+        # 레코드 → 헤더 순서 (레코드 수가 늘어난 시점엔 레코드가 이미 파일에 있음)
+        self._write_fields(updates)
+        self.count += len(rows)
+        self.last = int(rows[-1, 0])
+        if self.first is None:
+            self.first = int(rows[0, 0])
+        return len(rows)
+
+    def merge(self, rows):
+        """
+        레코드 끼워 넣기 (백필 - 마지막 시각 이전도 가능, 이미 있는 시각은 건너뜀)
+
+        마지막 시각 이후뿐이면 append, 아니면 정렬된 새 파일을 써서 교체
+        (교체 전에 매핑한 읽기 쪽은 이전 파일을 계속 봄 → refresh 후 다시 열기)
+        교체 전에 자기 매핑/핸들을 닫음 (Windows는 열려 있거나 매핑된 파일을 교체 못 함)
+        다른 프로세스가 아직 매핑하고 있어 교체가 거부되면 같은 파일에 제자리로 다시 씀
+
+        Returns:
+            int: 추가한 행 수
+        """
+        if not self.writable:
+            raise PermissionError("읽기 전용으로 연 캔들 파일")
+        if isinstance(rows, pd.DataFrame):
+            rows = self.encode_frame(rows)
+        rows = np.asarray(rows, dtype=np.float64)
+        rows = rows[~np.isnan(rows[:, 0])] if len(rows) else rows
+        if not len(rows) or self.last is None or rows[:, 0].min() > self.last:
+            return self.append(rows)
+        existing = np.array(self.records)
+        self._release()
+        fresh = rows[np.argsort(rows[:, 0], kind='stable')]
+        if self.meta['unique']:
+            fresh = fresh[np.r_[True, np.diff(fresh[:, 0]) != 0]]
+            fresh = fresh[~np.isin(fresh[:, 0], existing[:, 0])]
+        if not len(fresh):
+            return 0
+        merged = np.concatenate([existing, fresh])
+        merged = merged[np.argsort(merged[:, 0], kind='stable')]
+
+        fields = np.frombuffer(self._pread(8, _FIELDS * 8), dtype='<i8').copy()
+        fields[_COUNT] = len(merged)
+        fields[_FIRST_TS], fields[_LAST_TS] = int(merged[0, 0]), int(merged[-1, 0])
+        body = self._meta_bytes()
+        fields[_META_LEN] = len(body)
+        fields[_META_REV] = self.meta_rev + 1
+        tmp = self.path.with_name(f".{self.path.name}.tmp")
+        with open(tmp, 'wb') as f:
+            f.write(MAGIC + fields.tobytes() + body)
+            f.seek(HEADER_BYTES)
+            f.write(np.ascontiguousarray(merged).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        self.file.close()
+        try:
+            os.replace(tmp, self.path)
+            self.file = open(self.path, 'r+b', buffering=0)
+        except PermissionError:
+            # 읽는 쪽이 이전 파일을 매핑 중 (Windows) → 레코드 먼저, 헤더 나중 (append와 같은 순서)
+            self.file = open(self.path, 'r+b', buffering=0)
+            self._pwrite(np.ascontiguousarray(merged).tobytes(), HEADER_BYTES)
+            self._pwrite(body, _META_OFFSET)
+            self._pwrite(MAGIC + fields.tobytes(), 0)
+            os.fsync(self.file.fileno())
+            os.unlink(tmp)
+        self._meta_dirty = False
+        self._load_header()
+        return len(fresh)
+
+    def flush(self):
+        """디스크 동기화 (종료 시)"""
+        if self.file:
+            os.fsync(self.file.fileno())
+
+    # ------------------------------------------------------------------ 읽기
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def records(self):
+        """전체 레코드 memmap [n × 컬럼 수] (읽기 전용, 레코드 수가 늘었으면 다시 매핑)"""
+        if self._mm is None or self._mapped != self.count:
+            if not self.count:
+                return np.empty((0, len(self.columns)))
+            self._mm = np.memmap(self.path, dtype='<f8', mode='r', offset=HEADER_BYTES,
+                                 shape=(self.count, len(self.columns)))
+            self._mapped = self.count
+        return self._mm
+
+    def locate(self, start=None, end=None):
+        """[start, end) 구간의 레코드 위치 (i, j)"""
+        ts = self.records[:, 0]
+        i = 0 if start is None else int(np.searchsorted(ts, start, side='left'))
+        j = len(ts) if end is None else int(np.searchsorted(ts, end, side='left'))
+        return i, max(i, j)
+
+    def view(self, start=None, end=None):
+        """[start, end) 구간 레코드 (memmap 슬라이스 - 복사 없음, 컬럼은 self.index)"""
+        i, j = self.locate(start, end)
+        return self.records[i:j]
+
+    def column(self, name, start=None, end=None):
+        """컬럼 1개 (복사 없는 strided 뷰)"""
+        return self.view(start, end)[:, self.index[name]]
+
+    def to_frame(self, start=None, end=None):
+        """[start, end) 구간 DataFrame (복사, timestamp는 int64, 문자열 컬럼 복원)"""
+        block = self.view(start, end)
+        columns = {}
+        for col, i in self.index.items():
+            values = np.array(block[:, i])
+            categories = self.meta['categories'].get(col)
+            if categories is not None:
+                lookup = np.array(categories + [None], dtype=object)
+                values = lookup[np.where(np.isnan(values), len(categories), values).astype(np.int64)]
+            elif col == 'timestamp':
+                values = values.astype(np.int64)
+            columns[col] = values
+        return pd.DataFrame(columns)
+
+    def stats(self):
+        return {
+            'path': str(self.path),
+            'rows': self.count,
+            'columns': len(self.columns),
+            'first': self.first,
+            'last': self.last,
+            'bytes': HEADER_BYTES + self.count * self.itemsize,
+        }
+
+    def _release(self):
+        """자기 memmap 해제 (참조가 없어지면 매핑이 닫힘)"""
+        self._mm = None
+        self._mapped = 0
+
+    def close(self):
+        self._release()
+        if self.file:
+            self.file.close()
+            self.file = None
+
+
+class BinaryCandleArchive:
+    """
+    심볼 × 시간대별 바이너리 캔들 아카이브 (history.CandleArchive와 같은 인터페이스)
+
+    data/ohlcv/ETHUSDT/5m.candles - HistoryDownloader의 기본 저장소
+    """
+
+    def __init__(self, root="data/ohlcv", symbol="ETH/USDT"):
+        self.root = Path(root) / symbol.replace('/', '').replace(':', '')
+        self.symbol = symbol
+        self.stores = {}
+
+    def path(self, timeframe):
+        return self.root / f"{timeframe}.candles"
+
+    def store(self, timeframe, writable=False):
+        """시간대별 CandleStore (쓰기용은 없으면 생성)"""
+        store = self.stores.get(timeframe)
+        if store is None or (writable and not store.writable):
+            if store is not None:
+                store.close()
+            if not writable and not self.path(timeframe).exists():
+                return None
+            store = CandleStore(self.path(timeframe), OHLCV_COLUMNS if writable else None,
+                                meta={'symbol': self.symbol, 'timeframe': timeframe}, writable=writable)
+            self.stores[timeframe] = store
+        elif not store.writable:
+            store.refresh()
+        return store
+
+    def index(self, timeframe):
+        """{'first', 'last', 'rows'} (파일 1개라 파티션 대신 요약 1개)"""
+        store = self.store(timeframe)
+        if store is None or not len(store):
+            return {}
+        return {'first': store.first, 'last': store.last, 'rows': len(store)}
+
+    def last_timestamp(self, timeframe):
+        store = self.store(timeframe)
+        return store.last if store is not None else None
+
+    def append(self, timeframe, rows):
+        """봉 추가 ([n × 6] 정렬된 OHLCV, 마지막 저장 시각 이후만) → 기록한 행 수"""
+        if not len(rows):
+            return 0
+        return self.store(timeframe, writable=True).append(rows)
+
+    def merge(self, timeframe, rows):
+        """백필한 봉 끼워 넣기 (이미 있는 시각은 건너뜀) → 추가한 행 수"""
+        if not len(rows):
+            return 0
+        return self.store(timeframe, writable=True).merge(rows)
+
+    def timestamps(self, timeframe):
+        """저장된 봉 시각 전체 (int64 배열)"""
+        store = self.store(timeframe)
+        if store is None:
+            return np.empty(0, dtype=np.int64)
+        return store.column('timestamp').astype(np.int64)
+
+    def view(self, timeframe, start=None, end=None):
+        """[start, end) 구간 [n × 6] (복사 없음)"""
+        store = self.store(timeframe)
+        return store.view(start, end) if store is not None else np.empty((0, len(OHLCV_COLUMNS)))
+
+    def read(self, timeframe, start=None, end=None):
+        """[start, end) 구간 DataFrame"""
+        store = self.store(timeframe)
+        if store is None:
+            return pd.DataFrame(columns=OHLCV_COLUMNS)
+        return store.to_frame(start, end)
+
+    def stats(self, timeframe):
+        store = self.store(timeframe)
+        if store is None:
+            return {'partitions': 0, 'rows': 0, 'first': None, 'last': None}
+        return {'partitions': 1, 'rows': len(store), 'first': store.first, 'last': store.last,
+                'bytes': store.stats()['bytes']}
+
+    def close(self):
+        for store in self.stores.values():
+            store.close()
+        self.stores = {}
+
+
+# ---------------------------------------------------------------------- 변환
+
+
+def local_ms(values):
+    """로컬 시각 문자열(ISO) → ms (수집기/거래 로그는 datetime.now() 기준으로 기록)"""
+    out = np.full(len(values), np.nan)
+    for i, value in enumerate(values):
+        try:
+            out[i] = datetime.fromisoformat(str(value)).timestamp() * 1000
+        except ValueError:
+            pass
+    return out
+
+
+def price_frame(df):
+    """price_data_*.csv DataFrame → 저장용 (timestamp ms, OHLC 없는 행 제외)"""
+    df = df.copy()
+    df['timestamp'] = ts = local_ms(df['timestamp'].tolist())
+    missing = np.isnan(ts)
+    for col in ('open', 'high', 'low', 'close'):
+        missing |= pd.isna(df[col].to_numpy())
+    return df[~missing] if missing.any() else df
+
+
+def price_columns(df):
+    """price_data CSV 헤더 → (컬럼 목록, 문자열 컬럼 코드표)"""
+    columns = ['timestamp'] + [c for c in df.columns if c != 'timestamp']
+    categories = {c: [] for c in columns if c in PRICE_TEXT_COLUMNS}
+    return columns, categories
+
+
+def convert_price_csv(paths, target, symbol="ETH/USDT", timeframe="5m"):
+    """
+    수집기 price_data_*.csv → 바이너리 (OHLCV + 지표 전부, 문자열 컬럼은 코드)
+
+    Returns:
+        (bool, str): (성공 여부, 메시지)
+    """
+    paths = sorted(Path(p) for p in paths)
+    if not paths:
+        return False, "변환할 price_data CSV 없음"
+    frames = [pd.read_csv(p) for p in paths]
+    df = price_frame(pd.concat(frames, ignore_index=True))
+    columns, categories = price_columns(df)
+    store = CandleStore(target, columns, categories, meta={'symbol': symbol, 'timeframe': timeframe,
+                                                           'source': 'price_data'}, writable=True)
+    try:
+        written = store.append(df)
+        store.flush()
+        size = sum(p.stat().st_size for p in paths)
+        return True, f"{written}행 기록 ({len(df) - written}행 건너뜀) | CSV {size:,}B → {store.stats()['bytes']:,}B"
+    finally:
+        store.close()
+
+
+def convert_trade_log(path, target):
+    """
+    trade_log.csv (Time,Type,Price,Invested,AvgPrice,Profit,Balance,ROI,Note) → 바이너리 거래 레코드
+
+    봉이 아니라 체결 시점 기록 → 같은 시각 허용 (unique=False), Type은 코드, ROI는 % 제거
+
+    Returns:
+        (bool, str): (성공 여부, 메시지)
+    """
+    path = Path(path)
+    if not path.exists():
+        return False, f"파일 없음: {path}"
+    raw = pd.read_csv(path)
+    df = pd.DataFrame({
+        'timestamp': local_ms(raw['Time'].tolist()),
+        'type': raw['Type'],
+        'price': raw['Price'],
+        'invested': raw['Invested'],
+        'avg_price': raw['AvgPrice'],
+        'profit': raw['Profit'],
+        'balance': raw['Balance'],
+        'roi': raw['ROI'].astype(str).str.rstrip('%'),
+    })
+    store = CandleStore(target, TRADE_LOG_COLUMNS, {'type': []}, meta={'source': 'trade_log'},
+                        unique=False, writable=True)
+    try:
+        written = store.append(df)
+        store.flush()
+        return True, f"{written}건 기록 | CSV {path.stat().st_size:,}B → {store.stats()['bytes']:,}B"
+    finally:
+        store.close()
+
+
+def convert_archive(csv_archive, binary_archive, timeframes):
+    """history.CandleArchive(CSV 파티션) → BinaryCandleArchive (이어서 변환 가능)"""
+    results = {}
+    for timeframe in timeframes:
+        last = binary_archive.last_timestamp(timeframe)
+        df = csv_archive.read(timeframe, start=last + 1 if last is not None else None)
+        results[timeframe] = binary_archive.append(timeframe, df[OHLCV_COLUMNS].to_numpy(dtype=np.float64))
+    return results
+
+
+def main(argv=None):
+    """
+    CLI:
+        python -m modules.candle_store price logs/collected_data/price_data_*.csv --out data/ohlcv/ETHUSDT/collected_5m.candles
+        python -m modules.candle_store trades trade_log.csv --out data/trades.candles
+        python -m modules.candle_store archive --root data/ohlcv --timeframes 1m 5m
+        python -m modules.candle_store info data/ohlcv/ETHUSDT/5m.candles
+    """
+    import argparse
+    parser = argparse.ArgumentParser(description="바이너리 캔들 저장소 변환/조회")
+    sub = parser.add_subparsers(dest='command', required=True)
+    price = sub.add_parser('price', help="price_data_*.csv → .candles")
+    price.add_argument('paths', nargs='+')
+    price.add_argument('--out', required=True)
+    price.add_argument('--symbol', default="ETH/USDT")
+    price.add_argument('--timeframe', default="5m")
+    trades = sub.add_parser('trades', help="trade_log.csv → .candles")
+    trades.add_argument('path')
+    trades.add_argument('--out', required=True)
+    archive = sub.add_parser('archive', help="CSV 아카이브(history) → 바이너리 아카이브")
+    archive.add_argument('--root', default="data/ohlcv")
+    archive.add_argument('--symbol', default="ETH/USDT")
+    archive.add_argument('--timeframes', nargs='+', default=['1m', '3m', '5m', '15m'])
+    info = sub.add_parser('info', help="파일 요약")
+    info.add_argument('path')
+    args = parser.parse_args(argv)
+
+    if args.command == 'price':
+        ok, msg = convert_price_csv(args.paths, args.out, args.symbol, args.timeframe)
+    elif args.command == 'trades':
+        ok, msg = convert_trade_log(args.path, args.out)
+    elif args.command == 'archive':
+        from .history import CandleArchive
+        binary = BinaryCandleArchive(args.root, args.symbol)
+        results = convert_archive(CandleArchive(args.root, args.symbol), binary, args.timeframes)
+        binary.close()
+        ok, msg = True, ", ".join(f"{tf}: {n}행" for tf, n in results.items())
+    else:
+        store = CandleStore(args.path)
+        ok, msg = True, json.dumps(dict(store.stats(), meta={k: v for k, v in store.meta.items() if k != 'categories'}),
+                                   ensure_ascii=False)
+        store.close()
+    print(f"{'✅' if ok else '❌'} {msg}")
+    return ok
+
+
+if __name__ == "__main__":
+    main()
@@ -45,6 +45,10 @@ MAX_DAILY_LOSS_PERCENT = 10
 MAX_CONSECUTIVE_LOSSES = 3
 MIN_ORDER_SIZE_USDT = 25  # Binance 최소 $20, 안전마진 $25
 POSITION_TIMEOUT_BARS = 12
+RISK_LIMITS_ENABLED = True           # 위 한도 집행 (진입 차단 / 강제 청산)
+RISK_STREAK_PAUSE_MINUTES = 60       # 연속 손실 한도 도달 후 진입 휴식
+RISK_LATENCY_BUDGET_US = 50          # 리스크 검사 1회 시간 예산 (마이크로초)
+RISK_EQUITY_RETRY_SECONDS = 60       # 시작 시 잔고 조회 실패 → 이 간격으로 재조회 (그 전까지 진입 차단)
 
 # [5] HYBRID PRO v2.0 파라미터 (개선됨)
 # RSI 설정 - SHORT 과열 55→60 상향
@@ -66,6 +70,9 @@ TP_PERCENT = 0.025           # 2.5%
 # [NEW] v2.0 필수 설정
 TREND_15M_REQUIRED = True      # 15분 추세 확인 필수화
 FVG_FILTER_ENABLED = True      # FVG 레벨 확인 활성화
+FVG_MIN_SIZE_PCT = 0.05        # 최소 갭 크기 (가격 대비 %)
+FVG_NEAR_PCT = 0.1             # 갭 '근처' 판정 거리 (%)
+FVG_MAX_GAPS = 200             # 방향별 미체결 갭 보관 수
 
 # [NEW] v2.1 상승장 추세 추종 모드
 MARKET_MODE_AUTO = True        # 자동 시장 판별 활성화
@@ -99,9 +106,129 @@ TELEGRAM_CHAT_ID = "8074909196"
 LOG_FILE = "trade_log_v2.csv"
 REPORT_FILE = "trade_summary_v2.txt"
 
+# [9] 모니터링 (지연시간 계측)
+METRICS_ENABLED = True
+METRICS_HOST = "127.0.0.1"     # 로컬 전용
+METRICS_PORT = 9108            # http://127.0.0.1:9108/metrics
+METRICS_OVERHEAD_BUDGET_PCT = 1.0  # 계측 오버헤드 한도 (틱 시간 대비 %)
+
+# [10] 로깅
+LOG_LEVEL = "INFO"                    # DEBUG로 바꾸면 PnL/PG 체크 상세 출력
+LOG_JSON_FILE = "logs/lumi_bot.jsonl" # 구조화 로그 (JSON Lines)
+LOG_MAX_BYTES = 20 * 1024 * 1024      # 20MB마다 로테이션
+LOG_BACKUP_COUNT = 10                 # gzip 백업 보관 개수
+LOG_ROTATE_DAILY = True               # 날짜 변경 시에도 로테이션
+LOG_SAMPLE_SECONDS = 30               # 틱 반복 메시지: 30초에 1회만 출력
+
+# [11] 프로파일링 (재시작 없이 분석: echo "profile start" | nc 127.0.0.1 9109)
+PROFILER_ENABLED = True
+PROFILER_CONTROL_PORT = 9109          # 로컬 제어 소켓
+PROFILER_INTERVAL_MS = 5              # 샘플링 간격
+MEMORY_SAMPLE_SECONDS = 600           # 메모리 추세 기록 주기 (10분)
+
+# [12] 주문 실행 (호가 깊이 기반 분할)
+EXEC_SMART_ENABLED = True             # False면 호가 조회 없이 바로 시장가
+EXEC_DEPTH_LIMIT = 50                 # 호가창 조회 단계 수
+EXEC_MAX_IMPACT_BPS = 3.0             # 예상 충격이 이 이하면 단일 시장가
+EXEC_ALGO = "TWAP"                    # TWAP / ICEBERG / LIMIT_CHASE
+EXEC_MAX_SLICES = 5                   # 최대 분할 수
+EXEC_SLICE_INTERVAL = 1.0             # 분할/재주문 간격 (초)
+EXEC_CHASE_MAX_BPS = 5.0              # 패시브 주문 추격 한도 (초과 시 잔량 시장가)
+EXEC_MAX_DURATION = 15.0              # 분할 실행 최대 시간 (초)
+EXEC_MIN_SLICE_USDT = 100.0           # 조각 최소 금액
+EXEC_SLIPPAGE_FILE = "logs/slippage.jsonl"
+
+# [13] 상태 파일 / 지지·저항 존
+STATUS_FILE = "status.json"           # 대시보드용 (원자적 교체 기록)
+STATUS_MIN_INTERVAL = 1.0             # 최소 기록 간격 (초)
+STATUS_CVD_HISTORY = 60               # cvd_history 길이 (봉)
+STATUS_SERVER_ENABLED = True          # 메모리 상태 HTTP 서버 (파일 폴링 대신)
+STATUS_SERVER_HOST = "127.0.0.1"      # 로컬 전용
+STATUS_SERVER_PORT = 9110             # http://127.0.0.1:9110/status (롱폴), /events (SSE)
+STATUS_LONGPOLL_MAX = 30.0            # 롱폴 최대 대기 (초)
+STATUS_SSE_KEEPALIVE = 15.0           # SSE keepalive 간격 (초)
+STATUS_ALLOWED_ORIGIN = ""            # 교차 출처 대시보드 Origin (비우면 CORS 헤더 없음)
+ZONE_SWING_BARS = 3                   # 스윙 고점/저점 확인 봉 수 (좌우)
+ZONE_LEVEL_TOLERANCE_PCT = 0.3        # 같은 레벨로 병합할 거리 (%)
+ZONE_MAX_LEVELS = 30                  # 보관 레벨 수
+ZONE_PROFILE_BARS = 288               # 볼륨 프로파일 창 (5분봉 288개 = 1일)
+
+# [14] 체결(aggTrade) CVD
+CVD_TRADES_ENABLED = True             # False면 캔들 CLV 근사 CVD 사용
+CVD_POLL_INTERVAL = 5.0               # aggTrades 조회 간격 (초, 최소 5 - 요청당 가중치 20)
+CVD_CATCHUP_PER_MIN = 6               # 밀렸을 때 간격 없이 재조회하는 분당 최대 횟수 (최악 18회 × 20 = 분당 360)
+CVD_BUFFER_BARS = 1000                # 시간대별 봉 버퍼 크기
+CVD_REPLAY_FILE = ""                  # aggTrades 덤프 CSV 경로 (지정 시 거래소 대신 재생)
+
+# [15] 시장 국면 분류 (봉 마감마다 1회, 히스테리시스)
+REGIME_ENABLED = True                 # False면 틱마다 RSI 50 기준으로 모드 판단 (기존 방식)
+REGIME_ADX_TREND = 25                 # ADX 이상 → TRENDING
+REGIME_ADX_RANGE = 20                 # ADX 미만 → RANGING 복귀
+REGIME_SQUEEZE_ENTER = BB_BANDWIDTH_MIN  # 밴드폭 이하 → 스퀴즈
+REGIME_SQUEEZE_EXIT = 0.035           # 밴드폭 초과 → 스퀴즈 해제
+REGIME_VOL_WINDOW = 288               # ATR% 백분위 창 (5분봉 1일)
+REGIME_VOL_HIGH = 80                  # 백분위 이상 → 고변동성
+REGIME_VOL_LOW = 20                   # 백분위 이하 → 저변동성
+REGIME_VOL_BAND = 10                  # 변동성 복귀 히스테리시스 폭
+REGIME_SLOPE_BARS = 5                 # EMA21 기울기 계산 봉 수
+REGIME_SLOPE_FLAT_PCT = 0.05          # 기울기 ±% 이내는 FLAT
+REGIME_MODE_BAND = 2.0                # 모드 전환 RSI 히스테리시스 (50±2)
+
+# [16] 포지션 대조 (로컬 ↔ 거래소, 백그라운드)
+RECONCILE_ENABLED = True
+RECONCILE_INTERVAL = 5                # 대조 주기 (초, 캐시 비교)
+RECONCILE_REFRESH_SECONDS = 60        # 계정 상태 캐시 수명 (초과 시 REST 재조회)
+RECONCILE_FILL_DELAY = 2              # 체결 후 재조회 대기 (초)
+RECONCILE_CONFIRM_SECONDS = 3         # 불일치 확정용 재조회 간격 (초)
+RECONCILE_SIZE_TOLERANCE = 0.001      # 허용 수량 차이 (ETH)
+RECONCILE_ORPHAN_SECONDS = 30         # 봇 미체결 주문 고아 판정 (초)
+
+# [17] 요청 가중치 예산 (청산 > 진입 > 포지션 > 시세 > 분석)
+RATE_LIMIT_ENABLED = True             # False면 ccxt 기본 스로틀
+RATE_WEIGHT_PER_MIN = 2400            # Binance 선물 REQUEST_WEIGHT (IP 단위)
+RATE_ORDERS_PER_MIN = 1200            # ORDERS 분당
+RATE_ORDERS_PER_10S = 300             # ORDERS 10초당
+RATE_BUDGET_SHARE = 1.0               # 이 봇이 쓸 비율 (같은 IP에서 심볼 N개 운영 시 1/N)
+
+# [18] 거래소 I/O 정책 (재시도 횟수는 [3] MAX_RETRIES)
+IO_POLICY_ENABLED = True              # False면 호출당 1회 시도
+IO_RETRY_DEADLINE = 10                # 호출당 재시도 포함 총 시간 (초)
+IO_REQUEST_TIMEOUT = 4                # 요청 1회 타임아웃 (초)
+IO_BACKOFF_BASE = 0.2                 # 백오프 최소 대기 (초, 지터 적용)
+IO_BACKOFF_CAP = 3.0                  # 백오프 최대 대기 (초)
+IO_CIRCUIT_FAILURES = 5               # 서킷 open까지 연속 네트워크 오류
+IO_CIRCUIT_COOLDOWN = 30              # open 유지 (초, 청산 주문은 통과)
+IO_HEDGE_ENABLED = True               # 느린 조회에 중복 요청
+IO_HEDGE_QUANTILE = 0.95              # 이 분위수 지연을 넘으면 헤지
+IO_HEDGE_BUDGET = 0.1                 # 조회 대비 헤지 요청 비율 상한
+
+# [19] 데이터 수집 사이드카 (CSV 기록/자가 학습을 별도 프로세스로)
+COLLECTOR_SIDECAR_ENABLED = True      # False면 트레이딩 프로세스 안에서 기록
+COLLECTOR_RING_CAPACITY = 1024        # 공유 메모리 링 버퍼 슬롯 수
+COLLECTOR_POLL_INTERVAL = 0.2         # 사이드카 폴링 간격 (초)
+COLLECTOR_LEARN_INTERVAL = 3600       # 자가 학습 주기 (초, 0이면 끔)
+COLLECTOR_BINARY_STORE = True         # CSV와 함께 바이너리 캔들 파일(.candles, memmap)에도 기록
+
+# [20] 캔들 버스 (같은 장비의 여러 전략 프로세스가 캔들/피처 공유)
+CANDLE_BUS_ROLE = 'publish'           # 'publish'(라이브 봇) / 'consume'(섀도 변형 등, REST 없음) / None
+CANDLE_BUS_CAPACITY = 500             # 시간대별 보관 마감 봉 수
+CANDLE_BUS_MAX_AGE = 30               # 소비자: 이 시간(초) 넘게 갱신 없으면 데이터 없음
+
+# [21] 캔들 연속성 (빈 봉 감지 + 백필)
+CONTINUITY_BACKFILL_PAGES = 2         # fetch_data 1회당 최대 백필 요청 수 (넘게 끊겼으면 재워밍업, 0이면 감지만)
+CONTINUITY_PAGE_LIMIT = 1000          # 백필 요청당 봉 수
+
+# [22] 거래 원장 (SQLite WAL - 기존 파일은 비어 있는 원장을 처음 열 때 자동, 또는 python -m modules.ledger import)
+LEDGER_ENABLED = True                 # False면 trade_analysis_*.csv에만 기록 (기존 방식)
+LEDGER_FILE = "logs/trades.db"        # trades / fills / decisions
+LEDGER_BATCH_SIZE = 64                # 대기 쓰기가 이만큼 쌓이면 바로 기록
+LEDGER_FLUSH_INTERVAL = 1.0           # 백그라운드 기록 주기 (초)
+LEDGER_LEGACY_ROOT = "."              # 원장이 비어 있으면 여기(., logs/, logs/collected_data/)의 기존 파일 가져오기 (None이면 안 함)
+
 import sys
 if sys.stdout.encoding != 'utf-8':
-    sys.stdout = open(sys.stdout.fileno(), mode='w', encoding='utf-8', buffering=1)
+    # 줄 단위 버퍼링 없이 인코딩만 변경 (출력은 로깅 writer 스레드가 담당)
+    sys.stdout.reconfigure(encoding='utf-8')
 
 print("[OK] HYBRID PRO v2.1 설정 로드 완료")
 print(f"   RSI LONG (반전): {RSI_LONG_THRESHOLD}")
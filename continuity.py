@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""
+modules/continuity.py - 캔들 연속성 인덱스 (구간 집합으로 빠진 봉/중복 추적 + 최소 백필 계획)
+
+fetch_ohlcv 결과를 그대로 믿으면 네트워크 끊김/재시작 뒤 지표 창에 빠진 봉이 섞여도 모름
+→ 심볼 × 시간대마다 받은 봉이 덮는 시간 구간을 반열린 구간 [start, end) 집합으로 유지
+
+- observe(timestamps): 새로 들어온 봉 반영 → 새 봉 수, 중복 수, 정렬 안 맞는 시각 수, 새로 생긴 빈 구간
+- gaps(start, end): 구간 안에서 덮이지 않은 부분 (거래소에 원래 없는 것으로 확인된 구간은 제외)
+- plan_backfill(page_limit): 빈 구간들을 limit봉 페이지 최소 개수로 덮는 요청 목록 (since, limit)
+  빈 구간을 시작 시각 순으로 훑으면서 페이지 하나가 닿는 데까지 한꺼번에 처리 (탐욕법이 최적)
+- mark_empty(start, end): 백필해도 오지 않은 구간 (점검/상장 전) → 다시 요청하지 않음
+- coverage(start, end): 기대 봉 수 대비 보유/빈/확인된 빈 봉 수 → complete면 구간 전체 설명됨
+
+구간 집합은 정렬된 시작/끝 리스트 (bisect) - 구간 수는 빈 구간 수 + 1 정도라 작음
+"""
+
+import json
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+from .status import atomic_write_json
+
+
+class IntervalSet:
+    """서로 겹치지 않는 반열린 구간 [start, end) 집합 (정수 ms)"""
+
+    def __init__(self, intervals=()):
+        self.starts = []
+        self.ends = []
+        for start, end in intervals:
+            self.add(start, end)
+
+    def add(self, start, end):
+        """구간 추가 (겹치거나 맞닿은 구간과 병합)"""
+        if start >= end:
+            return
+        i = bisect_left(self.ends, start)           # end >= start인 첫 구간 (맞닿은 것 포함)
+        j = bisect_right(self.starts, end)          # start <= end인 마지막 구간 다음
+        if i < j:
+            start = min(start, self.starts[i])
+            end = max(end, self.ends[j - 1])
+        self.starts[i:j] = [start]
+        self.ends[i:j] = [end]
+
+    def __contains__(self, point):
+        i = bisect_right(self.starts, point) - 1
+        return i >= 0 and point < self.ends[i]
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self):
+        return zip(self.starts, self.ends)
+
+    def overlap(self, start, end):
+        """[start, end)와 겹치는 길이"""
+        total = 0
+        i = max(bisect_right(self.ends, start), 0)
+        while i < len(self.starts) and self.starts[i] < end:
+            total += min(end, self.ends[i]) - max(start, self.starts[i])
+            i += 1
+        return total
+
+    def complement(self, start, end):
+        """[start, end) 안에서 집합에 없는 구간 목록"""
+        missing = []
+        cursor = start
+        i = bisect_right(self.ends, start)
+        while i < len(self.starts) and self.starts[i] < end:
+            if self.starts[i] > cursor:
+                missing.append((cursor, self.starts[i]))
+            cursor = max(cursor, self.ends[i])
+            i += 1
+        if cursor < end:
+            missing.append((cursor, end))
+        return missing
+
+    @property
+    def span(self):
+        """(처음, 끝) - 비었으면 None"""
+        return (self.starts[0], self.ends[-1]) if self.starts else None
+
+    def to_list(self):
+        return [[s, e] for s, e in self]
+
+
+def normalize_ohlcv(ohlcv):
+    """
+    fetch_ohlcv 결과 정렬 + 같은 시각 중복 제거 (나중에 온 값 사용 - 진행 중이던 봉이 갱신된 것)
+
+    Returns:
+        (list, int): (정리된 봉 목록, 제거한 중복 수)
+    """
+    by_ts = {}
+    for candle in ohlcv or []:
+        by_ts[candle[0]] = candle
+    rows = [by_ts[ts] for ts in sorted(by_ts)]
+    return rows, len(ohlcv or []) - len(rows)
+
+
+class ContinuityIndex:
+    """심볼 × 시간대 1개의 봉 연속성 인덱스"""
+
+    def __init__(self, step, covered=(), empty=(), duplicates=0, misaligned=0):
+        """
+        Args:
+            step: 봉 간격 (ms, features.timeframe_ms)
+            covered: 보유 구간 [(start, end), ...]
+            empty: 거래소에 없다고 확인된 구간
+        """
+        self.step = step
+        self.covered = IntervalSet(covered)
+        self.empty = IntervalSet(empty)
+        self.duplicates = duplicates
+        self.misaligned = misaligned
+
+    @classmethod
+    def from_timestamps(cls, step, timestamps, empty=()):
+        """정렬된 봉 시각 배열 → 인덱스 (아카이브 전체를 한 번에, 연속 구간 단위 벡터 연산)"""
+        ts = np.unique(np.asarray(timestamps, dtype=np.int64))
+        index = cls(step, empty=empty)
+        aligned = ts[ts % step == 0]
+        index.misaligned = len(ts) - len(aligned)
+        if len(aligned):
+            breaks = np.nonzero(np.diff(aligned) != step)[0]
+            starts = np.r_[aligned[0], aligned[breaks + 1]]
+            ends = np.r_[aligned[breaks], aligned[-1]] + step
+            index.covered.starts = starts.tolist()
+            index.covered.ends = ends.tolist()
+        return index
+
+    # ------------------------------------------------------------------ 반영
+
+    def observe(self, timestamps):
+        """
+        들어온 봉 시각 반영
+
+        Returns:
+            dict: new(새 봉 수), duplicates, misaligned, gaps(이번에 새로 생긴 빈 구간 - 기존 끝 뒤로 건너뛴 부분)
+        """
+        step = self.step
+        new = duplicates = misaligned = 0
+        gaps = []
+        last_end = self.covered.ends[-1] if len(self.covered) else None
+        for ts in sorted(int(t) for t in timestamps):
+            if ts % step:
+                misaligned += 1
+                continue
+            if ts in self.covered:
+                duplicates += 1
+                continue
+            if last_end is not None and ts > last_end:
+                gaps += self.empty.complement(last_end, ts)
+            self.covered.add(ts, ts + step)
+            last_end = max(last_end or 0, ts + step)
+            new += 1
+        self.duplicates += duplicates
+        self.misaligned += misaligned
+        return {'new': new, 'duplicates': duplicates, 'misaligned': misaligned, 'gaps': gaps}
+
+    def mark_empty(self, start, end):
+        """백필해도 오지 않은 구간 (거래소에 없음) - 이후 빈 구간에서 제외"""
+        for s, e in self.covered.complement(start, end):
+            self.empty.add(s, e)
+
+    # ------------------------------------------------------------------ 조회
+
+    def _range(self, start, end):
+        span = self.covered.span
+        if span is None:
+            return start, end
+        return (span[0] if start is None else start), (span[1] if end is None else end)
+
+    def gaps(self, start=None, end=None):
+        """[start, end) 안의 빈 구간 (기본: 보유 구간 처음~끝, 확인된 빈 구간 제외)"""
+        start, end = self._range(start, end)
+        if start is None or end is None or start >= end:
+            return []
+        gaps = []
+        for s, e in self.covered.complement(start, end):
+            gaps += self.empty.complement(s, e)
+        return gaps
+
+    def plan_backfill(self, page_limit=1000, start=None, end=None, max_pages=None):
+        """
+        빈 구간을 덮는 최소 요청 목록
+
+        Returns:
+            list: [(since, limit)] - 페이지마다 fetch_ohlcv(since=since, limit=limit)
+        """
+        start, end = self._range(start, end)
+        span = page_limit * self.step
+        pages = []
+        cursor = None                          # 마지막 페이지가 덮는 끝
+        for gap_start, gap_end in self.gaps(start, end):
+            s = gap_start if cursor is None else max(gap_start, cursor)
+            while s < gap_end:
+                if max_pages is not None and len(pages) >= max_pages:
+                    return pages
+                page_end = s + span
+                pages.append((s, page_limit))
+                cursor = page_end
+                s = page_end
+        # 뒤 페이지까지 닿지 않는 짧은 마지막 페이지는 필요한 봉 수만 요청
+        if pages:
+            last_since, _ = pages[-1]
+            tail = self.gaps(last_since, min(last_since + span, end))
+            if tail:
+                pages[-1] = (last_since, min(page_limit, -(-(tail[-1][1] - last_since) // self.step)))
+        return pages
+
+    def coverage(self, start=None, end=None):
+        """
+        [start, end) 구간 봉 단위 요약
+
+        Returns:
+            dict: expected, present, missing, confirmed_empty, gaps, largest_gap(봉), coverage, complete
+        """
+        start, end = self._range(start, end)
+        if start is None or end is None or start >= end:
+            return {'expected': 0, 'present': 0, 'missing': 0, 'confirmed_empty': 0, 'gaps': 0,
+                    'largest_gap': 0, 'coverage': None, 'complete': True,
+                    'duplicates': self.duplicates, 'misaligned': self.misaligned}
+        step = self.step
+        expected = (end - start) // step
+        present = self.covered.overlap(start, end) // step
+        gaps = self.gaps(start, end)
+        missing = sum(e - s for s, e in gaps) // step
+        return {
+            'expected': expected,
+            'present': present,
+            'missing': missing,
+            'confirmed_empty': expected - present - missing,
+            'gaps': len(gaps),
+            'largest_gap': max(((e - s) // step for s, e in gaps), default=0),
+            'coverage': round(present / expected, 6) if expected else None,
+            'complete': missing == 0,
+            'duplicates': self.duplicates,
+            'misaligned': self.misaligned,
+        }
+
+    # ------------------------------------------------------------------ 저장
+
+    def to_dict(self):
+        return {
+            'step': self.step,
+            'covered': self.covered.to_list(),
+            'empty': self.empty.to_list(),
+            'duplicates': self.duplicates,
+            'misaligned': self.misaligned,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['step'], data.get('covered', ()), data.get('empty', ()),
+                   data.get('duplicates', 0), data.get('misaligned', 0))
+
+    def save(self, path):
+        atomic_write_json(path, self.to_dict())
+
+    @classmethod
+    def load(cls, path, step):
+        """저장된 인덱스 (없거나 간격이 다르면 빈 인덱스)"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('step') == step:
+                return cls.from_dict(data)
+        except (OSError, ValueError, KeyError):
+            pass
+        return cls(step)
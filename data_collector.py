@@ -2,6 +2,22 @@
 """
 LUMI 데이터 수집기
 실시간 차트 데이터 + 거래 시점 분석 데이터 저장
+
+사이드카 모드 (COLLECTOR_SIDECAR_ENABLED)
+- 트레이딩 프로세스: CollectorFeed가 기록을 고정 크기 레코드로 공유 메모리 링 버퍼에 복사만 함
+- 사이드카 프로세스: run_sidecar()가 링 버퍼를 읽어 CSV 기록 + 주기적 자가 학습
+  → pandas/디스크 지연과 GIL 경합이 주문 처리 스레드에 영향을 주지 않음
+
+바이너리 캔들 파일 (COLLECTOR_BINARY_STORE)
+- CSV 플러시 때 같은 봉을 price_data_ETHUSDT_5m.candles에도 추가 (modules.candle_store, memmap으로 읽음)
+
+연속성 (modules.continuity)
+- 플러시 전에 이미 기록한 봉 시각은 버림 (재시작/재전송 중복), 건너뛴 봉 구간은 경고
+- 기록한 봉 구간은 price_data_ETHUSDT_5m.continuity.json에 유지 → coverage()로 빠진 봉 확인
+
+거래 원장 (LEDGER_ENABLED, modules.ledger)
+- record_trade는 trade_analysis CSV 대신 원장 trades 행의 빈 칸을 채움 (진입/청산 행 모두 같은 trade_id)
+- 체결가/손익은 PositionManager가 같은 행에 기록 → 순서와 상관없이 합쳐짐
 """
 import sys
 sys.stdout.reconfigure(encoding='utf-8')
@@ -15,7 +31,56 @@ from datetime import datetime, timedelta
 from pathlib import Path
 import threading
 import time
+import multiprocessing
 from config import *
+from modules.candle_store import CandleStore, PRICE_TEXT_COLUMNS, local_ms, price_frame
+from modules.continuity import ContinuityIndex
+from modules.features import collector_row, timeframe_ms
+from modules.ledger import TradeLedger, TRADE_COLUMNS
+from modules.shm_ring import ShmRing
+from modules.telemetry import metrics
+
+PRICE_COLUMNS = [
+    'timestamp', 'symbol', 'open', 'high', 'low', 'close', 'volume',
+    'rsi', 'rsi_14', 'rsi_6', 'rsi_21',
+    'bb_mid', 'bb_upper', 'bb_lower', 'bb_pct', 'bb_width',
+    'ema_9', 'ema_21', 'ema_50', 'ema_200',
+    'macd', 'macdsignal', 'macdhist',
+    'vwap', 'atr', 'adx', 
+    'trend_5m', 'trend_15m', 'trend_1h',
+    'fvg_bull', 'fvg_bear', 'fvg_size',
+    'volume_ratio', 'volume_sma20',
+    'cvd', 'cvd_slope',
+    'market_mode', 'session'
+]
+
+# 사이드카 전송 레코드 (고정 크기): 숫자 컬럼은 float64 배열, 문자열 컬럼은 UTF-8 RECORD_TEXT_BYTES
+# 자유 입력인 notes는 별도 RECORD_NOTE_BYTES 필드 (한글 청산 사유만 해도 48바이트를 채움)
+# 그래도 넘치면 글자 경계에서 자르고 lumi_collector_truncated_total 증가
+RECORD_BAR, RECORD_TRADE = 1, 2
+RECORD_TEXT_COLUMNS = {
+    RECORD_BAR: ('symbol', 'trend_5m', 'trend_15m', 'trend_1h', 'market_mode', 'session'),
+    RECORD_TRADE: ('type', 'mode', 'action', 'entry_trend', 'entry_fvg', 'exit_reason',
+                   'market_regime', 'volatility_state', 'strategy_version'),
+}
+RECORD_NOTE_COLUMN = 'notes'
+RECORD_NUM_COLUMNS = {
+    RECORD_BAR: tuple(c for c in PRICE_COLUMNS if c != 'timestamp' and c not in RECORD_TEXT_COLUMNS[RECORD_BAR]),
+    RECORD_TRADE: tuple(c for c in TRADE_COLUMNS if c not in ('timestamp', RECORD_NOTE_COLUMN)
+                        and c not in RECORD_TEXT_COLUMNS[RECORD_TRADE]),
+}
+RECORD_INT_COLUMNS = {'fvg_bull', 'fvg_bear', 'trade_id'}
+RECORD_NUM_SLOTS = 32
+RECORD_TEXT_SLOTS = 10
+RECORD_TEXT_BYTES = 128
+RECORD_NOTE_BYTES = 1024
+RECORD_DTYPE = np.dtype([
+    ('kind', 'u1'),
+    ('ts', 'i8'),                                   # 봉 시작 / 기록 시각 (ms, 없으면 -1)
+    ('num', 'f8', (RECORD_NUM_SLOTS,)),
+    ('text', f'S{RECORD_TEXT_BYTES}', (RECORD_TEXT_SLOTS,)),
+    ('note', f'S{RECORD_NOTE_BYTES}'),
+], align=True)
 
 class DataCollector:
     """종합 데이터 수집기"""
@@ -37,31 +102,20 @@ class DataCollector:
         self.buffer_size = 100
         
         # 컬럼 정의
-        self.price_columns = [
-            'timestamp', 'symbol', 'open', 'high', 'low', 'close', 'volume',
-            'rsi', 'rsi_14', 'rsi_6', 'rsi_21',
-            'bb_mid', 'bb_upper', 'bb_lower', 'bb_pct', 'bb_width',
-            'ema_9', 'ema_21', 'ema_50', 'ema_200',
-            'macd', 'macdsignal', 'macdhist',
-            'vwap', 'atr', 'adx', 
-            'trend_5m', 'trend_15m', 'trend_1h',
-            'fvg_bull', 'fvg_bear', 'fvg_size',
-            'volume_ratio', 'volume_sma20',
-            'cvd', 'cvd_slope',
-            'market_mode', 'session'
-        ]
+        self.price_columns = list(PRICE_COLUMNS)
+        self.trade_columns = list(TRADE_COLUMNS)
+        
+        # 바이너리 캔들 파일 (월 구분 없이 1개, 첫 플러시 때 열기 - 기록하는 프로세스만 파일을 잡음)
+        series = f"price_data_{symbol.replace('/', '').replace(':', '')}_5m"
+        self.candle_store_file = self.data_dir / f"{series}.candles"
+        self.candle_store = None
         
-        self.trade_columns = [
-            'trade_id', 'timestamp', 'type', 'mode', 'action',
-            'entry_price', 'exit_price', 'stop_loss', 'take_profit',
-            'position_size', 'leverage', 'pnl', 'pnl_pct',
-            'entry_rsi', 'entry_bb_pct', 'entry_trend',
-            'entry_volume_ratio', 'entry_fvg',
-            'exit_reason', 'exit_rsi', 'exit_bb_pct',
-            'duration_seconds', 'max_profit', 'max_loss',
-            'market_regime', 'volatility_state',
-            'notes', 'strategy_version'
-        ]
+        # 기록한 봉 구간 (중복 제거/빠진 봉 감지)
+        self.continuity_file = self.data_dir / f"{series}.continuity.json"
+        self.continuity = None
+        
+        # 거래 원장 (첫 거래 기록 때 열기)
+        self.ledger = None
         
         self._init_files()
     
@@ -74,8 +128,8 @@ class DataCollector:
                 writer.writerow(self.price_columns)
             print(f"✅ 가격 데이터 파일 생성: {self.price_data_file}")
         
-        # 거래 분석 파일
-        if not self.trade_data_file.exists():
+        # 거래 분석 파일 (원장을 쓰면 만들지 않음)
+        if not LEDGER_ENABLED and not self.trade_data_file.exists():
             with open(self.trade_data_file, 'w', newline='', encoding='utf-8') as f:
                 writer = csv.writer(f)
                 writer.writerow(self.trade_columns)
@@ -93,7 +147,7 @@ class DataCollector:
         """실시간 가격 데이터 기록"""
         try:
             row = {col: kwargs.get(col, None) for col in self.price_columns}
-            row['timestamp'] = datetime.now().isoformat()
+            row['timestamp'] = kwargs.get('timestamp') or datetime.now().isoformat()
             
             with self.buffer_lock:
                 self.price_buffer.append(row)
@@ -103,11 +157,29 @@ class DataCollector:
         except Exception as e:
             print(f"데이터 기록 오류: {e}")
     
+    def record_features(self, features, **kwargs):
+        """
+        피처 파이프라인 결과 기록 (마감된 봉 1개)
+        
+        features: FeaturePipeline 행 (Series/dict) - 봇이 계산한 값을 그대로 재사용
+        kwargs: 파이프라인 밖의 값 (market_mode 등)
+        """
+        row = collector_row(features, self.price_columns)
+        row['symbol'] = self.symbol
+        if row.get('timestamp') is not None:
+            row['timestamp'] = datetime.fromtimestamp(int(row['timestamp']) / 1000).isoformat()
+        row.update(kwargs)
+        self.record_price_data(**row)
+    
     def _flush_buffer(self):
         """버퍼 플러시 (파일에 저장)"""
         if not self.price_buffer:
             return
         
+        self.price_buffer = self._dedupe(self.price_buffer)
+        if not self.price_buffer:
+            return
+        
         try:
             df = pd.DataFrame(self.price_buffer)
             
@@ -121,15 +193,103 @@ class DataCollector:
             print(f"💾 {len(df)}개 캔들 데이터 저장 완료")
         except Exception as e:
             print(f"버퍼 플러시 오류: {e}")
+            return
+        
+        if COLLECTOR_BINARY_STORE:
+            self._append_binary(df)
+    
+    def _dedupe(self, rows):
+        """이미 기록한 봉 / 버퍼 안 같은 시각 제거 (나중 값 사용), 건너뛴 봉 구간 경고"""
+        step = timeframe_ms('5m')
+        if self.continuity is None:
+            self.continuity = ContinuityIndex.load(self.continuity_file, step)
+        index = self.continuity
+        stamps = local_ms([row.get('timestamp') for row in rows])
+        latest = {}
+        kept = []
+        for row, ts in zip(rows, stamps):
+            if ts != ts or int(ts) % step:
+                kept.append(row)               # 봉 시각이 아닌 수동 기록은 그대로
+                continue
+            ts = int(ts)
+            if ts in index.covered:
+                index.duplicates += 1
+                continue
+            if ts in latest:
+                index.duplicates += 1
+                kept[latest[ts]] = None
+            latest[ts] = len(kept)
+            kept.append(row)
+        result = index.observe(latest)
+        if result['gaps']:
+            missing = sum(e - s for s, e in result['gaps']) // step
+            print(f"⚠️ 빠진 봉 {missing}개 (구간 {len(result['gaps'])}개, 첫 구간 "
+                  f"{datetime.fromtimestamp(result['gaps'][0][0] / 1000).isoformat()}~)")
+        try:
+            index.save(self.continuity_file)
+        except OSError as e:
+            print(f"연속성 인덱스 저장 오류: {e}")
+        return [row for row in kept if row is not None]
+    
+    def coverage(self, start=None, end=None):
+        """기록한 봉 연속성 요약 (ContinuityIndex.coverage)"""
+        if self.continuity is None:
+            self.continuity = ContinuityIndex.load(self.continuity_file, timeframe_ms('5m'))
+        return self.continuity.coverage(start, end)
+    
+    def _append_binary(self, df):
+        """바이너리 캔들 파일에 추가 (이미 있는 시각은 건너뜀)"""
+        try:
+            if self.candle_store is None:
+                categories = {col: [] for col in PRICE_COLUMNS if col in PRICE_TEXT_COLUMNS}
+                self.candle_store = CandleStore(self.candle_store_file, PRICE_COLUMNS, categories,
+                                                meta={'symbol': self.symbol, 'timeframe': '5m', 'source': 'collector'},
+                                                writable=True)
+            self.candle_store.append(price_frame(df))
+        except Exception as e:
+            print(f"바이너리 캔들 기록 오류: {e}")
+    
+    def close(self):
+        """남은 버퍼 저장 (종료 시)"""
+        with self.buffer_lock:
+            self._flush_buffer()
+            if self.candle_store is not None:
+                self.candle_store.flush()
+                self.candle_store.close()
+                self.candle_store = None
+        if self.ledger is not None:
+            self.ledger.close()
+            self.ledger = None
+    
+    def trade_ledger(self):
+        """거래 원장 (LEDGER_ENABLED일 때, 처음 부를 때 열고 기록 스레드 시작)"""
+        if not LEDGER_ENABLED:
+            return None
+        if self.ledger is None:
+            self.ledger = TradeLedger(LEDGER_FILE, LEDGER_BATCH_SIZE, LEDGER_FLUSH_INTERVAL, symbol=self.symbol)
+            self.ledger.start()
+        return self.ledger
     
     def record_trade(self, trade_info):
-        """거래 완료 시 상세 분석 데이터 기록"""
+        """거래 진입/청산 시점 분석 데이터 기록 (원장: 같은 trade_id 행의 빈 칸 채움)"""
         try:
             row = {col: trade_info.get(col, None) for col in self.trade_columns}
             row['timestamp'] = datetime.now().isoformat()
             
+            ledger = self.trade_ledger()
+            if ledger is not None and row.get('trade_id') is not None:
+                fields = {k: v for k, v in row.items() if k not in ('trade_id', 'action')}
+                if row.get('action') == 'exit':
+                    fields.pop('timestamp')          # 진입 시각은 PositionManager 기록
+                ledger.annotate_trade(row['trade_id'], **fields)
+                print(f"✅ 거래 #{row.get('trade_id')} 분석 데이터 저장 (원장)")
+                return
+            
+            new_file = not self.trade_data_file.exists()
             with open(self.trade_data_file, 'a', newline='', encoding='utf-8') as f:
                 writer = csv.DictWriter(f, fieldnames=self.trade_columns)
+                if new_file:
+                    writer.writeheader()
                 writer.writerow(row)
             
             print(f"✅ 거래 #{row.get('trade_id')} 분석 데이터 저장")
@@ -152,6 +312,10 @@ class DataCollector:
             date = datetime.now().strftime('%Y-%m-%d')
         
         try:
+            ledger = self.trade_ledger()
+            if ledger is not None:
+                return ledger.daily_performance(date)
+            
             df = pd.read_csv(self.trade_data_file)
             df['timestamp'] = pd.to_datetime(df['timestamp'])
             df['date'] = df['timestamp'].dt.date
@@ -181,14 +345,25 @@ class DataCollector:
 class TradeAnalyzer:
     """거래 분석기 - 승률/패턴 분석"""
     
-    def __init__(self):
+    def __init__(self, ledger_file=LEDGER_FILE if LEDGER_ENABLED else None):
         self.data_dir = Path("logs") / "collected_data"
         self.analysis_file = self.data_dir / "trade_patterns.json"
+        self.ledger_file = Path(ledger_file) if ledger_file else None
+    
+    def load_trades(self, days=30):
+        """최근 days일 청산 거래 (원장 인덱스 쿼리, 원장이 없으면 이번 달 CSV)"""
+        if self.ledger_file is not None and self.ledger_file.exists():
+            ledger = TradeLedger(self.ledger_file)
+            try:
+                return ledger.trades_frame(since=datetime.now() - timedelta(days=days), reason_codes=True)
+            finally:
+                ledger.close()
+        return pd.read_csv(self.data_dir / f"trade_analysis_{datetime.now().strftime('%Y%m')}.csv")
     
     def analyze_patterns(self, days=30):
         """거래 패턴 분석"""
         try:
-            df = pd.read_csv(self.data_dir / f"trade_analysis_{datetime.now().strftime('%Y%m')}.csv")
+            df = self.load_trades(days)
             
             if len(df) < 5:
                 print("분석할 거래 데이터가 부족합니다 (최소 5회)")
@@ -274,6 +449,148 @@ class TradeAnalyzer:
         return recommendations
 
 
+def _encode_text(col, value, size):
+    """문자열 → UTF-8 size바이트 이내 (넘치면 글자 경계에서 자르고 카운트)"""
+    data = str(value).encode('utf-8')
+    if len(data) > size:
+        metrics.inc('lumi_collector_truncated_total', column=col)
+        data = data[:size].decode('utf-8', 'ignore').encode('utf-8')
+    return data
+
+
+def _pack(kind, row, ts):
+    """기록 dict → 링 버퍼 레코드 (tuple)"""
+    num = [np.nan] * RECORD_NUM_SLOTS
+    for i, col in enumerate(RECORD_NUM_COLUMNS[kind]):
+        value = row.get(col)
+        if value is not None:
+            num[i] = float(value)
+    text = [b''] * RECORD_TEXT_SLOTS
+    for i, col in enumerate(RECORD_TEXT_COLUMNS[kind]):
+        value = row.get(col)
+        if value is not None:
+            text[i] = _encode_text(col, value, RECORD_TEXT_BYTES)
+    note = row.get(RECORD_NOTE_COLUMN)
+    note = _encode_text(RECORD_NOTE_COLUMN, note, RECORD_NOTE_BYTES) if note is not None else b''
+    return (kind, ts, num, text, note)
+
+
+def _unpack(record):
+    """링 버퍼 레코드 → (kind, 기록 dict)"""
+    kind = int(record['kind'])
+    row = {}
+    for col, value in zip(RECORD_NUM_COLUMNS[kind], record['num'].tolist()):
+        if value != value:
+            row[col] = None
+        else:
+            row[col] = int(value) if col in RECORD_INT_COLUMNS else value
+    for col, value in zip(RECORD_TEXT_COLUMNS[kind], record['text'].tolist()):
+        row[col] = value.decode('utf-8', 'ignore') or None
+    if kind == RECORD_TRADE:
+        row[RECORD_NOTE_COLUMN] = record['note'].decode('utf-8', 'ignore') or None
+    ts = int(record['ts'])
+    row['timestamp'] = datetime.fromtimestamp(ts / 1000).isoformat() if ts >= 0 else None
+    return kind, row
+
+
+class CollectorFeed:
+    """
+    트레이딩 프로세스 측 수집 피드 (DataCollector와 같은 기록 메서드)
+    
+    기록은 링 버퍼 복사만, 실제 CSV 저장/학습은 사이드카 프로세스
+    링이 가득 차면 (사이드카 정지 등) 버리고 lumi_collector_dropped_total 증가
+    """
+    
+    def __init__(self, symbol=SYMBOL, capacity=1024):
+        self.symbol = symbol
+        self.ring = ShmRing(RECORD_DTYPE, capacity)
+        self.process = None
+    
+    def start(self, poll_interval=0.2, learn_interval=3600):
+        """사이드카 프로세스 시작 (spawn - 부모의 스레드/락 상태를 물려받지 않음)"""
+        context = multiprocessing.get_context('spawn')
+        self.process = context.Process(target=run_sidecar, name="lumi-collector", daemon=True,
+                                       args=(self.ring.name, poll_interval, learn_interval))
+        self.process.start()
+    
+    def record_features(self, features, **kwargs):
+        """마감된 봉 피처 기록 (DataCollector.record_features와 같은 입력)"""
+        row = collector_row(features, PRICE_COLUMNS)
+        row['symbol'] = self.symbol
+        row.update(kwargs)
+        ts = row.get('timestamp')
+        return self._push(_pack(RECORD_BAR, row, int(ts) if ts is not None else -1))
+    
+    def record_trade(self, trade_info):
+        """거래 기록 (사이드카에서 DataCollector.record_trade)"""
+        return self._push(_pack(RECORD_TRADE, trade_info, int(time.time() * 1000)))
+    
+    def _push(self, record):
+        if self.ring.push(record):
+            return True
+        metrics.inc('lumi_collector_dropped_total')
+        return False
+    
+    def stats(self):
+        stats = self.ring.stats()
+        stats['alive'] = bool(self.process and self.process.is_alive())
+        return stats
+    
+    def close(self, timeout=5.0):
+        """생산 종료 → 사이드카가 남은 레코드를 저장하고 끝날 때까지 대기"""
+        self.ring.close_writer()
+        if self.process:
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.process.terminate()
+        self.ring.close()
+
+
+def run_sidecar(ring_name, poll_interval=0.2, learn_interval=3600):
+    """
+    사이드카 프로세스 본체: 링 버퍼 → CSV 기록, learn_interval초마다 자가 학습
+    
+    생산자가 종료를 알리거나 부모 프로세스가 죽으면 남은 레코드를 저장하고 종료
+    """
+    ring = ShmRing.attach(ring_name, RECORD_DTYPE)
+    learner = None
+    if learn_interval:
+        try:
+            from self_learning import SelfLearningSystem
+            learner = SelfLearningSystem(ledger_file=LEDGER_FILE if LEDGER_ENABLED else None)
+        except Exception as e:
+            print(f"자가 학습 로드 실패: {e}")
+    parent = multiprocessing.parent_process()
+    next_learn = time.time() + (learn_interval or 0)
+    
+    try:
+        while True:
+            records = ring.pop_many()
+            for record in records:
+                kind, row = _unpack(record)
+                if kind == RECORD_BAR:
+                    collector.record_price_data(**row)
+                elif kind == RECORD_TRADE:
+                    collector.record_trade(row)
+            if len(records):
+                continue
+            # closed를 먼저 확인 → 그 뒤 비어 있으면 더 들어올 레코드 없음
+            if ring.closed and len(ring) == 0:
+                break
+            if parent is not None and not parent.is_alive():
+                break
+            if learner and time.time() >= next_learn:
+                next_learn = time.time() + learn_interval
+                try:
+                    learner.learn_from_trades()
+                except Exception as e:
+                    print(f"자가 학습 오류: {e}")
+            time.sleep(poll_interval)
+    finally:
+        collector.close()
+        ring.close()
+
+
 # 전역 인스턴스
 collector = DataCollector()
 analyzer = TradeAnalyzer()
@@ -4,39 +4,80 @@ modules/exchange.py - 거래소 연결 및 관리
 """
 
 import ccxt
+import logging
 import os
+import time
+from datetime import datetime
 from .utils import safe_float
+from .telemetry import metrics
+from .logger import get_logger
+from .ratelimit import WeightScheduler, ScheduledExchange, request_priority
+from .io_policy import IOPolicy, ResilientExchange
+
+log = get_logger('exchange')
 
 
 class ExchangeManager:
     """Binance 거래소 연결 및 잔고/레버리지 관리"""
     
-    def __init__(self, symbol="ETH/USDT", leverage=20):
+    def __init__(self, symbol="ETH/USDT", leverage=20, rate_limits=None, io_policy=None):
+        """
+        Args:
+            rate_limits: WeightScheduler 설정 dict (None이면 ccxt 기본 균등 스로틀)
+            io_policy: IOPolicy 설정 dict (None이면 재시도/서킷/헤지 없이 1회 호출)
+        """
         self.exchange = None
         self.symbol = symbol
         self.leverage = leverage
         self.is_connected = False
+        self.scheduler = WeightScheduler(**rate_limits) if rate_limits is not None else None
+        self.io = IOPolicy(**io_policy) if io_policy is not None else None
+        self.on_balance = None  # 잔고 조회 성공 시 호출 (리스크 엔진 자산 보정 등)
+    
+    def priority(self, name):
+        """요청 우선순위 구간 (with exchange_mgr.priority('exit'): ...)"""
+        return request_priority(name)
+    
+    def rate_stats(self):
+        """요청 예산 사용 현황 (스케줄러 미사용 시 None)"""
+        return self.scheduler.stats() if self.scheduler else None
+    
+    def io_stats(self):
+        """재시도/서킷/헤지 현황 (정책 미사용 시 None)"""
+        return self.io.stats() if self.io else None
     
-    def connect(self):
-        """Binance 선물 거래소 연결"""
+    def connect(self, public=False):
+        """
+        Binance 선물 거래소 연결
+        
+        public=True: API 키 없이 공개 데이터만 (과거 캔들 다운로드 등, 레버리지 설정 생략)
+        """
         try:
             # API 키 로드 (여러 환경변수 이름 지원)
             api_key = os.getenv('BINANCE_API_KEY', '') or os.getenv('API_KEY', '')
             secret = os.getenv('BINANCE_SECRET', '') or os.getenv('SECRET_KEY', '') or os.getenv('BINANCE_API_SECRET', '')
             
-            if not api_key or not secret:
+            if (not api_key or not secret) and not public:
                 return False, "API 키가 설정되지 않았습니다. .env 파일을 확인하세요."
             
-            self.exchange = ccxt.binance({
+            exchange = ccxt.binance({
                 'apiKey': api_key,
                 'secret': secret,
-                'enableRateLimit': True,
+                # 스케줄러 사용 시 ccxt 균등 스로틀은 끔 (우선순위 없이 모든 호출을 줄 세움)
+                'enableRateLimit': self.scheduler is None,
+                # 재시도 정책 사용 시 1회 타임아웃을 짧게 (deadline 안에서 재시도할 여유)
+                'timeout': int(self.io.request_timeout * 1000) if self.io else 10000,
                 'options': {'defaultType': 'future'}
             })
-            self.exchange.set_sandbox_mode(False)
+            exchange.set_sandbox_mode(False)
+            # 바깥부터: 재시도/서킷/헤지 → 가중치 예산 → ccxt
+            if self.scheduler:
+                exchange = ScheduledExchange(exchange, self.scheduler)
+            self.exchange = ResilientExchange(exchange, self.io) if self.io else exchange
             
             # 레버리지 설정
-            self._set_leverage()
+            if not public:
+                self._set_leverage()
             
             self.is_connected = True
             return True, "연결 성공"
@@ -50,94 +91,187 @@ class ExchangeManager:
         if not self.exchange:
             return
         try:
+            metrics.inc('lumi_rest_calls_total', endpoint='set_leverage')
             self.exchange.fapiPrivatePostLeverage({
                 'symbol': self.symbol.replace('/', ''),
                 'leverage': self.leverage
             })
         except Exception as e:
-            print(f"⚠️ 레버리지 설정 실패: {e}")
+            metrics.inc('lumi_errors_total', component='exchange')
+            log.warning("레버리지 설정 실패: %s", e)
     
     def get_balance(self):
-        """USDT 잔고 조회"""
+        """USDT 잔고 조회 (조회 실패 시 None - 잔고 0과 구분)"""
         if not self.exchange:
-            return {'free': 0, 'total': 0}
+            return None
         try:
+            metrics.inc('lumi_rest_calls_total', endpoint='fetch_balance')
             balance = self.exchange.fetch_balance()
-            return {
+            balance = {
                 'free': safe_float(balance.get('USDT', {}).get('free', 0)),
                 'total': safe_float(balance.get('USDT', {}).get('total', 0))
             }
         except Exception as e:
-            print(f"❌ 잔고 조회 실패: {e}")
-            return {'free': 0, 'total': 0}
+            metrics.inc('lumi_errors_total', component='exchange')
+            log.error("잔고 조회 실패: %s", e)
+            return None
+        if self.on_balance:
+            self.on_balance(balance)
+        return balance
     
     def get_positions(self):
-        """현재 포지션 조회"""
+        """현재 포지션 조회 (조회 실패 시에도 None)"""
         if not self.exchange:
             return None
         try:
-            # 방법 1: fetch_positions 사용
-            positions = self.exchange.fetch_positions([self.symbol])
-            
-            # 심볼 형식 변환 (다양한 형식 지원)
-            symbol_alternate = self.symbol.replace('/', '')  # ETH/USDT -> ETHUSDT
-            symbol_ccxt_futures = f"{self.symbol}:USDT"      # ETH/USDT -> ETH/USDT:USDT (로그에서 확인된 형식)
-            symbol_with_colon = self.symbol.replace('/', ':') # ETH/USDT -> ETH:USDT
-            
-            # Binance specific: 선물 심볼 형식
-            binance_futures_symbol = symbol_alternate
+            return self._fetch_position()
+        except Exception as e:
+            metrics.inc('lumi_errors_total', component='exchange')
+            # 트레이스백은 DEBUG 레벨에서만 기록
+            log.error("포지션 조회 실패: %s", e, exc_info=log.isEnabledFor(logging.DEBUG))
+            return None
+    
+    @staticmethod
+    def _signed_amount(pos):
+        """
+        부호 있는 포지션 수량 (+롱 / -숏)
+        
+        ccxt 통합 형식의 contracts는 항상 절대값 → 방향은 info.positionAmt 또는 side로 판단
+        """
+        info = pos.get('info') or {}
+        for raw in (info.get('positionAmt'), pos.get('positionAmt')):
+            if raw not in (None, ''):
+                amount = safe_float(raw)
+                if amount:
+                    return amount
+        contracts = abs(safe_float(pos.get('contracts', 0)))
+        return -contracts if str(pos.get('side', '')).lower() == 'short' else contracts
+    
+    def _fetch_position(self):
+        """포지션 조회 (예외는 호출자에게 전달 - 실패와 '포지션 없음' 구분용)"""
+        # 방법 1: fetch_positions 사용
+        metrics.inc('lumi_rest_calls_total', endpoint='fetch_positions')
+        positions = self.exchange.fetch_positions([self.symbol])
+        
+        # 심볼 형식 변환 (다양한 형식 지원)
+        symbol_alternate = self.symbol.replace('/', '')  # ETH/USDT -> ETHUSDT
+        symbol_ccxt_futures = f"{self.symbol}:USDT"      # ETH/USDT -> ETH/USDT:USDT (로그에서 확인된 형식)
+        symbol_with_colon = self.symbol.replace('/', ':') # ETH/USDT -> ETH:USDT
+        
+        # Binance specific: 선물 심볼 형식
+        binance_futures_symbol = symbol_alternate
+        
+        for pos in positions:
+            pos_symbol = pos.get('symbol', '')
+            amount = self._signed_amount(pos)
             
-            for pos in positions:
+            # 각종 형식 비교 (ccxt 전용 형식 추가)
+            if pos_symbol in [self.symbol, symbol_alternate, symbol_with_colon, binance_futures_symbol, symbol_ccxt_futures]:
+                if abs(amount) > 0:
+                    entry_price = safe_float(pos.get('entryPrice', 0)) or safe_float(pos.get('avgPrice', 0))
+                    log.debug("포지션 발견! %s: %s @ $%s", pos_symbol, amount, entry_price)
+                    return {
+                        'side': 'LONG' if amount > 0 else 'SHORT',
+                        'size': abs(amount),
+                        'entry_price': entry_price,
+                        'unrealized_pnl': safe_float(pos.get('unrealizedPnl', 0)),
+                        'notional': safe_float(pos.get('notional', 0)),
+                        'leverage': safe_float(pos.get('leverage', 1)),
+                        'update_time': int(safe_float((pos.get('info') or {}).get('updateTime', 0))
+                                           or safe_float(pos.get('timestamp', 0))) or None
+                    }
+        
+        # 방법 2: balance에서 포지션 정보 확인 (Binance 스타일)
+        try:
+            metrics.inc('lumi_rest_calls_total', endpoint='fetch_balance')
+            balance = self.exchange.fetch_balance()
+            positions_from_balance = balance.get('info', {}).get('positions', [])
+            for pos in positions_from_balance:
                 pos_symbol = pos.get('symbol', '')
-                contracts = safe_float(pos.get('contracts', 0)) or safe_float(pos.get('positionAmt', 0))
-                
-                # 각종 형식 비교 (ccxt 전용 형식 추가)
-                if pos_symbol in [self.symbol, symbol_alternate, symbol_with_colon, binance_futures_symbol, symbol_ccxt_futures]:
-                    if abs(contracts) > 0:
-                        entry_price = safe_float(pos.get('entryPrice', 0)) or safe_float(pos.get('avgPrice', 0))
-                        print(f"   ✅ 포지션 발견! {pos_symbol}: {contracts} @ ${entry_price}")
-                        return {
-                            'side': 'LONG' if contracts > 0 else 'SHORT',
-                            'size': abs(contracts),
-                            'entry_price': entry_price,
-                            'unrealized_pnl': safe_float(pos.get('unrealizedPnl', 0)),
-                            'notional': safe_float(pos.get('notional', 0)),
-                            'leverage': safe_float(pos.get('leverage', 1))
-                        }
-            
-            # 방법 2: balance에서 포지션 정보 확인 (Binance 스타일)
-            try:
-                balance = self.exchange.fetch_balance()
-                positions_from_balance = balance.get('info', {}).get('positions', [])
-                for pos in positions_from_balance:
-                    pos_symbol = pos.get('symbol', '')
-                    position_amt = safe_float(pos.get('positionAmt', 0))
-                    if pos_symbol == symbol_alternate and abs(position_amt) > 0:
-                        print(f"   ✅ balance에서 포지션 발견! {pos_symbol}: {position_amt}")
-                        return {
-                            'side': 'LONG' if position_amt > 0 else 'SHORT',
-                            'size': abs(position_amt),
-                            'entry_price': safe_float(pos.get('entryPrice', 0)),
-                            'unrealized_pnl': safe_float(pos.get('unrealizedProfit', 0)),
-                            'notional': abs(position_amt) * safe_float(pos.get('entryPrice', 0)),
-                            'leverage': safe_float(pos.get('leverage', 1))
-                        }
-            except:
-                pass
-            
-            print(f"   ⏳ 포지션 없음")
-            return None
+                position_amt = safe_float(pos.get('positionAmt', 0))
+                if pos_symbol == symbol_alternate and abs(position_amt) > 0:
+                    log.debug("balance에서 포지션 발견! %s: %s", pos_symbol, position_amt)
+                    return {
+                        'side': 'LONG' if position_amt > 0 else 'SHORT',
+                        'size': abs(position_amt),
+                        'entry_price': safe_float(pos.get('entryPrice', 0)),
+                        'unrealized_pnl': safe_float(pos.get('unrealizedProfit', 0)),
+                        'notional': abs(position_amt) * safe_float(pos.get('entryPrice', 0)),
+                        'leverage': safe_float(pos.get('leverage', 1)),
+                        'update_time': int(safe_float(pos.get('updateTime', 0))) or None
+                    }
+        except Exception:
+            pass
+        
+        log.debug("포지션 없음")
+        return None
+    
+    def get_account_state(self):
+        """
+        포지션 + 미체결 주문 (대조용)
+        
+        Returns:
+            (bool, dict | str): (성공 여부, {'position', 'open_orders', 'fetched_at'} 또는 오류)
+        """
+        if not self.exchange:
+            return False, "거래소 연결 없음"
+        try:
+            position = self._fetch_position()
+            metrics.inc('lumi_rest_calls_total', endpoint='fetch_open_orders')
+            orders = self.exchange.fetch_open_orders(self.symbol)
+            return True, {'position': position, 'open_orders': orders, 'fetched_at': time.time()}
         except Exception as e:
-            print(f"❌ 포지션 조회 실패: {e}")
-            import traceback
-            traceback.print_exc()
+            metrics.inc('lumi_errors_total', component='exchange')
+            return False, f"계정 조회 실패: {e}"
+    
+    def get_recent_trades(self, limit=100):
+        """최근 내 체결 (오래된 → 최신)"""
+        if not self.exchange:
+            return []
+        try:
+            metrics.inc('lumi_rest_calls_total', endpoint='fetch_my_trades')
+            return self.exchange.fetch_my_trades(self.symbol, limit=limit) or []
+        except Exception as e:
+            metrics.inc('lumi_errors_total', component='exchange')
+            log.warning("체결 내역 조회 실패: %s", e)
+            return []
+    
+    @staticmethod
+    def find_entry_trade(trades, signed_amount):
+        """
+        현재 포지션이 시작된 체결 (최신부터 거슬러 올라가며 수량이 0/반대 부호가 되는 지점)
+        
+        Returns:
+            dict | None: ccxt 체결 (찾지 못하면 None)
+        """
+        remaining = signed_amount
+        for trade in reversed(trades):
+            signed = safe_float(trade.get('amount', 0)) * (1 if trade.get('side') == 'buy' else -1)
+            before = remaining - signed
+            if abs(before) < 1e-9 or (before > 0) != (signed_amount > 0):
+                return trade
+            remaining = before
+        return None
+    
+    def get_entry_time(self, position):
+        """
+        거래소 포지션의 실제 진입 시각 (datetime)
+        
+        체결 내역에서 찾고, 없으면 포지션 updateTime (그것도 없으면 None)
+        """
+        if not position:
             return None
+        signed = position['size'] * (1 if position['side'] == 'LONG' else -1)
+        trade = self.find_entry_trade(self.get_recent_trades(), signed)
+        ts = (trade or {}).get('timestamp') or position.get('update_time')
+        return datetime.fromtimestamp(ts / 1000) if ts else None
     
     def get_symbol_info(self):
         """거래 심볼 정보 조회"""
         if not self.exchange:
             return None
         try:
+            metrics.inc('lumi_rest_calls_total', endpoint='load_markets')
             markets = self.exchange.load_markets()
             return markets.get(self.symbol, {})
         except:
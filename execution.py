@@ -0,0 +1,402 @@
+# -*- coding: utf-8 -*-
+"""
+modules/execution.py - 호가 깊이 기반 주문 실행 (분할/패시브 체결 + 슬리피지 기록)
+
+1. L2 호가창 조회 → 시장가 체결 시 예상 충격(impact) 계산
+   긴급 청산(urgent)은 호가창 조회 없이 바로 시장가 (조회 왕복만큼 청산이 늦어지지 않게)
+2. 충격이 EXEC_MAX_IMPACT_BPS 이하 → 바로 시장가
+3. 초과 (또는 조회한 호가 깊이로 다 못 채움) → EXEC_ALGO에 따라 분할
+   - TWAP: 충격 한도 내 크기로 쪼개서 일정 간격 시장가
+   - ICEBERG: 최우선 호가에 일부 수량만 post-only 지정가, 체결되면 다음 조각
+   - LIMIT_CHASE: 전체 잔량을 최우선 호가에 post-only로 걸고 호가 이동 시 재주문
+   패시브 방식은 시간/추격 한도를 넘으면 잔량 시장가
+   지정가는 취소 후 재조회로 종료를 확인한 뒤에만 다음 주문 (확인 불가면 잔량 시장가 없이 중단)
+   조각 주문이 실패하면 분할 중단 → 그때까지 체결분을 부분 체결로 반환 (포지션 기록 누락 방지)
+4. 실제 평균 체결가 vs 신호 가격 슬리피지 기록 (jsonl + 메트릭)
+"""
+
+import json
+import math
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from .telemetry import metrics
+from .logger import get_logger
+
+log = get_logger('execution')
+
+
+def estimate_impact(order_book, side, amount):
+    """
+    시장가 체결 시 예상 평균가/충격
+
+    Args:
+        order_book: ccxt fetch_order_book 결과
+        side: 'buy' / 'sell'
+        amount: 수량
+
+    Returns:
+        dict: avg_price, worst_price, best_price, mid_price, impact_bps, filled, levels
+    """
+    levels = order_book.get('asks' if side == 'buy' else 'bids') or []
+    bids, asks = order_book.get('bids') or [], order_book.get('asks') or []
+    if not levels:
+        return None
+
+    best = levels[0][0]
+    mid = (bids[0][0] + asks[0][0]) / 2 if bids and asks else best
+    remaining = amount
+    cost = 0.0
+    worst = best
+    used = 0
+    for price, size in levels:
+        if remaining <= 0:
+            break
+        take = min(size, remaining)
+        cost += take * price
+        remaining -= take
+        worst = price
+        used += 1
+
+    filled = amount - remaining
+    avg = cost / filled if filled > 0 else best
+    direction = 1 if side == 'buy' else -1
+    return {
+        'avg_price': avg,
+        'worst_price': worst,
+        'best_price': best,
+        'mid_price': mid,
+        'impact_bps': (avg - best) / best * 1e4 * direction,
+        'filled': filled,
+        'fully_fillable': remaining <= 1e-12,
+        'levels': used,
+    }
+
+
+def max_amount_within(order_book, side, max_bps):
+    """평균 충격이 max_bps 이하인 최대 수량"""
+    levels = order_book.get('asks' if side == 'buy' else 'bids') or []
+    if not levels:
+        return 0.0
+    best = levels[0][0]
+    direction = 1 if side == 'buy' else -1
+    qty = 0.0
+    cost = 0.0
+    for price, size in levels:
+        # 이 레벨을 x만큼 먹었을 때 평균 충격 = max_bps 되는 x 계산
+        limit_avg = best * (1 + direction * max_bps / 1e4)
+        if (price - limit_avg) * direction <= 0:
+            qty += size
+            cost += size * price
+            continue
+        # (cost + x*price) / (qty + x) = limit_avg
+        x = (limit_avg * qty - cost) / (price - limit_avg)
+        if x > 0:
+            qty += min(x, size)
+        break
+    return qty
+
+
+class ExecutionEngine:
+    """호가 깊이 기반 주문 실행기"""
+
+    ALGOS = ('TWAP', 'ICEBERG', 'LIMIT_CHASE')
+    FINAL_STATUSES = ('closed', 'canceled', 'expired', 'rejected')
+
+    def __init__(self, exchange_manager, config=None, sleep=time.sleep):
+        config = config or {}
+        self.exchange_mgr = exchange_manager
+        self.symbol = config.get('SYMBOL', 'ETH/USDT')
+        self.enabled = config.get('EXEC_SMART_ENABLED', True)
+        self.depth_limit = config.get('EXEC_DEPTH_LIMIT', 50)
+        self.max_impact_bps = config.get('EXEC_MAX_IMPACT_BPS', 3.0)
+        self.algo = config.get('EXEC_ALGO', 'TWAP')
+        self.max_slices = config.get('EXEC_MAX_SLICES', 5)
+        self.slice_interval = config.get('EXEC_SLICE_INTERVAL', 1.0)
+        self.chase_max_bps = config.get('EXEC_CHASE_MAX_BPS', 5.0)
+        self.max_duration = config.get('EXEC_MAX_DURATION', 15.0)
+        self.min_slice_usdt = config.get('EXEC_MIN_SLICE_USDT', 100.0)
+        self.slippage_file = Path(config.get('EXEC_SLIPPAGE_FILE', 'logs/slippage.jsonl'))
+        self.sleep = sleep
+        self.fills = deque(maxlen=500)
+
+    @property
+    def exchange(self):
+        return self.exchange_mgr.exchange
+
+    # ------------------------------------------------------------------ 진입점
+
+    def execute(self, side, amount, signal_price, urgent=False, reduce_only=False):
+        """
+        주문 실행
+
+        Args:
+            side: 'buy' / 'sell'
+            amount: 목표 수량
+            signal_price: 신호 발생 시점 가격 (슬리피지 기준)
+            urgent: True면 호가창 조회/분할 없이 즉시 시장가 (청산용)
+
+        Returns:
+            (bool, dict | str): 성공 시 order_id, amount(체결 수량), avg_price, slippage_bps 등
+                                분할 도중 실패하면 partial=True, error와 함께 그때까지 체결분
+        """
+        started = time.time()
+        book = None
+        estimate = None
+        if self.enabled and not urgent:
+            book = self._fetch_book()
+            if book:
+                estimate = estimate_impact(book, side, amount)
+
+        error = None
+        # 조회한 깊이로 다 못 채우면 보이는 부분 평균 충격은 과소평가 → 한도 초과로 취급
+        if (urgent or not estimate
+                or (estimate['fully_fillable'] and estimate['impact_bps'] <= self.max_impact_bps)):
+            algo = 'DIRECT'
+            fills = [self._market(side, amount, reduce_only, signal_price)]
+        elif self.algo == 'TWAP':
+            algo = 'TWAP'
+            fills, error = self._twap(side, amount, book, reduce_only)
+        else:
+            algo = self.algo
+            fills, error = self._passive(side, amount, book, reduce_only, iceberg=(self.algo == 'ICEBERG'))
+
+        filled = sum(f['filled'] for f in fills)
+        if filled <= 0:
+            return False, error or "체결 수량 없음"
+
+        avg_price = sum(f['filled'] * f['average'] for f in fills) / filled
+        report = self._record(side, amount, filled, avg_price, signal_price, estimate, algo,
+                              len(fills), time.time() - started)
+        if error:
+            report['partial'] = True
+            report['error'] = error
+            log.warning("   ⚠️ %s 분할 중단 → 부분 체결 %.4f / %.4f 로 기록: %s", algo, filled, amount, error)
+        report['order_id'] = fills[-1].get('id')
+        report['order_ids'] = [f.get('id') for f in fills]
+        return True, report
+
+    # ------------------------------------------------------------------ 알고리즘
+
+    def _fetch_book(self):
+        try:
+            with metrics.span('order_book'):
+                metrics.inc('lumi_rest_calls_total', endpoint='fetch_order_book')
+                return self.exchange.fetch_order_book(self.symbol, self.depth_limit)
+        except Exception as e:
+            metrics.inc('lumi_errors_total', component='execution')
+            log.warning("호가창 조회 실패 (시장가로 진행): %s", e)
+            return None
+
+    def _params(self, reduce_only=False, **extra):
+        params = {'newClientOrderId': f"lumi-{uuid.uuid4().hex[:20]}"}
+        if reduce_only:
+            params['reduceOnly'] = True
+        params.update(extra)
+        return params
+
+    def _normalize(self, order, fallback_amount, fallback_price):
+        """
+        ccxt 주문 응답 → 체결 정보
+
+        체결가가 응답에도 fallback_price에도 없으면 ValueError (평균가 0으로 포지션/손익이 기록되지 않게)
+        """
+        filled = order.get('filled')
+        if filled is None:
+            filled = fallback_amount
+        filled = float(filled or 0)
+        average = float(order.get('average') or order.get('price') or fallback_price or 0)
+        if filled > 0 and average <= 0:
+            raise ValueError(f"체결가 확인 불가 (주문 {order.get('id')}, 체결 {filled})")
+        return {'id': order.get('id'), 'filled': filled, 'average': average}
+
+    def _market(self, side, amount, reduce_only=False, fallback_price=None):
+        """시장가 1건 (응답/조회에 평균가가 없으면 fallback_price - 신호가/호가 기준)"""
+        metrics.inc('lumi_rest_calls_total', endpoint='create_order')
+        order = self.exchange.create_order(self.symbol, 'market', side, amount, None,
+                                           self._params(reduce_only))
+        if order.get('filled') is None and order.get('id'):
+            try:
+                order = self.exchange.fetch_order(order['id'], self.symbol)
+            except Exception:
+                pass
+        return self._normalize(order, amount, fallback_price)
+
+    def _slice_failed(self, algo, e):
+        """조각 주문 실패 → 분할 중단 사유"""
+        metrics.inc('lumi_errors_total', component='execution')
+        log.error("   ❌ %s 조각 주문 실패 (분할 중단): %s", algo, e)
+        return f"{algo} 조각 주문 실패: {e}"
+
+    def _twap(self, side, amount, book, reduce_only):
+        """
+        충격 한도 내 크기로 분할 시장가
+
+        Returns:
+            (list, str | None): 체결 목록, 중단 사유 (조각 주문 실패 시)
+        """
+        mid = estimate_impact(book, side, amount)['mid_price']
+        clip = max_amount_within(book, side, self.max_impact_bps)
+        min_clip = self.min_slice_usdt / mid if mid > 0 else 0
+        n_slices = min(self.max_slices, max(1, math.ceil(amount / max(clip, min_clip, 1e-12))))
+        slice_size = amount / n_slices
+        log.info("   ✂️ TWAP 분할: %d조각 × %.4f (간격 %.1f초)", n_slices, slice_size, self.slice_interval)
+
+        fills = []
+        remaining = amount
+        deadline = time.time() + self.max_duration
+        try:
+            for i in range(n_slices):
+                size = remaining if i == n_slices - 1 else slice_size
+                fill = self._market(side, size, reduce_only, mid)
+                fills.append(fill)
+                remaining -= fill['filled']
+                if remaining <= 1e-12 or time.time() > deadline:
+                    break
+                self.sleep(self.slice_interval)
+            if remaining > 1e-9:
+                fills.append(self._market(side, remaining, reduce_only, mid))
+        except Exception as e:
+            return fills, self._slice_failed('TWAP', e)
+        return fills, None
+
+    def _settle_limit(self, order):
+        """
+        지정가 주문 종료 확정 → 최종 주문 (확인 못 하면 None)
+
+        미종료면 취소 후 다시 조회해서 실제 체결 수량을 얻음
+        (조회 실패여도 취소는 시도 - 살아 있는 주문을 남기지 않게)
+        """
+        order_id = order['id']
+        try:
+            order = self.exchange.fetch_order(order_id, self.symbol)
+        except Exception as e:
+            log.warning("지정가 상태 조회 실패: %s", e)
+        finally:
+            if order.get('status') not in self.FINAL_STATUSES:
+                try:
+                    metrics.inc('lumi_rest_calls_total', endpoint='cancel_order')
+                    self.exchange.cancel_order(order_id, self.symbol)
+                except Exception as e:
+                    log.warning("지정가 취소 실패: %s", e)
+        if order.get('status') in self.FINAL_STATUSES:
+            return order
+        try:
+            order = self.exchange.fetch_order(order_id, self.symbol)
+        except Exception as e:
+            log.warning("취소 후 지정가 재조회 실패: %s", e)
+            return None
+        return order if order.get('status') in self.FINAL_STATUSES else None
+
+    def _passive(self, side, amount, book, reduce_only, iceberg=True):
+        """
+        post-only 지정가 (ICEBERG: 일부 수량 / LIMIT_CHASE: 전체 잔량)
+
+        Returns:
+            (list, str | None): 체결 목록, 중단 사유 (주문 실패 / 지정가 종료 확인 불가 시)
+        """
+        algo = 'ICEBERG' if iceberg else 'LIMIT_CHASE'
+        direction = 1 if side == 'buy' else -1
+        touch_side = 'bids' if side == 'buy' else 'asks'
+        anchor = book[touch_side][0][0]
+        clip = max(max_amount_within(book, side, self.max_impact_bps), 1e-9) if iceberg else amount
+        deadline = time.time() + self.max_duration
+        fills = []
+        remaining = amount
+
+        while remaining > 1e-9 and time.time() < deadline:
+            touch = book[touch_side][0][0]
+            # 추격 한도: 시작 호가 대비 불리하게 chase_max_bps 이상 이동하면 중단
+            if (touch - anchor) / anchor * 1e4 * direction > self.chase_max_bps:
+                log.info("   🏃 추격 한도 초과 (%.1fbps) → 잔량 시장가", self.chase_max_bps)
+                break
+            size = min(clip, remaining)
+            try:
+                metrics.inc('lumi_rest_calls_total', endpoint='create_order')
+                order = self.exchange.create_order(self.symbol, 'limit', side, size, touch,
+                                                   self._params(reduce_only, timeInForce='GTX'))
+            except Exception as e:
+                return fills, self._slice_failed(algo, e)
+            self.sleep(self.slice_interval)
+            settled = self._settle_limit(order)
+            if settled is None:
+                # 주문이 아직 살아 있을 수 있음 → 잔량 시장가를 보내면 초과 체결 위험
+                return fills, self._slice_failed(algo, f"지정가 {order.get('id')} 종료 확인 불가")
+            fill = self._normalize(settled, 0, touch)
+            if fill['filled'] > 0:
+                fills.append(fill)
+                remaining -= fill['filled']
+            book = self._fetch_book() or book
+
+        if remaining > 1e-9:
+            try:
+                fills.append(self._market(side, remaining, reduce_only, book[touch_side][0][0]))
+            except Exception as e:
+                return fills, self._slice_failed(algo, e)
+        return fills, None
+
+    # ------------------------------------------------------------------ 기록
+
+    def _record(self, side, requested, filled, avg_price, signal_price, estimate, algo, n_orders, duration):
+        direction = 1 if side == 'buy' else -1
+        slippage_bps = (avg_price - signal_price) / signal_price * 1e4 * direction if signal_price else 0.0
+        report = {
+            'time': datetime.now().isoformat(),
+            'side': side,
+            'algo': algo,
+            'requested': requested,
+            'amount': filled,
+            'avg_price': avg_price,
+            'signal_price': signal_price,
+            'slippage_bps': slippage_bps,
+            'estimated_impact_bps': estimate['impact_bps'] if estimate else None,
+            'arrival_mid': estimate['mid_price'] if estimate else None,
+            'orders': n_orders,
+            'duration': duration,
+        }
+        self.fills.append(report)
+        metrics.observe('lumi_slippage_bps_abs', abs(slippage_bps), algo=algo)
+        metrics.set_gauge('lumi_last_slippage_bps', slippage_bps, side=side)
+        log.info("   📐 체결 %s %.4f @ $%.2f | 슬리피지 %+.2fbps (%s, %d건)",
+                 side, filled, avg_price, slippage_bps, algo, n_orders)
+        try:
+            self.slippage_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.slippage_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(report, ensure_ascii=False) + '\n')
+        except OSError as e:
+            log.warning("슬리피지 기록 실패: %s", e)
+        return report
+
+    def slippage_stats(self):
+        """최근 체결 슬리피지 요약"""
+        values = [f['slippage_bps'] for f in self.fills]
+        if not values:
+            return {'count': 0}
+        values.sort()
+        return {
+            'count': len(values),
+            'mean_bps': sum(values) / len(values),
+            'median_bps': values[len(values) // 2],
+            'worst_bps': values[-1],
+        }
+
+
+if __name__ == "__main__":
+    # 오프라인 데모: python -m modules.execution
+    from .sim_exchange import SimulatedExchange
+
+    class _Manager:
+        def __init__(self, exchange):
+            self.exchange = exchange
+
+    for algo in ('TWAP', 'ICEBERG', 'LIMIT_CHASE'):
+        sim = SimulatedExchange(seed=1)
+        engine = ExecutionEngine(_Manager(sim), {'EXEC_ALGO': algo, 'EXEC_MAX_IMPACT_BPS': 0.5, 'EXEC_SLIPPAGE_FILE': '/tmp/lumi_slippage.jsonl'},
+                                 sleep=sim.advance)
+        signal_price = sim.book.mid
+        naive = estimate_impact(sim.fetch_order_book(sim.symbol), 'buy', 200)
+        ok, report = engine.execute('buy', 200, signal_price)
+        print(f"{algo:<12} 단일 시장가 예상 {naive['impact_bps']:.2f}bps → 실제 {report['slippage_bps']:+.2f}bps "
+              f"({report['orders']}건, 체결 {report['amount']:.2f})")
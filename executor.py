@@ -5,6 +5,11 @@ modules/executor.py - 주문 실행 모듈
 
 import time
 from datetime import datetime
+from .telemetry import metrics
+from .logger import get_logger
+from .execution import ExecutionEngine
+
+log = get_logger('executor')
 
 
 class OrderExecutor:
@@ -17,6 +22,7 @@ class OrderExecutor:
         self.pending_position = False
         self.last_entry_attempt = 0
         self.position_size = 0
+        self.engine = ExecutionEngine(exchange_manager, config)
     
     def calculate_position_size(self, price, balance_data):
         """포지션 크기 계산 (ALL-IN 모드)"""
@@ -56,11 +62,14 @@ class OrderExecutor:
             return False, "거래소 연결 없음"
         
         self.pending_position = True
-        symbol = self.config.get('SYMBOL', 'ETH/USDT')
         
         try:
             # 잔고 확인
             balance = self.exchange_mgr.get_balance()
+            if balance is None:
+                # 조회 실패는 잔고 부족이 아님 → 쿨다운 없이 다음 틱에 재시도
+                self.pending_position = False
+                return False, "잔고 조회 실패"
             calc = self.calculate_position_size(price, balance)
             
             if not calc['is_valid']:
@@ -71,32 +80,40 @@ class OrderExecutor:
             
             # 디버깅 출력 (레버리지 계산 확인용)
             lev = self.config.get('LEVERAGE', 20)
-            print(f"   💰 [실행기] 잔고 ${calc['free_balance']:.2f}")
-            print(f"   💰 [실행기] 마진: ${calc['margin']:.2f} | 포지션: ${calc['notional']:.2f} | 레버리지: {lev}배")
-            print(f"   💰 [실행기] ETH 수량: {calc['amount']:.4f}")
+            log.debug("💰 [실행기] 잔고 $%.2f", calc['free_balance'])
+            log.debug("💰 [실행기] 마진: $%.2f | 포지션: $%.2f | 레버리지: %s배", calc['margin'], calc['notional'], lev)
+            log.debug("💰 [실행기] ETH 수량: %.4f", calc['amount'])
             
             # 주문 실행
-            order = self.exchange_mgr.exchange.create_market_buy_order(
-                symbol, calc['amount']
-            )
+            with metrics.span('order', side='LONG'):
+                ok, fill = self.engine.execute('buy', calc['amount'], price)
             
-            self.position_size = calc['amount']
+            if not ok:
+                self.pending_position = False
+                self.last_entry_attempt = time.time()
+                return False, f"주문 실패: {fill}"
+            
+            self.position_size = fill['amount']
             self.pending_position = False
             
             if self.notifier:
                 self.notifier.send_order_filled(
-                    "LONG", price, calc['amount'], calc['notional'], calc['margin']
+                    "LONG", fill['avg_price'], fill['amount'], calc['notional'], calc['margin']
                 )
             
             return True, {
-                'order_id': order.get('id'),
-                'amount': calc['amount'],
+                'order_id': fill['order_id'],
+                'amount': fill['amount'],
                 'notional': calc['notional'],
                 'margin': calc['margin'],
-                'price': price
+                'price': price,
+                'avg_price': fill['avg_price'],
+                'slippage_bps': fill['slippage_bps'],
+                'algo': fill['algo']
             }
             
         except Exception as e:
+            metrics.inc('lumi_errors_total', component='order')
             self.pending_position = False
             self.last_entry_attempt = time.time()
             return False, f"주문 실패: {e}"
@@ -113,11 +130,14 @@ class OrderExecutor:
             return False, "거래소 연결 없음"
         
         self.pending_position = True
-        symbol = self.config.get('SYMBOL', 'ETH/USDT')
         
         try:
             # 잔고 확인
             balance = self.exchange_mgr.get_balance()
+            if balance is None:
+                # 조회 실패는 잔고 부족이 아님 → 쿨다운 없이 다음 틱에 재시도
+                self.pending_position = False
+                return False, "잔고 조회 실패"
             calc = self.calculate_position_size(price, balance)
             
             if not calc['is_valid']:
@@ -127,27 +147,35 @@ class OrderExecutor:
                 return False, f"잔고 부족: ${calc['margin']:.2f} (최소 ${min_order})"
             
             # 주문 실행
-            order = self.exchange_mgr.exchange.create_market_sell_order(
-                symbol, calc['amount']
-            )
+            with metrics.span('order', side='SHORT'):
+                ok, fill = self.engine.execute('sell', calc['amount'], price)
+            
+            if not ok:
+                self.pending_position = False
+                self.last_entry_attempt = time.time()
+                return False, f"주문 실패: {fill}"
             
-            self.position_size = calc['amount']
+            self.position_size = fill['amount']
             self.pending_position = False
             
             if self.notifier:
                 self.notifier.send_order_filled(
-                    "SHORT", price, calc['amount'], calc['notional'], calc['margin']
+                    "SHORT", fill['avg_price'], fill['amount'], calc['notional'], calc['margin']
                 )
             
             return True, {
-                'order_id': order.get('id'),
-                'amount': calc['amount'],
+                'order_id': fill['order_id'],
+                'amount': fill['amount'],
                 'notional': calc['notional'],
                 'margin': calc['margin'],
-                'price': price
+                'price': price,
+                'avg_price': fill['avg_price'],
+                'slippage_bps': fill['slippage_bps'],
+                'algo': fill['algo']
             }
             
         except Exception as e:
+            metrics.inc('lumi_errors_total', component='order')
             self.pending_position = False
             self.last_entry_attempt = time.time()
             return False, f"주문 실패: {e}"
@@ -157,23 +185,28 @@ class OrderExecutor:
         if not self.exchange_mgr.exchange:
             return False, "거래소 연결 없음"
         
-        symbol = self.config.get('SYMBOL', 'ETH/USDT')
         close_amount = position.get('size', 0)
         
         if close_amount <= 0:
             return False, "청산할 포지션 없음"
         
         try:
-            if position['side'] == 'LONG':
-                order = self.exchange_mgr.exchange.create_market_sell_order(
-                    symbol, close_amount
-                )
-            else:
-                order = self.exchange_mgr.exchange.create_market_buy_order(
-                    symbol, close_amount
-                )
+            # 청산은 분할하지 않고 즉시 시장가 (슬리피지만 기록)
+            side = 'sell' if position['side'] == 'LONG' else 'buy'
+            with metrics.span('order', side='CLOSE'), self.exchange_mgr.priority('exit'):
+                ok, fill = self.engine.execute(side, close_amount, current_price,
+                                               urgent=True, reduce_only=True)
             
-            return True, {'order_id': order.get('id'), 'amount': close_amount}
+            if not ok:
+                return False, f"청산 실패: {fill}"
+            
+            return True, {
+                'order_id': fill['order_id'],
+                'amount': fill['amount'],
+                'avg_price': fill['avg_price'],
+                'slippage_bps': fill['slippage_bps']
+            }
             
         except Exception as e:
+            metrics.inc('lumi_errors_total', component='order')
             return False, f"청산 실패: {e}"
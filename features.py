@@ -0,0 +1,465 @@
+# -*- coding: utf-8 -*-
+"""
+modules/features.py - 캔들 피처 파이프라인 (배치 + 증분)
+
+DataCollector.price_columns 전체를 한 번에 계산
+- 배치 모드 compute(): 캔들 버퍼 전체를 NumPy/pandas 벡터 연산 한 번으로 계산 (백테스트/워밍업)
+- 증분 모드 update()/sync(): 봉마다 O(1) 상태 갱신 (실시간, 진행 중인 봉은 임시 계산)
+- 두 모드는 같은 점화식을 쓰므로 결과가 일치 (부동소수점 오차 범위)
+
+기존 지표(rsi, bb, ema8/21, macd, volume)는 ta 라이브러리와 같은 정의
+- RSI/ATR/ADX: Wilder 평활 (ewm alpha=1/n, adjust=False, min_periods=n), 첫 diff는 0
+- EMA: ewm(span=n, adjust=False, min_periods=n)
+- 볼린저: rolling(20) 평균 ± 2 * 모표준편차 (ddof=0)
+
+상위 시간대 추세(trend_15m, trend_1h)는 기본 봉을 버킷으로 묶어 계산
+- 진행 중인 상위 봉은 현재 종가로 임시 계산 (미래 데이터 참조 없음)
+CVD는 체결 데이터가 없으므로 봉의 종가 위치(CLV) × 거래량으로 근사
+"""
+
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+# MarketDataProvider 기존 컬럼 + 신규 피처
+FEATURE_COLUMNS = OHLCV_COLUMNS + [
+    'rsi', 'rsi_6', 'rsi_21',
+    'bb_upper', 'bb_lower', 'bb_mid', 'bb_pct_b', 'bb_bandwidth',
+    'ema8', 'ema_9', 'ema21', 'ema_50', 'ema_200', 'trend',
+    'macd', 'macd_signal', 'macd_hist',
+    'volume_sma', 'volume_ratio',
+    'vwap', 'atr', 'adx',
+    'trend_15m', 'trend_1h',
+    'fvg_bull', 'fvg_bear', 'fvg_size',
+    'cvd', 'cvd_slope', 'session'
+]
+
+# DataCollector.price_columns 이름 → 피처 이름
+COLLECTOR_ALIASES = {
+    'rsi_14': 'rsi',
+    'bb_pct': 'bb_pct_b',
+    'bb_width': 'bb_bandwidth',
+    'ema_21': 'ema21',
+    'macdsignal': 'macd_signal',
+    'macdhist': 'macd_hist',
+    'volume_sma20': 'volume_sma',
+    'trend_5m': 'trend',
+}
+
+TIMEFRAME_UNITS = {'m': 60_000, 'h': 3_600_000, 'd': 86_400_000, 'w': 604_800_000}
+
+# UTC 시간대별 세션
+SESSIONS = ((0, 7, 'asia'), (7, 13, 'london'), (13, 21, 'newyork'), (21, 24, 'late'))
+
+
+def timeframe_ms(timeframe):
+    """'5m' → 300000"""
+    return int(timeframe[:-1]) * TIMEFRAME_UNITS[timeframe[-1]]
+
+
+def session_of(hour):
+    for start, end, name in SESSIONS:
+        if start <= hour < end:
+            return name
+    return 'late'
+
+
+def collector_row(features, columns):
+    """피처 행(dict/Series) → DataCollector 컬럼 dict (NaN은 None)"""
+    if hasattr(features, 'to_numpy'):
+        # Series.get은 호출마다 인덱스 조회 비용이 커서 한 번에 dict로 변환
+        features = dict(zip(features.index, features.to_numpy().tolist()))
+    row = {}
+    for col in columns:
+        value = features.get(COLLECTOR_ALIASES.get(col, col))
+        if isinstance(value, float) and math.isnan(value):
+            value = None
+        row[col] = value
+    return row
+
+
+def _ewm(values, alpha, min_periods):
+    """열 방향 ewm (adjust=False) - 같은 alpha인 시리즈를 한 번에"""
+    return pd.DataFrame(values).ewm(alpha=alpha, adjust=False, min_periods=min_periods).mean().to_numpy()
+
+
+def _span_alpha(span):
+    return 2.0 / (span + 1.0)
+
+
+def _rsi(avg_up, avg_dn):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(avg_dn == 0, 100.0, 100.0 - 100.0 / (1.0 + avg_up / avg_dn))
+
+
+class FeaturePipeline:
+    """캔들 → 피처 (배치/증분 공용 정의)"""
+
+    RSI_PERIODS = (14, 6, 21)
+    EMA_SPANS = {'ema8': 8, 'ema_9': 9, 'ema21': 21, 'ema_50': 50, 'ema_200': 200, '_ema12': 12, '_ema26': 26}
+    BB_WINDOW = 20
+    BB_STD = 2.0
+    MACD_SIGNAL = 9
+    WILDER_PERIOD = 14           # ATR / ADX
+    VOLUME_WINDOW = 20
+    CVD_SLOPE_BARS = 5
+    HIGHER_TIMEFRAMES = ('15m', '1h')
+    TREND_SPANS = (8, 21)
+
+    def __init__(self, timeframe='5m', capacity=1000):
+        self.timeframe = timeframe
+        self.tf_ms = timeframe_ms(timeframe)
+        self.higher = [(tf, timeframe_ms(tf)) for tf in self.HIGHER_TIMEFRAMES if timeframe_ms(tf) > self.tf_ms]
+        self.capacity = capacity
+        self.listeners = []      # 마감 봉 콜백 (FVG 인덱스 등)
+        self.reset()
+
+    # ------------------------------------------------------------------ 배치
+
+    def compute(self, ohlcv):
+        """
+        캔들 버퍼 전체 계산 (벡터 연산)
+
+        Args:
+            ohlcv: fetch_ohlcv 리스트 또는 OHLCV DataFrame
+
+        Returns:
+            DataFrame: FEATURE_COLUMNS
+        """
+        if isinstance(ohlcv, pd.DataFrame):
+            df = ohlcv[OHLCV_COLUMNS].reset_index(drop=True)
+        else:
+            df = pd.DataFrame(ohlcv, columns=OHLCV_COLUMNS)
+        n = len(df)
+        ts = df['timestamp'].to_numpy(dtype=np.int64)
+        h = df['high'].to_numpy(dtype=float)
+        l = df['low'].to_numpy(dtype=float)
+        c = df['close'].to_numpy(dtype=float)
+        v = df['volume'].to_numpy(dtype=float)
+        out = {col: df[col].to_numpy() for col in OHLCV_COLUMNS}
+        if n == 0:
+            return pd.DataFrame({col: [] for col in FEATURE_COLUMNS})
+
+        prev_c = np.concatenate([c[:1], c[:-1]])
+        prev_h = np.concatenate([h[:1], h[:-1]])
+        prev_l = np.concatenate([l[:1], l[:-1]])
+
+        # 상승/하락폭, True Range, 방향성 움직임 (첫 봉은 0)
+        diff = c - prev_c
+        up = np.where(diff > 0, diff, 0.0)
+        dn = np.where(diff < 0, -diff, 0.0)
+        tr = np.maximum.reduce([h - l, np.abs(h - prev_c), np.abs(l - prev_c)])
+        up_move = h - prev_h
+        down_move = prev_l - l
+        plus_dm = np.where((up_move > down_move) & (up_move > 0), up_move, 0.0)
+        minus_dm = np.where((down_move > up_move) & (down_move > 0), down_move, 0.0)
+
+        # Wilder 평활: 같은 기간끼리 한 번에
+        rsi_key = {14: 'rsi', 6: 'rsi_6', 21: 'rsi_21'}
+        for period in self.RSI_PERIODS:
+            if period == self.WILDER_PERIOD:
+                sm = _ewm(np.column_stack([up, dn, tr, plus_dm, minus_dm]), 1.0 / period, period)
+                out['atr'] = sm[:, 2]
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    plus_di = 100.0 * sm[:, 3] / sm[:, 2]
+                    minus_di = 100.0 * sm[:, 4] / sm[:, 2]
+                    di_sum = plus_di + minus_di
+                    dx = np.where(di_sum > 0, 100.0 * np.abs(plus_di - minus_di) / di_sum, 0.0)
+                dx[np.isnan(sm[:, 2])] = np.nan
+                out['adx'] = pd.Series(dx).ewm(alpha=1.0 / period, adjust=False,
+                                               min_periods=period).mean().to_numpy()
+            else:
+                sm = _ewm(np.column_stack([up, dn]), 1.0 / period, period)
+            out[rsi_key[period]] = _rsi(sm[:, 0], sm[:, 1])
+
+        # EMA
+        close = pd.Series(c)
+        for name, span in self.EMA_SPANS.items():
+            out[name] = close.ewm(span=span, adjust=False, min_periods=span).mean().to_numpy()
+        out['trend'] = np.where(out['ema8'] > out['ema21'], 'UP', 'DOWN')
+
+        # MACD (시그널은 MACD 유효 구간부터)
+        macd = out.pop('_ema12') - out.pop('_ema26')
+        signal = pd.Series(macd).ewm(span=self.MACD_SIGNAL, adjust=False,
+                                     min_periods=self.MACD_SIGNAL).mean().to_numpy()
+        out['macd'], out['macd_signal'], out['macd_hist'] = macd, signal, macd - signal
+
+        # 볼린저 + 거래량 평균 (같은 창)
+        rolling = pd.DataFrame({'c': c, 'v': v}).rolling(self.BB_WINDOW)
+        means = rolling.mean().to_numpy()
+        std = close.rolling(self.BB_WINDOW).std(ddof=0).to_numpy()
+        mid = means[:, 0]
+        upper, lower = mid + self.BB_STD * std, mid - self.BB_STD * std
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out['bb_pct_b'] = (c - lower) / (upper - lower)
+            out['bb_bandwidth'] = (upper - lower) / mid
+            out['volume_ratio'] = v / means[:, 1]
+        out['bb_upper'], out['bb_lower'], out['bb_mid'] = upper, lower, mid
+        out['volume_sma'] = means[:, 1]
+
+        # VWAP (UTC 일 단위 리셋)
+        day = ts // TIMEFRAME_UNITS['d']
+        start = np.maximum.accumulate(np.where(np.r_[True, day[1:] != day[:-1]], np.arange(n), 0))
+        typical = (h + l + c) / 3.0
+        cum_pv = np.cumsum(typical * v)
+        cum_v = np.cumsum(v)
+        cum_pv = cum_pv - (cum_pv[start] - typical[start] * v[start])
+        cum_v = cum_v - (cum_v[start] - v[start])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out['vwap'] = np.where(cum_v > 0, cum_pv / cum_v, typical)
+
+        # 상위 시간대 추세
+        for tf, tf_ms in self.higher:
+            out[f'trend_{tf}'] = self._higher_trend(ts, c, tf_ms)
+        for tf in self.HIGHER_TIMEFRAMES:
+            if f'trend_{tf}' not in out:
+                out[f'trend_{tf}'] = out['trend']
+
+        # FVG (3봉 갭)
+        bull = np.zeros(n, dtype=bool)
+        bear = np.zeros(n, dtype=bool)
+        size = np.zeros(n)
+        if n >= 3:
+            bull[2:] = l[2:] > h[:-2]
+            bear[2:] = h[2:] < l[:-2]
+            size[2:] = np.where(bull[2:], l[2:] - h[:-2], np.where(bear[2:], l[:-2] - h[2:], 0.0)) / c[2:] * 100
+        out['fvg_bull'], out['fvg_bear'], out['fvg_size'] = bull.astype(int), bear.astype(int), size
+
+        # CVD 근사
+        rng = h - l
+        with np.errstate(divide='ignore', invalid='ignore'):
+            clv = np.where(rng > 0, ((c - l) - (h - c)) / rng, 0.0)
+        cvd = np.cumsum(v * clv)
+        slope = np.full(n, np.nan)
+        k = self.CVD_SLOPE_BARS
+        slope[k:] = (cvd[k:] - cvd[:-k]) / k
+        out['cvd'], out['cvd_slope'] = cvd, slope
+
+        hours = (ts // TIMEFRAME_UNITS['h']) % 24
+        out['session'] = np.select([hours < end for _, end, _ in SESSIONS], [s[2] for s in SESSIONS], 'late')
+
+        return pd.DataFrame({col: out[col] for col in FEATURE_COLUMNS})
+
+    def _higher_trend(self, ts, c, tf_ms):
+        """기본 봉 → 상위 봉 버킷 EMA 추세 (진행 중인 버킷은 현재 종가)"""
+        bucket = ts // tf_ms
+        n = len(c)
+        new_bucket = np.r_[True, bucket[1:] != bucket[:-1]]
+        last_in_bucket = np.r_[bucket[1:] != bucket[:-1], True]
+        idx = np.cumsum(new_bucket) - 1
+        closes = c[last_in_bucket]
+        values = []
+        for span in self.TREND_SPANS:
+            alpha = _span_alpha(span)
+            committed = pd.Series(closes).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+            prev = np.concatenate([[np.nan], committed[:-1]])[idx]
+            value = np.where(idx == 0, c, (1 - alpha) * prev + alpha * c)
+            value[idx + 1 < span] = np.nan
+            values.append(value)
+        fast, slow = values
+        valid = ~np.isnan(slow)
+        return np.where(valid, np.where(fast > slow, 'UP', 'DOWN'), None).astype(object) if n else np.array([])
+
+    # ------------------------------------------------------------------ 증분
+
+    def reset(self):
+        """증분 상태 초기화"""
+        self.last_ts = None
+        self.rows = deque(maxlen=self.capacity)
+        self.forming = None      # 마지막 sync의 진행 중인 봉 (없으면 None)
+        self._state = {
+            'n': 0, 'prev': None,
+            'wilder': {}, 'ema': {}, 'signal': None, 'signal_n': 0, 'adx': None, 'adx_n': 0,
+            'closes': deque(maxlen=self.BB_WINDOW), 'volumes': deque(maxlen=self.VOLUME_WINDOW),
+            'day': None, 'cum_pv': 0.0, 'cum_v': 0.0,
+            'higher': {tf: {'bucket': None, 'last_close': None, 'ema': {}, 'count': 0} for tf, _ in self.higher},
+            'hl': deque(maxlen=2), 'cvd': 0.0, 'cvd_hist': deque(maxlen=self.CVD_SLOPE_BARS),
+        }
+
+    @staticmethod
+    def _copy_state(state):
+        copied = {}
+        for key, value in state.items():
+            if isinstance(value, deque):
+                copied[key] = deque(value, value.maxlen)
+            elif key == 'higher':
+                copied[key] = {tf: dict(s, ema=dict(s['ema'])) for tf, s in value.items()}
+            elif isinstance(value, dict):
+                copied[key] = dict(value)
+            else:
+                copied[key] = value
+        return copied
+
+    def update(self, candle):
+        """마감된 봉 1개 반영 → 피처 행 (dict)"""
+        row = self._advance(self._state, candle)
+        self.last_ts = candle[0]
+        self.rows.append(row)
+        for listener in self.listeners:
+            listener(row)
+        return row
+
+    def peek(self, candle):
+        """진행 중인 봉 임시 계산 (상태 변경 없음)"""
+        return self._advance(self._copy_state(self._state), candle)
+
+    def sync(self, ohlcv, limit=None):
+        """
+        fetch_ohlcv 결과와 동기화 → 최근 limit개 피처 DataFrame
+
+        마지막 봉은 진행 중으로 보고 임시 계산
+        이전 동기화와 이어지지 않으면 (재시작/누락) 상태를 초기화하고 다시 워밍업
+        """
+        if not ohlcv:
+            return None
+        closed, forming = ohlcv[:-1], ohlcv[-1]
+        if self.last_ts is None or ohlcv[0][0] > self.last_ts + self.tf_ms:
+            self.reset()
+        for candle in closed:
+            if self.last_ts is None or candle[0] > self.last_ts:
+                self.update(candle)
+        rows = list(self.rows)
+        self.forming = None
+        if self.last_ts is None or forming[0] > self.last_ts:
+            self.forming = self.peek(forming)
+            rows.append(self.forming)
+        if limit:
+            rows = rows[-limit:]
+        return pd.DataFrame.from_records(rows, columns=FEATURE_COLUMNS)
+
+    def _advance(self, st, candle):
+        ts, o, h, l, c, v = candle[:6]
+        first = st['n'] == 0
+        prev_c, prev_h, prev_l = (c, h, l) if first else st['prev']
+        count = st['n'] + 1
+        nan = float('nan')
+
+        diff = c - prev_c
+        up, dn = max(diff, 0.0), max(-diff, 0.0)
+        tr = max(h - l, abs(h - prev_c), abs(l - prev_c))
+        up_move, down_move = h - prev_h, prev_l - l
+        plus_dm = up_move if up_move > down_move and up_move > 0 else 0.0
+        minus_dm = down_move if down_move > up_move and down_move > 0 else 0.0
+
+        row = dict(zip(OHLCV_COLUMNS, (ts, o, h, l, c, v)))
+
+        # Wilder 평활
+        wilder = st['wilder']
+        inputs = {'up': up, 'dn': dn, 'tr': tr, 'pdm': plus_dm, 'mdm': minus_dm}
+        for period in self.RSI_PERIODS:
+            alpha = 1.0 / period
+            keys = ('up', 'dn', 'tr', 'pdm', 'mdm') if period == self.WILDER_PERIOD else ('up', 'dn')
+            for key in keys:
+                name = (key, period)
+                wilder[name] = inputs[key] if first else wilder[name] + alpha * (inputs[key] - wilder[name])
+            valid = count >= period
+            avg_up, avg_dn = wilder[('up', period)], wilder[('dn', period)]
+            rsi = (100.0 if avg_dn == 0 else 100.0 - 100.0 / (1.0 + avg_up / avg_dn)) if valid else nan
+            row['rsi' if period == 14 else f'rsi_{period}'] = rsi
+
+        period = self.WILDER_PERIOD
+        atr = wilder[('tr', period)]
+        row['atr'] = atr if count >= period else nan
+        if count >= period:
+            plus_di = 100.0 * wilder[('pdm', period)] / atr if atr else nan
+            minus_di = 100.0 * wilder[('mdm', period)] / atr if atr else nan
+            di_sum = plus_di + minus_di
+            dx = 100.0 * abs(plus_di - minus_di) / di_sum if di_sum > 0 else 0.0
+            st['adx'] = dx if st['adx'] is None else st['adx'] + (dx - st['adx']) / period
+            st['adx_n'] += 1
+        row['adx'] = st['adx'] if st['adx_n'] >= period else nan
+
+        # EMA / MACD
+        ema = st['ema']
+        for name, span in self.EMA_SPANS.items():
+            ema[name] = c if first else ema[name] + _span_alpha(span) * (c - ema[name])
+            row[name] = ema[name] if count >= span else nan
+        row['trend'] = 'UP' if row['ema8'] > row['ema21'] else 'DOWN'
+        macd = row.pop('_ema12') - row.pop('_ema26')
+        if not math.isnan(macd):
+            st['signal'] = macd if st['signal'] is None else \
+                st['signal'] + _span_alpha(self.MACD_SIGNAL) * (macd - st['signal'])
+            st['signal_n'] += 1
+        signal = st['signal'] if st['signal_n'] >= self.MACD_SIGNAL else nan
+        row['macd'], row['macd_signal'], row['macd_hist'] = macd, signal, macd - signal
+
+        # 볼린저 / 거래량
+        st['closes'].append(c)
+        st['volumes'].append(v)
+        if len(st['closes']) == self.BB_WINDOW:
+            mid = sum(st['closes']) / self.BB_WINDOW
+            std = math.sqrt(sum((x - mid) ** 2 for x in st['closes']) / self.BB_WINDOW)
+            upper, lower = mid + self.BB_STD * std, mid - self.BB_STD * std
+            width = upper - lower
+            row.update(bb_upper=upper, bb_lower=lower, bb_mid=mid,
+                       bb_pct_b=(c - lower) / width if width else nan,
+                       bb_bandwidth=width / mid if mid else nan)
+        else:
+            row.update(bb_upper=nan, bb_lower=nan, bb_mid=nan, bb_pct_b=nan, bb_bandwidth=nan)
+        if len(st['volumes']) == self.VOLUME_WINDOW:
+            vol_sma = sum(st['volumes']) / self.VOLUME_WINDOW
+            row['volume_sma'] = vol_sma
+            row['volume_ratio'] = v / vol_sma if vol_sma else nan
+        else:
+            row['volume_sma'] = row['volume_ratio'] = nan
+
+        # VWAP
+        day = ts // TIMEFRAME_UNITS['d']
+        if day != st['day']:
+            st['day'], st['cum_pv'], st['cum_v'] = day, 0.0, 0.0
+        typical = (h + l + c) / 3.0
+        st['cum_pv'] += typical * v
+        st['cum_v'] += v
+        row['vwap'] = st['cum_pv'] / st['cum_v'] if st['cum_v'] > 0 else typical
+
+        # 상위 시간대 추세
+        for tf, tf_ms in self.higher:
+            hs = st['higher'][tf]
+            bucket = ts // tf_ms
+            if hs['bucket'] is not None and bucket != hs['bucket']:
+                for span in self.TREND_SPANS:
+                    prev = hs['ema'].get(span)
+                    hs['ema'][span] = hs['last_close'] if prev is None else \
+                        prev + _span_alpha(span) * (hs['last_close'] - prev)
+                hs['count'] += 1
+            hs['bucket'], hs['last_close'] = bucket, c
+            values = []
+            for span in self.TREND_SPANS:
+                prev = hs['ema'].get(span)
+                values.append(c if prev is None else prev + _span_alpha(span) * (c - prev))
+            fast, slow = values
+            row[f'trend_{tf}'] = ('UP' if fast > slow else 'DOWN') if hs['count'] + 1 >= self.TREND_SPANS[1] else None
+        for tf in self.HIGHER_TIMEFRAMES:
+            row.setdefault(f'trend_{tf}', row['trend'])
+
+        # FVG
+        bull = bear = 0
+        size = 0.0
+        if len(st['hl']) == 2:
+            h2, l2 = st['hl'][0]
+            if l > h2:
+                bull, size = 1, (l - h2) / c * 100
+            elif h < l2:
+                bear, size = 1, (l2 - h) / c * 100
+        st['hl'].append((h, l))
+        row['fvg_bull'], row['fvg_bear'], row['fvg_size'] = bull, bear, size
+
+        # CVD 근사
+        rng = h - l
+        clv = ((c - l) - (h - c)) / rng if rng > 0 else 0.0
+        cvd = st['cvd'] + v * clv
+        row['cvd'] = cvd
+        row['cvd_slope'] = (cvd - st['cvd_hist'][0]) / self.CVD_SLOPE_BARS \
+            if len(st['cvd_hist']) == self.CVD_SLOPE_BARS else nan
+        st['cvd_hist'].append(cvd)
+        st['cvd'] = cvd
+
+        row['session'] = session_of((ts // TIMEFRAME_UNITS['h']) % 24)
+
+        st['prev'] = (c, h, l)
+        st['n'] = count
+        return row
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+modules/fvg.py - 증분 FVG(Fair Value Gap) 탐지 + 미체결 갭 인덱스
+
+3봉 불균형 갭
+- 상승 FVG: low[i] > high[i-2] → 구간 (high[i-2], low[i])
+- 하락 FVG: high[i] < low[i-2] → 구간 (high[i], low[i-2])
+
+봉이 마감될 때마다 on_bar()로 갱신
+- 가격이 갭 안으로 들어오면 갭이 줄어들고, 관통하면 체결(제거)
+- 상승 갭은 항상 이후 저가보다 아래, 하락 갭은 이후 고가보다 위에 남으므로
+  가격순 정렬 리스트의 한쪽 끝에서만 체결/추가 → 겹치는 갭은 병합해서 서로소 유지
+- locate(price): bisect로 O(log n) 조회 (틱마다 호출해도 비용 없음)
+"""
+
+from bisect import bisect_right
+from collections import deque
+
+
+class FVGIndex:
+    """미체결 FVG 구간 인덱스 (한 시간대)"""
+
+    def __init__(self, min_size_pct=0.05, near_pct=0.1, max_gaps=200):
+        """
+        Args:
+            min_size_pct: 최소 갭 크기 (가격 대비 %)
+            near_pct: '근처' 판정 거리 (가격 대비 %)
+            max_gaps: 방향별 보관 개수 (초과 시 현재가에서 가장 먼 갭부터 제거)
+        """
+        self.min_size_pct = min_size_pct
+        self.near_pct = near_pct
+        self.max_gaps = max_gaps
+        self.bars = deque(maxlen=2)       # 직전 2봉 (high, low)
+        # 상승 갭: bottom 오름차순 (끝 = 현재가에 가장 가까움)
+        self.bull_bottoms, self.bull_tops, self.bull_meta = [], [], []
+        # 하락 갭: bottom 오름차순 (앞 = 현재가에 가장 가까움)
+        self.bear_bottoms, self.bear_tops, self.bear_meta = [], [], []
+        self.last_ts = None
+        self.detected = 0
+        self.filled = 0
+
+    # ------------------------------------------------------------------ 갱신
+
+    def on_bar(self, row):
+        """마감된 봉 1개 반영 (FeaturePipeline 리스너 / dict·Series 모두 가능)"""
+        self.update(row['timestamp'], row['high'], row['low'], row['close'])
+
+    def update(self, ts, high, low, close):
+        if self.last_ts is not None and ts <= self.last_ts:
+            return
+        self.last_ts = ts
+        self._fill(high, low)
+
+        if len(self.bars) == 2:
+            h2, l2 = self.bars[0]
+            min_size = close * self.min_size_pct / 100
+            if low > h2 and low - h2 >= min_size:
+                self._add_bull(h2, low, ts)
+            elif high < l2 and l2 - high >= min_size:
+                self._add_bear(high, l2, ts)
+        self.bars.append((high, low))
+
+    def _fill(self, high, low):
+        """가격이 지나간 구간 제거 (상승 갭은 위에서, 하락 갭은 아래에서 잠식)"""
+        bottoms, tops, meta = self.bull_bottoms, self.bull_tops, self.bull_meta
+        while bottoms and bottoms[-1] >= low:
+            bottoms.pop()
+            tops.pop()
+            meta.pop()
+            self.filled += 1
+        if tops and tops[-1] > low:
+            tops[-1] = low
+
+        bottoms, tops, meta = self.bear_bottoms, self.bear_tops, self.bear_meta
+        while tops and tops[0] <= high:
+            del bottoms[0], tops[0], meta[0]
+            self.filled += 1
+        if bottoms and bottoms[0] < high:
+            bottoms[0] = high
+
+    def _add_bull(self, bottom, top, ts):
+        self.detected += 1
+        bottoms, tops, meta = self.bull_bottoms, self.bull_tops, self.bull_meta
+        count = 1
+        # 겹치는 기존 갭 병합 (새 갭이 가장 위에 있음)
+        while tops and tops[-1] >= bottom:
+            bottom = min(bottom, bottoms.pop())
+            tops.pop()
+            old = meta.pop()
+            ts, count = old['since'], count + old['count']
+        bottoms.append(bottom)
+        tops.append(top)
+        meta.append({'since': ts, 'count': count})
+        if len(bottoms) > self.max_gaps:
+            del bottoms[0], tops[0], meta[0]
+
+    def _add_bear(self, bottom, top, ts):
+        self.detected += 1
+        bottoms, tops, meta = self.bear_bottoms, self.bear_tops, self.bear_meta
+        count = 1
+        while bottoms and bottoms[0] <= top:
+            top = max(top, tops[0])
+            old = meta[0]
+            ts, count = old['since'], count + old['count']
+            del bottoms[0], tops[0], meta[0]
+        bottoms.insert(0, bottom)
+        tops.insert(0, top)
+        meta.insert(0, {'since': ts, 'count': count})
+        if len(bottoms) > self.max_gaps:
+            bottoms.pop()
+            tops.pop()
+            meta.pop()
+
+    # ------------------------------------------------------------------ 조회
+
+    def _find(self, bottoms, tops, meta, side, price, tolerance):
+        """price ± tolerance와 겹치는 갭 (구간이 서로소라 후보는 최대 2개)"""
+        i = bisect_right(bottoms, price + tolerance) - 1
+        best = None
+        for j in (i - 1, i):
+            if 0 <= j < len(bottoms) and bottoms[j] - tolerance <= price <= tops[j] + tolerance:
+                inside = bottoms[j] <= price <= tops[j]
+                gap = {'side': side, 'bottom': bottoms[j], 'top': tops[j], 'inside': inside,
+                       'since': meta[j]['since'], 'count': meta[j]['count']}
+                if best is None or (inside and not best['inside']):
+                    best = gap
+        return best
+
+    def locate(self, price, near_pct=None):
+        """
+        가격이 미체결 갭 안/근처인지
+
+        Returns:
+            dict: {'bull': gap | None, 'bear': gap | None}
+        """
+        tolerance = price * (self.near_pct if near_pct is None else near_pct) / 100
+        return {
+            'bull': self._find(self.bull_bottoms, self.bull_tops, self.bull_meta, 'BULL', price, tolerance),
+            'bear': self._find(self.bear_bottoms, self.bear_tops, self.bear_meta, 'BEAR', price, tolerance),
+        }
+
+    def nearest(self):
+        """현재가 아래 가장 가까운 상승 갭 / 위 가장 가까운 하락 갭"""
+        below = {'bottom': self.bull_bottoms[-1], 'top': self.bull_tops[-1]} if self.bull_bottoms else None
+        above = {'bottom': self.bear_bottoms[0], 'top': self.bear_tops[0]} if self.bear_bottoms else None
+        return below, above
+
+    def snapshot(self, limit=5):
+        """status/리포트용 (가까운 순)"""
+        return {
+            'bull': [[float(b), float(t)] for b, t in zip(self.bull_bottoms[::-1], self.bull_tops[::-1])][:limit],
+            'bear': [[float(b), float(t)] for b, t in zip(self.bear_bottoms, self.bear_tops)][:limit],
+            'detected': self.detected,
+            'filled': self.filled,
+        }
+
+    def __len__(self):
+        return len(self.bull_bottoms) + len(self.bear_bottoms)
@@ -0,0 +1,457 @@
+# -*- coding: utf-8 -*-
+"""
+modules/history.py - 과거 OHLCV 대량 다운로드 + 로컬 아카이브
+
+봇은 fetch_ohlcv(limit=100)만 호출 → 백테스트용 몇 달치 1m/3m/5m/15m 캔들이 없음
+
+CandleArchive: 심볼 × 시간대별 월 단위 CSV 파티션 + index.json
+- data/ohlcv/ETHUSDT/5m/2026-01.csv, index.json = {파티션: {first, last, rows}}
+- append는 마지막 시각 이후 봉만 (정렬/중복 없음 보장), index는 원자적 교체
+  CSV를 먼저 쓰고 index를 나중에 교체 → 그 사이 중단되면 index가 뒤처짐
+  → 파티션 파일 끝 시각과도 비교해서 이미 기록된 봉은 다시 쓰지 않음 (index도 파일 기준으로 복구)
+- read(start, end)는 index로 필요한 파티션만 읽음
+- 같은 인터페이스의 바이너리 아카이브: candle_store.BinaryCandleArchive (CLI 기본값)
+- merge(): 백필한 봉을 중간에 끼워 넣기 (해당 월 파티션만 다시 씀)
+
+HistoryDownloader: ExchangeManager 위에서 동작 (재시도/서킷/가중치 예산 그대로 사용)
+- [시작, 끝) 구간을 페이지(limit봉)로 나눠 스레드 풀에서 동시에 fetch_ohlcv
+  요청 우선순위는 'analytics' → 가중치 예산이 빠듯하면 트레이딩 요청에 양보
+- 완료된 페이지는 앞에서부터 연속된 것만 아카이브에 기록 → 중단돼도 아카이브 끝 = 재개 지점
+- since가 아카이브 첫 봉보다 앞이면 [since, 첫 봉)도 받아서 merge (첫 봉 쪽부터 거꾸로
+  → 중단돼도 아카이브 처음 = 다음 실행의 앞쪽 재개 지점)
+- 페이지 내 중복 제거, OHLC 검증(고가 ≥ 시가/종가 ≥ 저가, 거래량 ≥ 0), 연속성 검사(빠진 봉 구간 보고)
+- backfill(): 아카이브 전체의 ContinuityIndex로 빈 구간만 최소 페이지로 다시 요청 (--backfill)
+"""
+
+import csv
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .continuity import ContinuityIndex
+from .features import timeframe_ms
+from .ratelimit import request_priority
+from .status import atomic_write_json
+from .telemetry import metrics
+from .logger import get_logger
+
+log = get_logger('history')
+
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+
+def _partition(ts):
+    """봉 시각(ms) → 월 파티션 이름 (UTC)"""
+    return datetime.fromtimestamp(ts / 1000, tz=timezone.utc).strftime('%Y-%m')
+
+
+def validate_ohlcv(rows):
+    """
+    정렬/중복 제거/OHLC 검증
+
+    Returns:
+        (ndarray, int, int): (유효한 행 [n × 6], 중복 수, 잘못된 행 수)
+    """
+    if not len(rows):
+        return np.empty((0, 6)), 0, 0
+    data = np.asarray(rows, dtype=np.float64)
+    data = data[np.argsort(data[:, 0], kind='stable')]
+    unique = np.r_[True, np.diff(data[:, 0]) != 0]
+    duplicates = int((~unique).sum())
+    data = data[unique]
+    o, h, l, c, v = data[:, 1], data[:, 2], data[:, 3], data[:, 4], data[:, 5]
+    valid = (h >= np.maximum(o, c)) & (l <= np.minimum(o, c)) & (l > 0) & (v >= 0)
+    return data[valid], duplicates, int((~valid).sum())
+
+
+def _tail_timestamp(path):
+    """CSV 파티션 마지막 행의 봉 시각 (파일 끝 일부만 읽음, 행이 없으면 None)"""
+    try:
+        with open(path, 'rb') as f:
+            f.seek(0, 2)
+            size = f.tell()
+            f.seek(max(0, size - 4096))
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+    for line in reversed(lines):
+        head = line.split(b',', 1)[0].strip()
+        if head.isdigit():
+            return int(head)
+        if head:
+            return None
+    return None
+
+
+def find_gaps(timestamps, step, start=None, end=None):
+    """빠진 봉 구간 [(시작, 끝)] (끝은 미포함, start/end가 주어지면 양끝도 검사)"""
+    ts = np.asarray(timestamps, dtype=np.int64)
+    gaps = []
+    if start is not None and (not len(ts) or ts[0] > start):
+        gaps.append((int(start), int(ts[0]) if len(ts) else int(end if end is not None else start)))
+    if len(ts) > 1:
+        jumps = np.nonzero(np.diff(ts) != step)[0]
+        gaps += [(int(ts[i] + step), int(ts[i + 1])) for i in jumps]
+    if end is not None and len(ts) and ts[-1] + step < end:
+        gaps.append((int(ts[-1] + step), int(end)))
+    return gaps
+
+
+class CandleArchive:
+    """심볼 × 시간대별 월 파티션 CSV 아카이브"""
+
+    def __init__(self, root="data/ohlcv", symbol="ETH/USDT"):
+        self.root = Path(root) / symbol.replace('/', '').replace(':', '')
+        self.symbol = symbol
+        self.indexes = {}
+
+    def _dir(self, timeframe):
+        return self.root / timeframe
+
+    def index(self, timeframe):
+        """{파티션: {'first', 'last', 'rows'}}"""
+        if timeframe not in self.indexes:
+            path = self._dir(timeframe) / "index.json"
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.indexes[timeframe] = json.load(f)
+            except (OSError, ValueError):
+                self.indexes[timeframe] = {}
+        return self.indexes[timeframe]
+
+    def last_timestamp(self, timeframe):
+        """저장된 마지막 봉 시각 (없으면 None)"""
+        index = self.index(timeframe)
+        return max((p['last'] for p in index.values()), default=None)
+
+    def append(self, timeframe, rows):
+        """
+        봉 추가 (마지막 저장 시각 이후만, 정렬된 [n × 6])
+
+        Returns:
+            int: 기록한 행 수
+        """
+        last = self.last_timestamp(timeframe)
+        if last is not None and len(rows):
+            rows = rows[rows[:, 0] > last]
+        if not len(rows):
+            return 0
+        index = self.index(timeframe)
+        folder = self._dir(timeframe)
+        folder.mkdir(parents=True, exist_ok=True)
+        months = rows[:, 0].astype(np.int64).astype('datetime64[ms]').astype('datetime64[M]')
+        written = 0
+        for month in np.unique(months):
+            part = rows[months == month]
+            name = str(month)
+            path = folder / f"{name}.csv"
+            new = not path.exists()
+            tail = None if new else _tail_timestamp(path)
+            entry = index.get(name)
+            if tail is not None and (entry is None or tail > entry['last']):
+                # CSV는 기록됐지만 index 교체 전에 중단된 경우 → 파일 기준으로 index 복구
+                stamps = pd.read_csv(path, usecols=['timestamp'])['timestamp'].to_numpy(dtype=np.int64)
+                index[name] = {'first': int(stamps[0]), 'last': int(stamps[-1]), 'rows': len(stamps)}
+                part = part[part[:, 0] > tail]
+                if not len(part):
+                    continue
+            with open(path, 'a', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                if new:
+                    writer.writerow(OHLCV_COLUMNS)
+                writer.writerows([int(r[0]), *r[1:].tolist()] for r in part)
+            entry = index.setdefault(name, {'first': int(part[0, 0]), 'last': 0, 'rows': 0})
+            entry['last'] = int(part[-1, 0])
+            entry['rows'] += len(part)
+            written += len(part)
+        atomic_write_json(folder / "index.json", dict(sorted(index.items())))
+        return written
+
+    def read(self, timeframe, start=None, end=None):
+        """[start, end) 구간 DataFrame (index로 필요한 파티션만 읽음)"""
+        frames = []
+        for name, entry in sorted(self.index(timeframe).items()):
+            if (start is not None and entry['last'] < start) or (end is not None and entry['first'] >= end):
+                continue
+            frames.append(pd.read_csv(self._dir(timeframe) / f"{name}.csv"))
+        if not frames:
+            return pd.DataFrame(columns=OHLCV_COLUMNS)
+        df = pd.concat(frames, ignore_index=True)
+        mask = np.ones(len(df), dtype=bool)
+        if start is not None:
+            mask &= df['timestamp'].to_numpy() >= start
+        if end is not None:
+            mask &= df['timestamp'].to_numpy() < end
+        return df[mask].reset_index(drop=True)
+
+    def timestamps(self, timeframe):
+        """저장된 봉 시각 전체 (int64 배열, 연속성 인덱스 구성용)"""
+        df = self.read(timeframe)
+        return df['timestamp'].to_numpy(dtype=np.int64)
+
+    def merge(self, timeframe, rows):
+        """
+        봉 끼워 넣기 (백필 - 마지막 시각 이전도 가능, 이미 있는 시각은 건너뜀)
+
+        해당 월 파티션만 다시 씀
+
+        Returns:
+            int: 추가한 행 수
+        """
+        if not len(rows):
+            return 0
+        index = self.index(timeframe)
+        folder = self._dir(timeframe)
+        folder.mkdir(parents=True, exist_ok=True)
+        added = 0
+        months = rows[:, 0].astype(np.int64).astype('datetime64[ms]').astype('datetime64[M]')
+        for month in np.unique(months):
+            name = str(month)
+            path = folder / f"{name}.csv"
+            part = rows[months == month]
+            old = pd.read_csv(path).to_numpy(dtype=np.float64) if path.exists() else np.empty((0, 6))
+            fresh = part[~np.isin(part[:, 0], old[:, 0])]
+            if not len(fresh):
+                continue
+            merged = np.concatenate([old, fresh])
+            merged = merged[np.argsort(merged[:, 0], kind='stable')]
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(OHLCV_COLUMNS)
+                writer.writerows([int(r[0]), *r[1:].tolist()] for r in merged)
+            index[name] = {'first': int(merged[0, 0]), 'last': int(merged[-1, 0]), 'rows': len(merged)}
+            added += len(fresh)
+        if added:
+            atomic_write_json(folder / "index.json", dict(sorted(index.items())))
+        return added
+
+    def stats(self, timeframe):
+        index = self.index(timeframe)
+        return {
+            'partitions': len(index),
+            'rows': sum(p['rows'] for p in index.values()),
+            'first': min((p['first'] for p in index.values()), default=None),
+            'last': self.last_timestamp(timeframe),
+        }
+
+
+class HistoryDownloader:
+    """동시 페이지 요청 + 재개 가능한 OHLCV 다운로더"""
+
+    def __init__(self, exchange_manager, archive, page_limit=1000, workers=4, priority='analytics'):
+        """
+        Args:
+            exchange_manager: ExchangeManager (연결된 상태, exchange 속성 사용)
+            archive: CandleArchive 또는 candle_store.BinaryCandleArchive
+            page_limit: 요청당 봉 수 (Binance 최대 1500, 1000 이하면 가중치 5)
+            workers: 동시 요청 수 (가중치 예산은 스케줄러가 지킴)
+            priority: 요청 우선순위 (기본 'analytics' - 트레이딩 요청에 양보)
+        """
+        self.exchange_mgr = exchange_manager
+        self.archive = archive
+        self.page_limit = page_limit
+        self.workers = workers
+        self.priority = priority
+
+    def _continuity_file(self, timeframe):
+        return self.archive.root / f"{timeframe}.continuity.json"
+
+    def continuity(self, timeframe):
+        """아카이브 연속성 인덱스 (저장된 봉 + 이전 백필에서 거래소에 없다고 확인된 구간)"""
+        step = timeframe_ms(timeframe)
+        saved = ContinuityIndex.load(self._continuity_file(timeframe), step)
+        return ContinuityIndex.from_timestamps(step, self.archive.timestamps(timeframe), empty=saved.empty)
+
+    def _fetch_page(self, timeframe, page_start, page_end):
+        """페이지 1개 (스레드 풀에서 실행 - 우선순위 컨텍스트는 스레드마다 지정)"""
+        with request_priority(self.priority):
+            metrics.inc('lumi_rest_calls_total', endpoint='fetch_ohlcv')
+            rows = self.exchange_mgr.exchange.fetch_ohlcv(
+                self.archive.symbol, timeframe, since=page_start, limit=self.page_limit)
+        data, duplicates, invalid = validate_ohlcv(rows or [])
+        if len(data):
+            data = data[(data[:, 0] >= page_start) & (data[:, 0] < page_end)]
+        return data, duplicates, invalid
+
+    def download(self, timeframe, since, until=None, progress=None):
+        """
+        [since, until) 구간 다운로드 (아카이브에 이미 있는 부분은 건너뜀)
+
+        Args:
+            since / until: 시작/끝 시각 (ms, until 기본값 = 현재 - 진행 중인 봉 제외)
+            progress: 콜백 (기록한 누적 행 수, 전체 페이지 중 완료 수, 전체 페이지 수)
+
+        Returns:
+            dict: rows, pages, seconds, rows_per_sec, duplicates, invalid, gaps, resumed_from,
+                  extended_from (아카이브 앞쪽으로 받은 시작 시각)
+        """
+        step = timeframe_ms(timeframe)
+        if until is None:
+            until = int(time.time() * 1000) // step * step
+        start = -(-since // step) * step
+        last = self.archive.last_timestamp(timeframe)
+        span = self.page_limit * step
+        # 앞쪽 [since, 첫 봉): 첫 봉에 붙은 페이지부터 거꾸로 merge
+        head = []
+        first = self.archive.stats(timeframe)['first'] if last is not None else None
+        extended_from = None
+        if first is not None and start < first:
+            head_end = min(first, until)
+            head = [(max(s - span, start), s) for s in range(head_end, start, -span)]
+            extended_from = start
+        resumed_from = None
+        if last is not None and last + step > start:
+            start = resumed_from = last + step
+        tail = [(s, min(s + span, until)) for s in range(start, until, span)]
+        pages = head + tail
+
+        started = time.perf_counter()
+        written = duplicates = invalid = 0
+        gaps = []
+        completed = 0
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"ohlcv-{timeframe}") as pool:
+            futures = [pool.submit(self._fetch_page, timeframe, s, e) for s, e in pages]
+            for (page_start, page_end), future in zip(pages, futures):
+                # 순서대로 기다림 → 앞 페이지가 끝나야 기록 (뒤 페이지는 그동안 계속 받는 중)
+                try:
+                    data, dup, bad = future.result()
+                except Exception as e:
+                    for f in futures[completed + 1:]:
+                        f.cancel()
+                    log.error("캔들 다운로드 중단 (%s, %s~): %s", timeframe, _partition(page_start), e)
+                    break
+                duplicates += dup
+                invalid += bad
+                gaps += find_gaps(data[:, 0] if len(data) else [], step, page_start, page_end)
+                if completed < len(head):
+                    written += self.archive.merge(timeframe, data)
+                else:
+                    written += self.archive.append(timeframe, data)
+                completed += 1
+                if progress:
+                    progress(written, completed, len(pages))
+
+        seconds = time.perf_counter() - started
+        gaps = _merge_gaps(gaps)
+        if gaps:
+            log.warning("빠진 봉 구간 %d개 (%s) - 첫 구간 %s", len(gaps), timeframe, gaps[0])
+        return {
+            'timeframe': timeframe,
+            'rows': written,
+            'pages': completed,
+            'total_pages': len(pages),
+            'seconds': round(seconds, 3),
+            'rows_per_sec': round(written / seconds, 1) if seconds > 0 else None,
+            'duplicates': duplicates,
+            'invalid': invalid,
+            'gaps': gaps,
+            'resumed_from': resumed_from,
+            'extended_from': extended_from,
+        }
+
+
+    def backfill(self, timeframe, start=None, end=None, max_pages=None):
+        """
+        아카이브 안의 빈 봉 구간을 최소 페이지로 다시 요청해서 끼워 넣기
+
+        다시 받아도 없는 구간은 거래소에 없는 것으로 기록 (.continuity.json) → 다음 백필에서 제외
+
+        Returns:
+            dict: pages, rows, before/after (coverage 요약)
+        """
+        index = self.continuity(timeframe)
+        before = index.coverage(start, end)
+        pages = index.plan_backfill(self.page_limit, start, end, max_pages)
+        step = index.step
+        written = 0
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"backfill-{timeframe}") as pool:
+            futures = [pool.submit(self._fetch_page, timeframe, since, since + count * step)
+                       for since, count in pages]
+            for (since, count), future in zip(pages, futures):
+                try:
+                    data, _, _ = future.result()
+                except Exception as e:
+                    log.error("백필 실패 (%s, %s~): %s", timeframe, _partition(since), e)
+                    continue
+                written += self.archive.merge(timeframe, data)
+                index.observe([ts for ts in data[:, 0].astype(np.int64).tolist() if ts not in index.covered])
+                index.mark_empty(since, since + count * step)
+        index.save(self._continuity_file(timeframe))
+        after = index.coverage(start, end)
+        if after['missing']:
+            log.warning("백필 후에도 빈 봉 %d개 (%s)", after['missing'], timeframe)
+        return {
+            'timeframe': timeframe,
+            'pages': len(pages),
+            'rows': written,
+            'seconds': round(time.perf_counter() - started, 3),
+            'before': before,
+            'after': after,
+        }
+
+
+def _merge_gaps(gaps):
+    merged = []
+    for start, end in gaps:
+        if start >= end:
+            continue
+        if merged and merged[-1][1] >= start:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def main(argv=None):
+    """CLI: python -m modules.history --days 90 --timeframes 1m 3m 5m 15m"""
+    import argparse
+    from .exchange import ExchangeManager
+    parser = argparse.ArgumentParser(description="과거 OHLCV 다운로드")
+    parser.add_argument('--symbol', default="ETH/USDT")
+    parser.add_argument('--timeframes', nargs='+', default=['1m', '3m', '5m', '15m'])
+    parser.add_argument('--days', type=float, default=90)
+    parser.add_argument('--root', default="data/ohlcv")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--page-limit', type=int, default=1000)
+    parser.add_argument('--format', choices=['binary', 'csv'], default='binary',
+                        help="binary: candle_store (.candles, memmap) / csv: 월 파티션")
+    parser.add_argument('--backfill', action='store_true', help="다운로드 후 빈 봉 구간 다시 요청")
+    args = parser.parse_args(argv)
+
+    # 공개 캔들만 받으므로 API 키 없이 연결, 가중치 예산의 절반만 사용 (같은 IP의 봇 몫 남김)
+    manager = ExchangeManager(args.symbol, rate_limits={'share': 0.5}, io_policy={})
+    ok, msg = manager.connect(public=True)
+    if not ok:
+        print(f"❌ {msg}")
+        return None
+    if args.format == 'binary':
+        from .candle_store import BinaryCandleArchive
+        archive = BinaryCandleArchive(args.root, args.symbol)
+    else:
+        archive = CandleArchive(args.root, args.symbol)
+    downloader = HistoryDownloader(manager, archive, page_limit=args.page_limit, workers=args.workers)
+    since = int((time.time() - args.days * 86400) * 1000)
+    results = []
+    for timeframe in args.timeframes:
+        result = downloader.download(timeframe, since)
+        results.append(result)
+        print(f"✅ {timeframe}: {result['rows']:,}행 / {result['pages']}페이지 / {result['seconds']}초 "
+              f"({result['rows_per_sec']}행/초) | 중복 {result['duplicates']} | 오류 {result['invalid']} "
+              f"| 빠진 구간 {len(result['gaps'])}")
+        if args.backfill:
+            filled = downloader.backfill(timeframe)
+            results.append(filled)
+            after = filled['after']
+            print(f"   ↳ 백필 {filled['pages']}페이지 / {filled['rows']:,}행 | 커버리지 {after['coverage']} "
+                  f"| 남은 빈 봉 {after['missing']} | 거래소에 없음 {after['confirmed_empty']}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
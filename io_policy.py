@@ -0,0 +1,431 @@
+# -*- coding: utf-8 -*-
+"""
+modules/io_policy.py - 거래소 I/O 정책 (재시도/백오프, 서킷 브레이커, 헤지 조회)
+
+호출마다 try/except 한 번뿐이면 타임아웃 1회에 틱이 통째로 건너뛰어지고,
+잔고 조회 실패가 '잔고 부족'으로 처리되어 진입이 막힘
+
+IOPolicy (ResilientExchange 프록시로 요청 메서드 전체에 적용)
+- 재시도: 네트워크 계열 오류(타임아웃/5xx/429)만 재시도, decorrelated jitter 백오프
+  (다음 대기 = min(cap, U(base, 직전 대기 × 3))) - MAX_RETRIES 또는 호출당 deadline 중 먼저 닿는 쪽까지
+  주문 거부/잔고 부족 같은 거래소 오류는 재시도 없이 바로 전달
+- 멱등성: 주문 생성은 clientOrderId로 재전송 (없으면 'lumi-' id 부여)
+  429/418처럼 거부가 확실하면 그대로 재전송
+  타임아웃/5xx처럼 접수 여부가 불확실하면 origClientOrderId로 먼저 조회 → 있으면 그 주문 반환,
+  없을 때만 같은 id로 재전송 (중복 주문 없음)
+  취소는 재시도에서 OrderNotFound가 나면 앞선 시도가 처리된 것 → 주문 상태 조회로 대체
+- 서킷 브레이커: 네트워크 오류가 failure_threshold번 연속이면 open → cooldown 동안 즉시 실패 (CircuitOpenError)
+  cooldown 뒤 half-open에서 1건만 시험 → 성공하면 closed, 실패하면 다시 open
+  청산(priority 'exit') 요청은 open이어도 통과 (거래소가 살아났는데 청산을 못 하는 일은 없게)
+- 헤지 조회: 멱등 조회가 엔드포인트별 최근 지연 분위수(p95)를 넘도록 응답이 없으면
+  같은 요청을 한 번 더 보내고 먼저 온 응답 사용 (hedge_budget: 헤지 요청 비율 상한)
+
+가중치 예산 프록시(ScheduledExchange) 바깥을 감싸므로 재시도/헤지 요청도 예산을 차감함
+"""
+
+import concurrent.futures
+import contextvars
+import random
+import threading
+import time
+import uuid
+from collections import deque
+
+import ccxt
+
+from .ratelimit import current_priority
+from .telemetry import metrics
+from .logger import get_logger
+
+log = get_logger('io_policy')
+
+# 메서드 → 종류
+# read: 멱등 조회 (헤지 가능) / write: 멱등 변경 / cancel: 주문 취소 / order: 주문 생성
+METHODS = {
+    'fetch_ohlcv': 'read',
+    'fetch_order_book': 'read',
+    'fetch_ticker': 'read',
+    'fetch_positions': 'read',
+    'fetch_balance': 'read',
+    'fetch_open_orders': 'read',
+    'fetch_my_trades': 'read',
+    'fetch_order': 'read',
+    'fapiPublicGetAggTrades': 'read',
+    'load_markets': 'write',              # 무거운 1회성 호출 → 헤지 안 함
+    'fapiPrivatePostLeverage': 'write',
+    'cancel_order': 'cancel',
+    'create_order': 'order',
+    'create_market_buy_order': 'order',
+    'create_market_sell_order': 'order',
+    'create_limit_buy_order': 'order',
+    'create_limit_sell_order': 'order',
+}
+
+# 주문 생성 메서드의 params 위치 (위치 인자)
+_ORDER_PARAMS_INDEX = {
+    'create_order': 5,
+    'create_market_buy_order': 2,
+    'create_market_sell_order': 2,
+    'create_limit_buy_order': 3,
+    'create_limit_sell_order': 3,
+}
+
+# 거래소가 요청을 처리하지 않은 것이 확실한 오류 (주문도 그대로 재전송 가능)
+_REJECTED = (ccxt.RateLimitExceeded, ccxt.DDoSProtection)
+
+
+class CircuitOpenError(ccxt.ExchangeNotAvailable):
+    """서킷 open 상태라 요청을 보내지 않음"""
+
+
+class CircuitBreaker:
+    """연속 네트워크 오류 기반 서킷 브레이커 (스레드 안전)"""
+
+    CLOSED, HALF_OPEN, OPEN = 'closed', 'half_open', 'open'
+    _GAUGE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, failure_threshold=5, cooldown=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def _set(self, state):
+        self.state = state
+        if state == self.OPEN:
+            self.opened_at = self.clock()
+        metrics.set_gauge('lumi_io_circuit_state', self._GAUGE[state])
+        metrics.inc('lumi_io_circuit_transitions_total', state=state)
+        if state == self.OPEN:
+            log.warning("🔌 거래소 서킷 open (연속 오류 %d회) - %.0f초간 요청 차단", self.failures, self.cooldown)
+        elif state == self.CLOSED:
+            log.info("🔌 거래소 서킷 closed (복구)")
+
+    def allow(self, bypass=False):
+        """요청 허용 여부 (half-open에서는 시험 요청 1건만)"""
+        with self.lock:
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.cooldown:
+                self._set(self.HALF_OPEN)
+            if self.state == self.CLOSED or bypass:
+                return True
+            if self.state == self.HALF_OPEN and not self.probing:
+                self.probing = True
+                return True
+            return False
+
+    def record_success(self):
+        """거래소가 응답함 (거래소 오류 응답 포함)"""
+        with self.lock:
+            self.failures = 0
+            self.probing = False
+            if self.state != self.CLOSED:
+                self._set(self.CLOSED)
+
+    def record_failure(self):
+        """네트워크 계열 오류"""
+        with self.lock:
+            self.failures += 1
+            self.probing = False
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED
+                                                and self.failures >= self.failure_threshold):
+                self._set(self.OPEN)
+            elif self.state == self.OPEN:
+                # open 중 통과시킨 청산 요청도 실패 → cooldown 연장
+                self.opened_at = self.clock()
+
+
+class LatencyTracker:
+    """엔드포인트별 최근 응답 지연 분위수 (헤지 기준)"""
+
+    def __init__(self, window=200, quantile=0.95, min_samples=20, refresh=10):
+        self.window = window
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.refresh = refresh
+        self.samples = {}
+        self.fresh = {}
+        self.thresholds = {}
+        self.lock = threading.Lock()
+
+    def record(self, endpoint, seconds):
+        metrics.observe('lumi_io_latency_seconds', seconds, endpoint=endpoint)
+        with self.lock:
+            samples = self.samples.get(endpoint)
+            if samples is None:
+                samples = self.samples[endpoint] = deque(maxlen=self.window)
+            samples.append(seconds)
+            # 정렬은 refresh건마다 한 번
+            self.fresh[endpoint] = self.fresh.get(endpoint, 0) + 1
+            if len(samples) >= self.min_samples and self.fresh[endpoint] >= self.refresh:
+                ordered = sorted(samples)
+                self.thresholds[endpoint] = ordered[int(self.quantile * (len(ordered) - 1))]
+                self.fresh[endpoint] = 0
+
+    def threshold(self, endpoint):
+        """분위수 지연 (표본 부족 시 None)"""
+        return self.thresholds.get(endpoint)
+
+
+class IOPolicy:
+    """거래소 호출 정책 (재시도/서킷/헤지, 스레드 안전)"""
+
+    def __init__(self, max_retries=50, deadline=10.0, request_timeout=4.0, backoff_base=0.2,
+                 backoff_cap=3.0, failure_threshold=5, cooldown=30.0, hedge=True, hedge_quantile=0.95,
+                 hedge_budget=0.1, hedge_min_delay=0.05, hedge_workers=8,
+                 sleep=time.sleep, clock=time.monotonic, rng=None):
+        """
+        Args:
+            max_retries: 호출당 최대 재시도 횟수
+            deadline: 호출당 재시도 포함 총 시간 한도 (초)
+            request_timeout: 요청 1회 타임아웃 (초, ccxt timeout으로 설정)
+            failure_threshold: 서킷 open까지 연속 네트워크 오류 수
+            cooldown: open 유지 시간 (초)
+            hedge_quantile: 헤지 요청을 보낼 지연 분위수
+            hedge_budget: 조회 대비 헤지 요청 비율 상한
+            hedge_min_delay: 헤지 대기 최소값 (초, 지연이 아주 짧은 엔드포인트의 불필요한 헤지 방지)
+        """
+        self.max_retries = max_retries
+        self.deadline = deadline
+        self.request_timeout = request_timeout
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.hedge = hedge
+        self.hedge_budget = hedge_budget
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_workers = hedge_workers
+        self.sleep = sleep
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self.breaker = CircuitBreaker(failure_threshold, cooldown, clock)
+        self.latency = LatencyTracker(quantile=hedge_quantile)
+        self.hedge_tokens = 1.0
+        self.pool = None
+        self.lock = threading.Lock()
+        self.counts = {'retries': 0, 'giveups': 0, 'rejected': 0, 'hedges': 0, 'hedge_wins': 0,
+                       'order_lookups': 0, 'orders_recovered': 0}
+
+    def _count(self, key):
+        with self.lock:
+            self.counts[key] += 1
+
+    def backoff(self, previous):
+        """decorrelated jitter: 직전 대기의 최대 3배 안에서 무작위"""
+        return min(self.backoff_cap, self.rng.uniform(self.backoff_base, max(self.backoff_base, previous * 3)))
+
+    # ------------------------------------------------------------------ 호출
+
+    def call(self, endpoint, fn, args=(), kwargs=None, kind='read', lookup=None):
+        """
+        정책 적용 호출
+
+        Args:
+            kind: METHODS 종류 (read / write / cancel / order)
+            lookup: order - clientOrderId로 기존 주문 조회, cancel - 주문 상태 조회
+
+        Raises:
+            CircuitOpenError: 서킷 open (청산 요청 제외)
+            그 외: 재시도 불가 오류 또는 재시도 한도 초과 시 마지막 오류
+        """
+        kwargs = kwargs or {}
+        bypass = current_priority() == 'exit'
+        if not self.breaker.allow(bypass):
+            self._count('rejected')
+            metrics.inc('lumi_io_circuit_rejected_total', endpoint=endpoint)
+            raise CircuitOpenError(f"{endpoint}: 거래소 서킷 open (연속 장애)")
+
+        deadline = self.clock() + self.deadline
+        delay = 0.0
+        attempt = 0
+        uncertain = False      # 앞선 주문 요청의 접수 여부 불확실
+        retried = False
+        while True:
+            attempt += 1
+            sending = True
+            try:
+                if uncertain:
+                    sending = False
+                    order = self._find_order(endpoint, lookup)
+                    if order is not None:
+                        self.breaker.record_success()
+                        return order
+                    uncertain, sending = False, True
+                result = self._attempt(endpoint, fn, args, kwargs, hedge=(kind == 'read'))
+            except ccxt.NetworkError as e:
+                self.breaker.record_failure()
+                if kind == 'order' and sending and not isinstance(e, _REJECTED):
+                    uncertain = True
+                delay = self.backoff(delay)
+                reason = None
+                if attempt > self.max_retries:
+                    reason = 'attempts'
+                elif self.clock() + delay > deadline:
+                    reason = 'deadline'
+                elif not self.breaker.allow(bypass):
+                    reason = 'circuit'
+                if reason:
+                    self._count('giveups')
+                    metrics.inc('lumi_io_giveups_total', endpoint=endpoint, reason=reason)
+                    if uncertain:
+                        log.warning("%s 접수 여부 불확실 (포지션 대조에서 확인): %s", endpoint, e)
+                    raise
+                self._count('retries')
+                retried = True
+                metrics.inc('lumi_retries_total', component='exchange', endpoint=endpoint)
+                metrics.inc('lumi_io_retries_total', endpoint=endpoint, error=type(e).__name__)
+                metrics.observe('lumi_io_backoff_seconds', delay)
+                log.warning("%s 재시도 %d회 (%.2f초 후): %s", endpoint, attempt, delay, e,
+                            extra={'sample_key': f'io_retry_{endpoint}'})
+                self.sleep(delay)
+            except ccxt.OrderNotFound:
+                self.breaker.record_success()
+                if kind == 'cancel' and retried and lookup:
+                    # 앞선 취소 요청이 처리됨 → 현재 주문 상태로 대체
+                    return lookup()
+                raise
+            except Exception:
+                # 거래소는 응답함 (주문 거부, 잔고 부족 등)
+                self.breaker.record_success()
+                raise
+            else:
+                self.breaker.record_success()
+                return result
+
+    def _find_order(self, endpoint, lookup):
+        """clientOrderId로 앞선 주문 조회 (없으면 None)"""
+        self._count('order_lookups')
+        try:
+            order = lookup()
+        except ccxt.OrderNotFound:
+            metrics.inc('lumi_io_order_lookups_total', endpoint=endpoint, result='not_found')
+            return None
+        self._count('orders_recovered')
+        metrics.inc('lumi_io_order_lookups_total', endpoint=endpoint, result='found')
+        log.info("%s 응답 유실 → 접수된 주문 확인 (%s)", endpoint, order.get('clientOrderId') or order.get('id'))
+        return order
+
+    def _attempt(self, endpoint, fn, args, kwargs, hedge):
+        threshold = self.latency.threshold(endpoint) if hedge and self.hedge else None
+        if threshold is None:
+            started = self.clock()
+            result = fn(*args, **kwargs)
+            self.latency.record(endpoint, self.clock() - started)
+            return result
+        return self._hedged(endpoint, fn, args, kwargs, max(threshold, self.hedge_min_delay))
+
+    # ------------------------------------------------------------------ 헤지
+
+    def _executor(self):
+        with self.lock:
+            if self.pool is None:
+                self.pool = concurrent.futures.ThreadPoolExecutor(self.hedge_workers, thread_name_prefix="io-hedge")
+            return self.pool
+
+    def _submit(self, endpoint, fn, args, kwargs):
+        # 요청 우선순위(contextvar)가 작업 스레드에서도 유지되도록 컨텍스트 복사
+        context = contextvars.copy_context()
+        started = self.clock()
+        future = self._executor().submit(context.run, fn, *args, **kwargs)
+
+        def done(f):
+            if f.exception() is None:
+                self.latency.record(endpoint, self.clock() - started)
+        future.add_done_callback(done)
+        return future
+
+    def _take_hedge_token(self):
+        with self.lock:
+            if self.hedge_tokens >= 1.0:
+                self.hedge_tokens -= 1.0
+                return True
+            return False
+
+    def _hedged(self, endpoint, fn, args, kwargs, delay):
+        """delay 안에 응답이 없으면 같은 요청을 하나 더 보내고 먼저 성공한 응답 사용"""
+        with self.lock:
+            self.hedge_tokens = min(5.0, self.hedge_tokens + self.hedge_budget)
+        primary = self._submit(endpoint, fn, args, kwargs)
+        try:
+            return primary.result(timeout=delay)
+        except concurrent.futures.TimeoutError:
+            pass
+        if not self._take_hedge_token():
+            return primary.result()
+
+        self._count('hedges')
+        metrics.inc('lumi_io_hedges_total', endpoint=endpoint)
+        backup = self._submit(endpoint, fn, args, kwargs)
+        pending = {primary, backup}
+        error = None
+        while pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is backup:
+                        self._count('hedge_wins')
+                        metrics.inc('lumi_io_hedge_wins_total', endpoint=endpoint)
+                    return future.result()
+                error = error or future.exception()
+        raise error
+
+    # ------------------------------------------------------------------ 조회
+
+    def stats(self):
+        """정책 동작 현황 (status.json용)"""
+        with self.lock:
+            counts = dict(self.counts)
+        counts['circuit'] = self.breaker.state
+        counts['p95_ms'] = {endpoint: round(value * 1000, 1)
+                            for endpoint, value in self.latency.thresholds.items()}
+        return counts
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _with_client_id(name, args, kwargs):
+    """주문 params에 clientOrderId 보장 → (args, kwargs, client_id)"""
+    index = _ORDER_PARAMS_INDEX[name]
+    if 'params' in kwargs or len(args) <= index:
+        params = dict(kwargs.get('params') or {})
+        kwargs = dict(kwargs, params=params)
+    else:
+        params = dict(args[index] or {})
+        args = args[:index] + (params,) + args[index + 1:]
+    client_id = params.get('newClientOrderId') or params.get('clientOrderId')
+    if not client_id:
+        client_id = params['newClientOrderId'] = f"lumi-{uuid.uuid4().hex[:20]}"
+    return args, kwargs, client_id
+
+
+class ResilientExchange:
+    """ccxt 인스턴스 프록시 (요청 메서드만 IOPolicy 경유)"""
+
+    def __init__(self, exchange, policy):
+        self._exchange = exchange
+        self._policy = policy
+
+    def __getattr__(self, name):
+        attr = getattr(self._exchange, name)
+        kind = METHODS.get(name)
+        if kind is None or not callable(attr):
+            return attr
+        policy = self._policy
+        exchange = self._exchange
+
+        def call(*args, **kwargs):
+            lookup = None
+            if kind == 'order':
+                args, kwargs, client_id = _with_client_id(name, args, kwargs)
+                symbol = args[0] if args else kwargs.get('symbol')
+                lookup = lambda: exchange.fetch_order(None, symbol, {'origClientOrderId': client_id})
+            elif kind == 'cancel':
+                order_id = args[0] if args else kwargs.get('id')
+                symbol = args[1] if len(args) > 1 else kwargs.get('symbol')
+                lookup = lambda: exchange.fetch_order(order_id, symbol)
+            return policy.call(name, attr, args, kwargs, kind, lookup)
+        return call
@@ -0,0 +1,613 @@
+# -*- coding: utf-8 -*-
+"""
+modules/kernels.py - 백테스트 커널 (지표 + 포지션 청산 상태 기계)
+
+백엔드 2개, 결과는 비트 단위로 같음
+- 'jit': 봉 단위 루프 커널 - numba가 설치돼 있으면 nopython 컴파일 (없으면 같은 소스를 파이썬으로 실행, 검증용)
+- 'numpy': numba 없는 환경의 기본값 - 지표는 FeaturePipeline.compute와 같은 pandas 연산,
+  청산은 포지션 × 봉 구간 행렬로 벡터화 (최고 수익 = 누적 최대)
+
+지표 (FeaturePipeline.compute와 같은 값)
+- ewm 루프는 pandas ewm(adjust=False) 점화식 그대로 (가중치 정규화 나눗셈 포함)
+- rolling mean/std 루프는 pandas 창 집계 그대로 (Kahan 보정 합 / Welford 분산, 추가·제거 보정값 분리)
+
+청산 (TradingBot._check_exit 중 동적 손절 → StrategyEngine.should_exit 순서, 순차 반전 SEQ 제외)
+- 진입 다음 봉부터 봉 종가로 검사, 첫 청산 봉에서 멈춤
+- 코드: EXIT_REASONS 인덱스 (TS 사유는 최고 수익으로 exit_reason()에서 조립)
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from .features import FeaturePipeline, _rsi, _span_alpha
+
+try:
+    import numba
+except ImportError:                     # 선택 의존성
+    numba = None
+
+NUMBA_AVAILABLE = numba is not None
+BACKEND = 'jit' if NUMBA_AVAILABLE else 'numpy'
+BACKENDS = ('jit', 'numpy')
+
+# 청산 코드 → should_exit / _check_exit 사유
+EXIT_NONE, EXIT_DSL, EXIT_SL, EXIT_TS, EXIT_TP = 0, 1, 2, 3, 4
+EXIT_PG_CROSS, EXIT_PG_TO_SHORT, EXIT_PG_TO_LONG, EXIT_PG_OVERBOUGHT, EXIT_PG_OVERSOLD = 5, 6, 7, 8, 9
+EXIT_REASONS = (
+    None,
+    'DSL (동적 손절)',
+    'SL (기본 손절)',
+    'TS',
+    'TP (목표 익절)',
+    'PG (추세 반전 보호)',
+    'PG (숏 추세 전환)',
+    'PG (롱 추세 전환)',
+    'PG (과매수 꺾임)',
+    'PG (과매도 반등)',
+)
+
+# 청산 파라미터 배열 순서 (exit_params)
+_SL, _TP, _TF_TP, _TRAIL_START, _TP_EXT_THRESHOLD, _TP_EXT_AMOUNT = range(6)
+
+_NUMPY_CHUNK = 32                       # numpy 청산: 처음 검사할 봉 수 (미청산 포지션만 2배씩 늘려 계속)
+_NUMPY_CHUNK_MAX = 4096
+
+
+def _jit(fn):
+    """numba 있으면 nopython 컴파일 (캐시), 없으면 그대로"""
+    if numba is None:
+        return fn
+    return numba.njit(cache=True, nogil=True)(fn)
+
+
+def _backend(backend):
+    backend = backend or BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"알 수 없는 커널 백엔드: {backend}")
+    return backend
+
+
+# ---------------------------------------------------------------------- 루프 커널 (numba)
+
+@_jit
+def _ewm_loop(values, alpha, min_periods):
+    """pandas ewm(alpha, adjust=False, ignore_na=False, min_periods).mean()"""
+    n = len(values)
+    out = np.empty(n)
+    if n == 0:
+        return out
+    old_wt_factor = 1.0 - alpha
+    new_wt = alpha
+    weighted = values[0]
+    nobs = 1 if weighted == weighted else 0
+    out[0] = weighted if nobs >= min_periods else np.nan
+    old_wt = 1.0
+    for i in range(1, n):
+        cur = values[i]
+        is_obs = cur == cur
+        if is_obs:
+            nobs += 1
+        if weighted == weighted:
+            old_wt *= old_wt_factor
+            if is_obs:
+                if weighted != cur:
+                    weighted = old_wt * weighted + new_wt * cur
+                    weighted /= old_wt + new_wt
+                old_wt = 1.0
+        elif is_obs:
+            weighted = cur
+        out[i] = weighted if nobs >= min_periods else np.nan
+    return out
+
+
+@_jit
+def _rolling_mean_std_loop(values, window):
+    """pandas rolling(window).mean() / .std(ddof=0) - min_periods = window"""
+    n = len(values)
+    mean_out = np.full(n, np.nan)
+    std_out = np.full(n, np.nan)
+    if n == 0:
+        return mean_out, std_out
+    # mean: Kahan 합
+    sum_x = 0.0
+    comp_add = 0.0
+    comp_remove = 0.0
+    neg_ct = 0
+    # var: Welford
+    mean_x = 0.0
+    ssqdm_x = 0.0
+    var_comp_add = 0.0
+    var_comp_remove = 0.0
+    nobs = 0
+    same = 0
+    prev = values[0]
+    for i in range(n):
+        if i >= window:
+            val = values[i - window]
+            if val == val:
+                nobs -= 1
+                y = -val - comp_remove
+                t = sum_x + y
+                comp_remove = t - sum_x - y
+                sum_x = t
+                if math.copysign(1.0, val) < 0:
+                    neg_ct -= 1
+                if nobs:
+                    prev_mean = mean_x - var_comp_remove
+                    y = val - var_comp_remove
+                    t = y - mean_x
+                    var_comp_remove = t + mean_x - y
+                    mean_x = mean_x - t / nobs
+                    ssqdm_x = ssqdm_x - (val - prev_mean) * (val - mean_x)
+                else:
+                    mean_x = 0.0
+                    ssqdm_x = 0.0
+        val = values[i]
+        if val == val:
+            nobs += 1
+            if val == prev:
+                same += 1
+            else:
+                same = 1
+            prev = val
+            y = val - comp_add
+            t = sum_x + y
+            comp_add = t - sum_x - y
+            sum_x = t
+            if math.copysign(1.0, val) < 0:
+                neg_ct += 1
+            prev_mean = mean_x - var_comp_add
+            y = val - var_comp_add
+            t = y - mean_x
+            var_comp_add = t + mean_x - y
+            mean_x = mean_x + t / nobs
+            ssqdm_x = ssqdm_x + (val - prev_mean) * (val - mean_x)
+        if nobs >= window and nobs > 0:
+            result = sum_x / nobs
+            if same >= nobs:
+                result = prev
+            elif neg_ct == 0 and result < 0:
+                result = 0.0
+            elif neg_ct == nobs and result > 0:
+                result = 0.0
+            mean_out[i] = result
+            if nobs == 1 or same >= nobs:
+                var = 0.0
+            else:
+                var = ssqdm_x / nobs
+            std_out[i] = math.sqrt(var) if var >= 0 else 0.0
+    return mean_out, std_out
+
+
+@_jit
+def _dynamic_sl_table(bb_width, ema8, ema21):
+    """
+    봉별 동적 손절 폭 (calculate_dynamic_sl의 포지션과 무관한 부분)
+
+    Returns:
+        (sl_gain, sl_other): 수익 중(pnl > 0) / 그 외일 때 추세 강도 반영 손절 폭
+    """
+    n = len(bb_width)
+    sl_gain = np.empty(n)
+    sl_other = np.empty(n)
+    for j in range(n):
+        width = bb_width[j]
+        if width < 0.03:
+            base_sl = 0.006
+        elif width > 0.06:
+            base_sl = 0.012
+        else:
+            base_sl = 0.008
+        fast = ema8[j]
+        slow = ema21[j]
+        gain = 1.0
+        other = 1.0
+        if fast > 0 and slow > 0:
+            strength = abs(fast - slow) / slow
+            if strength > 0.02:
+                gain = 1.2
+                other = 0.8
+            elif strength < 0.005:
+                gain = 0.8
+                other = 0.8
+        sl_gain[j] = base_sl * gain
+        sl_other[j] = base_sl * other
+    return sl_gain, sl_other
+
+
+@_jit
+def _exit_loop(close, rsi, trend, ema8, ema21, bb_width, trend_mode,
+               entries, sides, entry_prices, params, dynamic_sl, max_bars,
+               out_index, out_code, out_peak):
+    """
+    포지션마다 진입 다음 봉부터 청산 검사 (미청산: out_index = -1)
+
+    포지션과 무관한 동적 손절 폭은 봉별로 한 번만, 기본 SL/TP 가격은 포지션마다 한 번만 계산
+    (봉 루프에는 수익률에 따라 달라지는 비교만 남김 - 계산 순서는 should_exit와 같아서 결과 동일)
+    """
+    n = len(close)
+    sl_base = params[0]
+    tp_pct = params[1]
+    tf_tp_pct = params[2]
+    trail_start = params[3]
+    ext_threshold = params[4]
+    ext_amount = params[5]
+    if dynamic_sl:
+        sl_gain, sl_other = _dynamic_sl_table(bb_width, ema8, ema21)
+    else:
+        sl_gain = sl_other = bb_width
+    ext_from = 1 - ext_threshold
+    for p in range(len(entries)):
+        entry = entry_prices[p]
+        long = sides[p] > 0
+        direction = 1.0 if long else -1.0
+        if long:
+            base_stop = entry * (1 - sl_base)
+            tp_normal = entry * (1 + tp_pct)
+            tp_trend = entry * (1 + tf_tp_pct)
+        else:
+            base_stop = entry * (1 + sl_base)
+            tp_normal = entry * (1 - tp_pct)
+            tp_trend = entry * (1 - tf_tp_pct)
+        frac_normal = abs((tp_normal - entry) / entry)
+        frac_trend = abs((tp_trend - entry) / entry)
+        peak = 0.0
+        out_index[p] = -1
+        out_code[p] = 0
+        stop = n if max_bars <= 0 else min(n, entries[p] + 1 + max_bars)
+        for j in range(entries[p] + 1, stop):
+            price = close[j]
+            pnl = (price / entry - 1) * 100 * direction
+            code = 0
+
+            # 동적 손절 (calculate_dynamic_sl)
+            if dynamic_sl:
+                sl = sl_gain[j] if pnl > 0 else sl_other[j]
+                if pnl >= 0.5:
+                    trailing = pnl - 0.5
+                    if not trailing > 0:
+                        trailing = 0.0
+                    trailing = trailing / 100
+                    capped = 0.015 if 0.015 < sl else sl            # min(sl, 0.015)
+                    sl = capped if capped > trailing else trailing  # max(trailing, ...)
+                capped = sl if sl < 0.015 else 0.015                # min(0.015, sl)
+                sl = capped if capped > 0.005 else 0.005            # max(0.005, ...)
+                if long:
+                    if price <= entry * (1 - sl):
+                        code = 1
+                elif price >= entry * (1 + sl):
+                    code = 1
+
+            # 기본 SL
+            if code == 0:
+                if long:
+                    if price <= base_stop:
+                        code = 2
+                elif price >= base_stop:
+                    code = 2
+
+            if code == 0:
+                # 드래그 스탑 (최고 수익 기준)
+                if pnl > peak:
+                    peak = pnl
+                if peak >= trail_start:
+                    locked = peak - 0.8
+                    if not locked > 0.3:
+                        locked = 0.3
+                    if long:
+                        if price <= entry * (1 + locked / 100):
+                            code = 3
+                    elif price >= entry * (1 - locked / 100):
+                        code = 3
+
+            if code == 0:
+                # TP (+ 확장)
+                if trend_mode[j]:
+                    tp = tp_trend
+                    tp_frac = frac_trend
+                else:
+                    tp = tp_normal
+                    tp_frac = frac_normal
+                if pnl > 0:
+                    to_tp = pnl / 100 / tp_frac if tp_frac > 0 else 0.0
+                    if to_tp >= ext_from:
+                        if long:
+                            if rsi[j] >= 60 and trend[j] == 1:
+                                tp = tp * (1 + ext_amount)
+                        elif rsi[j] <= 40 and trend[j] == -1:
+                            tp = tp * (1 - ext_amount)
+                if long:
+                    if price >= tp:
+                        code = 4
+                elif price <= tp:
+                    code = 4
+
+            if code == 0 and pnl >= 1.0:
+                # 추세 반전 보호
+                if long:
+                    if ema8[j] < ema21[j]:
+                        code = 5
+                    elif trend[j] == -1:
+                        code = 6
+                else:
+                    if ema8[j] > ema21[j]:
+                        code = 5
+                    elif trend[j] == 1:
+                        code = 7
+
+            if code == 0 and pnl >= 1.5:
+                # 고점/저점 꺾임
+                if long:
+                    if rsi[j] > 70 and price < ema8[j]:
+                        code = 8
+                elif rsi[j] < 30 and price > ema8[j]:
+                    code = 9
+
+            if code:
+                out_index[p] = j
+                out_code[p] = code
+                break
+        out_peak[p] = peak
+
+
+# ---------------------------------------------------------------------- numpy 청산
+
+def _pymax(a, b):
+    """파이썬 max(a, b) (b가 더 클 때만 b - NaN 포함 같은 결과)"""
+    return np.where(b > a, b, a)
+
+
+def _pymin(a, b):
+    return np.where(b < a, b, a)
+
+
+def _exit_conditions(long, price, pnl, peak, entry, rsi, trend, ema8, ema21, bb_width, trend_mode,
+                     params, dynamic_sl):
+    """한 방향 포지션들의 봉 행렬 청산 조건 [(코드, bool 행렬)] - _exit_loop와 같은 우선순위"""
+    conditions = []
+    if dynamic_sl:
+        base_sl = np.where(bb_width < 0.03, 0.006, np.where(bb_width > 0.06, 0.012, 0.008))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            strength = np.abs(ema8 - ema21) / ema21
+        factor = np.where((ema8 > 0) & (ema21 > 0),
+                          np.where(strength > 0.02, np.where(pnl > 0, 1.2, 0.8),
+                                   np.where(strength < 0.005, 0.8, 1.0)),
+                          1.0)
+        sl = base_sl * factor
+        trailing = _pymax(0.0, pnl - 0.5) / 100
+        sl = np.where(pnl >= 0.5, _pymax(trailing, _pymin(sl, 0.015)), sl)
+        sl = _pymax(0.005, _pymin(0.015, sl))
+        conditions.append((EXIT_DSL, price <= entry * (1 - sl) if long else price >= entry * (1 + sl)))
+
+    sl_base = params[_SL]
+    conditions.append((EXIT_SL, price <= entry * (1 - sl_base) if long else price >= entry * (1 + sl_base)))
+
+    locked = _pymax(0.3, peak - 0.8)
+    trailing = peak >= params[_TRAIL_START]
+    if long:
+        conditions.append((EXIT_TS, trailing & (price <= entry * (1 + locked / 100))))
+    else:
+        conditions.append((EXIT_TS, trailing & (price >= entry * (1 - locked / 100))))
+
+    base_pct = np.where(trend_mode, params[_TF_TP], params[_TP])
+    tp = entry * (1 + base_pct) if long else entry * (1 - base_pct)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tp_frac = np.abs((tp - entry) / entry)
+        to_tp = np.where(tp_frac > 0, (np.abs(pnl) / 100) / tp_frac, 0.0)
+    extend = (pnl > 0) & (to_tp >= (1 - params[_TP_EXT_THRESHOLD]))
+    if long:
+        tp = np.where(extend & (rsi >= 60) & (trend == 1), tp * (1 + params[_TP_EXT_AMOUNT]), tp)
+        conditions.append((EXIT_TP, price >= tp))
+    else:
+        tp = np.where(extend & (rsi <= 40) & (trend == -1), tp * (1 - params[_TP_EXT_AMOUNT]), tp)
+        conditions.append((EXIT_TP, price <= tp))
+
+    guard = pnl >= 1.0
+    reversal = pnl >= 1.5
+    if long:
+        conditions.append((EXIT_PG_CROSS, guard & (ema8 < ema21)))
+        conditions.append((EXIT_PG_TO_SHORT, guard & (trend == -1)))
+        conditions.append((EXIT_PG_OVERBOUGHT, reversal & (rsi > 70) & (price < ema8)))
+    else:
+        conditions.append((EXIT_PG_CROSS, guard & (ema8 > ema21)))
+        conditions.append((EXIT_PG_TO_LONG, guard & (trend == 1)))
+        conditions.append((EXIT_PG_OVERSOLD, reversal & (rsi < 30) & (price > ema8)))
+    return conditions
+
+
+def _exit_numpy(close, rsi, trend, ema8, ema21, bb_width, trend_mode,
+                entries, sides, entry_prices, params, dynamic_sl, max_bars,
+                out_index, out_code, out_peak):
+    """포지션 × 봉 구간 행렬로 청산 검사 (방향별) - 미청산 포지션만 구간을 늘려 계속"""
+    n = len(close)
+    out_index[:] = -1
+    out_code[:] = 0
+    out_peak[:] = 0.0
+    stop = np.full(len(entries), n, dtype=np.int64)
+    if max_bars > 0:
+        stop = np.minimum(stop, entries + 1 + max_bars)
+    for long in (True, False):
+        active = np.nonzero(((sides > 0) == long) & (entries + 1 < stop))[0]
+        direction = 1 if long else -1
+        offset = 1
+        width = _NUMPY_CHUNK
+        while len(active):
+            bars = entries[active, None] + offset + np.arange(width)
+            valid = bars < stop[active, None]
+            bars = np.minimum(bars, n - 1)
+            entry = entry_prices[active, None]
+            price = close[bars]
+            pnl = (price / entry - 1) * 100 * direction
+            # 최고 수익: 이전 구간의 최고값에서 이어서 (NaN은 갱신 안 함 = fmax)
+            peak = np.fmax.accumulate(
+                np.concatenate([out_peak[active, None], np.where(valid, pnl, np.nan)], axis=1), axis=1)
+            conditions = _exit_conditions(long, price, pnl, peak[:, 1:], entry, rsi[bars], trend[bars], ema8[bars],
+                                          ema21[bars], bb_width[bars], trend_mode[bars], params, dynamic_sl)
+            hit = np.logical_or.reduce([cond for _, cond in conditions]) & valid
+            first = hit.argmax(axis=1)
+            done = hit[np.arange(len(active)), first]
+
+            # 청산 봉에서 우선순위가 가장 높은 조건
+            rows, cols = np.nonzero(done)[0], first[done]
+            code = np.zeros(len(rows), dtype=np.int8)
+            for value, cond in reversed(conditions):
+                code = np.where(cond[rows, cols], value, code)
+            exited = active[done]
+            out_index[exited] = bars[rows, cols]
+            out_code[exited] = code
+            # 청산 시점 최고값 (DSL/SL로 끝난 봉은 갱신 전 값)
+            out_peak[exited] = np.where(code <= EXIT_SL, peak[rows, cols], peak[rows, cols + 1])
+            out_peak[active[~done]] = peak[~done, -1]
+
+            offset += width
+            active = active[~done]
+            active = active[entries[active] + offset < stop[active]]
+            width = min(width * 2, _NUMPY_CHUNK_MAX)
+
+
+# ---------------------------------------------------------------------- 공개 API
+
+def ewm(values, alpha, min_periods=0, backend=None):
+    """ewm(alpha, adjust=False).mean()"""
+    values = np.ascontiguousarray(values, dtype=float)
+    if _backend(backend) == 'jit':
+        return _ewm_loop(values, float(alpha), int(min_periods))
+    return pd.Series(values).ewm(alpha=alpha, adjust=False, min_periods=min_periods).mean().to_numpy()
+
+
+def ema(close, span, backend=None):
+    """FeaturePipeline EMA (min_periods = span)"""
+    return ewm(close, _span_alpha(span), span, backend)
+
+
+def rsi(close, period=14, backend=None):
+    """Wilder RSI (첫 봉 변화 0, min_periods = period)"""
+    close = np.ascontiguousarray(close, dtype=float)
+    diff = np.diff(close, prepend=close[:1])
+    up = np.where(diff > 0, diff, 0.0)
+    dn = np.where(diff < 0, -diff, 0.0)
+    alpha = 1.0 / period
+    return _rsi(ewm(up, alpha, period, backend), ewm(dn, alpha, period, backend))
+
+
+def bollinger(close, window=FeaturePipeline.BB_WINDOW, num_std=FeaturePipeline.BB_STD, backend=None):
+    """
+    Returns:
+        dict: bb_mid, bb_upper, bb_lower, bb_pct_b, bb_bandwidth
+    """
+    close = np.ascontiguousarray(close, dtype=float)
+    if _backend(backend) == 'jit':
+        mid, std = _rolling_mean_std_loop(close, int(window))
+    else:
+        rolling = pd.Series(close).rolling(window)
+        mid, std = rolling.mean().to_numpy(), rolling.std(ddof=0).to_numpy()
+    upper, lower = mid + num_std * std, mid - num_std * std
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct_b = (close - lower) / (upper - lower)
+        bandwidth = (upper - lower) / mid
+    return {'bb_mid': mid, 'bb_upper': upper, 'bb_lower': lower, 'bb_pct_b': pct_b, 'bb_bandwidth': bandwidth}
+
+
+def macd(close, fast=12, slow=26, signal=FeaturePipeline.MACD_SIGNAL, backend=None):
+    """
+    Returns:
+        dict: macd, macd_signal, macd_hist
+    """
+    line = ema(close, fast, backend) - ema(close, slow, backend)
+    sig = ewm(line, _span_alpha(signal), signal, backend)
+    return {'macd': line, 'macd_signal': sig, 'macd_hist': line - sig}
+
+
+def indicators(close, backend=None):
+    """
+    청산/진입 규칙에 필요한 지표 한 번에 (FeaturePipeline.compute 같은 이름/값)
+
+    Returns:
+        dict: rsi, ema8, ema21, trend, bb_*, macd*
+    """
+    out = {'rsi': rsi(close, 14, backend), 'ema8': ema(close, 8, backend), 'ema21': ema(close, 21, backend)}
+    out['trend'] = np.where(out['ema8'] > out['ema21'], 'UP', 'DOWN')
+    out.update(bollinger(close, backend=backend))
+    out.update(macd(close, backend=backend))
+    return out
+
+
+def trend_codes(trend):
+    """'UP'/'DOWN'/그 외 → 1/-1/0"""
+    trend = np.asarray(trend, dtype=object)
+    return np.where(trend == 'UP', 1, np.where(trend == 'DOWN', -1, 0)).astype(np.int8)
+
+
+def exit_params(engine):
+    """StrategyEngine 청산 설정 → 커널 파라미터 배열"""
+    params = np.empty(6)
+    params[_SL] = engine.sl_pct
+    params[_TP] = engine.tp_pct
+    params[_TF_TP] = engine.tf_tp_pct
+    params[_TRAIL_START] = engine.min_trailing_start
+    params[_TP_EXT_THRESHOLD] = engine.tp_extend_threshold
+    params[_TP_EXT_AMOUNT] = engine.tp_extend_amount
+    return params
+
+
+def exit_reason(code, peak):
+    """청산 코드 → should_exit / _check_exit 사유 문자열"""
+    if code == EXIT_TS:
+        locked_profit = max(0.3, peak - 0.8)
+        return f"TS (드래그 스탑 +{locked_profit}% 보장, 최고 {peak:.2f}%)"
+    return EXIT_REASONS[code]
+
+
+def exit_reasons(codes, peaks):
+    """청산 코드 배열 → 사유 목록 (TS만 봉마다 조립)"""
+    reasons = np.array(EXIT_REASONS, dtype=object)[codes]
+    for i in np.nonzero(codes == EXIT_TS)[0]:
+        reasons[i] = exit_reason(EXIT_TS, peaks[i])
+    return reasons
+
+
+def simulate_exits(close, rsi, trend, ema8, ema21, bb_width, trend_mode, entries, sides, params,
+                   entry_prices=None, dynamic_sl=True, max_bars=0, backend=None):
+    """
+    포지션별 첫 청산 봉
+
+    Args:
+        close, rsi, ema8, ema21, bb_width: 봉 배열 (float)
+        trend: trend_codes() 결과, trend_mode: 봉별 TREND 모드 여부 (bool)
+        entries: 진입 봉 인덱스, sides: 1(LONG) / -1(SHORT)
+        params: exit_params(engine)
+        entry_prices: 기본값 진입 봉 종가
+        dynamic_sl: 동적 손절 검사 포함 (실거래 _check_exit와 같음)
+        max_bars: 0보다 크면 진입 후 최대 검사 봉 수
+
+    Returns:
+        dict: exit_index (미청산 -1), code (EXIT_REASONS 인덱스), peak (청산 시점 최고 수익 %)
+    """
+    close = np.ascontiguousarray(close, dtype=float)
+    entries = np.ascontiguousarray(entries, dtype=np.int64)
+    sides = np.ascontiguousarray(sides, dtype=np.int64)
+    if entry_prices is None:
+        entry_prices = close[entries]
+    arrays = (
+        close,
+        np.ascontiguousarray(rsi, dtype=float),
+        np.ascontiguousarray(trend, dtype=np.int8),
+        np.ascontiguousarray(ema8, dtype=float),
+        np.ascontiguousarray(ema21, dtype=float),
+        np.ascontiguousarray(bb_width, dtype=float),
+        np.ascontiguousarray(trend_mode, dtype=np.bool_),
+        entries,
+        sides,
+        np.ascontiguousarray(entry_prices, dtype=float),
+        np.ascontiguousarray(params, dtype=float),
+        bool(dynamic_sl),
+        int(max_bars),
+    )
+    out_index = np.empty(len(entries), dtype=np.int64)
+    out_code = np.empty(len(entries), dtype=np.int8)
+    out_peak = np.empty(len(entries))
+    kernel = _exit_loop if _backend(backend) == 'jit' else _exit_numpy
+    kernel(*arrays, out_index, out_code, out_peak)
+    return {'exit_index': out_index, 'code': out_code, 'peak': out_peak}
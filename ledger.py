@@ -0,0 +1,790 @@
+# -*- coding: utf-8 -*-
+"""
+modules/ledger.py - 거래 원장 (SQLite WAL, trades / fills / decisions)
+
+거래 기록이 trade_history.json(PositionManager), trade_analysis_*.csv(DataCollector, 진입 행만 있음),
+trade_log.csv, trade_log_*.txt, performance_*.csv로 흩어져 있음
+→ 분석마다 파일 전체를 다시 파싱, 청산 컬럼은 항상 빈 칸
+→ 파일 하나(logs/trades.db)에 거래 1건 = trades 행 1개, 진입 때 만들고 청산 때 trade_id로 같은 행 갱신
+
+테이블
+- trades: 거래 1건 (컬럼 이름은 TRADE_COLUMNS 그대로 - 기존 분석 코드가 같은 DataFrame을 받음)
+  + status(OPEN/CLOSED/UNKNOWN), symbol, exit_time, exit_kind(사유 코드 SL/TP/TS/DSL/PG/SEQ), source
+- fills: 체결 (진입/청산, trade_id 인덱스)
+- decisions: 진입/청산 판단 기록 (시각 인덱스)
+- performance: 일별 성과 (가져온 performance_*.csv)
+
+쓰기 두 종류 (같은 trade_id에 순서와 상관없이 합쳐짐)
+- record_trade: 주어진 값으로 덮어씀 (PositionManager - 체결가/수량/손익의 기준)
+- annotate_trade: 빈 칸만 채움 (DataCollector - 진입/청산 시점 지표, 사이드카 프로세스에서 따로 기록)
+
+틱 경로에서는 큐에 넣기만 → 백그라운드 스레드가 flush_interval마다 한 트랜잭션으로 기록
+읽기(stats, trades_frame ...)는 대기 중인 쓰기를 먼저 반영하고 인덱스 쿼리
+WAL이라 사이드카/분석 스크립트가 같은 파일을 동시에 읽어도 기록을 막지 않음
+
+기존 파일 가져오기: 원장이 비어 있고 가져온 적도 없으면 처음 열 때 자동 (legacy_root), 수동은 봇을 멈춘 상태에서:
+    python -m modules.ledger import                      # ., logs/, logs/collected_data/ 자동 탐색
+    python -m modules.ledger import trade_history.json trade_log.csv --db logs/trades.db
+    python -m modules.ledger stats
+"""
+
+import csv
+import json
+import re
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+from .logger import get_logger
+
+log = get_logger('ledger')
+
+TRADE_COLUMNS = [
+    'trade_id', 'timestamp', 'type', 'mode', 'action',
+    'entry_price', 'exit_price', 'stop_loss', 'take_profit',
+    'position_size', 'leverage', 'pnl', 'pnl_pct',
+    'entry_rsi', 'entry_bb_pct', 'entry_trend',
+    'entry_volume_ratio', 'entry_fvg',
+    'exit_reason', 'exit_rsi', 'exit_bb_pct',
+    'duration_seconds', 'max_profit', 'max_loss',
+    'market_regime', 'volatility_state',
+    'notes', 'strategy_version'
+]
+LEDGER_COLUMNS = ['status', 'symbol', 'exit_time', 'exit_kind', 'source']
+
+_TEXT_COLUMNS = {'timestamp', 'type', 'mode', 'action', 'entry_trend', 'entry_fvg', 'exit_reason',
+                 'market_regime', 'volatility_state', 'notes', 'strategy_version'} | set(LEDGER_COLUMNS)
+_TRADE_FIELDS = set(TRADE_COLUMNS) | set(LEDGER_COLUMNS)
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS trades (
+    trade_id INTEGER PRIMARY KEY,
+    {', '.join(f"{c} {'TEXT' if c in _TEXT_COLUMNS else 'REAL'}" for c in TRADE_COLUMNS[1:] + LEDGER_COLUMNS)}
+);
+CREATE INDEX IF NOT EXISTS trades_status ON trades(status, pnl_pct);
+CREATE INDEX IF NOT EXISTS trades_entry_time ON trades(timestamp);
+CREATE INDEX IF NOT EXISTS trades_exit_time ON trades(exit_time);
+CREATE INDEX IF NOT EXISTS trades_side_mode ON trades(type, mode);
+CREATE INDEX IF NOT EXISTS trades_natural ON trades(type, COALESCE(timestamp, exit_time));
+
+CREATE TABLE IF NOT EXISTS fills (
+    id INTEGER PRIMARY KEY,
+    trade_id INTEGER,
+    time TEXT,
+    side TEXT,
+    action TEXT,
+    price REAL,
+    size REAL,
+    fee REAL,
+    source TEXT,
+    UNIQUE(trade_id, action, time)
+);
+CREATE INDEX IF NOT EXISTS fills_trade ON fills(trade_id);
+
+CREATE TABLE IF NOT EXISTS decisions (
+    id INTEGER PRIMARY KEY,
+    time TEXT,
+    side TEXT,
+    action TEXT,
+    mode TEXT,
+    price REAL,
+    reason TEXT,
+    trade_id INTEGER,
+    source TEXT,
+    UNIQUE(time, side, action)
+);
+CREATE INDEX IF NOT EXISTS decisions_time ON decisions(time);
+
+CREATE TABLE IF NOT EXISTS performance (
+    date TEXT PRIMARY KEY,
+    total_return REAL,
+    win_rate REAL,
+    profit_factor REAL,
+    avg_trade REAL,
+    max_drawdown REAL,
+    trades_count INTEGER,
+    notes TEXT,
+    source TEXT
+);
+
+CREATE TABLE IF NOT EXISTS imports (
+    path TEXT PRIMARY KEY,
+    kind TEXT,
+    size INTEGER,
+    mtime REAL,
+    rows INTEGER,
+    imported_at TEXT
+);
+"""
+
+_FILL_SQL = ("INSERT OR IGNORE INTO fills (trade_id, time, side, action, price, size, fee, source) "
+             "VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+_DECISION_SQL = ("INSERT OR IGNORE INTO decisions (time, side, action, mode, price, reason, trade_id, source) "
+                 "VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+
+
+_EXIT_KIND = re.compile(r"^[A-Z]+\b")
+
+
+def exit_kind(reason):
+    """청산 사유 문자열 → 코드 ('TS (드래그 스탑 ...)' → 'TS', 'DSL (동적 손절)' → 'DSL', 코드 없으면 None)"""
+    match = _EXIT_KIND.match(str(reason)) if reason else None
+    return match.group(0) if match else None
+
+
+def _iso(value):
+    """datetime/문자열 → ISO 문자열 (None 유지)"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _clean(value):
+    """NaN/numpy 스칼라 → sqlite 값"""
+    if value is None:
+        return None
+    if hasattr(value, 'item'):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+class TradeLedger:
+    """SQLite(WAL) 거래 원장 - 쓰기는 큐 + 백그라운드 일괄 기록, 읽기는 인덱스 쿼리"""
+
+    def __init__(self, path="logs/trades.db", batch_size=64, flush_interval=1.0, symbol=None, timeout=5.0,
+                 legacy_root=None):
+        """
+        Args:
+            path: 원장 파일 (WAL이라 -wal/-shm 파일이 옆에 생김)
+            batch_size: 대기 쓰기가 이만큼 쌓이면 즉시 기록 (스레드 없으면 호출 스레드에서)
+            flush_interval: 백그라운드 기록 주기 (초)
+            symbol: trades.symbol 기본값
+            timeout: 다른 프로세스가 쓰는 중일 때 대기 (초, busy_timeout)
+            legacy_root: 원장이 비어 있으면 이 폴더의 기존 거래 파일을 가져옴 (None이면 안 함)
+                → 원장으로 바꾼 첫 실행에서 get_stats가 trade_history.json 거래를 잃지 않음
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.symbol = symbol
+        self.conn = sqlite3.connect(str(self.path), timeout=timeout, isolation_level=None,
+                                    check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.pending = []
+        self.lock = threading.Lock()            # pending
+        self.db_lock = threading.Lock()         # 연결 (쓰기 스레드 ↔ 읽기)
+        self.wakeup = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = None
+        self.writes = 0
+        self.errors = 0
+        self._sql = {}
+        self._stats = None
+        self._stats_key = None
+        if legacy_root is not None:
+            self._import_if_empty(legacy_root)
+
+    def _import_if_empty(self, root):
+        """거래도 가져오기 기록도 없는 새 원장이면 discover_legacy(root) 파일 가져오기"""
+        if self.conn.execute("SELECT EXISTS(SELECT 1 FROM trades) OR EXISTS(SELECT 1 FROM imports)").fetchone()[0]:
+            return
+        paths = discover_legacy(root)
+        if not paths:
+            return
+        ok, msg = import_legacy(self, paths)
+        (log.info if ok else log.warning)("기존 거래 파일 가져오기: %s", msg)
+
+    # ------------------------------------------------------------------ 백그라운드 기록
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self._run, name="ledger-writer", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while not self.stopped.is_set():
+            self.wakeup.wait(timeout=self.flush_interval)
+            self.wakeup.clear()
+            self.flush()
+        self.flush()
+
+    def stop(self):
+        self.stopped.set()
+        self.wakeup.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+        self.flush()
+
+    def close(self):
+        self.stop()
+        with self.db_lock:
+            self.conn.close()
+
+    def _enqueue(self, sql, params):
+        with self.lock:
+            self.pending.append((sql, params))
+            full = len(self.pending) >= self.batch_size
+        if full:
+            if self.thread and self.thread.is_alive():
+                self.wakeup.set()
+            else:
+                self.flush()
+
+    def flush(self):
+        """대기 중인 쓰기를 한 트랜잭션으로 기록 → 기록한 문장 수"""
+        with self.lock:
+            ops, self.pending = self.pending, []
+        if not ops:
+            return 0
+        with self.db_lock:
+            try:
+                self._execute(ops)
+            except sqlite3.Error as e:
+                # 한 문장 때문에 묶음 전체를 잃지 않도록 하나씩 다시
+                log.warning("원장 일괄 기록 실패 (%d건, 개별 재시도): %s", len(ops), e)
+                for op in ops:
+                    try:
+                        self._execute([op])
+                    except sqlite3.Error as e:
+                        self.errors += 1
+                        log.warning("원장 기록 실패: %s | %s", e, op[1])
+            self.writes += len(ops)
+        return len(ops)
+
+    def _execute(self, ops):
+        """같은 문장이 이어지는 구간은 executemany (순서 유지)"""
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            i = 0
+            while i < len(ops):
+                sql = ops[i][0]
+                j = i + 1
+                while j < len(ops) and ops[j][0] == sql:
+                    j += 1
+                conn.executemany(sql, [params for _, params in ops[i:j]])
+                i = j
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    # ------------------------------------------------------------------ 쓰기 (틱 경로 - 큐만)
+
+    def _upsert_sql(self, columns, overwrite):
+        """trade_id 기준 병합 문장 (컬럼 조합별 캐시)"""
+        key = (columns, overwrite)
+        sql = self._sql.get(key)
+        if sql is None:
+            if overwrite:
+                merge = ", ".join(f"{c} = COALESCE(excluded.{c}, trades.{c})" for c in columns[1:])
+            else:
+                merge = ", ".join(f"{c} = COALESCE(trades.{c}, excluded.{c})" for c in columns[1:])
+            sql = (f"INSERT INTO trades ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+                   f"ON CONFLICT(trade_id) DO " + (f"UPDATE SET {merge}" if merge else "NOTHING"))
+            self._sql[key] = sql
+        return sql
+
+    def _trade(self, trade_id, fields, overwrite):
+        fields = {k: v for k, v in fields.items() if k in _TRADE_FIELDS and k != 'trade_id' and v is not None}
+        if 'exit_reason' in fields and 'exit_kind' not in fields:
+            fields['exit_kind'] = exit_kind(fields['exit_reason'])
+        if 'timestamp' in fields:
+            fields['timestamp'] = _iso(fields['timestamp'])
+        if 'exit_time' in fields:
+            fields['exit_time'] = _iso(fields['exit_time'])
+        columns = ('trade_id',) + tuple(sorted(fields))
+        self._enqueue(self._upsert_sql(columns, overwrite),
+                      (int(trade_id),) + tuple(_clean(fields[c]) for c in columns[1:]))
+
+    def record_trade(self, trade_id, **fields):
+        """거래 행 기록 (주어진 값으로 덮어씀, None은 무시)"""
+        self._trade(trade_id, fields, overwrite=True)
+
+    def annotate_trade(self, trade_id, **fields):
+        """거래 행의 빈 칸만 채움 (분석 지표 - 체결 기록을 덮지 않음)"""
+        self._trade(trade_id, fields, overwrite=False)
+
+    def record_fill(self, trade_id, side, action, price, size, fee=None, time=None, source='live'):
+        self._enqueue(_FILL_SQL, (trade_id, _iso(time or datetime.now()), side, action,
+                                  _clean(price), _clean(size), _clean(fee), source))
+
+    def record_decision(self, side, action, reason='', mode=None, price=None, trade_id=None, time=None,
+                        source='live'):
+        """진입/청산 판단 (action: entry / entry_failed / exit / exit_failed ...)"""
+        self._enqueue(_DECISION_SQL, (_iso(time or datetime.now()), side, action, mode, _clean(price),
+                                      reason, trade_id, source))
+
+    def open_trade(self, trade_id, side, price, size, mode=None, sl=None, tp=None, time=None, source='live'):
+        """진입: trades 행 생성 (OPEN) + 진입 체결"""
+        time = time or datetime.now()
+        self.record_trade(trade_id, status='OPEN', symbol=self.symbol, timestamp=time, type=side, mode=mode,
+                          entry_price=price, position_size=size, stop_loss=sl, take_profit=tp, source=source)
+        self.record_fill(trade_id, side, 'entry', price, size, time=time, source=source)
+
+    def close_trade(self, trade_id, side, entry_price, exit_price, size, reason='', entry_time=None, time=None,
+                    source='live'):
+        """청산: 같은 trade_id 행을 CLOSED로 갱신 (손익/보유 시간 계산) + 청산 체결"""
+        time = time or datetime.now()
+        direction = 1 if side == 'LONG' else -1
+        pnl_pct = (exit_price / entry_price - 1) * 100 * direction if entry_price else None
+        pnl = (exit_price - entry_price) * size * direction if entry_price and size else None
+        duration = (time - entry_time).total_seconds() if isinstance(entry_time, datetime) else None
+        self.record_trade(trade_id, status='CLOSED', type=side, entry_price=entry_price, exit_price=exit_price,
+                          position_size=size, pnl=pnl, pnl_pct=pnl_pct, exit_reason=reason, exit_time=time,
+                          duration_seconds=duration)
+        self.record_fill(trade_id, side, 'exit', exit_price, size, time=time, source=source)
+        return pnl_pct
+
+    # ------------------------------------------------------------------ 읽기 (대기 쓰기 반영 후)
+
+    def query(self, sql, params=()):
+        self.flush()
+        with self.db_lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def last_trade_id(self):
+        return self.query("SELECT COALESCE(MAX(trade_id), 0) FROM trades")[0][0]
+
+    def open_trades(self):
+        rows = self.query("SELECT trade_id, type, entry_price, position_size, timestamp FROM trades "
+                          "WHERE status = 'OPEN' ORDER BY trade_id")
+        return [dict(zip(('trade_id', 'side', 'entry_price', 'size', 'time'), row)) for row in rows]
+
+    def stats(self):
+        """PositionManager.get_stats와 같은 키 (trades_status 인덱스만 읽음, 변경 없으면 캐시)"""
+        self.flush()
+        with self.db_lock:
+            # 다른 프로세스(사이드카)의 커밋은 data_version, 이 연결의 커밋은 writes로 감지
+            key = (self.conn.execute("PRAGMA data_version").fetchone()[0], self.writes)
+            if key == self._stats_key:
+                return dict(self._stats)
+            total = self.conn.execute("SELECT COUNT(*) FROM trades").fetchone()[0]
+            closed, wins, total_pnl = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(pnl_pct > 0), 0), COALESCE(SUM(pnl_pct), 0) "
+                "FROM trades WHERE status = 'CLOSED'").fetchone()
+        self._stats = {
+            'total_trades': total,
+            'closed_trades': closed,
+            'wins': wins,
+            'losses': closed - wins,
+            'win_rate': wins / closed * 100 if closed else 0,
+            'total_pnl_pct': total_pnl
+        }
+        self._stats_key = key
+        return dict(self._stats)
+
+    def trades_frame(self, status='CLOSED', since=None, until=None, columns=None, reason_codes=False, ordered=True):
+        """
+        거래 DataFrame (trade_analysis_*.csv와 같은 컬럼)
+
+        Args:
+            status: 'CLOSED' / 'OPEN' / None(전체)
+            since, until: 진입 시각 범위 (datetime/ISO, trades_entry_time 인덱스)
+            columns: 읽을 컬럼 (기본 TRADE_COLUMNS)
+            reason_codes: True면 exit_reason 대신 사유 코드 (SL/TP/TS/DSL/PG/SEQ - 분석 집계용)
+            ordered: False면 진입 시각 정렬 생략 (집계만 하는 경우 - 10만 행 기준 조회 시간의 약 40%)
+        """
+        columns = list(columns or TRADE_COLUMNS)
+        select = [("COALESCE(exit_kind, exit_reason) AS exit_reason" if c == 'exit_reason' and reason_codes else c)
+                  for c in columns]
+        where, params = [], []
+        if status is not None:
+            # 거의 모든 행이 CLOSED → trades_status 인덱스로 찾으면 행마다 테이블 재조회 (전체 스캔의 2배)
+            # '+'로 인덱스 제외: 기간 조건이 있으면 trades_entry_time, 없으면 전체 스캔
+            where.append("+status = ?")
+            params.append(status)
+        if since is not None:
+            where.append("timestamp >= ?")
+            params.append(_iso(since))
+        if until is not None:
+            where.append("timestamp < ?")
+            params.append(_iso(until))
+        sql = f"SELECT {', '.join(select)} FROM trades"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        if ordered:
+            sql += " ORDER BY timestamp"
+        self.flush()
+        with self.db_lock:
+            return pd.read_sql_query(sql, self.conn, params=params)
+
+    def daily_performance(self, date):
+        """
+        하루 성과 (진입 시각 기준, DataCollector.analyze_daily_performance와 같은 키)
+
+        Returns:
+            dict 또는 None (그날 청산된 거래 없음)
+        """
+        day = datetime.strptime(str(date), '%Y-%m-%d')
+        rows = self.query(
+            "SELECT COUNT(*), SUM(pnl > 0), SUM(pnl <= 0), SUM(pnl), AVG(pnl), MAX(pnl), MIN(pnl), "
+            "SUM(UPPER(mode) = 'TREND'), SUM(UPPER(mode) = 'REVERSAL') "
+            "FROM trades WHERE status = 'CLOSED' AND timestamp >= ? AND timestamp < ?",
+            (day.isoformat(), (day + timedelta(days=1)).isoformat()))
+        count, wins, losses, total, avg, best, worst, trend, reversal = rows[0]
+        if not count:
+            return None
+        return {
+            'date': str(date),
+            'total_trades': count,
+            'winning_trades': wins or 0,
+            'losing_trades': losses or 0,
+            'total_pnl': total,
+            'avg_pnl': avg,
+            'best_trade': best,
+            'worst_trade': worst,
+            'trend_trades': trend or 0,
+            'reversal_trades': reversal or 0
+        }
+
+    def counts(self):
+        """테이블별 행 수"""
+        return {table: self.query(f"SELECT COUNT(*) FROM {table}")[0][0]
+                for table in ('trades', 'fills', 'decisions', 'performance')}
+
+
+# ---------------------------------------------------------------------- 기존 파일 가져오기
+
+def _parse_time(value):
+    """'2026-02-09 00:29:55' / ISO → datetime (실패 시 None)"""
+    try:
+        return datetime.fromisoformat(str(value).strip())
+    except ValueError:
+        return None
+
+
+def _float(value):
+    try:
+        value = float(str(value).strip().rstrip('%'))
+    except (TypeError, ValueError):
+        return None
+    return value if value == value else None
+
+
+def _insert_trade(conn, fields):
+    """가져온 거래 1건 (trade_id 없으면 새 번호, 같은 방향·시각 거래가 이미 있으면 건너뜀)"""
+    fields = {k: _clean(v) for k, v in fields.items() if k in _TRADE_FIELDS and _clean(v) is not None}
+    if fields.get('exit_reason') and 'exit_kind' not in fields:
+        fields['exit_kind'] = exit_kind(fields['exit_reason'])
+    key = fields.get('timestamp') or fields.get('exit_time')
+    if key is not None and conn.execute("SELECT 1 FROM trades WHERE type = ? AND COALESCE(timestamp, exit_time) = ?",
+                                        (fields.get('type'), key)).fetchone():
+        return None
+    columns = sorted(fields)
+    cursor = conn.execute(f"INSERT OR IGNORE INTO trades ({', '.join(columns)}) "
+                          f"VALUES ({', '.join('?' * len(columns))})", [fields[c] for c in columns])
+    return cursor.lastrowid if cursor.rowcount else None
+
+
+def import_trade_history(conn, path):
+    """
+    trade_history.json (PositionManager) → trades + fills
+
+    진입 기록과 이어지는 같은 방향 청산 기록을 한 거래로 묶음
+    진입 기록 없는 청산(재시작 후 거래소에서 불러온 포지션)도 CLOSED 거래로, 청산 없는 진입은 UNKNOWN
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        history = json.load(f).get('trade_history', [])
+    source = Path(path).name
+    trades = []
+    pending = {}
+    for record in history:
+        side = record.get('side')
+        if record.get('type') == 'entry':
+            if side in pending:
+                trades.append((pending.pop(side), None))
+            pending[side] = record
+        elif record.get('type') == 'exit':
+            trades.append((pending.pop(side, None), record))
+    trades += [(entry, None) for entry in pending.values()]
+
+    written = 0
+    for entry, exit_ in trades:
+        side = (entry or exit_)['side']
+        fields = {'type': side, 'source': source, 'status': 'CLOSED' if exit_ else 'UNKNOWN',
+                  'trade_id': (exit_ or entry).get('trade_id')}
+        if entry:
+            fields.update(timestamp=entry.get('time'), entry_price=entry.get('price'), position_size=entry.get('size'),
+                          mode=entry.get('mode'), stop_loss=entry.get('sl'), take_profit=entry.get('tp'))
+        if exit_:
+            direction = 1 if side == 'LONG' else -1
+            entry_price, exit_price, size = exit_.get('entry_price'), exit_.get('exit_price'), exit_.get('size')
+            fields.update(exit_time=exit_.get('time'), exit_price=exit_price, pnl_pct=exit_.get('pnl_pct'),
+                          exit_reason=exit_.get('reason'))
+            fields['entry_price'] = fields.get('entry_price') or entry_price
+            fields['position_size'] = fields.get('position_size') or size
+            fields['mode'] = fields.get('mode') or exit_.get('mode')
+            if entry_price and exit_price and size:
+                fields['pnl'] = (exit_price - entry_price) * size * direction
+            start, end = _parse_time(fields.get('timestamp')), _parse_time(exit_.get('time'))
+            if start and end:
+                fields['duration_seconds'] = (end - start).total_seconds()
+        trade_id = _insert_trade(conn, fields)
+        if trade_id is None:
+            continue
+        written += 1
+        if entry:
+            conn.execute(_FILL_SQL, (trade_id, entry.get('time'), side, 'entry', entry.get('price'),
+                                     entry.get('size'), None, source))
+        if exit_:
+            conn.execute(_FILL_SQL, (trade_id, exit_.get('time'), side, 'exit', exit_.get('exit_price'),
+                                     exit_.get('size'), None, source))
+    return written
+
+
+def import_trade_analysis(conn, path, tolerance=120):
+    """
+    trade_analysis_*.csv (DataCollector) → 같은 방향·tolerance초 이내 진입 거래의 빈 칸 채우기
+
+    CSV trade_id는 진입 전 카운터 기준이라 어긋남 → 시각으로 맞춤, 맞는 거래가 없으면 UNKNOWN 거래로 추가
+    """
+    df = pd.read_csv(path)
+    source = Path(path).name
+    written = 0
+    for row in df.to_dict('records'):
+        fields = {k: v for k, v in row.items() if k in _TRADE_FIELDS and k not in ('trade_id', 'action')}
+        start = _parse_time(row.get('timestamp'))
+        match = None
+        if start is not None:
+            match = conn.execute(
+                "SELECT trade_id FROM trades WHERE type = ? AND timestamp BETWEEN ? AND ? "
+                "ORDER BY ABS(julianday(timestamp) - julianday(?)) LIMIT 1",
+                (row.get('type'), (start - timedelta(seconds=tolerance)).isoformat(),
+                 (start + timedelta(seconds=tolerance)).isoformat(), start.isoformat())).fetchone()
+        if match:
+            fields = {k: _clean(v) for k, v in fields.items() if k != 'timestamp' and _clean(v) is not None}
+            if fields:
+                columns = sorted(fields)
+                conn.execute(f"UPDATE trades SET {', '.join(f'{c} = COALESCE({c}, ?)' for c in columns)} "
+                             f"WHERE trade_id = ?", [fields[c] for c in columns] + [match[0]])
+            written += 1
+        else:
+            fields.update(status='CLOSED' if _float(row.get('pnl_pct')) is not None else 'UNKNOWN',
+                          source=source)
+            written += _insert_trade(conn, fields) is not None
+    return written
+
+
+def import_trade_log(conn, path):
+    """trade_log.csv (Time,Type,Price,...,Profit,...,Note) → OPEN_x/CLOSE_x 쌍을 거래로 + 체결"""
+    source = Path(path).name
+    written = 0
+    pending = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            action, _, side = (row.get('Type') or '').partition('_')
+            time = _parse_time(row.get('Time'))
+            price = _float(row.get('Price'))
+            if time is None or price is None or side not in ('LONG', 'SHORT'):
+                continue
+            if action == 'OPEN':
+                pending[side] = (time, price, row)
+            elif action == 'CLOSE':
+                open_ = pending.pop(side, None)
+                entry_time, entry_price = (open_[0], open_[1]) if open_ else (None, _float(row.get('AvgPrice')))
+                direction = 1 if side == 'LONG' else -1
+                trade_id = _insert_trade(conn, {
+                    'type': side, 'status': 'CLOSED', 'source': source,
+                    'timestamp': entry_time.isoformat() if entry_time else None,
+                    'exit_time': time.isoformat(), 'entry_price': entry_price, 'exit_price': price,
+                    'pnl': _float(row.get('Profit')),
+                    'pnl_pct': (price / entry_price - 1) * 100 * direction if entry_price else None,
+                    'exit_reason': row.get('Note'), 'notes': open_[2].get('Note') if open_ else None,
+                    'duration_seconds': (time - entry_time).total_seconds() if entry_time else None,
+                })
+                if trade_id is None:
+                    continue
+                written += 1
+                if open_:
+                    conn.execute(_FILL_SQL, (trade_id, entry_time.isoformat(), side, 'entry', entry_price,
+                                             None, None, source))
+                conn.execute(_FILL_SQL, (trade_id, time.isoformat(), side, 'exit', price, None, None, source))
+    return written
+
+
+_TXT_LINE = re.compile(r"^\[(\d{2}):(\d{2}):(\d{2})\]\s*(.*)$")
+_TXT_ENTRY = re.compile(r"(롱|숏) 진입!(?:\s*\[(\w+) MODE\])?")
+_TXT_EXIT = re.compile(r"청산!\s*(.+?)\s*\|\s*수익률:\s*([+-]?[\d.]+)%")
+_TXT_PRICE = re.compile(r"^가격:\s*\$([\d.,]+)")
+_TXT_REASON = re.compile(r"^사유:\s*(.+)$")
+
+
+def import_text_log(conn, path):
+    """
+    trade_log_YYYYMMDD.txt (콘솔 로그) → decisions
+
+    '롱/숏 진입! [MODE]' 뒤 '가격:'/'사유:' 줄, '청산! 사유 | 수익률: x%' 줄만 읽음 (날짜는 파일 이름, 자정 넘김 처리)
+    """
+    path = Path(path)
+    match = re.search(r"(\d{8})", path.name)
+    day = datetime.strptime(match.group(1), '%Y%m%d') if match else datetime.fromtimestamp(path.stat().st_mtime)
+    day = day.replace(hour=0, minute=0, second=0, microsecond=0)
+    source = path.name
+    decisions = []
+    last = None
+    side = None
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            parsed = _TXT_LINE.match(line.strip())
+            if not parsed:
+                continue
+            hh, mm, ss, text = parsed.groups()
+            time = day + timedelta(hours=int(hh), minutes=int(mm), seconds=int(ss))
+            if last is not None and time < last:
+                day += timedelta(days=1)
+                time += timedelta(days=1)
+            last = time
+            text = text.strip()
+            entry = _TXT_ENTRY.search(text)
+            if entry:
+                side = 'LONG' if entry.group(1) == '롱' else 'SHORT'
+                decisions.append({'time': time, 'side': side, 'action': 'entry', 'mode': entry.group(2),
+                                  'price': None, 'reason': None})
+                continue
+            exit_ = _TXT_EXIT.search(text)
+            if exit_:
+                decisions.append({'time': time, 'side': side, 'action': 'exit', 'mode': None,
+                                  'price': None, 'reason': f"{exit_.group(1)} ({exit_.group(2)}%)"})
+                continue
+            if decisions and decisions[-1]['action'] == 'entry':
+                price, reason = _TXT_PRICE.match(text), _TXT_REASON.match(text)
+                if price and decisions[-1]['price'] is None:
+                    decisions[-1]['price'] = _float(price.group(1).replace(',', ''))
+                elif reason and decisions[-1]['reason'] is None:
+                    decisions[-1]['reason'] = reason.group(1)
+    written = 0
+    for d in decisions:
+        cursor = conn.execute(_DECISION_SQL, (d['time'].isoformat(), d['side'], d['action'], d['mode'],
+                                              d['price'], d['reason'], None, source))
+        written += cursor.rowcount
+    return written
+
+
+def import_performance(conn, path):
+    """performance_*.csv → performance (같은 날짜는 교체)"""
+    source = Path(path).name
+    written = 0
+    with open(path, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            if not row.get('date'):
+                continue
+            conn.execute("INSERT OR REPLACE INTO performance VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                         (row['date'], _float(row.get('total_return')), _float(row.get('win_rate')),
+                          _float(row.get('profit_factor')), _float(row.get('avg_trade')),
+                          _float(row.get('max_drawdown')), _float(row.get('trades_count')),
+                          row.get('notes') or None, source))
+            written += 1
+    return written
+
+
+# (kind, 파일 이름 패턴, 가져오기 함수) - 거래 분석 CSV는 거래 행이 먼저 있어야 맞출 수 있음
+IMPORTERS = (
+    ('trade_history', re.compile(r"^trade_history.*\.json$"), import_trade_history),
+    ('trade_log', re.compile(r"^trade_log.*\.csv$"), import_trade_log),
+    ('trade_analysis', re.compile(r"^trade_analysis_.*\.csv$"), import_trade_analysis),
+    ('performance', re.compile(r"^performance_.*\.csv$"), import_performance),
+    ('text_log', re.compile(r"^trade_log_.*\.txt$"), import_text_log),
+)
+
+
+def _importer(path):
+    for kind, pattern, func in IMPORTERS:
+        if pattern.match(Path(path).name):
+            return kind, func
+    return None, None
+
+
+def discover_legacy(root="."):
+    """root, root/logs, root/logs/collected_data의 기존 거래 파일 (IMPORTERS 순서)"""
+    root = Path(root)
+    found = []
+    for folder in (root, root / "logs", root / "logs" / "collected_data"):
+        if folder.is_dir():
+            found += [p for p in sorted(folder.iterdir()) if p.is_file() and _importer(p)[0]]
+    order = {kind: i for i, (kind, _, _) in enumerate(IMPORTERS)}
+    return sorted(found, key=lambda p: order[_importer(p)[0]])
+
+
+def import_legacy(ledger, paths, force=False):
+    """
+    기존 거래 파일 → 원장 (파일마다 한 트랜잭션, 바뀌지 않은 파일은 다시 읽지 않음)
+
+    Returns:
+        (bool, str): (성공 여부, 메시지)
+    """
+    ledger.flush()
+    results = []
+    failed = 0
+    with ledger.db_lock:
+        conn = ledger.conn
+        for path in paths:
+            path = Path(path)
+            kind, func = _importer(path)
+            if func is None or not path.exists():
+                results.append(f"{path.name}: 건너뜀")
+                continue
+            stat = path.stat()
+            key = str(path.resolve())
+            done = conn.execute("SELECT size, mtime FROM imports WHERE path = ?", (key,)).fetchone()
+            if not force and done == (stat.st_size, stat.st_mtime):
+                results.append(f"{path.name}: 변경 없음")
+                continue
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = func(conn, path)
+                conn.execute("INSERT OR REPLACE INTO imports VALUES (?, ?, ?, ?, ?, ?)",
+                             (key, kind, stat.st_size, stat.st_mtime, rows, datetime.now().isoformat()))
+                conn.execute("COMMIT")
+                results.append(f"{path.name}: {rows}건")
+            except Exception as e:
+                conn.execute("ROLLBACK")
+                failed += 1
+                results.append(f"{path.name}: 실패 ({e})")
+        ledger.writes += 1                     # stats 캐시 무효화
+    return failed == 0, " | ".join(results) if results else "가져올 파일 없음"
+
+
+def main(argv=None):
+    """
+    CLI:
+        python -m modules.ledger import [파일 ...] [--root .] [--db logs/trades.db] [--force]
+        python -m modules.ledger stats [--db logs/trades.db]
+    """
+    import argparse
+    parser = argparse.ArgumentParser(description="거래 원장 (SQLite) 가져오기/조회")
+    parser.add_argument('--db', default="logs/trades.db")
+    sub = parser.add_subparsers(dest='command', required=True)
+    imp = sub.add_parser('import', help="기존 거래 파일 → 원장")
+    imp.add_argument('paths', nargs='*')
+    imp.add_argument('--root', default=".")
+    imp.add_argument('--force', action='store_true', help="이미 가져온 파일도 다시")
+    sub.add_parser('stats', help="거래 통계 / 테이블 행 수")
+    args = parser.parse_args(argv)
+
+    ledger = TradeLedger(args.db)
+    try:
+        if args.command == 'import':
+            ok, msg = import_legacy(ledger, args.paths or discover_legacy(args.root), force=args.force)
+        else:
+            ok, msg = True, json.dumps(dict(ledger.stats(), **ledger.counts()), ensure_ascii=False)
+    finally:
+        ledger.close()
+    print(f"{'✅' if ok else '❌'} {msg}")
+    return ok
+
+
+if __name__ == "__main__":
+    main()
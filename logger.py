@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+modules/logger.py - 구조화 로깅 (레벨 + 백그라운드 기록 + 로테이션/압축 + 샘플링)
+
+- 호출 스레드는 LogRecord를 큐에 넣기만 함 (포맷/디스크 I/O는 writer 스레드)
+- 콘솔: 기존 "[HH:MM:SS] ✅ 메시지" 형식 유지
+- 파일: JSON Lines, 크기/일자 기준 로테이션 후 gzip 압축
+- 틱마다 반복되는 메시지는 sample_key 단위로 N초에 1회만 출력
+- 디버그 메시지는 %-포맷 인자로 넘겨서 레벨 비활성 시 포맷 비용 0
+"""
+
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+
+ROOT_LOGGER = 'lumi'
+
+_LEVEL_PREFIX = {
+    logging.DEBUG: '🔹',
+    logging.INFO: '✅',
+    logging.WARNING: '⚠️',
+    logging.ERROR: '❌',
+    logging.CRITICAL: '🚨',
+}
+
+# LogRecord 기본 속성 (extra 필드 추출용)
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener = None
+_lock = threading.Lock()
+
+
+def get_logger(name):
+    """모듈 로거 (lumi.<name>)"""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+class ConsoleFormatter(logging.Formatter):
+    """콘솔용: [HH:MM:SS] ✅ 메시지 (+N 생략)"""
+
+    def format(self, record):
+        ts = datetime.fromtimestamp(record.created).strftime("%H:%M:%S")
+        msg = record.getMessage()
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            msg += f" (+{suppressed}건 생략)"
+        line = f"[{ts}] {_LEVEL_PREFIX.get(record.levelno, '')} {msg}"
+        if record.exc_info:
+            line += '\n' + self.formatException(record.exc_info)
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """파일용: 한 줄 JSON (extra 필드 포함)"""
+
+    def format(self, record):
+        payload = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info:
+            payload['exc'] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    반복 메시지 샘플링
+
+    extra={'sample_key': 'tick_status'} 가 붙은 레코드는 키별로
+    interval초에 한 번만 통과, 생략된 개수는 다음 레코드에 기록
+    """
+
+    def __init__(self, interval=30.0):
+        super().__init__()
+        self.interval = interval
+        self.last_emit = {}
+        self.suppressed = {}
+
+    def filter(self, record):
+        key = getattr(record, 'sample_key', None)
+        if key is None or self.interval <= 0:
+            return True
+        now = record.created
+        if now - self.last_emit.get(key, 0) < self.interval:
+            self.suppressed[key] = self.suppressed.get(key, 0) + 1
+            return False
+        self.last_emit[key] = now
+        record.suppressed = self.suppressed.pop(key, 0)
+        return True
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """포맷을 writer 스레드로 미루는 QueueHandler (같은 프로세스 내 큐 전용)"""
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass  # 디스크가 밀려도 트레이딩 루프는 막지 않음
+
+
+class CompressingRotatingFileHandler(RotatingFileHandler):
+    """크기 또는 날짜 변경 시 로테이션 + gzip 압축"""
+
+    def __init__(self, filename, max_bytes=20 * 1024 * 1024, backup_count=10, daily=True):
+        os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+        self.daily = daily
+        self.current_day = time.strftime('%Y%m%d')
+        self.namer = lambda name: name + '.gz'
+        self.rotator = self._compress
+
+    @staticmethod
+    def _compress(source, dest):
+        with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(source)
+
+    def shouldRollover(self, record):
+        if self.daily and time.strftime('%Y%m%d') != self.current_day:
+            self.current_day = time.strftime('%Y%m%d')
+            return True
+        return super().shouldRollover(record)
+
+
+def setup_logging(level='INFO', log_file='logs/lumi_bot.jsonl', max_bytes=20 * 1024 * 1024,
+                  backup_count=10, daily=True, sample_interval=30.0, console=True):
+    """
+    로깅 초기화 (프로세스당 1회)
+
+    Returns:
+        logging.Logger: lumi 루트 로거
+    """
+    global _listener
+    root = logging.getLogger(ROOT_LOGGER)
+
+    with _lock:
+        if _listener is not None:
+            root.setLevel(level)
+            return root
+
+        handlers = []
+        if console:
+            stream = logging.StreamHandler(sys.stdout)
+            stream.setFormatter(ConsoleFormatter())
+            handlers.append(stream)
+        if log_file:
+            file_handler = CompressingRotatingFileHandler(log_file, max_bytes, backup_count, daily)
+            file_handler.setFormatter(JsonFormatter())
+            handlers.append(file_handler)
+
+        log_queue = queue.Queue(maxsize=10000)
+        queue_handler = _DeferredQueueHandler(log_queue)
+        queue_handler.addFilter(SamplingFilter(sample_interval))
+
+        root.handlers = [queue_handler]
+        root.setLevel(level)
+        root.propagate = False
+
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+
+    return root
+
+
+def shutdown_logging():
+    """큐에 남은 로그 기록 후 writer 스레드 종료"""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
@@ -36,12 +36,28 @@ from modules import (
     PositionManager,
     MarketDataProvider,
     TelegramNotifier,
+    MetricsServer,
+    ProfilingHooks,
+    StatusWriter,
+    StatusServer,
+    CVDAggregator,
+    AggTradeStream,
+    AggTradeReplay,
+    PositionReconciler,
+    RiskEngine,
+    TradeLedger,
+    metrics,
+    get_logger,
+    setup_logging,
+    shutdown_logging,
     safe_float
 )
 
+log = get_logger('main')
+
 # 데이터 수집 시스템 (있으면 로드)
 try:
-    from data_collector import DataCollector
+    from data_collector import DataCollector, CollectorFeed
     from self_learning import SelfLearningSystem
     DATA_COLLECTION_ENABLED = True
 except ImportError:
@@ -57,12 +73,62 @@ class TradingBot:
         # 모듈 초기화
         self.exchange_mgr = ExchangeManager(
             symbol=self.config['SYMBOL'],
-            leverage=self.config['LEVERAGE']
+            leverage=self.config['LEVERAGE'],
+            rate_limits={'weight_per_min': RATE_WEIGHT_PER_MIN, 'orders_per_min': RATE_ORDERS_PER_MIN,
+                         'orders_per_10s': RATE_ORDERS_PER_10S,
+                         'share': RATE_BUDGET_SHARE} if RATE_LIMIT_ENABLED else None,
+            io_policy={'max_retries': MAX_RETRIES, 'deadline': IO_RETRY_DEADLINE,
+                       'request_timeout': IO_REQUEST_TIMEOUT, 'backoff_base': IO_BACKOFF_BASE,
+                       'backoff_cap': IO_BACKOFF_CAP, 'failure_threshold': IO_CIRCUIT_FAILURES,
+                       'cooldown': IO_CIRCUIT_COOLDOWN, 'hedge': IO_HEDGE_ENABLED,
+                       'hedge_quantile': IO_HEDGE_QUANTILE,
+                       'hedge_budget': IO_HEDGE_BUDGET} if IO_POLICY_ENABLED else None
         )
         
         self.strategy = StrategyEngine(self.config)
-        self.position_mgr = PositionManager(history_file="logs/trade_history.json")
-        self.market_data = MarketDataProvider(symbol=self.config['SYMBOL'])
+        self.ledger = None
+        if LEDGER_ENABLED:
+            # 진입/청산/판단 기록 (틱 경로는 큐만, 기록은 원장 스레드)
+            self.ledger = TradeLedger(LEDGER_FILE, LEDGER_BATCH_SIZE, LEDGER_FLUSH_INTERVAL, symbol=SYMBOL,
+                                      legacy_root=LEDGER_LEGACY_ROOT)
+        self.position_mgr = PositionManager(history_file="logs/trade_history.json", ledger=self.ledger)
+        self.risk = None
+        if RISK_LIMITS_ENABLED:
+            self.risk = RiskEngine(MAX_DAILY_LOSS_PERCENT, MAX_CONSECUTIVE_LOSSES, POSITION_TIMEOUT_BARS,
+                                   streak_pause=RISK_STREAK_PAUSE_MINUTES * 60, fee_rate=TRADING_FEE_RATE,
+                                   latency_budget=RISK_LATENCY_BUDGET_US / 1e6)
+            self.risk.replay(self.position_mgr.trade_history)
+        self.market_data = MarketDataProvider(
+            symbol=self.config['SYMBOL'],
+            fvg_settings={'min_size_pct': FVG_MIN_SIZE_PCT, 'near_pct': FVG_NEAR_PCT, 'max_gaps': FVG_MAX_GAPS},
+            zone_settings={'swing_bars': ZONE_SWING_BARS, 'level_tolerance_pct': ZONE_LEVEL_TOLERANCE_PCT,
+                           'max_levels': ZONE_MAX_LEVELS, 'profile_bars': ZONE_PROFILE_BARS},
+            regime_settings={'adx_trend': REGIME_ADX_TREND, 'adx_range': REGIME_ADX_RANGE,
+                             'squeeze_enter': REGIME_SQUEEZE_ENTER, 'squeeze_exit': REGIME_SQUEEZE_EXIT,
+                             'vol_window': REGIME_VOL_WINDOW, 'vol_high': REGIME_VOL_HIGH,
+                             'vol_low': REGIME_VOL_LOW, 'vol_band': REGIME_VOL_BAND,
+                             'slope_bars': REGIME_SLOPE_BARS, 'slope_flat_pct': REGIME_SLOPE_FLAT_PCT,
+                             'mode_band': REGIME_MODE_BAND},
+            bus_role=CANDLE_BUS_ROLE, bus_capacity=CANDLE_BUS_CAPACITY, bus_max_age=CANDLE_BUS_MAX_AGE,
+            backfill_pages=CONTINUITY_BACKFILL_PAGES, backfill_page_limit=CONTINUITY_PAGE_LIMIT
+        )
+        self.strategy.fvg_index = self.market_data.fvg_index('5m')
+        self.regime = self.market_data.regime('5m')
+        if REGIME_ENABLED:
+            self.strategy.regime = self.regime
+        self.zone_engine = self.market_data.zone_engine('5m')
+        # 루프 지연/틱 시간만 바뀐 틱은 변경으로 치지 않음 (status.json 재기록/SSE 전송 안 함)
+        self.status = StatusWriter(STATUS_FILE, STATUS_MIN_INTERVAL, volatile=('last_update', 'loop'))
+        self.status_server = None
+        self.loop_lag = 0.0      # 예정 시각보다 늦게 시작한 시간 (초)
+        self.tick_seconds = 0.0  # 직전 틱 소요 시간 (초)
+        self.last_balance = 0.0
+        self.last_equity_retry = 0.0
+        self.exchange_mgr.on_balance = self._on_balance
+        self.cvd = CVDAggregator(TIMEFRAMES + [TF_15M], CVD_BUFFER_BARS) if CVD_TRADES_ENABLED else None
+        self.trade_stream = None
+        self.reconciler = None
+        self.last_price = None
         
         self.notifier = TelegramNotifier(
             self.config.get('TELEGRAM_BOT_TOKEN', ''),
@@ -80,11 +146,15 @@ class TradingBot:
         self.learner = None
         if DATA_COLLECTION_ENABLED:
             try:
-                self.data_collector = DataCollector()
-                self.learner = SelfLearningSystem()
-                print("✅ 데이터 수집 시스템 로드 완료")
+                if COLLECTOR_SIDECAR_ENABLED:
+                    # CSV 기록/자가 학습은 사이드카 프로세스 (여기서는 링 버퍼 복사만)
+                    self.data_collector = CollectorFeed(capacity=COLLECTOR_RING_CAPACITY)
+                else:
+                    self.data_collector = DataCollector()
+                    self.learner = SelfLearningSystem(ledger_file=LEDGER_FILE if LEDGER_ENABLED else None)
+                log.info("데이터 수집 시스템 로드 완료")
             except Exception as e:
-                print(f"⚠️ 데이터 수집 시스템 로드 실패: {e}")
+                log.warning("데이터 수집 시스템 로드 실패: %s", e)
         
         # 상태 변수
         self.last_check = 0
@@ -104,6 +174,13 @@ class TradingBot:
         self.last_exit_time = None
         self.last_exit_reason = None
         self.last_exit_pnl = 0
+        self.last_recorded_bar = None
+        
+        # 📈 지연시간 계측
+        metrics.enabled = METRICS_ENABLED
+        metrics.overhead_budget_pct = METRICS_OVERHEAD_BUDGET_PCT
+        self.metrics_server = None
+        self.profiling = None
     
     def _load_config(self):
         """설정값 로드"""
@@ -123,19 +200,38 @@ class TradingBot:
             'TF_RSI_MAX': TF_RSI_MAX,
             'TF_BB_PCT_MIN': TF_BB_PCT_MIN,
             'TF_BB_PCT_MAX': TF_BB_PCT_MAX,
+            'FVG_FILTER_ENABLED': FVG_FILTER_ENABLED,
             'TELEGRAM_BOT_TOKEN': TELEGRAM_BOT_TOKEN,
             'TELEGRAM_CHAT_ID': TELEGRAM_CHAT_ID,
             'CHECK_INTERVAL': CHECK_INTERVAL,
-            'REPORT_INTERVAL': REPORT_INTERVAL
+            'REPORT_INTERVAL': REPORT_INTERVAL,
+            'EXEC_SMART_ENABLED': EXEC_SMART_ENABLED,
+            'EXEC_DEPTH_LIMIT': EXEC_DEPTH_LIMIT,
+            'EXEC_MAX_IMPACT_BPS': EXEC_MAX_IMPACT_BPS,
+            'EXEC_ALGO': EXEC_ALGO,
+            'EXEC_MAX_SLICES': EXEC_MAX_SLICES,
+            'EXEC_SLICE_INTERVAL': EXEC_SLICE_INTERVAL,
+            'EXEC_CHASE_MAX_BPS': EXEC_CHASE_MAX_BPS,
+            'EXEC_MAX_DURATION': EXEC_MAX_DURATION,
+            'EXEC_MIN_SLICE_USDT': EXEC_MIN_SLICE_USDT,
+            'EXEC_SLIPPAGE_FILE': EXEC_SLIPPAGE_FILE
         }
     
-    def log(self, msg, telegram=False, error=False):
-        """로그 출력"""
-        ts = datetime.now().strftime("%H:%M:%S")
-        prefix = "❌" if error else "✅"
-        print(f"[{ts}] {prefix} {msg}")
+    def log(self, msg, *args, telegram=False, error=False, sample=None):
+        """
+        로그 출력
+        
+        args: %-포맷 인자 (샘플링으로 생략되면 포맷하지 않음)
+        sample: 틱마다 반복되는 메시지 키 (LOG_SAMPLE_SECONDS에 1회만 출력)
+        """
+        if error:
+            log.error(msg, *args)
+        elif sample:
+            log.info(msg, *args, extra={'sample_key': sample})
+        else:
+            log.info(msg, *args)
         if telegram:
-            self.notifier.send(msg)
+            self.notifier.send(msg % args if args else msg)
     
     def connect(self):
         """거래소 연결 - 포지션 확인 강화"""
@@ -150,18 +246,24 @@ class TradingBot:
         existing = self.exchange_mgr.get_positions()
         
         if existing:
+            # 실제 진입 시각 (체결 내역 기준)
+            existing['entry_time'] = self.exchange_mgr.get_entry_time(existing)
             self.position_mgr.load_from_exchange(existing)
-        
-        if existing:
-            self.position_mgr.load_from_exchange(existing)
+            if self.risk:
+                held = datetime.now() - self.position_mgr.entry_time
+                self.risk.on_entry(existing['side'], existing['entry_price'], existing['size'],
+                                   bars=int(held.total_seconds() // 300))
             self.log(f"💡 기존 포지션 발견! {existing['side']} {existing['size']:.4f} ETH @ ${existing['entry_price']:.2f}", telegram=True)
             self.log(f"   미실현 손익: ${existing.get('unrealized_pnl', 0):.2f}", telegram=False)
         else:
             self.log(f"✅ 포지션 없음 - 신규 진입 모드", telegram=False)
         
-        # 잔고 확인
+        # 잔고 확인 (성공하면 _on_balance가 리스크 기준 자산 보정)
         balance = self.exchange_mgr.get_balance()
-        self.log(f"💰 연결 성공! 잔고: ${balance['free']:.2f} (총 ${balance['total']:.2f})", telegram=True)
+        if balance is None:
+            self.log("⚠️ 연결 성공, 잔고 조회 실패 (진입 시 다시 조회)", telegram=True)
+        else:
+            self.log(f"💰 연결 성공! 잔고: ${balance['free']:.2f} (총 ${balance['total']:.2f})", telegram=True)
         
         # 📊 시작 시 거래 요약 보고 (텔레그램)
         self.send_report()
@@ -173,9 +275,14 @@ class TradingBot:
     
     def check_signals(self):
         """매매 신호 확인 및 실행 - 스위칭 지원 (보수적)"""
+        self._apply_reconcile()
+        self._resync_equity()
+        
         # 데이터 조회
-        df = self.market_data.fetch_data('5m', 100)
+        with metrics.span('fetch_data'):
+            df = self.market_data.fetch_data('5m', 100)
         if df is None:
+            metrics.inc('lumi_skipped_ticks_total', reason='fetch_data')
             return
         
         market_state = self.market_data.get_current_market_state(df)
@@ -183,9 +290,20 @@ class TradingBot:
             return
         
         current_price = market_state['price']
+        self.last_price = current_price
+        if REGIME_ENABLED:
+            market_state.update(self.regime.snapshot())
         mode = self.strategy.determine_mode(market_state)
+        self._record_bar(df, mode)
+        
+        # 지지/저항 존 + TII/RMI (마감 봉마다 갱신된 상태를 조회만)
+        zone_state = self.zone_engine.snapshot(current_price)
+        market_state.update(zone_state)
+        self._publish_status(df, market_state, mode)
         
-        self.log(f"⏳ 분석 중... ETH ${current_price:.2f} | RSI {market_state['rsi']:.1f} | BB% {market_state['bb_pct']:.2f} | 추세 {market_state['trend']}")
+        self.log("⏳ 분석 중... ETH $%.2f | RSI %.1f | BB%% %.2f | 추세 %s",
+                 current_price, market_state['rsi'], market_state['bb_pct'], market_state['trend'],
+                 sample='tick_status')
         
         # ✅ 포지션 보유 중: SL/TP 체크만 수행 (스위칭 제거)
         if self.position_mgr.has_position():
@@ -193,18 +311,27 @@ class TradingBot:
             entry_price = self.position_mgr.entry_price
             
             # 디버그 출력
-            print(f"   [DEBUG] 포지션: {current_position}, 진입가: {entry_price}, 현재가: {current_price}")
+            log.debug("포지션: %s, 진입가: %s, 현재가: %s", current_position, entry_price, current_price)
             
             # 현재 PnL 계산
             direction = 1 if current_position == 'LONG' else -1
             if entry_price and entry_price > 0 and current_price and current_price > 0:
                 current_pnl = ((current_price - entry_price) / entry_price) * 100 * direction
-                print(f"   [DEBUG] PnL 계산: (({current_price} - {entry_price}) / {entry_price}) * 100 * {direction} = {current_pnl:.2f}%")
+                log.debug("PnL 계산: ((%s - %s) / %s) * 100 * %s = %.2f%%",
+                          current_price, entry_price, entry_price, direction, current_pnl)
             else:
                 current_pnl = 0
-                print(f"   [DEBUG] PnL 계산 실패: entry_price={entry_price}, current_price={current_price}")
+                log.debug("PnL 계산 실패: entry_price=%s, current_price=%s", entry_price, current_price)
             
-            self.log(f"   📍 보유 중 ({current_position}) | PnL: {current_pnl:+.2f}%", telegram=False)
+            self.log("   📍 보유 중 (%s) | PnL: %+.2f%%", current_position, current_pnl, sample='tick_position')
+            
+            # 리스크 한도 (일일 손실 / 보유 봉 수) - 상수 시간
+            if self.risk:
+                forced = self.risk.on_tick(current_price, df['timestamp'].iloc[-1])
+                if forced:
+                    self.log(f"\n🛑 리스크 한도 청산! {forced}", telegram=True)
+                    self._execute_exit(current_price, forced, current_pnl, market_state)
+                    return
             
             # SL/TP 체크만 수행
             self._check_exit()
@@ -221,7 +348,8 @@ class TradingBot:
             remaining = int(self.exit_cooldown_until - current_time)
             mins = remaining // 60
             secs = remaining % 60
-            self.log(f"   ⏳ 쿨다운 중... {mins}분 {secs}초 후 진입 가능 (이전: {self.last_exit_reason})", telegram=False)
+            self.log("   ⏳ 쿨다운 중... %d분 %d초 후 진입 가능 (이전: %s)", mins, secs, self.last_exit_reason,
+                     sample='tick_cooldown')
             return
         
         # 🆕 시간대 필터 (밤/새벽 롱 진입 제한)
@@ -230,7 +358,7 @@ class TradingBot:
         night_mode = 23 <= current_hour or current_hour < 7  # 23:00 ~ 07:00
         
         if night_mode:
-            self.log(f"   🌙 야간 모드 (23:00-07:00): 롱 진입 제한, 숏 우선", telegram=False)
+            self.log("   🌙 야간 모드 (23:00-07:00): 롱 진입 제한, 숏 우선", sample='tick_night')
         
         # 롱 신호 확인
         long_ok, long_reason = self.strategy.check_long_signal(market_state, df)
@@ -251,7 +379,8 @@ class TradingBot:
             # 연속 신호 확인 완료!
             if self.long_signal_count >= self.signal_confirmation:
                 # 🆕 다중 시간대 추세 정렬 확인
-                multi_data = self.market_data.fetch_multi_timeframe_data(['3m', '5m', '15m'])
+                with metrics.span('fetch_multi_tf'):
+                    multi_data = self.market_data.fetch_multi_timeframe_data(['3m', '5m', '15m'])
                 is_aligned, alignment_msg = self.market_data.check_multi_timeframe_alignment(
                     multi_data, 'LONG'
                 )
@@ -292,7 +421,8 @@ class TradingBot:
                 # 연속 신호 확인 완료!
                 if self.short_signal_count >= self.signal_confirmation:
                     # 🆕 다중 시간대 추세 정렬 확인
-                    multi_data = self.market_data.fetch_multi_timeframe_data(['3m', '5m', '15m'])
+                    with metrics.span('fetch_multi_tf'):
+                        multi_data = self.market_data.fetch_multi_timeframe_data(['3m', '5m', '15m'])
                     is_aligned, alignment_msg = self.market_data.check_multi_timeframe_alignment(
                         multi_data, 'SHORT'
                     )
@@ -312,10 +442,13 @@ class TradingBot:
         
         # 대기 메시지
         if self.long_signal_count == 0 and self.short_signal_count == 0:
-            self.log(f"   ⏳ 신호 대기 중...", telegram=False)
+            self.log("   ⏳ 신호 대기 중...", sample='tick_waiting')
     
     def _enter_long(self, price, mode, reason, market_state):
         """롱 진입 - 동적 SL 계산"""
+        if not self._risk_allows():
+            return
+        
         # 🆕 동적 SL 계산
         dynamic_sl = self.strategy.calculate_dynamic_sl_price(price, 'LONG', market_state, 0)
         _, tp, tp_pct = self.strategy.calculate_sl_tp(price, 'LONG', mode)
@@ -330,8 +463,12 @@ class TradingBot:
         success, result = self.executor.execute_long(price, dynamic_sl, tp, reason, mode)
         
         if success:
-            self.position_mgr.open_position('LONG', price, result['amount'], mode, dynamic_sl, tp)
+            self.position_mgr.open_position('LONG', result['avg_price'], result['amount'], mode, dynamic_sl, tp)
+            if self.risk:
+                self.risk.on_entry('LONG', result['avg_price'], result['amount'])
+            self._notify_fill()
             self.notifier.send_signal('LONG', price, dynamic_sl, tp, f"{mode} - {reason}")
+            self._record_decision('LONG', 'entry', reason, mode, result['avg_price'], self.position_mgr.trade_id)
             self._record_entry('LONG', price, result['amount'], mode, market_state)
             # 🔄 동적 SL 추적 초기화
             self.strategy.peak_profit_tracker['LONG'] = 0
@@ -341,10 +478,14 @@ class TradingBot:
             # 📊 진입 시 거래 요약 보고
             self.send_report()
         else:
+            self._record_decision('LONG', 'entry_failed', f"{reason} | {result}", mode, price)
             self.log(f"   ❌ {result}", error=True, telegram=True)
     
     def _enter_short(self, price, mode, reason, market_state):
         """숏 진입 - 동적 SL 계산"""
+        if not self._risk_allows():
+            return
+        
         # 🆕 동적 SL 계산
         dynamic_sl = self.strategy.calculate_dynamic_sl_price(price, 'SHORT', market_state, 0)
         _, tp, tp_pct = self.strategy.calculate_sl_tp(price, 'SHORT', mode)
@@ -359,8 +500,12 @@ class TradingBot:
         success, result = self.executor.execute_short(price, dynamic_sl, tp, reason, mode)
         
         if success:
-            self.position_mgr.open_position('SHORT', price, result['amount'], mode, dynamic_sl, tp)
+            self.position_mgr.open_position('SHORT', result['avg_price'], result['amount'], mode, dynamic_sl, tp)
+            if self.risk:
+                self.risk.on_entry('SHORT', result['avg_price'], result['amount'])
+            self._notify_fill()
             self.notifier.send_signal('SHORT', price, dynamic_sl, tp, f"{mode} - {reason}")
+            self._record_decision('SHORT', 'entry', reason, mode, result['avg_price'], self.position_mgr.trade_id)
             self._record_entry('SHORT', price, result['amount'], mode, market_state)
             # 🔄 동적 SL 추적 초기화
             self.strategy.peak_profit_tracker['SHORT'] = 0
@@ -370,15 +515,43 @@ class TradingBot:
             # 📊 진입 시 거래 요약 보고
             self.send_report()
         else:
+            self._record_decision('SHORT', 'entry_failed', f"{reason} | {result}", mode, price)
             self.log(f"   ❌ {result}", error=True, telegram=True)
     
+    def _on_balance(self, balance):
+        """잔고 조회 성공 (시작 시 / 진입 경로 / 재조회) → 상태 잔고 + 리스크 자산 보정"""
+        self.last_balance = balance['total']
+        if self.risk:
+            self.risk.sync_equity(balance['total'])
+    
+    def _resync_equity(self):
+        """시작 시 잔고 조회가 실패했으면 주기적으로 재조회 (자산을 알기 전까지 리스크 엔진이 진입 차단)"""
+        if not self.risk or self.risk.equity_synced or not self.exchange_mgr.exchange:
+            return
+        now = time.time()
+        if now - self.last_equity_retry < RISK_EQUITY_RETRY_SECONDS:
+            return
+        self.last_equity_retry = now
+        if self.exchange_mgr.get_balance() is not None:
+            self.log("💰 잔고 재조회 성공 - 일일 손실 한도 집행 시작", telegram=True)
+    
+    def _risk_allows(self):
+        """진입 전 리스크 한도 확인 (일일 손실 / 연속 손실 휴식)"""
+        if not self.risk:
+            return True
+        ok, msg = self.risk.can_enter()
+        if not ok:
+            self.log("   🛑 진입 차단: %s", msg, sample='risk_block')
+        return ok
+    
     def _check_exit(self):
         """청산 체크 - 다중 시간대 분석 포함"""
         if not self.position_mgr.has_position():
             return
         
         # 🆕 다중 시간대 데이터 조회 (3m, 5m, 15m)
-        multi_data = self.market_data.fetch_multi_timeframe_data(['3m', '5m', '15m'])
+        with metrics.span('fetch_multi_tf'):
+            multi_data = self.market_data.fetch_multi_timeframe_data(['3m', '5m', '15m'])
         
         # 현재 가격 (5분 기준)
         df_5m = multi_data.get('5m', {}).get('df')
@@ -402,7 +575,7 @@ class TradingBot:
         # 🆕 수익 중일 때 순차적 반전 감지 (0.3% 이상 수익)
         if pnl_pct >= 0.3 and sequential_reversal:
             self.log(f"\n⚠️ 순차적 추세 반전! {reversal_reason} | 수익: {pnl_pct:+.2f}%", telegram=True)
-            self._execute_exit(current_price, f"SEQ ({reversal_reason})", pnl_pct)
+            self._execute_exit(current_price, f"SEQ ({reversal_reason})", pnl_pct, market_state_5m)
             return
         
         # 🆕 동적 SL 계산 및 체크
@@ -412,22 +585,23 @@ class TradingBot:
         
         if position == 'LONG' and current_price <= dynamic_sl_price:
             self.log(f"\n❌ 동적 손절! 현재 {pnl_pct:+.2f}% | SL가: ${dynamic_sl_price:.2f}", telegram=True)
-            self._execute_exit(current_price, 'DSL (동적 손절)', pnl_pct)
+            self._execute_exit(current_price, 'DSL (동적 손절)', pnl_pct, market_state_5m)
             return
         if position == 'SHORT' and current_price >= dynamic_sl_price:
             self.log(f"\n❌ 동적 손절! 현재 {pnl_pct:+.2f}% | SL가: ${dynamic_sl_price:.2f}", telegram=True)
-            self._execute_exit(current_price, 'DSL (동적 손절)', pnl_pct)
+            self._execute_exit(current_price, 'DSL (동적 손절)', pnl_pct, market_state_5m)
             return
         
         # 기존 SL/TP/TS 체크
-        exit_type, pnl = self.strategy.should_exit(
-            position, entry_price, current_price, market_state_5m
-        )
+        with metrics.span('should_exit'):
+            exit_type, pnl = self.strategy.should_exit(
+                position, entry_price, current_price, market_state_5m
+            )
         
         if exit_type:
-            self._execute_exit(current_price, exit_type, pnl)
+            self._execute_exit(current_price, exit_type, pnl, market_state_5m)
     
-    def _execute_exit(self, price, reason, pnl):
+    def _execute_exit(self, price, reason, pnl, market_state=None):
         """청산 실행"""
         self.log(f"\n{'✅' if pnl > 0 else '❌'} 청산! {reason} | 수익률: {pnl:+.2f}%", telegram=True)
         
@@ -440,7 +614,13 @@ class TradingBot:
         
         if success:
             closed_position = self.position_mgr.position  # ⚠️ close 전에 저장!
-            self.position_mgr.close_position(price, reason)
+            trade_id = self.position_mgr.trade_id
+            self.position_mgr.close_position(result['avg_price'], reason)
+            self._record_decision(closed_position, 'exit', reason, None, result['avg_price'], trade_id)
+            self._record_exit(trade_id, result['avg_price'], reason, pnl, market_state)
+            if self.risk:
+                self.risk.on_exit(result['avg_price'])
+            self._notify_fill()
             self.notifier.send_exit(self.position_mgr.position, pnl, reason)
             # 🔄 드래그 스탑 추적 초기화
             self.strategy.reset_position_tracking(closed_position)
@@ -461,15 +641,95 @@ class TradingBot:
             # 📊 청산 시 거래 요약 보고
             self.send_report()
         else:
+            self._record_decision(self.position_mgr.position, 'exit_failed', f"{reason} | {result}", None, price,
+                                  self.position_mgr.trade_id)
             self.log(f"   ❌ 청산 실패: {result}", error=True, telegram=True)
     
+    def _notify_fill(self):
+        """체결 직후 거래소 재대조 요청"""
+        if self.reconciler:
+            self.reconciler.notify_fill()
+    
+    def _apply_reconcile(self):
+        """백그라운드 대조에서 확정된 수정 적용 (REST 없음)"""
+        if not self.reconciler:
+            return
+        for fix in self.reconciler.apply_pending():
+            self.log(f"🔄 포지션 대조 수정: {fix['message']}")
+            if fix['kind'] in ('closed_externally', 'side'):
+                self.strategy.reset_position_tracking(fix['local_side'])
+            if self.risk:
+                pm = self.position_mgr
+                self.risk.sync_position(pm.position, pm.entry_price, pm.position_size)
+    
+    def _publish_status(self, df, market_state, mode):
+        """status.json 갱신 요청 (기록은 백그라운드 스레드)"""
+        if self.cvd and self.cvd.ready('5m'):
+            # 체결 스트림 기반 (진행 중인 봉 포함)
+            delta = self.cvd.delta('5m')
+            cvd_history = self.cvd.cvd_history('5m', STATUS_CVD_HISTORY)
+        else:
+            # 캔들 CLV 근사
+            cvd = df['cvd'].tail(STATUS_CVD_HISTORY)
+            delta = float(cvd.iloc[-1] - cvd.iloc[-2]) if len(cvd) > 1 else 0.0
+            cvd_history = cvd.tolist()
+        self.status.publish(
+            last_update=datetime.now().strftime('%H:%M:%S'),
+            price=round(float(market_state['price']), 2),
+            delta=round(delta, 3),
+            cvd_history=[round(float(v), 3) for v in cvd_history],
+            position=self.position_mgr.position or 'NONE',
+            entry_price=self.position_mgr.entry_price,
+            pnl_pct=round(self.position_mgr.get_current_pnl(market_state['price']), 3),
+            mode=mode,
+            indicators={key: market_state.get(key) for key in ('rsi', 'bb_pct', 'trend')},
+            cooldown={
+                'exit_until': (datetime.fromtimestamp(self.exit_cooldown_until).strftime('%H:%M:%S')
+                               if self.exit_cooldown_until > time.time() else None),
+                'last_exit_reason': self.last_exit_reason
+            },
+            loop={'lag_ms': round(self.loop_lag * 1000), 'tick_ms': round(self.tick_seconds * 1000)},
+            tii=market_state.get('tii'),
+            rmi=market_state.get('rmi'),
+            balance=self.last_balance,
+            note=f"{mode} 모드 | 추세 {market_state['trend']}",
+            zones=market_state['zones'],
+            poc=market_state.get('poc'),
+            regime={key: market_state.get(key) for key in
+                    ('regime_trend', 'regime_squeeze', 'regime_volatility', 'regime_direction')},
+            rate_budget=self.exchange_mgr.rate_stats(),
+            io=self.exchange_mgr.io_stats(),
+            risk=self.risk.snapshot() if self.risk else None,
+            continuity=self.market_data.continuity_stats()
+        )
+    
+    def _record_bar(self, df, mode):
+        """마감된 봉 피처 기록 (봉마다 1회, 지표는 fetch_data 결과 재사용)"""
+        if not DATA_COLLECTION_ENABLED or not self.data_collector or len(df) < 2:
+            return
+        # 지난 기록 이후 마감된 봉 전부 (틱을 건너뛰었거나 백필로 여러 봉이 한 번에 들어온 경우)
+        closed = df.iloc[:-1]
+        if self.last_recorded_bar is None:
+            closed = closed.tail(1)
+        else:
+            closed = closed[closed['timestamp'] > self.last_recorded_bar]
+        if closed.empty:
+            return
+        self.last_recorded_bar = closed['timestamp'].iloc[-1]
+        try:
+            for _, row in closed.iterrows():
+                self.data_collector.record_features(row, market_mode=mode)
+        except Exception as e:
+            log.warning("봉 데이터 기록 실패: %s", e)
+    
     def _record_entry(self, side, price, size, mode, market_state):
         """진입 데이터 기록"""
         if not DATA_COLLECTION_ENABLED or not self.data_collector:
             return
         try:
             self.data_collector.record_trade({
-                'trade_id': self.position_mgr.trade_count + 1,
+                'trade_id': self.position_mgr.trade_id,
+                'action': 'entry',
                 'type': side,
                 'entry_price': price,
                 'position_size': size,
@@ -478,12 +738,35 @@ class TradingBot:
                 'entry_bb_pct': market_state.get('bb_pct'),
                 'entry_trend': market_state.get('trend'),
                 'entry_volume_ratio': market_state.get('volume_ratio'),
+                'entry_fvg': self.strategy.fvg_label(price),
                 'timestamp': datetime.now().isoformat()
             })
         except Exception as e:
-            print(f"⚠️ 데이터 기록 실패: {e}")
+            log.warning("데이터 기록 실패: %s", e)
+    
+    def _record_exit(self, trade_id, price, reason, pnl, market_state):
+        """청산 시점 데이터 기록 (진입 행과 같은 trade_id - 원장에서 한 행으로 합쳐짐)"""
+        if not DATA_COLLECTION_ENABLED or not self.data_collector or trade_id is None:
+            return
+        market_state = market_state or {}
+        try:
+            self.data_collector.record_trade({
+                'trade_id': trade_id,
+                'action': 'exit',
+                'exit_price': price,
+                'exit_reason': reason,
+                'pnl_pct': pnl,
+                'exit_rsi': market_state.get('rsi'),
+                'exit_bb_pct': market_state.get('bb_pct'),
+            })
+        except Exception as e:
+            log.warning("데이터 기록 실패: %s", e)
+    
+    def _record_decision(self, side, action, reason, mode, price, trade_id=None):
+        """진입/청산 판단 원장 기록 (큐만)"""
+        if self.ledger:
+            self.ledger.record_decision(side, action, reason, mode, price, trade_id)
     
-    # _record_exit는 청산 시에 사용 (data_collector에 별도 메서드 없음)
     
     def send_report(self):
         """거래 요약 보고서 (시작/진입/청산 시에만)"""
@@ -504,6 +787,84 @@ class TradingBot:
         
         self.notifier.send(msg)
     
+    def _start_metrics_server(self):
+        """메트릭 엔드포인트 시작 (localhost 전용)"""
+        if not METRICS_ENABLED:
+            return
+        self.metrics_server = MetricsServer(metrics, METRICS_HOST, METRICS_PORT)
+        success, msg = self.metrics_server.start()
+        self.log(f"📈 메트릭: {msg}", error=not success)
+    
+    def _start_status_server(self):
+        """메모리 상태 HTTP 서버 시작 (localhost 전용, 롱폴/SSE)"""
+        if not STATUS_SERVER_ENABLED:
+            return
+        self.status_server = StatusServer(self.status, STATUS_SERVER_HOST, STATUS_SERVER_PORT,
+                                          max_wait=STATUS_LONGPOLL_MAX, keepalive=STATUS_SSE_KEEPALIVE,
+                                          allow_origin=STATUS_ALLOWED_ORIGIN)
+        success, msg = self.status_server.start()
+        self.log(f"🖥️ 상태 서버: {msg}", error=not success)
+    
+    def _start_profiling_hooks(self):
+        """프로파일러/메모리 추적 제어 훅 설치 (메인 스레드에서 호출)"""
+        if not PROFILER_ENABLED:
+            return
+        self.profiling = ProfilingHooks(
+            port=PROFILER_CONTROL_PORT,
+            interval_ms=PROFILER_INTERVAL_MS,
+            memory_sample_seconds=MEMORY_SAMPLE_SECONDS
+        )
+        success, msg = self.profiling.install(self)
+        self.log(f"🔬 프로파일러 제어: {msg}", error=not success)
+    
+    def _start_trade_stream(self):
+        """체결 CVD 수집 시작 (덤프 재생 또는 거래소 aggTrades)"""
+        if not self.cvd:
+            return
+        if CVD_REPLAY_FILE:
+            replay = AggTradeReplay(CVD_REPLAY_FILE, self.cvd.add_trades)
+            try:
+                count = replay.run()
+                self.log(f"📼 aggTrades 재생: {count:,}건 ({CVD_REPLAY_FILE})")
+            except OSError as e:
+                self.log(f"❌ aggTrades 재생 실패: {e}", error=True)
+            return
+        if not self.exchange_mgr.exchange:
+            return
+        # 가장 긴 시간대의 진행 중인 봉 시작부터 채움
+        longest = max(buf.tf_ms for buf in self.cvd.buffers.values())
+        now_ms = int(time.time() * 1000)
+        self.trade_stream = AggTradeStream(self.exchange_mgr.exchange, SYMBOL, self.cvd.add_trades,
+                                           interval=CVD_POLL_INTERVAL, start_time=now_ms - now_ms % longest,
+                                           catchup_per_min=CVD_CATCHUP_PER_MIN)
+        self.trade_stream.start()
+        self.log("📡 aggTrades CVD 수집 시작")
+    
+    def _start_reconciler(self):
+        """포지션 대조 스레드 시작"""
+        if not RECONCILE_ENABLED:
+            return
+        self.reconciler = PositionReconciler(
+            self.exchange_mgr, self.position_mgr, self.notifier,
+            interval=RECONCILE_INTERVAL,
+            refresh_seconds=RECONCILE_REFRESH_SECONDS,
+            fill_delay=RECONCILE_FILL_DELAY,
+            confirm_seconds=RECONCILE_CONFIRM_SECONDS,
+            size_tolerance=RECONCILE_SIZE_TOLERANCE,
+            orphan_seconds=RECONCILE_ORPHAN_SECONDS,
+            price_fn=lambda: self.last_price
+        )
+        self.reconciler.start()
+        self.log("🔄 포지션 대조 시작 (%s초 주기, 캐시 %s초)", RECONCILE_INTERVAL, RECONCILE_REFRESH_SECONDS)
+    
+    def _start_collector(self):
+        """데이터 수집 사이드카 프로세스 시작"""
+        if not isinstance(self.data_collector, CollectorFeed):
+            return
+        self.data_collector.start(poll_interval=COLLECTOR_POLL_INTERVAL,
+                                  learn_interval=COLLECTOR_LEARN_INTERVAL)
+        self.log("🗄️ 데이터 수집 사이드카 시작 (링 %d슬롯)", self.data_collector.ring.capacity)
+    
     def run(self):
         """메인 루프"""
         self.log("🚀 LUMI HYBRID PRO v2.1 (모듈화) 시작", telegram=True)
@@ -511,25 +872,65 @@ class TradingBot:
         if not self.connect():
             return
         
+        self._start_metrics_server()
+        self._start_profiling_hooks()
+        self.status.start()
+        self._start_status_server()
+        if self.ledger:
+            self.ledger.start()
+        self._start_trade_stream()
+        self._start_reconciler()
+        self._start_collector()
+        
+        next_tick = time.monotonic()
         while self.running:
             try:
-                # 신호 체크
-                self.check_signals()
+                # 신호 체크 (틱 전체 시간 측정)
+                started = time.monotonic()
+                self.loop_lag = max(0.0, started - next_tick)
+                with metrics.tick():
+                    self.check_signals()
+                self.tick_seconds = time.monotonic() - started
                 
+                next_tick = time.monotonic() + CHECK_INTERVAL
                 time.sleep(CHECK_INTERVAL)
                 
             except KeyboardInterrupt:
                 self.log("🛑 사용자 중단", telegram=True)
                 break
             except Exception as e:
+                metrics.inc('lumi_errors_total', component='tick')
                 self.log(f"❌ 오류: {e}", error=True, telegram=True)
+                next_tick = time.monotonic() + 5
                 time.sleep(5)
 
 
 def main():
     """메인 함수"""
+    # TradingBot.__init__ 중 로그(데이터 수집 로드, 원장 가져오기 등)도 JSON 파일로 가도록 생성 전에 초기화
+    setup_logging(LOG_LEVEL, LOG_JSON_FILE, LOG_MAX_BYTES, LOG_BACKUP_COUNT,
+                  daily=LOG_ROTATE_DAILY, sample_interval=LOG_SAMPLE_SECONDS)
     bot = TradingBot()
-    bot.run()
+    try:
+        bot.run()
+    finally:
+        if bot.trade_stream:
+            bot.trade_stream.stop()
+        if bot.reconciler:
+            bot.reconciler.stop()
+        if bot.data_collector:
+            bot.data_collector.close()
+        bot.market_data.close()
+        if bot.ledger:
+            bot.ledger.close()
+        if bot.status_server:
+            bot.status_server.stop()
+        if bot.profiling:
+            bot.profiling.shutdown()
+        if bot.metrics_server:
+            bot.metrics_server.stop()
+        bot.status.stop()
+        shutdown_logging()
 
 
 if __name__ == "__main__":
@@ -1,112 +1,263 @@
 # -*- coding: utf-8 -*-
 """
 modules/market_data.py - 시장 데이터 및 지표 계산
+
+캔들 버스 (bus_role)
+- 'publish': REST로 받은 봉의 피처를 공유 메모리 버스에도 기록 (라이브 봇)
+- 'consume': REST 없이 버스에서 읽기 (섀도 변형 등 같은 장비의 추가 프로세스)
+  → 소비자가 늘어도 거래소 호출은 발행자 1개분
+
+연속성 (modules.continuity)
+- fetch_ohlcv 응답의 중복 시각 제거, 받은 마감 봉을 시간대별 ContinuityIndex에 반영
+- 마지막 처리 봉 이후 빈 봉이 있으면 (끊김/재시작) 최소 페이지로 백필 후 파이프라인에 이어 붙임
+  백필로도 안 오는 봉은 거래소에 없는 것으로 기록, 백필 한도보다 길게 끊겼으면 기존처럼 재워밍업
+
+데모 모드: 거래소 대신 SyntheticMarket(modules.synthetic)의 fetch_ohlcv → 이후 경로는 실제와 같음
 """
 
-import pandas as pd
-import numpy as np
-import ta
-import time
-from datetime import datetime
+from .telemetry import metrics
+from .logger import get_logger
+from .features import FeaturePipeline, FEATURE_COLUMNS, timeframe_ms
+from .candle_bus import CandleBus, bus_name
+from .continuity import ContinuityIndex, normalize_ohlcv
+from .fvg import FVGIndex
+from .zones import ZoneEngine
+from .regime import RegimeClassifier
+from .synthetic import SyntheticMarket
+
+log = get_logger('market_data')
 
 
 class MarketDataProvider:
     """시장 데이터 제공 및 지표 계산"""
     
-    def __init__(self, exchange=None, symbol="ETH/USDT"):
+    def __init__(self, exchange=None, symbol="ETH/USDT", fvg_settings=None, zone_settings=None,
+                 regime_settings=None, bus_role=None, bus_capacity=500, bus_max_age=30.0,
+                 backfill_pages=2, backfill_page_limit=1000):
+        """
+        Args:
+            bus_role: None / 'publish' / 'consume' (캔들 버스)
+            bus_capacity: 버스에 보관할 마감 봉 수 (발행자)
+            bus_max_age: 소비자 - 이 시간(초) 넘게 갱신이 없으면 데이터 없음으로 처리
+            backfill_pages: fetch_data 1회당 최대 백필 요청 수 (0이면 감지만)
+            backfill_page_limit: 백필 요청당 봉 수
+        """
         self.exchange = exchange
         self.symbol = symbol
         self.demo_mode = False
+        self.synthetic = None  # 데모 모드 합성 시장
+        self.pipelines = {}    # 시간대별 증분 피처 파이프라인
+        self.fvg_indexes = {}  # 시간대별 미체결 FVG (마감 봉마다 갱신)
+        self.fvg_settings = fvg_settings or {}
+        self.zone_engines = {} # 시간대별 지지/저항 존 + TII/RMI
+        self.zone_settings = zone_settings or {}
+        self.regimes = {}      # 시간대별 시장 국면 (마감 봉마다 분류)
+        self.regime_settings = regime_settings or {}
+        self.bus_role = bus_role
+        self.bus_capacity = bus_capacity
+        self.bus_max_age = bus_max_age
+        self.buses = {}        # 시간대별 캔들 버스
+        self.bus_seen = {}     # 소비자: 리스너에 넘긴 마지막 마감 봉 시각
+        self.continuity_indexes = {}   # 시간대별 받은 봉 구간
+        self.backfill_pages = backfill_pages
+        self.backfill_page_limit = backfill_page_limit
     
-    def set_demo_mode(self, enabled=True):
-        """데모 모드 설정"""
+    def set_demo_mode(self, enabled=True, seed=None, **market_settings):
+        """
+        데모 모드 설정 (거래소 대신 합성 시장 - 지표/FVG/존/국면은 실제 파이프라인 그대로)
+        
+        Args:
+            seed: 합성 시장 시드 (같은 시드 + 같은 시작 시각이면 같은 시장)
+            market_settings: SyntheticMarket 인자 (regimes, jumps_per_day 등)
+        """
         self.demo_mode = enabled
+        if enabled and (self.synthetic is None or seed is not None or market_settings):
+            self.synthetic = SyntheticMarket(seed=seed, symbol=self.symbol, **market_settings)
     
     def generate_demo_data(self, timeframe, limit=100):
-        """데모 데이터 생성 (시뮬레이션)"""
-        np.random.seed(int(time.time()))
-        
-        base_price = 1900.0
-        prices = []
-        rsi_values = []
-        bb_pcts = []
-        
-        price = base_price
-        for i in range(limit):
-            change = np.random.normal(0.001, 0.008)
-            price *= (1 + change)
-            prices.append(price)
-            
-            if i < 20:
-                rsi = 40 + i * 2 + np.random.normal(0, 3)
-            else:
-                rsi = 50 + np.sin(i/10) * 20 + np.random.normal(0, 5)
-            rsi = max(20, min(80, rsi))
-            rsi_values.append(rsi)
-            
-            bb_pct = 0.3 + (rsi - 30) / 100 * 0.5 + np.random.normal(0, 0.05)
-            bb_pct = max(0.1, min(0.95, bb_pct))
-            bb_pcts.append(bb_pct)
-        
-        df = pd.DataFrame({
-            'timestamp': [int(time.time()) - (limit-i)*300 for i in range(limit)],
-            'open': [p * (1 - abs(np.random.normal(0, 0.002))) for p in prices],
-            'high': [p * (1 + abs(np.random.normal(0, 0.003))) for p in prices],
-            'low': [p * (1 - abs(np.random.normal(0, 0.003))) for p in prices],
-            'close': prices,
-            'volume': [np.random.uniform(1000, 5000) for _ in range(limit)],
-            'rsi': rsi_values,
-            'bb_pct_b': bb_pcts,
-            'bb_width': [np.random.uniform(0.03, 0.06) for _ in range(limit)],
-            'trend': ['UP' if rsi > 50 else 'DOWN' for rsi in rsi_values]
-        })
-        
-        return df
+        """데모 데이터 (합성 시장 fetch_ohlcv → 실제 피처 파이프라인)"""
+        if self.synthetic is None:
+            self.synthetic = SyntheticMarket(symbol=self.symbol)
+        ohlcv = self.synthetic.fetch_ohlcv(self.symbol, timeframe, limit=limit)
+        return self._sync(timeframe, ohlcv, limit)
     
     def fetch_data(self, timeframe='5m', limit=100):
         """OHLCV 데이터 조회 및 지표 계산"""
         if self.demo_mode:
             return self.generate_demo_data(timeframe, limit)
         
+        if self.bus_role == 'consume':
+            return self._read_bus(timeframe, limit)
+        
         if not self.exchange:
             return None
         
         try:
-            ohlcv = self.exchange.fetch_ohlcv(self.symbol, timeframe, limit=limit)
-            df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-            
-            # RSI
-            df['rsi'] = ta.momentum.rsi(df['close'], 14)
+            with metrics.span('fetch_ohlcv', timeframe=timeframe):
+                metrics.inc('lumi_rest_calls_total', endpoint='fetch_ohlcv')
+                ohlcv = self.exchange.fetch_ohlcv(self.symbol, timeframe, limit=limit)
             
-            # 볼린저 밴드
-            bb = ta.volatility.BollingerBands(df['close'], 20, 2)
-            df['bb_upper'] = bb.bollinger_hband()
-            df['bb_lower'] = bb.bollinger_lband()
-            df['bb_mid'] = bb.bollinger_mavg()
-            df['bb_pct_b'] = (df['close'] - df['bb_lower']) / (df['bb_upper'] - df['bb_lower'])
-            df['bb_bandwidth'] = (df['bb_upper'] - df['bb_lower']) / df['bb_mid']
-            
-            # EMA 추세
-            df['ema8'] = ta.trend.ema_indicator(df['close'], 8)
-            df['ema21'] = ta.trend.ema_indicator(df['close'], 21)
-            df['trend'] = np.where(df['ema8'] > df['ema21'], 'UP', 'DOWN')
-            
-            # MACD
-            macd = ta.trend.MACD(df['close'], 12, 26, 9)
-            df['macd'] = macd.macd()
-            df['macd_signal'] = macd.macd_signal()
-            df['macd_hist'] = macd.macd_diff()
-            
-            # 거래량 비율
-            df['volume_sma'] = df['volume'].rolling(20).mean()
-            df['volume_ratio'] = df['volume'] / df['volume_sma']
-            
-            return df
+            return self._sync(timeframe, ohlcv, limit)
             
         except Exception as e:
-            print(f"❌ 데이터 조회 실패: {e}")
+            metrics.inc('lumi_errors_total', component='market_data')
+            log.error("데이터 조회 실패: %s", e, extra={'sample_key': f'fetch_data_{timeframe}'})
+            return None
+    
+    def _sync(self, timeframe, ohlcv, limit):
+        """받은 봉 → 연속성 검사 → 피처 파이프라인 (+ 버스 발행)"""
+        pipeline = self._pipeline(timeframe)
+        ohlcv = self._ensure_continuity(timeframe, ohlcv, pipeline.last_ts)
+        with metrics.span('indicators', timeframe=timeframe):
+            df = pipeline.sync(ohlcv, limit)
+        if self.bus_role == 'publish':
+            self.bus(timeframe).set_forming(pipeline.forming)
+        return df
+    
+    def continuity(self, timeframe='5m'):
+        """시간대별 연속성 인덱스"""
+        if timeframe not in self.continuity_indexes:
+            self.continuity_indexes[timeframe] = ContinuityIndex(timeframe_ms(timeframe))
+        return self.continuity_indexes[timeframe]
+    
+    def _ensure_continuity(self, timeframe, ohlcv, last_ts):
+        """
+        응답 정리 + 마지막 처리 봉(last_ts) 이후 빈 봉 백필 → 파이프라인에 넘길 봉 목록
+        
+        마지막 봉은 진행 중으로 보고 검사하지 않음
+        """
+        ohlcv, duplicates = normalize_ohlcv(ohlcv)
+        index = self.continuity(timeframe)
+        if duplicates:
+            index.duplicates += duplicates
+            metrics.inc('lumi_candle_duplicates_total', duplicates, timeframe=timeframe)
+        if len(ohlcv) < 2:
+            return ohlcv
+        step = index.step
+        forming_ts = ohlcv[-1][0]
+        index.observe([c[0] for c in ohlcv[:-1] if c[0] not in index.covered])
+        start = ohlcv[0][0] if last_ts is None else min(last_ts + step, ohlcv[0][0])
+        gaps = index.gaps(start, forming_ts)
+        if not gaps:
+            return ohlcv
+        
+        missing = sum(e - s for s, e in gaps) // step
+        metrics.inc('lumi_candle_gaps_total', len(gaps), timeframe=timeframe)
+        pages = index.plan_backfill(self.backfill_page_limit, start, forming_ts)
+        if not pages or len(pages) > self.backfill_pages:
+            # 백필 한도보다 긴 끊김 → 받은 봉만 사용 (파이프라인이 이어지지 않으면 재워밍업)
+            log.warning("빈 봉 %d개 (%s, 구간 %d개) - 백필 한도 초과, 재워밍업", missing, timeframe, len(gaps),
+                        extra={'sample_key': f'gap_{timeframe}'})
+            return ohlcv
+        
+        fetched = []
+        for since, count in pages:
+            metrics.inc('lumi_rest_calls_total', endpoint='fetch_ohlcv')
+            metrics.inc('lumi_candle_backfill_requests_total', timeframe=timeframe)
+            source = self.synthetic if self.demo_mode else self.exchange
+            rows = source.fetch_ohlcv(self.symbol, timeframe, since=since, limit=count)
+            rows = [r for r in rows or [] if since <= r[0] < forming_ts]
+            index.observe([r[0] for r in rows if r[0] not in index.covered])
+            # 요청 구간에서 여전히 빈 부분 = 거래소에 없는 봉 (다시 요청하지 않음)
+            index.mark_empty(since, min(since + count * step, forming_ts))
+            fetched += rows
+        log.info("빈 봉 %d개 백필 (%s, 요청 %d회, 받은 봉 %d개)", missing, timeframe, len(pages), len(fetched))
+        return normalize_ohlcv(fetched + ohlcv)[0]
+    
+    def continuity_stats(self):
+        """시간대별 지표 창(파이프라인 보관 봉) 연속성 요약 (status.json용)"""
+        stats = {}
+        for timeframe, index in self.continuity_indexes.items():
+            pipeline = self.pipelines.get(timeframe)
+            if pipeline is None or not pipeline.rows:
+                continue
+            stats[timeframe] = index.coverage(pipeline.rows[0]['timestamp'], pipeline.last_ts + index.step)
+        return stats
+    
+    def _pipeline(self, timeframe):
+        """시간대별 증분 파이프라인 (마감 봉만 상태 반영, 진행 중인 봉은 임시 계산)"""
+        if timeframe not in self.pipelines:
+            pipeline = FeaturePipeline(timeframe)
+            pipeline.listeners.append(self.fvg_index(timeframe).on_bar)
+            pipeline.listeners.append(self.zone_engine(timeframe).on_bar)
+            pipeline.listeners.append(self.regime(timeframe).on_bar)
+            if self.bus_role == 'publish':
+                pipeline.listeners.append(self.bus(timeframe).on_bar)
+            self.pipelines[timeframe] = pipeline
+        return self.pipelines[timeframe]
+    
+    def fvg_index(self, timeframe='5m'):
+        """시간대별 FVG 인덱스 (전략 필터용)"""
+        if timeframe not in self.fvg_indexes:
+            self.fvg_indexes[timeframe] = FVGIndex(**self.fvg_settings)
+        return self.fvg_indexes[timeframe]
+    
+    def zone_engine(self, timeframe='5m'):
+        """시간대별 존 엔진 (status.json / 전략용 스냅샷)"""
+        if timeframe not in self.zone_engines:
+            self.zone_engines[timeframe] = ZoneEngine(**self.zone_settings)
+        return self.zone_engines[timeframe]
+    
+    def regime(self, timeframe='5m'):
+        """시간대별 국면 분류기 (determine_mode 캐시)"""
+        if timeframe not in self.regimes:
+            self.regimes[timeframe] = RegimeClassifier(**self.regime_settings)
+        return self.regimes[timeframe]
+    
+    def bus(self, timeframe='5m'):
+        """시간대별 캔들 버스 (발행자는 생성, 소비자는 연결 - 발행자가 없으면 None)"""
+        if timeframe not in self.buses:
+            name = bus_name(self.symbol, timeframe)
+            if self.bus_role == 'publish':
+                self.buses[timeframe] = CandleBus(name, FEATURE_COLUMNS, self.bus_capacity, create=True)
+            else:
+                try:
+                    self.buses[timeframe] = CandleBus.attach(name)
+                except (FileNotFoundError, ValueError) as e:
+                    log.warning("캔들 버스 연결 실패 (%s): %s", name, e, extra={'sample_key': f'bus_{timeframe}'})
+                    return None
+        return self.buses[timeframe]
+    
+    def _read_bus(self, timeframe, limit):
+        """버스에서 읽기 (REST 없음) - 새 마감 봉은 이 프로세스의 FVG/존/국면에도 반영"""
+        bus = self.bus(timeframe)
+        if bus is None:
+            return None
+        age = bus.age()
+        if age is None or age > self.bus_max_age:
+            log.warning("캔들 버스 갱신 없음 (%s, %s초)", timeframe, None if age is None else round(age),
+                        extra={'sample_key': f'bus_{timeframe}'})
+            # 발행자가 다른 형식으로 재시작했으면 새 세그먼트 → 다음 호출에서 다시 연결
+            bus.close()
+            del self.buses[timeframe]
             return None
+        
+        with metrics.span('bus_read', timeframe=timeframe):
+            block, forming = bus.read_block()
+            if block is None or not len(block):
+                return None
+            closed = block[:-1] if forming else block
+            seen = self.bus_seen.get(timeframe)
+            ts_col = bus.index['timestamp']
+            fresh = closed if seen is None else closed[closed[:, ts_col] > seen]
+            if len(fresh):
+                listeners = self._pipeline(timeframe).listeners
+                for row in bus.decode(fresh).to_dict('records'):
+                    for listener in listeners:
+                        listener(row)
+                self.bus_seen[timeframe] = int(fresh[-1, ts_col])
+            return bus.decode(block[-limit:] if limit else block)
     
+    def close(self):
+        """캔들 버스 해제 (발행자면 공유 메모리 삭제)"""
+        for bus in self.buses.values():
+            bus.close()
+        self.buses.clear()
+    
+    def _compute_indicators(self, ohlcv, timeframe='5m'):
+        """OHLCV → 지표 일괄 계산 (배치 모드, 백테스트/분석용)"""
+        return FeaturePipeline(timeframe).compute(ohlcv)
+
     def get_current_market_state(self, df):
         """현재 시장 상태 분석"""
         if df is None or len(df) < 20:
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+modules/montecarlo.py - 거래 이력 몬테카를로 리스크 시뮬레이터
+
+ThresholdOptimizer.simulate_new_strategy는 과거 거래를 다시 셀 뿐 → 앞으로의 위험은 알 수 없음
+실현 손익(pnl_pct) 순서를 재표집해서 수십만 개의 자산 경로를 만들고 분포로 위험을 봄
+
+- 재표집: block=1이면 거래 단위 부트스트랩, block>1이면 원형 블록 부트스트랩 (연패/연승 같은 자기상관 유지)
+- 거래당 자산 변화: 증거금 비율(ENTRY_PERCENT) × LEVERAGE × pnl_pct - 왕복 수수료
+  손실은 증거금까지 (청산) → 거래 1회로 잃을 수 있는 최대치는 entry_percent
+- 결과: 파산 확률(자산이 ruin_level 이하로 떨어진 경로 비율), 최대 낙폭 분포,
+  회복 시간(고점 아래에 머문 최장 거래 수), 최종 자산 분포
+
+전부 NumPy 벡터 연산 (경로 × 거래 행렬), chunk 단위로 나눠서 메모리 상한 유지
+경로별 요약(최대 낙폭/회복 시간/최종 자산)만 모아서 마지막에 분위수 계산
+"""
+
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PERCENTILES = (5, 25, 50, 75, 95, 99)
+
+
+def load_pnl(history_file="logs/trade_history.json", analysis_dir=None):
+    """
+    실현 손익(%) 배열 (시간 순)
+
+    Args:
+        history_file: PositionManager 거래 이력 (type == 'exit' 기록의 pnl_pct)
+        analysis_dir: trade_analysis_*.csv 폴더 (주어지면 pnl_pct가 있는 행도 추가)
+    """
+    records = []
+    path = Path(history_file)
+    if path.exists():
+        with open(path, 'r', encoding='utf-8') as f:
+            history = json.load(f).get('trade_history', [])
+        records += [(t.get('time', ''), t['pnl_pct']) for t in history
+                    if t.get('type') == 'exit' and t.get('pnl_pct') is not None]
+    if analysis_dir is not None:
+        for f in sorted(Path(analysis_dir).glob("trade_analysis_*.csv")):
+            df = pd.read_csv(f, usecols=['timestamp', 'pnl_pct'])
+            df = df.dropna(subset=['pnl_pct'])
+            records += list(zip(df['timestamp'].astype(str), df['pnl_pct'].astype(float)))
+    records.sort(key=lambda r: r[0])
+    return np.array([pnl for _, pnl in records], dtype=np.float64)
+
+
+class MonteCarloRisk:
+    """실현 손익 재표집 자산 경로 시뮬레이터"""
+
+    def __init__(self, pnl_pct, leverage=20, entry_percent=25, fee_rate=0.0005, seed=None):
+        """
+        Args:
+            pnl_pct: 거래별 실현 손익 (가격 변동 %, 레버리지 미적용 - PositionManager 기록 기준)
+            leverage: 레버리지 (config.LEVERAGE)
+            entry_percent: 거래당 증거금 비율 % (config.ENTRY_PERCENT)
+            fee_rate: 편도 수수료율 (config.TRADING_FEE_RATE, 명목가 기준 왕복 2회)
+            seed: 난수 시드 (같은 시드면 같은 결과)
+        """
+        self.pnl_pct = np.asarray(pnl_pct, dtype=np.float64)
+        if not len(self.pnl_pct):
+            raise ValueError("시뮬레이션할 거래가 없음")
+        self.leverage = leverage
+        self.entry_percent = entry_percent
+        self.fee_rate = fee_rate
+        self.rng = np.random.default_rng(seed)
+
+        margin = entry_percent / 100
+        notional = margin * leverage
+        returns = notional * (self.pnl_pct / 100 - 2 * fee_rate)
+        # 손실은 증거금까지 (격리 마진 청산)
+        self.returns = np.maximum(returns, -margin)
+        with np.errstate(divide='ignore'):
+            self.log_growth = np.log1p(self.returns)     # 증거금 100%면 -inf (자산 0)
+
+    def _indices(self, n_paths, n_trades, block):
+        """재표집 인덱스 (경로 × 거래)"""
+        n = len(self.returns)
+        if block <= 1:
+            return self.rng.integers(0, n, size=(n_paths, n_trades))
+        n_blocks = -(-n_trades // block)
+        starts = self.rng.integers(0, n, size=(n_paths, n_blocks, 1))
+        idx = (starts + np.arange(block)) % n
+        return idx.reshape(n_paths, -1)[:, :n_trades]
+
+    def _chunk(self, n_paths, n_trades, block, ruin_log):
+        """경로 chunk 1개 → (최대 낙폭, 최장 회복 시간, 끝날 때 고점 아래인지, 파산 여부, 최종 자산)"""
+        log_eq = np.cumsum(self.log_growth[self._indices(n_paths, n_trades, block)], axis=1)
+        # 시작 자산(로그 0)도 고점 후보
+        peak = np.maximum(np.maximum.accumulate(log_eq, axis=1), 0.0)
+        max_dd = 1.0 - np.exp((log_eq - peak).min(axis=1))
+        ruined = log_eq.min(axis=1) <= ruin_log
+
+        # 회복 시간: 마지막 고점 이후 경과 거래 수의 최대값
+        steps = np.arange(1, n_trades + 1)
+        at_peak = log_eq >= peak
+        last_peak = np.maximum.accumulate(np.where(at_peak, steps, 0), axis=1)
+        underwater = steps - last_peak
+        return max_dd, underwater.max(axis=1), underwater[:, -1] > 0, ruined, np.exp(log_eq[:, -1])
+
+    def simulate(self, n_paths=200_000, n_trades=100, block=1, ruin_level=0.5, chunk=20_000):
+        """
+        자산 경로 시뮬레이션 (시작 자산 1.0)
+
+        Args:
+            n_paths: 경로 수
+            n_trades: 경로당 거래 수
+            block: 블록 길이 (1이면 거래 단위 부트스트랩)
+            ruin_level: 파산 기준 자산 (시작 대비 비율, 0.5 = 절반 손실)
+            chunk: 한 번에 계산할 경로 수 (메모리 ≈ chunk × n_trades × 8바이트 × 몇 배)
+
+        Returns:
+            dict: 파산 확률, 최대 낙폭/회복 시간/최종 자산 분위수
+        """
+        started = time.perf_counter()
+        ruin_log = np.log(ruin_level) if ruin_level > 0 else -np.inf
+        parts = []
+        done = 0
+        while done < n_paths:
+            size = min(chunk, n_paths - done)
+            parts.append(self._chunk(size, n_trades, block, ruin_log))
+            done += size
+        max_dd, recover, ends_under, ruined, final = (np.concatenate(col) for col in zip(*parts))
+
+        def dist(values):
+            return {f'p{q}': float(v) for q, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+
+        return {
+            'paths': n_paths,
+            'trades': n_trades,
+            'block': block,
+            'samples': len(self.pnl_pct),
+            'leverage': self.leverage,
+            'entry_percent': self.entry_percent,
+            'ruin_level': ruin_level,
+            'risk_of_ruin': float(ruined.mean()),
+            'prob_loss': float((final < 1.0).mean()),
+            'max_drawdown': dict(dist(max_dd), mean=float(max_dd.mean())),
+            'recovery_trades': dict(dist(recover), max=int(recover.max())),
+            'ends_underwater': float(ends_under.mean()),
+            'final_equity': dict(dist(final), mean=float(final.mean())),
+            'elapsed': round(time.perf_counter() - started, 3),
+        }
+
+
+def print_report(result):
+    """시뮬레이션 결과 출력"""
+    dd = result['max_drawdown']
+    rec = result['recovery_trades']
+    eq = result['final_equity']
+    print("=" * 60)
+    print(f"🎲 몬테카를로 리스크 ({result['paths']:,}경로 × {result['trades']}거래, 블록 {result['block']})")
+    print("=" * 60)
+    print(f"표본 거래: {result['samples']}건 | 레버리지 {result['leverage']}x | 증거금 {result['entry_percent']}%")
+    print(f"파산 확률 (자산 {result['ruin_level']:.0%} 이하): {result['risk_of_ruin']:.2%}")
+    print(f"손실 확률 (최종 자산 < 시작): {result['prob_loss']:.2%}")
+    print(f"최대 낙폭: 중앙 {dd['p50']:.1%} | 95% {dd['p95']:.1%} | 99% {dd['p99']:.1%}")
+    print(f"회복 시간 (거래 수): 중앙 {rec['p50']:.0f} | 95% {rec['p95']:.0f} | 최대 {rec['max']}")
+    print(f"끝날 때 고점 아래: {result['ends_underwater']:.1%}")
+    print(f"최종 자산: 5% {eq['p5']:.2f} | 중앙 {eq['p50']:.2f} | 95% {eq['p95']:.2f}")
+    print(f"계산 시간: {result['elapsed']}초")
+
+
+def main(argv=None):
+    """CLI: python -m modules.montecarlo [--paths 200000] [--trades 100] [--block 1]"""
+    import argparse
+    parser = argparse.ArgumentParser(description="거래 이력 몬테카를로 리스크")
+    parser.add_argument('--history', default="logs/trade_history.json")
+    parser.add_argument('--analysis-dir', default=None, help="trade_analysis_*.csv 폴더 (선택)")
+    parser.add_argument('--paths', type=int, default=200_000)
+    parser.add_argument('--trades', type=int, default=100)
+    parser.add_argument('--block', type=int, default=1)
+    parser.add_argument('--leverage', type=float, default=20)
+    parser.add_argument('--entry-percent', type=float, default=25)
+    parser.add_argument('--ruin', type=float, default=0.5)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    pnl = load_pnl(args.history, args.analysis_dir)
+    if not len(pnl):
+        print("❌ 실현 손익 기록이 없음")
+        return None
+    sim = MonteCarloRisk(pnl, leverage=args.leverage, entry_percent=args.entry_percent, seed=args.seed)
+    result = sim.simulate(args.paths, args.trades, block=args.block, ruin_level=args.ruin)
+    print_report(result)
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ modules/notifier.py - 텔레그램 알림 모듈
 """
 
 import requests
+from .telemetry import metrics
 
 
 class TelegramNotifier:
@@ -21,9 +22,10 @@ class TelegramNotifier:
         try:
             url = f"https://api.telegram.org/bot{self.token}/sendMessage"
             payload = {"chat_id": self.chat_id, "text": message, "parse_mode": "HTML"}
-            requests.post(url, json=payload, timeout=5)
+            with metrics.span('telegram'):
+                requests.post(url, json=payload, timeout=5)
         except:
-            pass
+            metrics.inc('lumi_errors_total', component='telegram')
     
     def send_signal(self, action, price, sl, tp, reason=""):
         """진입 신호 알림"""
@@ -1,18 +1,24 @@
 # -*- coding: utf-8 -*-
 """
 modules/position.py - 포지션 상태 관리 (데이터 영속성 추가)
+
+ledger(TradeLedger)가 있으면 진입/청산을 trade_id로 원장에도 기록 (큐만, 기록은 원장 스레드)
+→ get_stats는 원장 인덱스 쿼리 (trade_history.json은 리스크 엔진 복원용으로 유지)
 """
 
 from datetime import datetime
 import json
 import os
 from pathlib import Path
+from .logger import get_logger
+
+log = get_logger('position')
 
 
 class PositionManager:
     """포지션 상태 및 거래 기록 관리"""
     
-    def __init__(self, history_file="logs/trade_history.json"):
+    def __init__(self, history_file="logs/trade_history.json", ledger=None):
         self.position = None  # 'LONG', 'SHORT', or None
         self.entry_price = None
         self.position_size = 0
@@ -22,10 +28,16 @@ class PositionManager:
         self.tp_price = None
         self.trade_history = []
         self.trade_count = 0  # 거래 번호 카운터
+        self.trade_id = None  # 현재 포지션의 거래 번호 (원장 trades.trade_id)
+        self.version = 0      # 상태 변경 카운터 (대조 결과가 그 사이 바뀐 상태에 적용되지 않도록)
         self.history_file = Path(history_file)
+        self.ledger = ledger
         
         # 영속된 거래 기록 로드
         self._load_history()
+        if self.ledger:
+            # 가져온 기존 거래와 번호가 겹치지 않도록
+            self.trade_count = max(self.trade_count, self.ledger.last_trade_id())
     
     def _load_history(self):
         """파일에서 거래 기록 로드"""
@@ -37,9 +49,9 @@ class PositionManager:
                     self.trade_count = data.get('trade_count', 0)
                     # 통계 계산
                     stats = self.get_stats()
-                    print(f"📊 이전 거래 기록 로드 완료: 총 {stats['closed_trades']}건 거래, 승률 {stats['win_rate']:.1f}%")
+                    log.info("📊 이전 거래 기록 로드 완료: 총 %d건 거래, 승률 %.1f%%", stats['closed_trades'], stats['win_rate'])
         except Exception as e:
-            print(f"⚠️ 거래 기록 로드 실패: {e}")
+            log.warning("거래 기록 로드 실패: %s", e)
             self.trade_history = []
             self.trade_count = 0
     
@@ -54,7 +66,7 @@ class PositionManager:
                     'last_saved': datetime.now().isoformat()
                 }, f, ensure_ascii=False, indent=2)
         except Exception as e:
-            print(f"⚠️ 거래 기록 저장 실패: {e}")
+            log.warning("거래 기록 저장 실패: %s", e)
     
     def open_position(self, side, price, size, mode='', sl=None, tp=None):
         """포지션 진입 기록"""
@@ -66,9 +78,12 @@ class PositionManager:
         self.sl_price = sl
         self.tp_price = tp
         self.trade_count += 1  # 거래 카운트 증가
+        self.trade_id = self.trade_count
+        self.version += 1
         
         record = {
             'type': 'entry',
+            'trade_id': self.trade_id,
             'side': side,
             'price': price,
             'size': size,
@@ -78,6 +93,8 @@ class PositionManager:
             'time': self.entry_time.isoformat()
         }
         self.trade_history.append(record)
+        if self.ledger:
+            self.ledger.open_trade(self.trade_id, side, price, size, mode, sl, tp, time=self.entry_time)
         return record
     
     def close_position(self, exit_price, reason=''):
@@ -90,6 +107,7 @@ class PositionManager:
         
         record = {
             'type': 'exit',
+            'trade_id': self.trade_id,
             'side': self.position,
             'entry_price': self.entry_price,
             'exit_price': exit_price,
@@ -100,6 +118,9 @@ class PositionManager:
             'time': datetime.now().isoformat()
         }
         self.trade_history.append(record)
+        if self.ledger and self.trade_id is not None:
+            self.ledger.close_trade(self.trade_id, self.position, self.entry_price, exit_price, self.position_size,
+                                    reason, entry_time=self.entry_time)
         
         # 💾 거래 기록 저장
         self._save_history()
@@ -111,7 +132,9 @@ class PositionManager:
     
     def _reset(self):
         """포지션 상태 초기화"""
+        self.version += 1
         self.position = None
+        self.trade_id = None
         self.entry_price = None
         self.position_size = 0
         self.entry_time = None
@@ -132,17 +155,43 @@ class PositionManager:
         return self.position is not None
     
     def load_from_exchange(self, exchange_position):
-        """거래소에서 기존 포지션 로드"""
+        """거래소에서 기존 포지션 로드 (entry_time: 체결 내역 기준 실제 진입 시각, 없으면 현재)"""
         if exchange_position:
             self.position = exchange_position['side']
             self.entry_price = exchange_position['entry_price']
             self.position_size = exchange_position['size']
-            self.entry_time = datetime.now()
+            self.entry_time = exchange_position.get('entry_time') or datetime.now()
+            self.version += 1
+            if self.ledger:
+                self._adopt_ledger_trade()
             return True
         return False
     
+    def sync_size(self, size, entry_price):
+        """부분 체결/부분 청산 반영 (방향은 같고 수량만 다를 때)"""
+        if not self.position:
+            return False
+        self.position_size = size
+        if entry_price:
+            self.entry_price = entry_price
+        self.version += 1
+        return True
+    
+    def _adopt_ledger_trade(self):
+        """거래소에서 불러온 포지션 → 원장의 같은 방향 OPEN 거래 이어받기 (없으면 새 거래로 기록)"""
+        for trade in self.ledger.open_trades():
+            if trade['side'] == self.position:
+                self.trade_id = trade['trade_id']
+                return
+        self.trade_count += 1
+        self.trade_id = self.trade_count
+        self.ledger.open_trade(self.trade_id, self.position, self.entry_price, self.position_size,
+                               time=self.entry_time, source='exchange')
+    
     def get_stats(self):
-        """거래 통계"""
+        """거래 통계 (원장이 있으면 인덱스 쿼리)"""
+        if self.ledger:
+            return self.ledger.stats()
         entries = [t for t in self.trade_history if t['type'] == 'entry']
         exits = [t for t in self.trade_history if t['type'] == 'exit']
         
@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+"""
+modules/profiler.py - 실행 중인 봇 프로파일링 / 메모리 스냅샷 훅
+
+재시작 없이 TradingBot.run 루프를 들여다보기 위한 제어 훅
+- 로컬 소켓 명령 (127.0.0.1:PROFILER_CONTROL_PORT, 한 줄 텍스트)
+    profile start [간격ms] / profile stop / mem [N] / mem stop / trend / help
+- POSIX 시그널: SIGUSR1 = 프로파일러 토글, SIGUSR2 = 메모리 덤프
+- SamplingProfiler: 대상 스레드 스택을 주기적으로 샘플링 → flamegraph folded 포맷
+- MemoryTracker: tracemalloc 상위 할당 위치 + 장기 메모리 추세 (jsonl)
+
+사용 예: echo "profile start 5" | nc 127.0.0.1 9109
+"""
+
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from .logger import get_logger
+
+log = get_logger('profiler')
+
+
+class SamplingProfiler:
+    """저오버헤드 샘플링 프로파일러 (대상 스레드 1개)"""
+
+    def __init__(self, target_thread_id, output_dir="logs/profiles", interval=0.005, max_depth=64):
+        self.target_thread_id = target_thread_id
+        self.output_dir = Path(output_dir)
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = {}
+        self.samples = 0
+        self.running = False
+        self.started_at = None
+        self.thread = None
+
+    def start(self, interval=None):
+        """샘플링 시작"""
+        if self.running:
+            return False, "이미 프로파일링 중"
+        if interval:
+            self.interval = interval
+        self.stacks = {}
+        self.samples = 0
+        self.running = True
+        self.started_at = time.time()
+        self.thread = threading.Thread(target=self._loop, name='sampling-profiler', daemon=True)
+        self.thread.start()
+        return True, f"프로파일링 시작 (간격 {self.interval * 1000:.1f}ms)"
+
+    def _loop(self):
+        while self.running:
+            frame = sys._current_frames().get(self.target_thread_id)
+            if frame is not None:
+                self._record(frame)
+            time.sleep(self.interval)
+
+    def _record(self, frame):
+        parts = []
+        depth = 0
+        while frame is not None and depth < self.max_depth:
+            code = frame.f_code
+            parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+            depth += 1
+        # folded 포맷은 루트 → 리프 순서
+        key = ';'.join(reversed(parts))
+        self.stacks[key] = self.stacks.get(key, 0) + 1
+        self.samples += 1
+
+    def stop(self):
+        """샘플링 종료 후 folded 파일 저장"""
+        if not self.running:
+            return False, "프로파일링 중 아님"
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=1)
+        duration = time.time() - self.started_at
+        path = self._write_folded()
+        return True, f"{self.samples}개 샘플 ({duration:.1f}초) → {path}\n" + self.top_functions()
+
+    def _write_folded(self):
+        """flamegraph.pl / speedscope 호환 collapsed stack 파일"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        path = self.output_dir / f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.folded"
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in sorted(self.stacks.items(), key=lambda x: -x[1]):
+                f.write(f"{stack} {count}\n")
+        return path
+
+    def top_functions(self, n=15):
+        """self 시간 기준 상위 함수"""
+        if not self.samples:
+            return "샘플 없음"
+        leaf_counts = {}
+        for stack, count in self.stacks.items():
+            leaf = stack.rsplit(';', 1)[-1]
+            leaf_counts[leaf] = leaf_counts.get(leaf, 0) + count
+        lines = [f"{count / self.samples * 100:5.1f}%  {leaf}"
+                 for leaf, count in sorted(leaf_counts.items(), key=lambda x: -x[1])[:n]]
+        return '\n'.join(lines)
+
+
+class MemoryTracker:
+    """tracemalloc 스냅샷 + 장기 메모리 추세"""
+
+    def __init__(self, output_dir="logs/profiles", trend_file="logs/memory_trend.jsonl",
+                 sample_interval=600, history=1000, frames=10):
+        self.output_dir = Path(output_dir)
+        self.trend_file = Path(trend_file)
+        self.sample_interval = sample_interval
+        self.frames = frames
+        self.watches = {}
+        self.samples = deque(maxlen=history)
+        self.last_snapshot = None
+        self.running = False
+        self.thread = None
+
+    def watch(self, name, size_fn):
+        """추세 추적 대상 등록 (size_fn: 크기를 반환하는 함수)"""
+        self.watches[name] = size_fn
+
+    @staticmethod
+    def rss_bytes():
+        """현재 RSS (Linux /proc, 그 외 getrusage 최대값)"""
+        try:
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, AttributeError):
+            pass
+        try:
+            import resource
+            usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return usage if sys.platform == 'darwin' else usage * 1024
+        except ImportError:
+            return 0
+
+    def sample(self):
+        """현재 메모리 상태 1회 기록"""
+        row = {'ts': time.time(), 'rss': self.rss_bytes()}
+        if tracemalloc.is_tracing():
+            row['traced'] = tracemalloc.get_traced_memory()[0]
+        for name, size_fn in self.watches.items():
+            try:
+                row[name] = size_fn()
+            except Exception:
+                row[name] = None
+        self.samples.append(row)
+        try:
+            self.trend_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.trend_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(row) + '\n')
+        except OSError as e:
+            log.warning("메모리 추세 기록 실패: %s", e)
+        return row
+
+    def start(self):
+        """주기적 샘플링 스레드 시작"""
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, name='memory-trend', daemon=True)
+        self.thread.start()
+
+    def _loop(self):
+        while self.running:
+            self.sample()
+            time.sleep(self.sample_interval)
+
+    def stop(self):
+        self.running = False
+
+    def trend(self):
+        """항목별 시간당 증가량 (최소제곱 기울기)"""
+        rows = list(self.samples)
+        if len(rows) < 2:
+            return {}
+        result = {}
+        keys = [k for k in rows[-1] if k != 'ts']
+        for key in keys:
+            points = [(r['ts'], r[key]) for r in rows if r.get(key) is not None]
+            if len(points) < 2:
+                continue
+            n = len(points)
+            mean_t = sum(p[0] for p in points) / n
+            mean_v = sum(p[1] for p in points) / n
+            var_t = sum((p[0] - mean_t) ** 2 for p in points)
+            if var_t == 0:
+                continue
+            slope = sum((p[0] - mean_t) * (p[1] - mean_v) for p in points) / var_t
+            result[key] = {'current': points[-1][1], 'per_hour': slope * 3600, 'samples': n}
+        return result
+
+    def format_trend(self):
+        trend = self.trend()
+        if not trend:
+            return "추세 데이터 부족 (샘플 2개 이상 필요)"
+        return '\n'.join(f"{key:>20}: 현재 {v['current']:,} | 시간당 {v['per_hour']:+,.1f} ({v['samples']}개 샘플)"
+                         for key, v in trend.items())
+
+    def dump_top(self, n=20):
+        """상위 할당 위치 덤프 (첫 호출은 tracemalloc 시작만)"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self.last_snapshot = None
+            return "tracemalloc 시작 - 잠시 후 다시 호출하면 상위 할당/증가분 출력"
+
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ))
+        lines = [f"# 상위 {n} 할당 위치 (현재 {tracemalloc.get_traced_memory()[0] / 1024:,.0f} KiB)"]
+        for stat in snapshot.statistics('lineno')[:n]:
+            lines.append(str(stat))
+        if self.last_snapshot is not None:
+            lines.append(f"# 직전 스냅샷 대비 증가 상위 {n}")
+            for stat in snapshot.compare_to(self.last_snapshot, 'lineno')[:n]:
+                lines.append(str(stat))
+        self.last_snapshot = snapshot
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        path = self.output_dir / f"memory_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        return '\n'.join(lines[:n + 1]) + f"\n→ {path}"
+
+    def stop_tracing(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.last_snapshot = None
+        return "tracemalloc 중지"
+
+
+class ProfilingHooks:
+    """제어 소켓 + 시그널 핸들러 (프로파일러/메모리 추적 묶음)"""
+
+    HELP = ("profile start [간격ms] | profile stop | mem [N] | mem stop | trend | help")
+
+    def __init__(self, target_thread_id=None, host='127.0.0.1', port=9109,
+                 interval_ms=5, memory_sample_seconds=600, output_dir="logs/profiles"):
+        target_thread_id = target_thread_id or threading.main_thread().ident
+        self.profiler = SamplingProfiler(target_thread_id, output_dir, interval_ms / 1000)
+        self.memory = MemoryTracker(output_dir, sample_interval=memory_sample_seconds)
+        self.host = host
+        self.port = port
+        self.server = None
+        self.thread = None
+
+    def install(self, bot=None):
+        """봇 상태 추적 등록 + 소켓/시그널 설치"""
+        if bot is not None:
+            self._watch_bot(bot)
+        self.memory.start()
+        self._install_signals()
+        return self._start_socket()
+
+    def _watch_bot(self, bot):
+        """trade_history / 수집기 버퍼 / 전략 dict 크기 추적"""
+        self.memory.watch('trade_history', lambda: len(bot.position_mgr.trade_history))
+        self.memory.watch('peak_profit_tracker', lambda: len(bot.strategy.peak_profit_tracker))
+        self.memory.watch('current_extended_tp', lambda: len(bot.strategy.current_extended_tp))
+        collector = getattr(bot, 'data_collector', None)
+        if hasattr(collector, 'ring'):
+            # CollectorFeed (사이드카): 버퍼는 별도 프로세스 → 링에 쌓인(미소비) 레코드 수
+            self.memory.watch('collector_ring', lambda: len(collector.ring))
+        elif hasattr(collector, 'price_buffer'):
+            self.memory.watch('price_buffer', lambda: len(collector.price_buffer))
+
+    def handle_command(self, line):
+        """텍스트 명령 처리"""
+        parts = line.strip().split()
+        if not parts:
+            return self.HELP
+        cmd, args = parts[0].lower(), parts[1:]
+        try:
+            if cmd == 'profile' and args and args[0] == 'start':
+                interval = float(args[1]) / 1000 if len(args) > 1 else None
+                return self.profiler.start(interval)[1]
+            if cmd == 'profile' and args and args[0] == 'stop':
+                return self.profiler.stop()[1]
+            if cmd == 'mem' and args and args[0] == 'stop':
+                return self.memory.stop_tracing()
+            if cmd == 'mem':
+                return self.memory.dump_top(int(args[0]) if args else 20)
+            if cmd == 'trend':
+                self.memory.sample()
+                return self.memory.format_trend()
+        except Exception as e:
+            return f"명령 실패: {e}"
+        return self.HELP
+
+    def _start_socket(self):
+        try:
+            self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.server.bind((self.host, self.port))
+            self.server.listen(2)
+        except OSError as e:
+            self.server = None
+            return False, f"프로파일러 제어 소켓 실패: {e}"
+        self.thread = threading.Thread(target=self._serve, name='profiler-control', daemon=True)
+        self.thread.start()
+        return True, f"{self.host}:{self.port}"
+
+    def _serve(self):
+        while self.server is not None:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                break
+            with conn:
+                try:
+                    conn.settimeout(5)
+                    line = conn.makefile('r', encoding='utf-8').readline()
+                    response = self.handle_command(line)
+                    conn.sendall((response + '\n').encode('utf-8'))
+                except OSError:
+                    pass
+
+    def _install_signals(self):
+        """POSIX 전용 (Windows는 소켓 명령 사용)"""
+        if threading.current_thread() is not threading.main_thread():
+            return
+        if hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, lambda *_: self._run_async('profile stop' if self.profiler.running else 'profile start'))
+        if hasattr(signal, 'SIGUSR2'):
+            signal.signal(signal.SIGUSR2, lambda *_: self._run_async('mem'))
+
+    def _run_async(self, command):
+        """시그널 핸들러에서는 무거운 작업 금지 → 별도 스레드에서 처리"""
+        def worker():
+            log.info("🔬 %s\n%s", command, self.handle_command(command))
+        threading.Thread(target=worker, daemon=True).start()
+
+    def shutdown(self):
+        self.memory.stop()
+        if self.profiler.running:
+            self.profiler.stop()
+        if self.server is not None:
+            server, self.server = self.server, None
+            server.close()
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""
+modules/ratelimit.py - Binance 요청 가중치 예산 스케줄러 (우선순위 + 토큰 버킷)
+
+ccxt enableRateLimit은 모든 호출을 같은 간격으로 줄 세움
+→ 다중 시간대 캔들/잔고/마켓 조회가 몰리면 손절 시장가 주문이 그 뒤에 기다림
+
+Binance 선물 한도 (IP/계정 단위)
+- REQUEST_WEIGHT: 분당 2400 (엔드포인트마다 가중치 다름, 초과 시 429 → 반복 시 418 차단)
+- ORDERS: 분당 1200, 10초당 300
+
+WeightScheduler
+- 한도별 토큰 버킷 (연속 보충), share로 이 프로세스가 쓸 비율 지정 (여러 심볼/봇 운영 시)
+- 우선순위: exit > entry > position > market_data > analytics
+  하위 등급일수록 버킷에 예비분(reserve)을 남겨야 통과 → 예산이 빠듯해도 청산 주문 몫은 항상 남음
+  같은 시점에 대기 중인 상위 등급이 있으면 하위 등급은 양보
+- 응답 헤더(X-MBX-USED-WEIGHT-1M)로 서버 집계와 동기화, 429/418이면 버킷을 비움
+
+ScheduledExchange: ccxt 인스턴스 프록시 - 요청 메서드만 가중치 계산 후 acquire, 나머지 속성은 그대로
+우선순위는 메서드별 기본값 (reduceOnly 주문 / 주문 조회·취소는 'exit'), 호출 구간에서 바꾸려면 with request_priority('exit'):
+"""
+
+import contextlib
+import contextvars
+import threading
+import time
+
+from .telemetry import metrics
+from .logger import get_logger
+
+log = get_logger('ratelimit')
+
+PRIORITIES = ('exit', 'entry', 'position', 'market_data', 'analytics')
+
+# 버킷 잔량 중 등급별로 남겨둬야 하는 비율
+DEFAULT_RESERVES = {'exit': 0.0, 'entry': 0.05, 'position': 0.15, 'market_data': 0.30, 'analytics': 0.50}
+
+_priority = contextvars.ContextVar('lumi_request_priority', default=None)
+
+
+@contextlib.contextmanager
+def request_priority(priority):
+    """구간 내 요청의 우선순위 지정 (예: 청산 주문은 'exit')"""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority():
+    """현재 구간의 요청 우선순위 (지정 안 됐으면 None)"""
+    return _priority.get()
+
+
+def _kline_weight(args, kwargs):
+    # fetch_ohlcv(symbol, timeframe, since, limit)
+    limit = kwargs.get('limit') or (args[3] if len(args) > 3 else None) or 500
+    return 1 if limit < 100 else 2 if limit < 500 else 5 if limit <= 1000 else 10
+
+
+def _depth_weight(args, kwargs):
+    limit = kwargs.get('limit') or (args[1] if len(args) > 1 else None) or 500
+    return 2 if limit <= 50 else 5 if limit <= 100 else 10 if limit <= 500 else 20
+
+
+def _open_orders_weight(args, kwargs):
+    return 1 if (args and args[0]) or kwargs.get('symbol') else 40
+
+
+def _order_priority(args, kwargs):
+    """create_order(symbol, type, side, amount, price, params) - reduceOnly(청산)면 'exit'"""
+    params = kwargs.get('params') or (args[5] if len(args) > 5 else None) or {}
+    return 'exit' if params.get('reduceOnly') else 'entry'
+
+
+# 메서드 → (가중치 또는 함수, 기본 우선순위 또는 함수, 주문 수)
+# 주문 조회/취소는 청산 경로(체결 확인, 고아 주문 정리)에서도 쓰임 → 'exit' (가중치 1이라 예산 영향 작음)
+ENDPOINTS = {
+    'create_order': (1, _order_priority, 1),
+    'create_market_buy_order': (1, 'entry', 1),
+    'create_market_sell_order': (1, 'entry', 1),
+    'create_limit_buy_order': (1, 'entry', 1),
+    'create_limit_sell_order': (1, 'entry', 1),
+    'cancel_order': (1, 'exit', 0),
+    'fetch_order': (1, 'exit', 0),
+    'fetch_positions': (5, 'position', 0),
+    'fetch_balance': (5, 'position', 0),
+    'fetch_open_orders': (_open_orders_weight, 'position', 0),
+    'fetch_my_trades': (5, 'position', 0),
+    'fetch_ohlcv': (_kline_weight, 'market_data', 0),
+    'fetch_order_book': (_depth_weight, 'market_data', 0),
+    'fetch_ticker': (1, 'market_data', 0),
+    'fapiPublicGetAggTrades': (20, 'market_data', 0),
+    'fapiPrivatePostLeverage': (1, 'analytics', 0),
+    'load_markets': (1, 'analytics', 0),
+}
+
+
+class TokenBucket:
+    """연속 보충 토큰 버킷"""
+
+    def __init__(self, capacity, period, clock=time.monotonic):
+        self.capacity = float(capacity)
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.clock = clock
+        self.updated = clock()
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, reserve):
+        """amount를 쓰고도 reserve 비율이 남을 때까지 남은 시간 (0이면 즉시 가능)"""
+        deficit = amount + reserve * self.capacity - self.tokens
+        if amount > self.capacity:
+            # 한도보다 큰 단일 요청은 버킷이 가득 찰 때 통과
+            deficit = self.capacity - self.tokens
+        return max(0.0, deficit / self.rate)
+
+    @property
+    def utilization(self):
+        return 1.0 - self.tokens / self.capacity
+
+
+class WeightScheduler:
+    """요청 가중치/주문 수 예산 스케줄러 (스레드 안전)"""
+
+    def __init__(self, weight_per_min=2400, orders_per_min=1200, orders_per_10s=300, share=1.0,
+                 reserves=None, clock=time.monotonic):
+        self.weight_limit = weight_per_min
+        self.share = share
+        self.clock = clock
+        self.weight = TokenBucket(weight_per_min * share, 60, clock)
+        self.orders = [TokenBucket(orders_per_min * share, 60, clock),
+                       TokenBucket(orders_per_10s * share, 10, clock)]
+        self.reserves = dict(DEFAULT_RESERVES, **(reserves or {}))
+        self.cond = threading.Condition()
+        self.waiting = {p: 0 for p in PRIORITIES}
+        self.used = {p: 0 for p in PRIORITIES}
+        self.waited = {p: 0.0 for p in PRIORITIES}
+        self.rate_limited = 0
+
+    def _wait_time(self, weight, orders, reserve):
+        wait = self.weight.wait_time(weight, reserve)
+        if orders:
+            wait = max([wait] + [bucket.wait_time(orders, reserve) for bucket in self.orders])
+        return wait
+
+    def acquire(self, weight, priority='market_data', orders=0):
+        """
+        예산 확보 (부족하면 대기)
+
+        Returns:
+            float: 대기한 시간 (초)
+        """
+        if priority not in self.waiting:
+            priority = 'analytics'
+        rank = PRIORITIES.index(priority)
+        reserve = self.reserves[priority]
+        started = self.clock()
+        with self.cond:
+            self.waiting[priority] += 1
+            try:
+                while True:
+                    now = self.clock()
+                    self.weight.refill(now)
+                    for bucket in self.orders:
+                        bucket.refill(now)
+                    wait = self._wait_time(weight, orders, reserve)
+                    yielding = any(self.waiting[p] for p in PRIORITIES[:rank])
+                    if wait <= 0 and not yielding:
+                        break
+                    self.cond.wait(timeout=min(max(wait, 0.01), 1.0))
+                self.weight.tokens -= weight
+                for bucket in self.orders:
+                    bucket.tokens -= orders
+                self.used[priority] += weight
+            finally:
+                self.waiting[priority] -= 1
+                self.cond.notify_all()
+
+        waited = self.clock() - started
+        self.waited[priority] += waited
+        metrics.inc('lumi_rate_weight_total', weight, priority=priority)
+        metrics.set_gauge('lumi_rate_budget_utilization', self.weight.utilization, bucket='weight')
+        if orders:
+            metrics.set_gauge('lumi_rate_budget_utilization', self.orders[1].utilization, bucket='orders_10s')
+        if waited > 0.001:
+            metrics.observe('lumi_rate_wait_seconds', waited, priority=priority)
+        return waited
+
+    def sync_used_weight(self, used):
+        """
+        서버 집계(X-MBX-USED-WEIGHT-1M) 반영 - 다른 프로세스 사용분 포함
+
+        서버 기준 남은 가중치 중 share 비율까지만 (같은 IP의 다른 프로세스도 남은 몫을 같이 보므로
+        share < 1이면 전부 가져가지 않음 - 예: history CLI 0.5가 봇 몫을 남김)
+        """
+        with self.cond:
+            self.weight.refill(self.clock())
+            remaining = max(0.0, self.weight_limit - used) * self.share
+            self.weight.tokens = min(self.weight.tokens, remaining)
+            metrics.set_gauge('lumi_rate_server_used_weight', used)
+
+    def on_rate_limited(self):
+        """429/418 응답: 버킷을 비워서 보충될 때까지 모든 등급 대기"""
+        with self.cond:
+            self.rate_limited += 1
+            self.weight.tokens = 0.0
+        metrics.inc('lumi_rate_limited_total')
+
+    def stats(self):
+        """예산 사용 현황"""
+        with self.cond:
+            now = self.clock()
+            self.weight.refill(now)
+            for bucket in self.orders:
+                bucket.refill(now)
+            return {
+                'weight_utilization': round(self.weight.utilization, 3),
+                'orders_10s_utilization': round(self.orders[1].utilization, 3),
+                'weight_by_priority': dict(self.used),
+                'wait_seconds_by_priority': {p: round(w, 3) for p, w in self.waited.items()},
+                'rate_limited': self.rate_limited,
+            }
+
+
+class ScheduledExchange:
+    """ccxt 인스턴스 프록시 (요청 메서드만 스케줄러 경유)"""
+
+    def __init__(self, exchange, scheduler):
+        self._exchange = exchange
+        self._scheduler = scheduler
+
+    def __getattr__(self, name):
+        attr = getattr(self._exchange, name)
+        spec = ENDPOINTS.get(name)
+        if spec is None or not callable(attr):
+            return attr
+        weight, default_priority, orders = spec
+        scheduler = self._scheduler
+        exchange = self._exchange
+
+        def call(*args, **kwargs):
+            cost = weight(args, kwargs) if callable(weight) else weight
+            priority = _priority.get() or (default_priority(args, kwargs) if callable(default_priority)
+                                           else default_priority)
+            scheduler.acquire(cost, priority, orders)
+            try:
+                result = attr(*args, **kwargs)
+            except Exception as e:
+                if type(e).__name__ in ('RateLimitExceeded', 'DDoSProtection'):
+                    scheduler.on_rate_limited()
+                raise
+            used = _used_weight(getattr(exchange, 'last_response_headers', None))
+            if used is not None:
+                scheduler.sync_used_weight(used)
+            return result
+        return call
+
+
+def _used_weight(headers):
+    """응답 헤더의 분당 사용 가중치 (대소문자 무관)"""
+    if not headers:
+        return None
+    for key, value in headers.items():
+        if key.lower() == 'x-mbx-used-weight-1m':
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                return None
+    return None
@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""
+modules/reconcile.py - 로컬 포지션 ↔ 거래소 포지션/미체결 주문 대조 (백그라운드)
+
+부분 체결, 수동 청산, 강제 청산 등으로 로컬 상태가 거래소와 어긋나는 경우를 찾아서 고침
+- 대부분의 주기는 캐시된 계정 상태와만 비교 (REST 호출 없음)
+- 캐시가 refresh_seconds보다 오래됐거나, 체결 직후(fill_delay 뒤), 불일치 의심 시에만 재조회
+- 불일치는 confirm_seconds 뒤 재조회에서 같은 결과가 나와야 확정 (주문 진행 중 일시적 차이 무시)
+- 확정된 수정은 pending에 쌓고 메인 루프가 apply_pending()으로 적용
+  (조회 시점의 PositionManager.version과 다르면 그 사이 상태가 바뀐 것이므로 버림)
+- 봇이 낸 주문(clientOrderId 'lumi-')이 orphan_seconds 넘게 남아 있으면 취소, 외부 주문은 알림만
+
+불일치 종류
+- closed_externally: 로컬은 보유, 거래소는 없음 (수동 청산/강제 청산/외부 SL)
+- untracked: 로컬은 없음, 거래소는 보유 (수동 진입/응답 유실)
+- side: 방향이 다름
+- size: 수량 차이가 size_tolerance 초과 (부분 체결/부분 청산)
+"""
+
+import threading
+import time
+from collections import deque
+
+from .telemetry import metrics
+from .logger import get_logger
+from .utils import safe_float
+
+log = get_logger('reconcile')
+
+BOT_ORDER_PREFIX = 'lumi-'
+
+
+class PositionReconciler:
+    """포지션 대조기"""
+
+    def __init__(self, exchange_manager, position_mgr, notifier=None, interval=5.0, refresh_seconds=60.0,
+                 fill_delay=2.0, confirm_seconds=3.0, size_tolerance=0.001, orphan_seconds=30.0,
+                 price_fn=None, clock=time.monotonic):
+        """
+        Args:
+            interval: 대조 주기 (초, 캐시 비교라 짧아도 비용 없음)
+            refresh_seconds: 캐시 최대 수명 (초과 시 REST 재조회)
+            fill_delay: 체결 통보 후 재조회까지 대기 (거래소 반영 지연)
+            confirm_seconds: 불일치 확정용 재조회 간격
+            size_tolerance: 허용 수량 차이 (ETH)
+            orphan_seconds: 봇 주문을 고아로 보고 취소하기까지의 시간
+            price_fn: 현재가 콜백 (외부 청산 가격을 체결 내역에서 못 찾을 때)
+        """
+        self.exchange_mgr = exchange_manager
+        self.position_mgr = position_mgr
+        self.notifier = notifier
+        self.interval = interval
+        self.refresh_seconds = refresh_seconds
+        self.fill_delay = fill_delay
+        self.confirm_seconds = confirm_seconds
+        self.size_tolerance = size_tolerance
+        self.orphan_seconds = orphan_seconds
+        self.price_fn = price_fn
+        self.clock = clock
+
+        self.cache = None
+        self.cache_time = None
+        self.refresh_at = None        # 강제 재조회 시각 (체결/의심)
+        self.suspect = None           # (kind, version)
+        self.pending = deque()        # 확정된 수정 (메인 스레드 적용)
+        self.orders_seen = {}         # 주문 id → 처음 본 시각
+        self.foreign_alerted = set()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    # ------------------------------------------------------------------ 스레드
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self._run, name="position-reconciler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.wakeup.set()
+        if self.thread:
+            self.thread.join(timeout=2)
+
+    def notify_fill(self):
+        """주문 체결 직후 호출 (fill_delay 뒤 재조회)"""
+        with self.lock:
+            self.refresh_at = self.clock() + self.fill_delay
+        self.wakeup.set()
+
+    def _run(self):
+        while not self.stopped.is_set():
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            if self.stopped.is_set():
+                break
+            try:
+                self.check()
+            except Exception as e:
+                metrics.inc('lumi_errors_total', component='reconcile')
+                log.warning("포지션 대조 실패: %s", e, extra={'sample_key': 'reconcile_error'})
+
+    # ------------------------------------------------------------------ 대조
+
+    def _local(self):
+        pm = self.position_mgr
+        return {'version': pm.version, 'side': pm.position, 'size': pm.position_size or 0.0,
+                'entry_price': pm.entry_price, 'entry_time': pm.entry_time}
+
+    def diff(self, local, remote):
+        """불일치 종류 (일치하면 None)"""
+        if local['side'] and not remote:
+            return 'closed_externally'
+        if remote and not local['side']:
+            return 'untracked'
+        if not remote:
+            return None
+        if remote['side'] != local['side']:
+            return 'side'
+        if abs(remote['size'] - local['size']) > self.size_tolerance:
+            return 'size'
+        return None
+
+    def _due(self, now):
+        if self.cache is None or now - self.cache_time >= self.refresh_seconds:
+            return True
+        return self.refresh_at is not None and now >= self.refresh_at
+
+    def check(self):
+        """
+        대조 1회
+
+        Returns:
+            str | None: 이번 주기에 확정된 불일치 종류
+        """
+        now = self.clock()
+        with self.lock:
+            due = self._due(now)
+        if not due:
+            metrics.inc('lumi_reconcile_checks_total', source='cache')
+            metrics.set_gauge('lumi_reconcile_cache_age_seconds', now - self.cache_time)
+            if self.diff(self._local(), self.cache['position']):
+                # 캐시 기준 불일치 → 바로 고치지 않고 재조회로 확인
+                with self.lock:
+                    if self.refresh_at is None:
+                        self.refresh_at = now
+            return None
+
+        ok, state = self.exchange_mgr.get_account_state()
+        metrics.inc('lumi_reconcile_checks_total', source='rest')
+        if not ok:
+            log.warning("계정 상태 조회 실패: %s", state, extra={'sample_key': 'reconcile_fetch'})
+            return None
+        with self.lock:
+            self.cache, self.cache_time, self.refresh_at = state, now, None
+        self._check_orders(state['open_orders'], now)
+
+        local = self._local()
+        remote = state['position']
+        kind = self.diff(local, remote)
+        if kind is None:
+            self.suspect = None
+            return None
+
+        metrics.inc('lumi_reconcile_divergence_total', kind=kind)
+        if self.suspect != (kind, local['version']):
+            self.suspect = (kind, local['version'])
+            with self.lock:
+                self.refresh_at = now + self.confirm_seconds
+            log.info("포지션 불일치 의심 (%s) - %.0f초 뒤 재확인", kind, self.confirm_seconds)
+            return None
+
+        self.suspect = None
+        fix = self._build_fix(kind, local, remote)
+        self.pending.append(fix)
+        log.warning("⚠️ 포지션 불일치 확정: %s", fix['message'])
+        if self.notifier:
+            self.notifier.send(f"⚠️ <b>포지션 불일치</b>\n\n{fix['message']}\n→ 거래소 기준으로 수정")
+        return kind
+
+    def _build_fix(self, kind, local, remote):
+        """수정 내용 (필요한 추가 조회는 여기서 - 백그라운드 스레드)"""
+        fix = {'kind': kind, 'version': local['version'], 'local_side': local['side'],
+               'position': remote, 'exit_price': None}
+        describe = lambda p: f"{p['side']} {p['size']:.4f} @ ${p['entry_price']:.2f}" if p and p.get('side') else "없음"
+        local_text = describe({'side': local['side'], 'size': local['size'], 'entry_price': local['entry_price'] or 0})
+        fix['message'] = f"{kind}: 로컬 {local_text} / 거래소 {describe(remote)}"
+
+        if kind in ('closed_externally', 'side'):
+            fix['exit_price'] = self._exit_price(local)
+        if kind in ('untracked', 'side'):
+            remote = dict(remote)
+            remote['entry_time'] = self.exchange_mgr.get_entry_time(remote)
+            fix['position'] = remote
+        return fix
+
+    def _exit_price(self, local):
+        """외부 청산 가격: 로컬 진입 이후 반대 방향 체결의 평균가 → 현재가 → 진입가"""
+        closing_side = 'sell' if local['side'] == 'LONG' else 'buy'
+        since = local['entry_time'].timestamp() * 1000 if local['entry_time'] else 0
+        trades = [t for t in self.exchange_mgr.get_recent_trades()
+                  if t.get('side') == closing_side and (t.get('timestamp') or 0) >= since]
+        amount = sum(safe_float(t.get('amount', 0)) for t in trades)
+        if amount > 0:
+            return sum(safe_float(t.get('amount', 0)) * safe_float(t.get('price', 0)) for t in trades) / amount
+        price = self.price_fn() if self.price_fn else None
+        return price or local['entry_price']
+
+    def _check_orders(self, orders, now):
+        """고아 봇 주문 취소 / 외부 주문 알림"""
+        open_ids = set()
+        for order in orders or []:
+            order_id = order.get('id')
+            open_ids.add(order_id)
+            client_id = order.get('clientOrderId') or ''
+            if not client_id.startswith(BOT_ORDER_PREFIX):
+                if order_id not in self.foreign_alerted:
+                    self.foreign_alerted.add(order_id)
+                    metrics.inc('lumi_reconcile_divergence_total', kind='foreign_order')
+                    log.warning("외부 미체결 주문: %s %s %s @ %s", order_id, order.get('side'),
+                                order.get('amount'), order.get('price'))
+                continue
+            first_seen = self.orders_seen.setdefault(order_id, now)
+            if now - first_seen < self.orphan_seconds:
+                continue
+            try:
+                metrics.inc('lumi_rest_calls_total', endpoint='cancel_order')
+                self.exchange_mgr.exchange.cancel_order(order_id, self.exchange_mgr.symbol)
+                metrics.inc('lumi_reconcile_fixes_total', kind='orphan_order')
+                log.warning("고아 주문 취소: %s (%s)", order_id, client_id)
+            except Exception as e:
+                metrics.inc('lumi_errors_total', component='reconcile')
+                log.warning("고아 주문 취소 실패: %s", e)
+        for order_id in list(self.orders_seen):
+            if order_id not in open_ids:
+                del self.orders_seen[order_id]
+        self.foreign_alerted &= open_ids
+
+    # ------------------------------------------------------------------ 적용 (메인 스레드)
+
+    def apply_pending(self):
+        """
+        확정된 수정 적용 (틱 시작 시 호출 - REST 없음)
+
+        Returns:
+            list: 적용된 수정 (kind, message, ...)
+        """
+        applied = []
+        pm = self.position_mgr
+        while self.pending:
+            fix = self.pending.popleft()
+            if fix['version'] != pm.version:
+                # 조회 이후 로컬 상태가 바뀜 (방금 진입/청산) → 다시 대조
+                metrics.inc('lumi_reconcile_stale_total')
+                self.notify_fill()
+                continue
+            kind, remote = fix['kind'], fix['position']
+            reason = f"RECONCILE ({kind})"
+            if kind == 'closed_externally':
+                pm.close_position(fix['exit_price'], reason)
+            elif kind == 'untracked':
+                pm.load_from_exchange(remote)
+            elif kind == 'side':
+                pm.close_position(fix['exit_price'], reason)
+                pm.load_from_exchange(remote)
+            elif kind == 'size':
+                pm.sync_size(remote['size'], remote['entry_price'])
+            metrics.inc('lumi_reconcile_fixes_total', kind=kind)
+            applied.append(fix)
+        return applied
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+modules/regime.py - 봉 단위 시장 국면 분류기 (히스테리시스 캐시)
+
+마감된 봉마다 한 번만 분류하고 결과를 보관 → 틱마다 호출하는 determine_mode는 O(1) 조회
+- 추세 강도: ADX (adx_trend 이상 TRENDING 진입, adx_range 미만 RANGING 복귀)
+- 스퀴즈: BB 밴드폭 (squeeze_enter 이하 진입, squeeze_exit 초과 해제)
+- 변동성: ATR/가격의 최근 vol_window봉 백분위 (HIGH/LOW 진입 후 vol_band만큼 돌아와야 NORMAL)
+- 방향: EMA21 기울기 (slope_bars봉 변화율, ±slope_flat_pct 이내는 FLAT)
+- 모드: 기존 규칙(RSI 50 이상 TREND)에 ±mode_band 히스테리시스 → 경계에서 모드가 깜빡이지 않음
+
+classify(df): 같은 규칙의 벡터 버전 (백테스트용, 증분 결과와 봉마다 일치)
+히스테리시스 = '진입/해제 조건을 만족한 마지막 봉의 결정'을 앞으로 채우기 → ffill로 벡터화
+"""
+
+import math
+from bisect import bisect_right, insort
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+REGIME_COLUMNS = ['regime_trend', 'regime_squeeze', 'regime_volatility', 'regime_direction', 'regime_mode']
+
+
+def _hysteresis(state, value, on, off):
+    """value >= on이면 True, value < off이면 False, 그 사이(또는 NaN)는 이전 상태 유지"""
+    if value >= on:
+        return True
+    if value < off:
+        return False
+    return state
+
+
+def _hysteresis_vec(values, on, off, initial):
+    decision = np.where(values >= on, 1.0, np.where(values < off, 0.0, np.nan))
+    filled = pd.Series(decision).ffill().to_numpy()
+    if initial is None:
+        return filled
+    return np.where(np.isnan(filled), float(initial), filled)
+
+
+class RegimeClassifier:
+    """시장 국면 분류기 (한 시간대)"""
+
+    def __init__(self, adx_trend=25.0, adx_range=20.0, squeeze_enter=0.03, squeeze_exit=0.035,
+                 vol_window=288, vol_min_periods=20, vol_high=80.0, vol_low=20.0, vol_band=10.0,
+                 slope_bars=5, slope_flat_pct=0.05, mode_rsi=50.0, mode_band=2.0):
+        self.adx_trend = adx_trend
+        self.adx_range = adx_range
+        self.squeeze_enter = squeeze_enter
+        self.squeeze_exit = squeeze_exit
+        self.vol_window = vol_window
+        self.vol_min_periods = vol_min_periods
+        self.vol_high = vol_high
+        self.vol_low = vol_low
+        self.vol_band = vol_band
+        self.slope_bars = slope_bars
+        self.slope_flat_pct = slope_flat_pct
+        self.mode_rsi = mode_rsi
+        self.mode_band = mode_band
+        self.reset()
+
+    def reset(self):
+        self.last_ts = None
+        self.vol_values = deque()      # 창 안의 ATR% (NaN 포함)
+        self.vol_sorted = []           # 창 안의 유효 ATR% 정렬본
+        self.emas = deque(maxlen=self.slope_bars + 1)
+        self.trending = False
+        self.squeeze = False
+        self.vol_is_high = False
+        self.vol_is_low = False
+        self.trend_mode = None         # True: TREND / False: REVERSAL / None: 판단 전
+        self.state = {col: None for col in REGIME_COLUMNS}
+        self.state.update({'vol_percentile': None, 'ema_slope_pct': None, 'since': None})
+
+    # ------------------------------------------------------------------ 증분
+
+    def on_bar(self, row):
+        """마감된 봉 1개 반영 (FeaturePipeline 리스너)"""
+        self.update(row['timestamp'], row['close'], row['rsi'], row['adx'], row['bb_bandwidth'],
+                    row['atr'], row['ema21'])
+
+    def update(self, ts, close, rsi, adx, bandwidth, atr, ema):
+        if self.last_ts is not None and ts <= self.last_ts:
+            return self.state
+        self.last_ts = ts
+
+        self.trending = _hysteresis(self.trending, adx, self.adx_trend, self.adx_range)
+        self.squeeze = _hysteresis(self.squeeze, -bandwidth, -self.squeeze_enter, -self.squeeze_exit)
+
+        pct = self._vol_percentile(atr / close * 100 if close else math.nan)
+        self.vol_is_high = _hysteresis(self.vol_is_high, pct, self.vol_high, self.vol_high - self.vol_band)
+        self.vol_is_low = _hysteresis(self.vol_is_low, -pct, -self.vol_low, -(self.vol_low + self.vol_band))
+
+        self.emas.append(ema)
+        slope = math.nan
+        if len(self.emas) == self.emas.maxlen and self.emas[0]:
+            slope = float((ema - self.emas[0]) / self.emas[0] * 100)
+
+        mode = _hysteresis(self.trend_mode, rsi, self.mode_rsi + self.mode_band, self.mode_rsi - self.mode_band)
+        self.trend_mode = mode
+
+        label = None if mode is None else 'TREND' if mode else 'REVERSAL'
+        since = self.state['since'] if label == self.state['regime_mode'] else ts
+        self.state = {
+            'regime_trend': 'TRENDING' if self.trending else 'RANGING',
+            'regime_squeeze': self.squeeze,
+            'regime_volatility': 'HIGH' if self.vol_is_high else 'LOW' if self.vol_is_low else 'NORMAL',
+            'regime_direction': self._direction(slope),
+            'regime_mode': label,
+            'vol_percentile': None if math.isnan(pct) else pct,
+            'ema_slope_pct': None if math.isnan(slope) else slope,
+            'since': since,               # 현재 모드 시작 봉
+        }
+        return self.state
+
+    def _vol_percentile(self, value):
+        """창 안에서 value 이하 비율 (%) - pandas rolling rank(method='max', pct=True)와 동일"""
+        self.vol_values.append(value)
+        if not math.isnan(value):
+            insort(self.vol_sorted, value)
+        if len(self.vol_values) > self.vol_window:
+            old = self.vol_values.popleft()
+            if not math.isnan(old):
+                del self.vol_sorted[bisect_right(self.vol_sorted, old) - 1]
+        if math.isnan(value) or len(self.vol_sorted) < self.vol_min_periods:
+            return math.nan
+        return bisect_right(self.vol_sorted, value) / len(self.vol_sorted) * 100
+
+    def _direction(self, slope):
+        if slope > self.slope_flat_pct:
+            return 'UP'
+        if slope < -self.slope_flat_pct:
+            return 'DOWN'
+        return 'FLAT'
+
+    # ------------------------------------------------------------------ 조회
+
+    @property
+    def mode(self):
+        """캐시된 모드 (TREND / REVERSAL / 판단 전 None)"""
+        return self.state['regime_mode']
+
+    def snapshot(self):
+        return dict(self.state)
+
+    # ------------------------------------------------------------------ 벡터 (백테스트)
+
+    def classify(self, df):
+        """
+        피처 DataFrame 전체 분류 (FeaturePipeline.compute 결과)
+
+        Returns:
+            DataFrame: REGIME_COLUMNS + vol_percentile, ema_slope_pct (df와 같은 인덱스)
+        """
+        close = df['close'].to_numpy(dtype=float)
+        adx = df['adx'].to_numpy(dtype=float)
+        bandwidth = df['bb_bandwidth'].to_numpy(dtype=float)
+        rsi = df['rsi'].to_numpy(dtype=float)
+        ema = df['ema21'].to_numpy(dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            atr_pct = df['atr'].to_numpy(dtype=float) / close * 100
+
+        trending = _hysteresis_vec(adx, self.adx_trend, self.adx_range, False).astype(bool)
+        squeeze = _hysteresis_vec(-bandwidth, -self.squeeze_enter, -self.squeeze_exit, False).astype(bool)
+
+        pct = (pd.Series(atr_pct).rolling(self.vol_window, min_periods=self.vol_min_periods)
+               .rank(method='max', pct=True).to_numpy() * 100)
+        vol_high = _hysteresis_vec(pct, self.vol_high, self.vol_high - self.vol_band, False).astype(bool)
+        vol_low = _hysteresis_vec(-pct, -self.vol_low, -(self.vol_low + self.vol_band), False).astype(bool)
+
+        prev_ema = pd.Series(ema).shift(self.slope_bars).to_numpy()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope = np.where(prev_ema != 0, (ema - prev_ema) / prev_ema * 100, np.nan)
+
+        mode = _hysteresis_vec(rsi, self.mode_rsi + self.mode_band, self.mode_rsi - self.mode_band, None)
+
+        return pd.DataFrame({
+            'regime_trend': np.where(trending, 'TRENDING', 'RANGING'),
+            'regime_squeeze': squeeze,
+            'regime_volatility': np.where(vol_high, 'HIGH', np.where(vol_low, 'LOW', 'NORMAL')),
+            'regime_direction': np.where(slope > self.slope_flat_pct, 'UP',
+                                         np.where(slope < -self.slope_flat_pct, 'DOWN', 'FLAT')),
+            'regime_mode': pd.Series(mode).map({1.0: 'TREND', 0.0: 'REVERSAL'}).to_numpy(),
+            'vol_percentile': pct,
+            'ema_slope_pct': slope,
+        }, index=df.index)
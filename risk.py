@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""
+modules/risk.py - 실시간 리스크 한도 (일일 손실 / 연속 손실 / 보유 봉 수)
+
+config의 MAX_DAILY_LOSS_PERCENT, MAX_CONSECUTIVE_LOSSES, POSITION_TIMEOUT_BARS를 실제로 집행
+- 상태는 전부 누적 카운터 (체결/틱마다 상수 개 연산만, 이력 재계산 없음)
+  자산(실현 누적), 오늘 실현/미실현 손익, 연속 손실, 보유 봉 수, 노출(명목가)
+- can_enter(): 진입 전 게이트 (일일 손실 한도 도달 / 연속 손실 휴식 중이면 차단)
+- on_tick(): 보유 중 강제 청산 사유 반환 (일일 손실 한도 - 미실현 포함 / 보유 봉 수 초과)
+- 날짜가 바뀌면 오늘 손익을 0으로, 기준 자산을 현재 자산으로
+- 재시작 시 replay(거래 이력)로 오늘 실현 손익과 연속 손실 복원 (시작 시 1회)
+- 거래소 잔고로 자산을 한 번도 못 맞췄으면 (시작 시 잔고 조회 실패) 일일 손실 한도를 검사할 수 없음
+  → sync_equity 전까지 진입 차단 (잔고 조회가 성공하는 대로 기준 자산 설정)
+
+검사 1회 시간은 latency_budget 안이어야 함 → 초과 시 카운터 증가 + 1회 경고
+"""
+
+import time
+from datetime import datetime, timedelta
+
+from .telemetry import metrics
+from .logger import get_logger
+
+log = get_logger('risk')
+
+
+class RiskEngine:
+    """리스크 한도 엔진 (메인 루프 스레드에서만 호출)"""
+
+    def __init__(self, max_daily_loss_pct=10.0, max_consecutive_losses=3, timeout_bars=12,
+                 streak_pause=3600.0, fee_rate=0.0005, latency_budget=50e-6, clock=time.time):
+        """
+        Args:
+            max_daily_loss_pct: 오늘 기준 자산 대비 손실 한도 % (0이면 끔)
+            max_consecutive_losses: 연속 손실 한도 (0이면 끔)
+            timeout_bars: 최대 보유 봉 수 (0이면 끔)
+            streak_pause: 연속 손실 한도 도달 후 진입 휴식 (초, 지나면 연속 손실 초기화)
+            fee_rate: 편도 수수료율 (실현 손익에서 차감)
+            latency_budget: 검사 1회 시간 예산 (초)
+        """
+        self.max_daily_loss_pct = max_daily_loss_pct
+        self.max_consecutive_losses = max_consecutive_losses
+        self.timeout_bars = timeout_bars
+        self.streak_pause = streak_pause
+        self.fee_rate = fee_rate
+        self.latency_budget = latency_budget
+        self.clock = clock
+
+        self.equity = 0.0             # 실현 기준 자산 (USDT)
+        self.equity_synced = False    # 거래소 잔고로 한 번이라도 맞췄는지
+        self.day = None
+        self.day_end = 0.0            # 다음 자정 (timestamp) - 틱마다 날짜 계산 안 함
+        self.day_equity = 0.0         # 오늘 시작 자산
+        self.realized_today = 0.0
+        self.unrealized = 0.0
+        self.loss_streak = 0
+        self.paused_until = 0.0
+
+        self.side = None
+        self.entry_price = 0.0
+        self.size = 0.0
+        self.direction = 0
+        self.exposure = 0.0           # 현재 명목가
+        self.bars_in_trade = 0
+        self.last_bar = None
+
+        self.budget_exceeded = 0
+        self.budget_warned = False
+
+    # ------------------------------------------------------------------ 자산/날짜
+
+    def _set_day(self):
+        self.day = datetime.fromtimestamp(self.clock()).date()
+        self.day_end = datetime.combine(self.day + timedelta(days=1), datetime.min.time()).timestamp()
+
+    def _roll_day(self):
+        if self.clock() >= self.day_end:
+            self._set_day()
+            self.day_equity = self.equity
+            self.realized_today = 0.0
+
+    def sync_equity(self, total):
+        """거래소 잔고로 자산 보정 (연결 시/잔고 조회 시)"""
+        if total is None or total <= 0:
+            return
+        first = not self.equity_synced
+        self.equity = float(total)
+        self.equity_synced = True
+        if first or self.day_equity <= 0:
+            # 첫 보정: 오늘 시작 자산 = 현재 - 오늘 실현분 (replay로 복원된 경우)
+            # (보정 전 청산/날짜 변경으로 잡힌 기준 자산은 잔고를 모른 채 계산한 값이라 버림)
+            self._set_day()
+            self.day_equity = self.equity - self.realized_today
+
+    def replay(self, trade_history):
+        """거래 이력으로 오늘 실현 손익/연속 손실 복원 (PositionManager.trade_history)"""
+        self._roll_day()
+        today = self.day.isoformat()
+        streak = 0
+        realized = 0.0
+        last_exit = None
+        for record in trade_history:
+            if record.get('type') != 'exit' or record.get('pnl_pct') is None:
+                continue
+            direction = 1 if record.get('side') == 'LONG' else -1
+            entry = record.get('entry_price') or 0.0
+            exit_price = record.get('exit_price') or 0.0
+            size = record.get('size') or 0.0
+            if entry and exit_price:
+                # on_exit과 같은 기준 (수수료 차감 후) - 수수료보다 작은 이익도 손실로 셈
+                unit = (exit_price - entry) * direction - (entry + exit_price) * self.fee_rate
+                pnl = unit * size
+                loss = unit <= 0
+            else:
+                pnl = 0.0
+                loss = record['pnl_pct'] <= 0
+            streak = streak + 1 if loss else 0
+            last_exit = record.get('time')
+            if str(record.get('time', '')).startswith(today):
+                realized += pnl
+        self.loss_streak = streak
+        self.realized_today = realized
+        if self.max_consecutive_losses and streak >= self.max_consecutive_losses and last_exit:
+            # 휴식 중에 재시작했으면 남은 휴식 유지
+            try:
+                self.paused_until = datetime.fromisoformat(last_exit).timestamp() + self.streak_pause
+            except ValueError:
+                self.paused_until = self.clock() + self.streak_pause
+        if self.day_equity > 0:
+            self.day_equity = self.equity - realized
+
+    # ------------------------------------------------------------------ 체결
+
+    def on_entry(self, side, price, size, bars=0):
+        """진입 체결 (bars: 기존 포지션 로드 시 이미 지난 봉 수)"""
+        self.side = side
+        self.direction = 1 if side == 'LONG' else -1
+        self.entry_price = float(price)
+        self.size = float(size)
+        self.exposure = self.entry_price * self.size
+        self.unrealized = 0.0
+        self.bars_in_trade = bars
+        self.last_bar = None
+
+    def on_exit(self, price):
+        """
+        청산 체결 → 실현 손익 반영
+
+        Returns:
+            float: 실현 손익 (USDT, 수수료 차감)
+        """
+        if not self.side:
+            return 0.0
+        self._roll_day()
+        price = float(price)
+        pnl = ((price - self.entry_price) * self.direction - (self.entry_price + price) * self.fee_rate) * self.size
+        self.equity += pnl
+        self.realized_today += pnl
+        if pnl <= 0:
+            self.loss_streak += 1
+            if self.max_consecutive_losses and self.loss_streak >= self.max_consecutive_losses:
+                self.paused_until = self.clock() + self.streak_pause
+                metrics.inc('lumi_risk_blocks_total', reason='streak')
+        else:
+            self.loss_streak = 0
+        self.flat()
+        return pnl
+
+    def flat(self):
+        """포지션 없음 (외부 청산 등 실현 손익을 모를 때도 사용)"""
+        self.side = None
+        self.direction = 0
+        self.size = 0.0
+        self.exposure = 0.0
+        self.unrealized = 0.0
+        self.bars_in_trade = 0
+        self.last_bar = None
+
+    def sync_position(self, side, entry_price, size):
+        """대조 결과 반영 (방향/수량만 맞춤, 보유 봉 수는 유지)"""
+        if not side:
+            self.flat()
+            return
+        if side != self.side:
+            self.on_entry(side, entry_price, size)
+            return
+        self.entry_price = float(entry_price or self.entry_price)
+        self.size = float(size)
+        self.exposure = self.entry_price * self.size
+
+    # ------------------------------------------------------------------ 검사
+
+    def _daily_loss_pct(self):
+        if self.day_equity <= 0:
+            return 0.0
+        return -(self.realized_today + self.unrealized) / self.day_equity * 100
+
+    def _observe(self, started):
+        elapsed = time.perf_counter() - started
+        metrics.observe('lumi_risk_check_seconds', elapsed)
+        if elapsed > self.latency_budget:
+            self.budget_exceeded += 1
+            metrics.inc('lumi_risk_budget_exceeded_total')
+            if not self.budget_warned:
+                self.budget_warned = True
+                log.warning("리스크 검사 %.1fus > 예산 %.1fus", elapsed * 1e6, self.latency_budget * 1e6)
+
+    def can_enter(self):
+        """
+        신규 진입 가능 여부
+
+        Returns:
+            (bool, str): (가능 여부, 차단 사유)
+        """
+        started = time.perf_counter()
+        self._roll_day()
+        ok, msg = True, ""
+        if self.max_daily_loss_pct and not self.equity_synced:
+            ok, msg = False, "자산 미확인 (잔고 조회 전) - 일일 손실 한도 검사 불가"
+        elif self.max_daily_loss_pct and self._daily_loss_pct() >= self.max_daily_loss_pct:
+            ok, msg = False, f"일일 손실 한도 {self.max_daily_loss_pct}% 도달 ({self._daily_loss_pct():.1f}%)"
+        elif self.paused_until:
+            now = self.clock()
+            if now < self.paused_until:
+                ok, msg = False, f"연속 손실 {self.loss_streak}회 - {int(self.paused_until - now) // 60}분 휴식"
+            else:
+                self.paused_until = 0.0
+                self.loss_streak = 0
+        self._observe(started)
+        if not ok:
+            metrics.inc('lumi_risk_blocks_total', reason='entry')
+        return ok, msg
+
+    def on_tick(self, price, bar_ts=None):
+        """
+        보유 중 틱 갱신 + 강제 청산 검사
+
+        Args:
+            price: 현재가
+            bar_ts: 현재(진행 중) 봉 시각 - 바뀔 때마다 보유 봉 수 +1
+
+        Returns:
+            str | None: 강제 청산 사유 (없으면 None)
+        """
+        if not self.side:
+            return None
+        started = time.perf_counter()
+        self._roll_day()
+        price = float(price)
+        self.exposure = price * self.size
+        self.unrealized = (price - self.entry_price) * self.direction * self.size
+        if bar_ts is not None and bar_ts != self.last_bar:
+            if self.last_bar is not None:
+                self.bars_in_trade += 1
+            self.last_bar = bar_ts
+        reason = None
+        if self.max_daily_loss_pct and self._daily_loss_pct() >= self.max_daily_loss_pct:
+            reason = f"RISK (일일 손실 한도 {self.max_daily_loss_pct}%)"
+        elif self.timeout_bars and self.bars_in_trade >= self.timeout_bars:
+            reason = f"TIMEOUT ({self.bars_in_trade}봉 경과)"
+        self._observe(started)
+        if reason:
+            metrics.inc('lumi_risk_forced_exits_total', reason=reason.split()[0])
+        return reason
+
+    def snapshot(self):
+        """상태 요약 (status.json용)"""
+        return {
+            'equity': round(self.equity, 2),
+            'equity_synced': self.equity_synced,
+            'daily_pnl': round(self.realized_today + self.unrealized, 2),
+            'daily_loss_pct': round(self._daily_loss_pct(), 2),
+            'loss_streak': self.loss_streak,
+            'paused_until': self.paused_until or None,
+            'bars_in_trade': self.bars_in_trade if self.side else None,
+            'exposure': round(self.exposure, 2),
+            'leverage': round(self.exposure / self.equity, 2) if self.equity > 0 else None,
+        }
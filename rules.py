@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""
+modules/rules.py - 선언형 진입 규칙 (실시간 틱 / 백테스트 공용)
+
+진입 조건을 코드가 아닌 데이터로 정의 → 한 번 컴파일해서 두 가지 평가기로 사용
+- signal(state, gate): 틱마다 호출하는 스칼라 평가기 - 규칙마다 파이썬 함수 하나로 생성
+  조건 비교 → 성립하면 gate(추가 필터) → 사유 문자열까지 한 번에 (bool, 사유) 반환
+  불성립 사유는 조건 수만 쓰는 템플릿이면 컴파일 때 만든 문자열 재사용 (틱마다 생성 안 함)
+- check(state): (조건 수, 성립 시 사유 목록 / 불성립 None), explain(state, hits): 불성립 사유
+- mask(frame): 히스토리 전체 NumPy 벡터 평가 (FeaturePipeline.compute 결과 또는 {필드: 배열})
+
+조건: Condition(필드, 연산자, 값, 사유 템플릿)
+- 연산자: < <= > >= == between(양 끝 포함)
+- 값: 상수, Param('이름') (컴파일 시 params에서 채움), Field('필드') (다른 필드와 비교)
+- 사유 템플릿: str.format 문법, 필드 값과 params 사용 ('RSI 과매도: {rsi:.1f}')
+
+스칼라/벡터 모두 같은 float 비교 → NaN 포함 봉마다 결과 일치
+"""
+
+from string import Formatter
+
+import numpy as np
+
+# 필드: (market_state 기본값, 피처 DataFrame 컬럼) - get_current_market_state와 같은 기본값
+FIELDS = {
+    'rsi': (50, 'rsi'),
+    'bb_pct': (0.5, 'bb_pct_b'),
+    'trend': ('NEUTRAL', 'trend'),
+    'ema8': (0, 'ema8'),
+    'ema21': (0, 'ema21'),
+}
+
+OPERATORS = ('<', '<=', '>', '>=', '==', 'between')
+
+_VECTOR_OPS = {
+    '<': np.less,
+    '<=': np.less_equal,
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '==': np.equal,
+}
+
+
+class Param:
+    """컴파일 시 params[name]으로 바뀌는 임계값 자리"""
+
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return f"Param({self.name!r})"
+
+
+class Field:
+    """다른 필드 값과 비교 (EMA8 < EMA21 등)"""
+
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return f"Field({self.name!r})"
+
+
+class Condition:
+    """조건 1개: field op value"""
+
+    def __init__(self, field, op, value, reason):
+        if op not in OPERATORS:
+            raise ValueError(f"지원하지 않는 연산자: {op}")
+        if not field.isidentifier():
+            raise ValueError(f"필드 이름 오류: {field}")
+        if op == 'between' and (not isinstance(value, tuple) or len(value) != 2):
+            raise ValueError("between 값은 (하한, 상한)")
+        self.field = field
+        self.op = op
+        self.value = value
+        self.reason = reason
+
+    def fields(self):
+        names = [self.field]
+        if isinstance(self.value, Field):
+            names.append(self.value.name)
+        return names
+
+    def __repr__(self):
+        return f"Condition({self.field!r}, {self.op!r}, {self.value!r})"
+
+
+class Rule:
+    """
+    조건 묶음 - need개 이상 만족하면 성립 (None: 전부)
+
+    accept: 성립 사유 ({label}, {reasons} = 만족한 조건 사유를 ', '로 연결)
+    reject: 불성립 사유 ({hits}, {total} + 필드 값/params)
+    """
+
+    def __init__(self, label, conditions, need=None, accept='{label} ({reasons})',
+                 reject='대기 중 ({hits}/{total})'):
+        self.label = label
+        self.conditions = tuple(conditions)
+        self.need = len(self.conditions) if need is None else need
+        self.accept = accept
+        self.reject = reject
+
+    def compile(self, params=None):
+        return CompiledRule(self, params or {})
+
+    def __repr__(self):
+        return f"Rule({self.label!r}, need={self.need}, conditions={list(self.conditions)!r})"
+
+
+def _resolve(value, params):
+    if isinstance(value, Param):
+        try:
+            return params[value.name]
+        except KeyError:
+            raise KeyError(f"규칙 파라미터 없음: {value.name}") from None
+    return value
+
+
+class CompiledRule:
+    """임계값이 채워진 규칙 - 스칼라 함수 + 벡터 평가기"""
+
+    def __init__(self, rule, params):
+        self.rule = rule
+        self.label = rule.label
+        self.need = rule.need
+        self.total = len(rule.conditions)
+        # 규칙이 쓰는 파라미터만 보관 (사유 템플릿에서도 사용)
+        names = [v.name for c in rule.conditions
+                 for v in (c.value if c.op == 'between' else (c.value,)) if isinstance(v, Param)]
+        self.params = {name: _resolve(Param(name), params) for name in names}
+        self.fields = list(dict.fromkeys(name for c in rule.conditions for name in c.fields()))
+        # 조건별 비교 값 (between은 (하한, 상한), Field는 그대로)
+        self.bounds = []
+        for cond in rule.conditions:
+            if cond.op == 'between':
+                self.bounds.append(tuple(_resolve(v, self.params) for v in cond.value))
+            else:
+                self.bounds.append(_resolve(cond.value, self.params))
+        self._build_scalar()
+
+    # ------------------------------------------------------------------ 스칼라
+
+    def _build_scalar(self):
+        """
+        count / check / explain / signal 소스 생성 후 컴파일
+        상수·파라미터는 네임스페이스로 전달, 사유 템플릿은 f-string으로 변환 (성립 분기에서만 실행)
+        """
+        namespace = dict(self.params)
+        namespace['_total'] = self.total
+        # 성립 사유 = 앞 + 조건 사유 ', ' 연결 + 뒤
+        namespace['_head'], namespace['_tail'] = self.rule.accept.format(label=self.label, reasons='\0').split('\0')
+        loads = []
+        for name in self.fields:
+            namespace[f'_d_{name}'] = FIELDS.get(name, (None, name))[0]
+            loads.append(f"    {name} = s.get({name!r}, _d_{name})")
+
+        exprs = []
+        for i, (cond, bound) in enumerate(zip(self.rule.conditions, self.bounds)):
+            if cond.op == 'between':
+                namespace[f'_k{i}a'], namespace[f'_k{i}b'] = bound
+                exprs.append(f"(_k{i}a <= {cond.field} <= _k{i}b)")
+            elif isinstance(bound, Field):
+                exprs.append(f"({cond.field} {cond.op} {bound.name})")
+            else:
+                namespace[f'_k{i}'] = bound
+                exprs.append(f"({cond.field} {cond.op} _k{i})")
+
+        body = '\n'.join(loads)
+        # 조건 결과는 np.bool_일 수 있음 (np.bool_ + np.bool_ = OR) → 참인 조건만 세기
+        flags = ''.join(f"    _h{i} = {expr}\n" for i, expr in enumerate(exprs))
+        counts = ''.join(f"    if _h{i}:\n        hits += 1\n" for i in range(len(exprs)))
+        appends = ''.join(f"    if _h{i}:\n        out.append(f{cond.reason!r})\n"
+                          for i, cond in enumerate(self.rule.conditions))
+        reject_fields = {name for _, name, _, _ in Formatter().parse(self.rule.reject) if name}
+        if reject_fields <= {'hits', 'total'}:
+            # 조건 수만 쓰는 불성립 사유 → 가능한 값 전부 미리 생성
+            namespace['_rejects'] = tuple((False, self.rule.reject.format(hits=h, total=self.total))
+                                          for h in range(self.total + 1))
+            reject = "_rejects[hits]"
+        else:
+            reject = f"False, f{self.rule.reject.replace('{total}', '{_total}')!r}"
+        source = (
+            f"def count(s):\n{body}\n{flags}    hits = 0\n{counts}    return hits\n\n"
+            f"def check(s):\n{body}\n{flags}    hits = 0\n{counts}"
+            f"    if hits < {self.need}:\n        return hits, None\n"
+            f"    out = []\n{appends}    return hits, out\n\n"
+            f"def explain(s, hits, total={self.total}):\n{body}\n    return f{self.rule.reject!r}\n\n"
+            f"def signal(s, gate=None):\n{body}\n{flags}    hits = 0\n{counts}"
+            f"    if hits < {self.need}:\n        return {reject}\n"
+            f"    extra = None\n"
+            f"    if gate is not None:\n        ok, extra = gate(s)\n        if not ok:\n            return False, extra\n"
+            f"    out = []\n{appends}    if extra:\n        out.append(extra)\n"
+            f"    return True, _head + ', '.join(out) + _tail\n"
+        )
+        exec(compile(source, f'<rule {self.label}>', 'exec'), namespace)
+        self.source = source
+        self.count = namespace['count']              # 만족한 조건 수만
+        self.check = namespace['check']              # (조건 수, 성립 시 사유 목록 / 불성립 None)
+        self.explain = namespace['explain']          # 불성립 사유
+        self.signal = namespace['signal']            # (성립 여부, 사유) - gate(state) → (통과 여부, 추가 사유)
+
+    def evaluate(self, state):
+        """
+        Returns:
+            (bool, str): (성립 여부, 사유)
+        """
+        return self.signal(state)
+
+    # ------------------------------------------------------------------ 벡터
+
+    def _column(self, frame, name, n):
+        default, column = FIELDS.get(name, (None, name))
+        for key in (name, column):
+            if key in frame:
+                return np.asarray(frame[key])
+        return np.full(n, default, dtype=object if isinstance(default, str) else float)
+
+    def hits(self, frame):
+        """봉마다 만족한 조건 수 (int 배열)"""
+        n = len(frame) if hasattr(frame, 'columns') else len(next(iter(frame.values()), ()))
+        columns = {name: self._column(frame, name, n) for name in self.fields}
+        hits = np.zeros(n, dtype=np.int64)
+        for cond, bound in zip(self.rule.conditions, self.bounds):
+            values = columns[cond.field]
+            if cond.op == 'between':
+                hit = (bound[0] <= values) & (values <= bound[1])
+            elif isinstance(bound, Field):
+                hit = _VECTOR_OPS[cond.op](values, columns[bound.name])
+            else:
+                hit = _VECTOR_OPS[cond.op](values, bound)
+            hits += np.asarray(hit, dtype=bool)
+        return hits
+
+    def mask(self, frame):
+        """봉마다 성립 여부 (bool 배열)"""
+        return self.hits(frame) >= self.need
+
+
+# ---------------------------------------------------------------------- 진입 규칙 정의
+# 파라미터 이름 = StrategyEngine 속성 이름 (compile(vars(engine)))
+
+LONG_REVERSAL = Rule('반전 롱', need=2, conditions=(
+    Condition('rsi', '<', Param('rsi_long'), 'RSI 과매도: {rsi:.1f}'),
+    Condition('bb_pct', 'between', (Param('bb_low'), 0.6), 'BB% 과매도: {bb_pct:.2f}'),
+    Condition('trend', '==', 'DOWN', '추세 하강'),
+))
+
+LONG_TREND = Rule('추세 롱', need=2, conditions=(
+    Condition('rsi', 'between', (Param('tf_rsi_min'), Param('tf_rsi_max')), 'RSI 추세: {rsi:.1f}'),
+    Condition('bb_pct', 'between', (Param('tf_bb_min'), Param('tf_bb_max')), 'BB% 추세: {bb_pct:.2f}'),
+    Condition('trend', '==', 'UP', '추세 상승'),
+))
+
+SHORT_REVERSAL = Rule('반전 숏', need=2, conditions=(
+    Condition('rsi', '>', Param('rsi_short'), 'RSI 과매수: {rsi:.1f}'),
+    Condition('bb_pct', '>', 0.7, 'BB% 과매수: {bb_pct:.2f}'),
+    Condition('trend', '==', 'UP', '추세 상승'),
+))
+
+SHORT_TREND = Rule('추세 숏', need=2, conditions=(
+    Condition('rsi', 'between', (Param('tf_rsi_min'), Param('tf_rsi_max')), 'RSI 추세: {rsi:.1f}'),
+    Condition('bb_pct', 'between', (Param('tf_bb_min'), Param('tf_bb_max')), 'BB% 추세: {bb_pct:.2f}'),
+    Condition('ema8', '<', Field('ema21'), 'EMA 하강'),
+))
+
+# 야간 롱: 극과매도 구간만 허용 (루미 분석 기반)
+NIGHT_LONG = Rule('극과매도', conditions=(
+    Condition('rsi', '<', Param('night_rsi_threshold'), 'RSI {rsi:.1f} < {night_rsi_threshold}'),
+    Condition('bb_pct', '<', Param('night_bb_threshold'), 'BB% {bb_pct:.2f} < {night_bb_threshold}'),
+), reject='RSI {rsi:.1f}, BB% {bb_pct:.2f} (극과매도 아님)')
+
+# 강화된 숏: 과매수 강제 진입
+SHORT_FORCE = Rule('과매수 돌파', conditions=(
+    Condition('rsi', '>', Param('short_force_rsi'), 'RSI {rsi:.1f} > {short_force_rsi}'),
+    Condition('bb_pct', '>', Param('short_force_bb'), 'BB% {bb_pct:.2f} > {short_force_bb}'),
+), reject='RSI {rsi:.1f}, BB% {bb_pct:.2f} (과매수 아님)')
+
+ENTRY_RULES = {
+    'LONG': {'REVERSAL': LONG_REVERSAL, 'TREND': LONG_TREND},
+    'SHORT': {'REVERSAL': SHORT_REVERSAL, 'TREND': SHORT_TREND},
+}
+
+
+def compile_rules(params, rules=None):
+    """{방향: {모드: CompiledRule}}"""
+    rules = rules or ENTRY_RULES
+    return {side: {mode: rule.compile(params) for mode, rule in modes.items()}
+            for side, modes in rules.items()}
+
+
+def reversal_mask(frame):
+    """
+    봉마다 반전 모드 여부 - StrategyEngine.determine_mode의 벡터 버전
+    regime_mode 컬럼(RegimeClassifier.classify)이 있으면 우선, 비었으면 RSI 50 기준
+    """
+    rsi = np.asarray(frame['rsi'], dtype=float)
+    fallback = ~(rsi >= 50)
+    if 'regime_mode' not in frame:
+        return fallback
+    mode = np.asarray(frame['regime_mode'], dtype=object)
+    known = np.array([isinstance(m, str) and bool(m) for m in mode], dtype=bool)
+    return np.where(known, mode == 'REVERSAL', fallback)
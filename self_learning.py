@@ -2,6 +2,9 @@
 """
 LUMI 자기 학습 시스템
 수집된 데이터로 전략 자동 개선
+
+ledger_file(거래 원장, modules.ledger)이 있으면 청산 거래만 인덱스 쿼리로 읽음
+(exit_reason은 사유 코드 SL/TP/TS/DSL/PG/SEQ) - 없거나 비었으면 trade_analysis_*.csv
 """
 import sys
 sys.stdout.reconfigure(encoding='utf-8')
@@ -14,11 +17,18 @@ from pathlib import Path
 from collections import deque
 import statistics
 
+from modules.ledger import TradeLedger
+
+# 학습에 쓰는 거래 컬럼 (원장에서는 이것만 읽음)
+LEARN_COLUMNS = ['timestamp', 'type', 'mode', 'pnl', 'entry_rsi', 'entry_bb_pct',
+                 'duration_seconds', 'exit_reason', 'market_regime']
+
 class SelfLearningSystem:
     """자가 학습 시스템"""
     
-    def __init__(self):
+    def __init__(self, ledger_file=None):
         self.data_dir = Path("logs") / "collected_data"
+        self.ledger_file = Path(ledger_file) if ledger_file else None
         self.learning_file = self.data_dir / "learning_data.json"
         self.insights_file = self.data_dir / "strategy_insights.json"
         self.thesis_file = self.data_dir / "trading_thesis.md"
@@ -41,6 +51,15 @@ class SelfLearningSystem:
     def load_trade_history(self):
         """거래 이력 로드"""
         try:
+            if self.ledger_file is not None and self.ledger_file.exists():
+                ledger = TradeLedger(self.ledger_file)
+                try:
+                    df = ledger.trades_frame(columns=LEARN_COLUMNS, reason_codes=True, ordered=False)
+                finally:
+                    ledger.close()
+                if len(df):
+                    return df
+            
             files = list(self.data_dir.glob("trade_analysis_*.csv"))
             all_trades = []
             
@@ -120,7 +139,7 @@ class SelfLearningSystem:
                 }
         
         # 2. 시간대별 패턴
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        df['timestamp'] = pd.to_datetime(df['timestamp'], format='ISO8601')
         df['hour'] = df['timestamp'].dt.hour
         df['day_of_week'] = df['timestamp'].dt.dayofweek  # 0=월, 6=일
         
@@ -150,6 +169,7 @@ class SelfLearningSystem:
                 'pnl': ['count', 'mean', 'sum'],
                 'mode': lambda x: x.mode()[0] if len(x.mode()) > 0 else 'unknown'
             }).reset_index()
+            regime_stats.columns = ['market_regime', 'trade_count', 'avg_pnl', 'total_pnl', 'common_mode']
             insights['learning_results']['regime_performance'] = regime_stats.to_dict('records')
         
         # 5. 모드별 최적화
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+modules/shm_ring.py - 공유 메모리 SPSC 링 버퍼 (고정 크기 레코드, 락 없음)
+
+생산자 1개(트레이딩 프로세스) → 소비자 1개(사이드카 프로세스)
+- 레코드는 NumPy structured dtype 고정 크기 → push는 슬롯 복사 + 쓰기 카운터 증가뿐
+- 카운터(write_seq / read_seq)는 단조 증가하는 uint64, 서로 다른 캐시 라인에 배치
+  생산자만 write_seq를, 소비자만 read_seq를 씀 → 락 불필요
+  슬롯을 먼저 쓰고 카운터를 나중에 올림 (x86 TSO에서 저장 순서 유지)
+- 가득 차면 기다리지 않고 버림 (dropped 증가) - 트레이딩 루프는 절대 블록되지 않음
+- closed 플래그: 생산자 종료 알림 (소비자는 남은 레코드를 비우고 종료)
+
+메모리 배치: [헤더 192바이트: magic/capacity/itemsize | write_seq | read_seq, closed] [슬롯 × capacity]
+"""
+
+import multiprocessing
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+MAGIC = 0x4C554D4952494E47        # 'LUMIRING'
+HEADER_BYTES = 192
+_MAGIC, _CAPACITY, _ITEMSIZE = 0, 1, 2
+_WRITE = 8                         # 두 번째 캐시 라인
+_READ, _CLOSED = 16, 17            # 세 번째 캐시 라인
+
+_created = set()                   # 이 프로세스가 만든 세그먼트 이름
+
+
+def create_shared_memory(name, size):
+    """공유 메모리 생성 (같은 프로세스 안의 attach_shared_memory가 등록을 건드리지 않게 기록)"""
+    shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+    _created.add(shm.name)
+    return shm
+
+
+def adopt_shared_memory(name):
+    """이전 생성자가 남긴 세그먼트를 이 프로세스 소유로 연결 (종료 시 삭제 대상)"""
+    shm = shared_memory.SharedMemory(name=name)
+    _created.add(shm.name)
+    return shm
+
+
+def attach_shared_memory(name):
+    """
+    기존 공유 메모리 연결 (소비자 종료 시 resource_tracker가 세그먼트를 지우지 않게)
+
+    3.13+는 track=False, 이전 버전은 연결 후 등록 해제
+    (multiprocessing 자식이나 같은 프로세스의 생성자는 tracker 등록을 공유 → 해제하면 생성자 등록이 지워짐 → 그대로 둠)
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        if multiprocessing.parent_process() is None and shm.name not in _created:
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+class ShmRing:
+    """공유 메모리 링 버퍼"""
+
+    def __init__(self, dtype, capacity=1024, name=None, create=True):
+        """
+        Args:
+            dtype: 레코드 dtype (양쪽 프로세스가 같은 dtype 사용)
+            capacity: 슬롯 수
+            name: 공유 메모리 이름 (create=False면 필수)
+            create: True면 생성(생산자), False면 기존 버퍼에 연결(소비자)
+        """
+        self.dtype = np.dtype(dtype)
+        if create:
+            size = HEADER_BYTES + self.dtype.itemsize * capacity
+            self.shm = create_shared_memory(name, size)
+        else:
+            self.shm = attach_shared_memory(name)
+        self.name = self.shm.name
+        self.owner = create
+        self.header = np.ndarray(HEADER_BYTES // 8, dtype=np.uint64, buffer=self.shm.buf)
+        if create:
+            self.header[:] = 0
+            self.header[_MAGIC] = MAGIC
+            self.header[_CAPACITY] = capacity
+            self.header[_ITEMSIZE] = self.dtype.itemsize
+        elif int(self.header[_MAGIC]) != MAGIC or int(self.header[_ITEMSIZE]) != self.dtype.itemsize:
+            self.header = None
+            self.shm.close()
+            raise ValueError(f"링 버퍼 형식 불일치: {name}")
+        self.capacity = int(self.header[_CAPACITY])
+        self.slots = np.ndarray(self.capacity, dtype=self.dtype, buffer=self.shm.buf, offset=HEADER_BYTES)
+        self.dropped = 0
+
+    @classmethod
+    def attach(cls, name, dtype):
+        """소비자 측 연결"""
+        return cls(dtype, name=name, create=False)
+
+    # ------------------------------------------------------------------ 생산자
+
+    def push(self, record):
+        """
+        레코드 1개 추가 (tuple 또는 같은 dtype의 레코드)
+
+        Returns:
+            bool: False면 가득 차서 버림
+        """
+        write = int(self.header[_WRITE])
+        if write - int(self.header[_READ]) >= self.capacity:
+            self.dropped += 1
+            return False
+        self.slots[write % self.capacity] = record
+        self.header[_WRITE] = write + 1
+        return True
+
+    def close_writer(self):
+        """생산 종료 알림"""
+        self.header[_CLOSED] = 1
+
+    # ------------------------------------------------------------------ 소비자
+
+    def pop_many(self, max_records=256):
+        """쌓인 레코드 복사본 (오래된 순, 없으면 길이 0)"""
+        read = int(self.header[_READ])
+        available = min(int(self.header[_WRITE]) - read, max_records)
+        if available <= 0:
+            return self.slots[:0].copy()
+        idx = (read + np.arange(available)) % self.capacity
+        records = self.slots[idx]          # 팬시 인덱싱 → 복사본
+        self.header[_READ] = read + available
+        return records
+
+    # ------------------------------------------------------------------ 상태
+
+    @property
+    def closed(self):
+        return bool(self.header[_CLOSED])
+
+    def __len__(self):
+        return int(self.header[_WRITE]) - int(self.header[_READ])
+
+    def stats(self):
+        return {
+            'written': int(self.header[_WRITE]),
+            'read': int(self.header[_READ]),
+            'pending': len(self),
+            'capacity': self.capacity,
+            'dropped': self.dropped,
+        }
+
+    def close(self):
+        """매핑 해제 (생성한 쪽이면 공유 메모리도 삭제)"""
+        if self.header is None:
+            return
+        self.header = None
+        self.slots = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+"""
+modules/sim_exchange.py - 오프라인 테스트용 시뮬레이션 거래소
+
+ccxt binance 선물 객체와 같은 메서드 이름/반환 형식을 흉내냄
+- SimulatedOrderBook: L2 호가창 (가격 랜덤워크 + 소비 후 유동성 회복)
+- SimulatedExchange: 시장가/지정가 주문, 잔고, 단일 심볼 포지션, 과거 캔들 (다운로더 테스트용)
+"""
+
+import itertools
+import time
+
+import ccxt
+import numpy as np
+
+
+class SimulatedOrderBook:
+    """L2 호가창 시뮬레이터"""
+
+    def __init__(self, mid_price=2000.0, tick_size=0.01, levels=50, base_size=2.0,
+                 depth_growth=0.08, volatility_bps=2.0, replenish_rate=0.5, seed=None):
+        self.rng = np.random.default_rng(seed)
+        self.mid = mid_price
+        self.tick_size = tick_size
+        self.levels = levels
+        self.base_size = base_size
+        self.depth_growth = depth_growth
+        self.volatility_bps = volatility_bps
+        self.replenish_rate = replenish_rate
+        self.liquidity = {'buy': 1.0, 'sell': 1.0}   # 소비 후 회복 중인 유동성 비율
+        self.bids = []
+        self.asks = []
+        self._rebuild()
+
+    def _level_size(self, i):
+        return self.base_size * (1 + self.depth_growth * i) * self.rng.uniform(0.6, 1.4)
+
+    def _rebuild(self):
+        half_spread = self.tick_size
+        best_bid = round(self.mid - half_spread, 2)
+        best_ask = round(self.mid + half_spread, 2)
+        bid_factor, ask_factor = self.liquidity['sell'], self.liquidity['buy']
+        self.bids = [[round(best_bid - i * self.tick_size, 2), self._level_size(i) * bid_factor]
+                     for i in range(self.levels)]
+        self.asks = [[round(best_ask + i * self.tick_size, 2), self._level_size(i) * ask_factor]
+                     for i in range(self.levels)]
+
+    def total_depth(self, side):
+        book = self.asks if side == 'buy' else self.bids
+        return sum(size for _, size in book)
+
+    def best_bid(self):
+        return self.bids[0][0] if self.bids else self.mid
+
+    def best_ask(self):
+        return self.asks[0][0] if self.asks else self.mid
+
+    def snapshot(self, limit=50):
+        """ccxt fetch_order_book 형식"""
+        return {
+            'bids': [list(level) for level in self.bids[:limit]],
+            'asks': [list(level) for level in self.asks[:limit]],
+            'timestamp': int(time.time() * 1000),
+        }
+
+    def consume(self, side, amount):
+        """
+        시장가 체결: 호가를 먹어 들어가며 체결
+
+        Returns:
+            (filled, avg_price)
+        """
+        book = self.asks if side == 'buy' else self.bids
+        depth = self.total_depth(side)
+        remaining = amount
+        cost = 0.0
+        while remaining > 1e-12 and book:
+            price, size = book[0]
+            take = min(size, remaining)
+            cost += take * price
+            remaining -= take
+            if take >= size - 1e-12:
+                book.pop(0)
+            else:
+                book[0][1] = size - take
+        filled = amount - remaining
+        if depth > 0:
+            self.liquidity[side] = max(0.1, self.liquidity[side] - filled / depth)
+        if not book:
+            self._rebuild()
+        return filled, (cost / filled if filled > 0 else 0.0)
+
+    def advance(self, seconds=1.0):
+        """시간 경과: 중간가 랜덤워크 + 소비된 유동성 회복 후 호가 재생성"""
+        drift = self.rng.normal(0, self.volatility_bps / 1e4 * np.sqrt(max(seconds, 1e-3)))
+        self.mid *= (1 + drift)
+        for side in self.liquidity:
+            self.liquidity[side] = min(1.0, self.liquidity[side] + self.replenish_rate * seconds)
+        self._rebuild()
+
+
+class SimulatedExchange:
+    """ccxt 호환 시뮬레이션 거래소 (단일 심볼, 단방향 포지션)"""
+
+    def __init__(self, symbol="ETH/USDT", balance=1000.0, leverage=20, taker_fee=0.0005,
+                 maker_fee=0.0002, order_book=None, seed=None):
+        self.symbol = symbol
+        self.book = order_book or SimulatedOrderBook(seed=seed)
+        self.balance = balance
+        self.leverage = leverage
+        self.taker_fee = taker_fee
+        self.maker_fee = maker_fee
+        self.position_amt = 0.0       # +롱 / -숏
+        self.entry_price = 0.0
+        self.orders = {}
+        self.trades = []
+        self._ids = itertools.count(1)
+        self.clock = time.time()
+        self.seed = seed or 0
+        self.ohlcv_gaps = []          # 캔들이 없는 구간 [(시작 ms, 끝 ms)] (거래소 점검 흉내)
+        self.ohlcv_latency = 0.0      # fetch_ohlcv 응답 지연 (초)
+        self.ohlcv_calls = 0
+
+    # ------------------------------------------------------------------ 시세
+
+    def fetch_order_book(self, symbol, limit=50, params=None):
+        return self.book.snapshot(limit)
+
+    def fetch_ticker(self, symbol, params=None):
+        return {'symbol': symbol, 'bid': self.book.best_bid(), 'ask': self.book.best_ask(),
+                'last': self.book.mid, 'timestamp': int(self.clock * 1000)}
+
+    def fetch_ohlcv(self, symbol, timeframe='5m', since=None, limit=500, params=None):
+        """
+        결정적 과거 캔들 (같은 seed/시각이면 항상 같은 값)
+
+        1분 가격이 시각의 함수 (주기 추세 + 해시 잡음) → 페이지를 어떤 순서로 받아도 일관되고,
+        큰 시간대 봉은 1분 봉을 묶은 값과 같음. 현재 시각(clock) 이후 봉은 없음
+        """
+        from .features import timeframe_ms
+        self.ohlcv_calls += 1
+        if self.ohlcv_latency:
+            time.sleep(self.ohlcv_latency)
+        step = timeframe_ms(timeframe)
+        now = int(self.clock * 1000) // step * step
+        limit = limit or 500
+        start = now - limit * step if since is None else -(-since // step) * step
+        ts = np.arange(start, min(start + limit * step, now), step, dtype=np.int64)
+        for gap_start, gap_end in self.ohlcv_gaps:
+            ts = ts[(ts < gap_start) | (ts >= gap_end)]
+        if not len(ts):
+            return []
+
+        per_bar = step // 60_000
+        minutes = ts[:, None] // 60_000 + np.arange(per_bar + 1)
+        price = self._minute_price(minutes)
+        open_, close = price[:, 0], price[:, -1]
+        body = price[:, :-1], price[:, 1:]
+        wick = 0.0005 * self._noise(minutes[:, :-1], 1)
+        high = (np.maximum(*body) * (1 + wick)).max(axis=1)
+        low = (np.minimum(*body) * (1 - wick)).min(axis=1)
+        volume = (10 + 50 * self._noise(minutes[:, :-1], 2)).sum(axis=1)
+        return [[int(t), float(o), float(h), float(l), float(c), float(v)]
+                for t, o, h, l, c, v in zip(ts, open_, high, low, close, volume)]
+
+    def _noise(self, minutes, salt):
+        """분 인덱스 → [0, 1) 결정적 잡음"""
+        x = np.sin((minutes * 12.9898 + (self.seed + salt) * 78.233) % (2 * np.pi)) * 43758.5453
+        return x - np.floor(x)
+
+    def _minute_price(self, minutes):
+        trend = 0.03 * np.sin(2 * np.pi * minutes / 10_080) + 0.01 * np.sin(2 * np.pi * minutes / 977)
+        return 2000.0 * np.exp(trend + 0.002 * (self._noise(minutes, 0) - 0.5))
+
+    def advance(self, seconds=1.0):
+        """시뮬레이션 시간 진행 + 대기 지정가 체결 검사"""
+        self.clock += seconds
+        self.book.advance(seconds)
+        self._match_resting()
+
+    # ------------------------------------------------------------------ 주문
+
+    def create_order(self, symbol, type, side, amount, price=None, params=None):
+        params = params or {}
+        order_id = str(next(self._ids))
+        order = {
+            'id': order_id, 'clientOrderId': params.get('newClientOrderId') or params.get('clientOrderId'),
+            'symbol': symbol, 'type': type, 'side': side,
+            'amount': amount, 'price': price, 'filled': 0.0, 'remaining': amount,
+            'average': None, 'cost': 0.0, 'status': 'open', 'fee': {'cost': 0.0, 'currency': 'USDT'},
+            'timestamp': int(self.clock * 1000), 'reduceOnly': bool(params.get('reduceOnly')),
+        }
+        self.orders[order_id] = order
+
+        if type == 'market':
+            filled, avg = self.book.consume(side, amount)
+            self._fill(order, filled, avg, self.taker_fee)
+        else:
+            crosses = (side == 'buy' and price >= self.book.best_ask()) or \
+                      (side == 'sell' and price <= self.book.best_bid())
+            if crosses and params.get('timeInForce') == 'GTX':
+                order['status'] = 'canceled'   # post-only 거부
+            elif crosses:
+                filled, avg = self.book.consume(side, amount)
+                self._fill(order, filled, avg, self.taker_fee)
+        return dict(order)
+
+    def create_market_buy_order(self, symbol, amount, params=None):
+        return self.create_order(symbol, 'market', 'buy', amount, None, params)
+
+    def create_market_sell_order(self, symbol, amount, params=None):
+        return self.create_order(symbol, 'market', 'sell', amount, None, params)
+
+    def create_limit_buy_order(self, symbol, amount, price, params=None):
+        return self.create_order(symbol, 'limit', 'buy', amount, price, params)
+
+    def create_limit_sell_order(self, symbol, amount, price, params=None):
+        return self.create_order(symbol, 'limit', 'sell', amount, price, params)
+
+    def fetch_order(self, id, symbol=None, params=None):
+        client_id = (params or {}).get('origClientOrderId')
+        if id is None and client_id:
+            for order in self.orders.values():
+                if order['clientOrderId'] == client_id:
+                    return dict(order)
+            raise ccxt.OrderNotFound(f"주문 없음: {client_id}")
+        return dict(self.orders[id])
+
+    def fetch_open_orders(self, symbol=None, since=None, limit=None, params=None):
+        return [dict(o) for o in self.orders.values() if o['status'] == 'open']
+
+    def fetch_my_trades(self, symbol=None, since=None, limit=None, params=None):
+        trades = [{'id': str(i + 1), 'order': t['order'], 'symbol': self.symbol, 'side': t['side'],
+                   'amount': t['amount'], 'price': t['price'], 'timestamp': t['timestamp']}
+                  for i, t in enumerate(self.trades) if since is None or t['timestamp'] >= since]
+        return trades[-limit:] if limit else trades
+
+    def cancel_order(self, id, symbol=None, params=None):
+        order = self.orders[id]
+        if order['status'] == 'open':
+            order['status'] = 'canceled'
+        return dict(order)
+
+    def _match_resting(self):
+        """지정가 주문: 반대편 최우선 호가가 가격을 넘으면 (maker 체결)"""
+        for order in self.orders.values():
+            if order['status'] != 'open' or order['type'] != 'limit':
+                continue
+            if order['side'] == 'buy' and self.book.best_ask() <= order['price']:
+                self._fill(order, order['remaining'], order['price'], self.maker_fee)
+            elif order['side'] == 'sell' and self.book.best_bid() >= order['price']:
+                self._fill(order, order['remaining'], order['price'], self.maker_fee)
+
+    def _fill(self, order, filled, avg_price, fee_rate):
+        if filled <= 0:
+            return
+        prev_filled = order['filled']
+        total = prev_filled + filled
+        order['average'] = ((order['average'] or 0) * prev_filled + avg_price * filled) / total
+        order['filled'] = total
+        order['remaining'] = max(0.0, order['amount'] - total)
+        order['cost'] = order['average'] * total
+        fee = avg_price * filled * fee_rate
+        order['fee']['cost'] += fee
+        order['status'] = 'closed' if order['remaining'] <= 1e-12 else 'open'
+        self.balance -= fee
+        self._apply_position(order['side'], filled, avg_price)
+        self.trades.append({'order': order['id'], 'side': order['side'], 'amount': filled,
+                            'price': avg_price, 'timestamp': int(self.clock * 1000)})
+
+    def _apply_position(self, side, amount, price):
+        signed = amount if side == 'buy' else -amount
+        new_amt = self.position_amt + signed
+        if self.position_amt == 0 or (self.position_amt > 0) == (signed > 0):
+            # 진입/추가: 평균 단가 갱신
+            self.entry_price = (self.entry_price * abs(self.position_amt) + price * amount) / abs(new_amt)
+        else:
+            # 감소/청산: 실현 손익
+            closed = min(abs(signed), abs(self.position_amt))
+            direction = 1 if self.position_amt > 0 else -1
+            self.balance += (price - self.entry_price) * closed * direction
+            if abs(new_amt) > 1e-12 and (new_amt > 0) != (self.position_amt > 0):
+                self.entry_price = price   # 반대 방향 전환
+        self.position_amt = new_amt if abs(new_amt) > 1e-12 else 0.0
+        if self.position_amt == 0:
+            self.entry_price = 0.0
+
+    # ------------------------------------------------------------------ 계정
+
+    def unrealized_pnl(self):
+        if not self.position_amt:
+            return 0.0
+        return (self.book.mid - self.entry_price) * self.position_amt
+
+    def fetch_balance(self, params=None):
+        margin = abs(self.position_amt) * self.entry_price / self.leverage
+        total = self.balance + self.unrealized_pnl()
+        return {'USDT': {'free': max(0.0, total - margin), 'used': margin, 'total': total},
+                'info': {'positions': []}}
+
+    def fetch_positions(self, symbols=None, params=None):
+        if not self.position_amt:
+            return []
+        # ccxt 통합 형식: contracts는 절대값, 방향은 side / info.positionAmt
+        return [{
+            'symbol': f"{self.symbol}:USDT", 'contracts': abs(self.position_amt),
+            'side': 'long' if self.position_amt > 0 else 'short',
+            'info': {'positionAmt': str(self.position_amt), 'updateTime': int(self.clock * 1000)},
+            'entryPrice': self.entry_price, 'unrealizedPnl': self.unrealized_pnl(),
+            'notional': abs(self.position_amt) * self.book.mid, 'leverage': self.leverage,
+            'timestamp': int(self.clock * 1000),
+        }]
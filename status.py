@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+modules/status.py - status.json 원자적 기록기
+
+- publish(**fields): 틱 경로에서는 최신 상태 dict만 갱신 (파일 I/O 없음)
+  값이 실제로 바뀐 경우에만 version 증가 (volatile 키(last_update)만 바뀐 틱은 변경 아님)
+- 백그라운드 스레드가 min_interval마다 한 번만 기록 (변경이 있을 때만)
+- 같은 디렉토리 임시 파일에 쓰고 os.replace → 읽는 쪽은 항상 완전한 JSON만 봄
+- StatusServer: 메모리 상태를 localhost HTTP/JSON으로 제공 (파일 폴링 불필요)
+  GET /status?since=N&wait=초 → 롱폴 (version이 N과 달라질 때까지 대기)
+  GET /events → SSE (변경마다 event: status, 유휴 시 keepalive 주석)
+  CORS 헤더는 allow_origin을 지정했고 요청 Origin이 같을 때만 (기본: 같은 출처만)
+"""
+
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+from .logger import get_logger
+
+log = get_logger('status')
+
+
+def atomic_write_json(path, data):
+    """임시 파일 + os.replace 원자적 교체"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=4, ensure_ascii=False, default=_json_default)
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+_MISSING = object()
+
+
+def _json_default(value):
+    """numpy 스칼라 등"""
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+class StatusWriter:
+    """status.json 스로틀 기록 (백그라운드)"""
+
+    def __init__(self, path="status.json", min_interval=1.0, volatile=('last_update',)):
+        self.path = Path(path)
+        self.min_interval = min_interval
+        self.volatile = frozenset(volatile)
+        self.state = {}
+        self.version = 0
+        self.written_version = 0
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)  # 롱폴/SSE 대기
+        self.encoded = (None, b'')                     # (version, JSON 바이트) - 클라이언트 간 공유
+        self.wakeup = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = None
+        self.writes = 0
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self._run, name="status-writer", daemon=True)
+        self.thread.start()
+
+    def publish(self, **fields):
+        """상태 갱신 (틱 경로용 - 즉시 반환, 값이 바뀌었을 때만 변경으로 취급)"""
+        state = self.state
+        with self.lock:
+            changed = any(key not in self.volatile and state.get(key, _MISSING) != value
+                          for key, value in fields.items())
+            state.update(fields)
+            if not changed:
+                return False
+            self.version += 1
+            self.changed.notify_all()
+        self.wakeup.set()
+        return True
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.state)
+
+    def wait(self, since=None, timeout=None, cancel=None):
+        """version이 since와 달라질 때까지 대기 → (version, 상태 사본) (시간 초과/취소면 그대로 반환)"""
+        with self.changed:
+            if since is not None and timeout:
+                self.changed.wait_for(lambda: (self.version != since or self.stopped.is_set()
+                                               or (cancel is not None and cancel.is_set())), timeout)
+            return self.version, dict(self.state)
+
+    def encode(self, since=None, timeout=None, cancel=None):
+        """wait() 결과를 JSON 바이트로 (같은 version은 한 번만 직렬화)"""
+        version, state = self.wait(since, timeout, cancel)
+        cached_version, body = self.encoded
+        if cached_version != version:
+            body = json.dumps(state, ensure_ascii=False, default=_json_default).encode('utf-8')
+            self.encoded = (version, body)
+        return version, body
+
+    def flush(self):
+        """변경분 즉시 기록"""
+        with self.lock:
+            if self.version == self.written_version:
+                return False
+            data = dict(self.state)
+            version = self.version
+        try:
+            atomic_write_json(self.path, data)
+        except Exception as e:
+            log.warning("status.json 기록 실패: %s", e, extra={'sample_key': 'status_write'})
+            return False
+        self.written_version = version
+        self.writes += 1
+        return True
+
+    def _run(self):
+        last_write = 0.0
+        while not self.stopped.is_set():
+            self.wakeup.wait(timeout=self.min_interval)
+            self.wakeup.clear()
+            wait = self.min_interval - (time.monotonic() - last_write)
+            if wait > 0 and self.stopped.wait(wait):
+                break
+            if self.flush():
+                last_write = time.monotonic()
+        self.flush()
+
+    def stop(self):
+        self.stopped.set()
+        self.wakeup.set()
+        with self.changed:
+            self.changed.notify_all()
+        if self.thread:
+            self.thread.join(timeout=2)
+
+
+class StatusServer:
+    """메모리 상태 localhost HTTP 서버 (GET /status 롱폴, GET /events SSE)"""
+
+    def __init__(self, writer, host='127.0.0.1', port=9110, max_wait=30.0, keepalive=15.0, allow_origin=None):
+        self.writer = writer
+        self.allow_origin = allow_origin or None  # 교차 출처 허용할 대시보드 Origin (예: http://localhost:3000)
+        self.host = host
+        self.port = port
+        self.max_wait = max_wait
+        self.keepalive = keepalive
+        self.stopping = threading.Event()
+        self.httpd = None
+        self.thread = None
+        self.clients = 0  # 연결 중인 SSE 클라이언트 수
+
+    def start(self):
+        """백그라운드 스레드로 서버 시작"""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlsplit(self.path)
+                if url.path in ('/', '/status'):
+                    server._serve_status(self, parse_qs(url.query))
+                elif url.path == '/events':
+                    server._serve_events(self)
+                else:
+                    self.send_error(404)
+
+            def log_message(self, format, *args):
+                pass  # 요청마다 로그 출력 금지
+
+        try:
+            self.stopping.clear()
+            self.httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+            self.httpd.daemon_threads = True
+            self.thread = threading.Thread(target=self.httpd.serve_forever, name='status-http', daemon=True)
+            self.thread.start()
+            return True, f"http://{self.host}:{self.port}/status (SSE: /events)"
+        except Exception as e:
+            return False, f"상태 서버 시작 실패: {e}"
+
+    def _serve_status(self, handler, query):
+        """현재 상태 JSON (since가 있으면 변경될 때까지 최대 wait초 대기)"""
+        try:
+            since = int(query['since'][0]) if 'since' in query else None
+            wait = float(query.get('wait', [self.max_wait])[0])
+        except ValueError:
+            handler.send_error(400, explain="since/wait 형식 오류")
+            return
+        if not math.isfinite(wait) or wait < 0:
+            handler.send_error(400, explain="wait는 0 이상 유한한 초")
+            return
+        wait = min(wait, self.max_wait)
+        version, body = self.writer.encode(since, wait, self.stopping)
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'application/json; charset=utf-8')
+        handler.send_header('Content-Length', str(len(body)))
+        handler.send_header('Cache-Control', 'no-store')
+        self._send_cors(handler)
+        handler.send_header('X-Status-Version', str(version))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def _send_cors(self, handler):
+        """허용한 Origin에서 온 요청에만 CORS 헤더"""
+        if self.allow_origin and handler.headers.get('Origin') == self.allow_origin:
+            handler.send_header('Access-Control-Allow-Origin', self.allow_origin)
+            handler.send_header('Vary', 'Origin')
+
+    def _serve_events(self, handler):
+        """SSE 스트림 (Last-Event-ID 이후 변경부터, 연결이 끊기거나 서버가 멈출 때까지)"""
+        last = handler.headers.get('Last-Event-ID')
+        last = int(last) if last and last.isdigit() else None
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+        handler.send_header('Cache-Control', 'no-store')
+        self._send_cors(handler)
+        handler.end_headers()
+        self.clients += 1
+        try:
+            handler.wfile.write(f"retry: {int(self.keepalive * 1000)}\n\n".encode('ascii'))
+            while not self.stopping.is_set() and not self.writer.stopped.is_set():
+                version, body = self.writer.encode(last, self.keepalive, self.stopping)
+                if version == last:
+                    handler.wfile.write(b": keepalive\n\n")
+                else:
+                    handler.wfile.write(b"id: %d\nevent: status\ndata: %s\n\n" % (version, body))
+                    last = version
+                handler.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.clients -= 1
+
+    def stop(self):
+        """서버 종료 (대기 중인 롱폴/SSE도 깨움)"""
+        self.stopping.set()
+        with self.writer.changed:
+            self.writer.changed.notify_all()
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
@@ -4,7 +4,15 @@ modules/strategy.py - 듀얼 모드 전략 (반전 + 추세 추종)
 향상된 청산 로직: 동적 드래그 스탑 + TP 확장
 """
 
+from functools import partial
+
 import numpy as np
+import pandas as pd
+from . import kernels
+from .logger import get_logger
+from .rules import NIGHT_LONG, SHORT_FORCE, compile_rules, reversal_mask
+
+log = get_logger('strategy')
 
 
 class StrategyEngine:
@@ -48,6 +56,27 @@ class StrategyEngine:
         self.night_bb_threshold = 0.15     # 야간 롱: BB% < 0.15
         self.short_force_rsi = 65          # 강제 숏: RSI > 65
         self.short_force_bb = 0.75         # 강제 숏: BB% > 0.75
+        
+        # 🆕 FVG 필터 (MarketDataProvider.fvg_index() 연결 시 동작)
+        self.fvg_filter = self.config.get('FVG_FILTER_ENABLED', False)
+        self.fvg_index = None
+        
+        # 🆕 시장 국면 (MarketDataProvider.regime() 연결 시 봉 단위 캐시 모드 사용)
+        self.regime = None
+        
+        # 🆕 진입 규칙 컴파일 (rules.py 선언 + 위 임계값) - 실시간/백테스트 공용
+        self.rebuild_rules()
+    
+    def rebuild_rules(self):
+        """임계값 변경 후 다시 호출"""
+        params = vars(self)
+        self.entry_rules = compile_rules(params)
+        self._long_rules = (self.entry_rules['LONG']['REVERSAL'], self.entry_rules['LONG']['TREND'])
+        self._short_rules = (self.entry_rules['SHORT']['REVERSAL'], self.entry_rules['SHORT']['TREND'])
+        self.night_long_rule = NIGHT_LONG.compile(params)
+        self.short_force_rule = SHORT_FORCE.compile(params)
+        self._long_gate = partial(self._fvg_gate, 'LONG')
+        self._short_gate = partial(self._fvg_gate, 'SHORT')
     
     def check_night_long_conditions(self, market_state):
         """
@@ -59,14 +88,7 @@ class StrategyEngine:
         if market_state is None:
             return False, "데이터 없음"
         
-        rsi = market_state.get('rsi', 50)
-        bb_pct = market_state.get('bb_pct', 0.5)
-        
-        # 극과매도 구간만 허용
-        if rsi < self.night_rsi_threshold and bb_pct < self.night_bb_threshold:
-            return True, f"극과매도 (RSI {rsi:.1f} < {self.night_rsi_threshold}, BB% {bb_pct:.2f} < {self.night_bb_threshold})"
-        
-        return False, f"RSI {rsi:.1f}, BB% {bb_pct:.2f} (극과매도 아님)"
+        return self.night_long_rule.evaluate(market_state)
     
     def check_enhanced_short_signal(self, market_state):
         """
@@ -78,99 +100,98 @@ class StrategyEngine:
         if market_state is None:
             return False, "데이터 없음"
         
-        rsi = market_state.get('rsi', 50)
-        bb_pct = market_state.get('bb_pct', 0.5)
-        
-        # 과매수 강제 진입 조건
-        if rsi > self.short_force_rsi and bb_pct > self.short_force_bb:
-            return True, f"과매수 돌파 (RSI {rsi:.1f} > {self.short_force_rsi}, BB% {bb_pct:.2f} > {self.short_force_bb})"
+        return self.short_force_rule.evaluate(market_state)
+    
+    def check_fvg_filter(self, side, price):
+        """
+        🆕 FVG 필터: 반대 방향 미체결 갭 안/근처면 진입 보류
         
-        return False, f"RSI {rsi:.1f}, BB% {bb_pct:.2f} (과매수 아님)"
+        Returns:
+            (bool, str): (통과 여부, 사유 - 같은 방향 갭이면 근거로 추가)
+        """
+        if not self.fvg_filter or self.fvg_index is None or not price:
+            return True, ""
+        
+        zone = self.fvg_index.locate(price)
+        against, support = (zone['bear'], zone['bull']) if side == 'LONG' else (zone['bull'], zone['bear'])
+        if against:
+            return False, f"FVG {'저항' if side == 'LONG' else '지지'} ${against['bottom']:.2f}~${against['top']:.2f}"
+        if support:
+            return True, f"FVG {'지지' if side == 'LONG' else '저항'}"
+        return True, ""
+    
+    def fvg_label(self, price):
+        """진입 기록용: 현재가가 걸친 미체결 갭 방향"""
+        if self.fvg_index is None or not price:
+            return None
+        zone = self.fvg_index.locate(price)
+        return 'BULL' if zone['bull'] else 'BEAR' if zone['bear'] else None
     
     def determine_mode(self, market_state):
-        """현재 모드 판단 (반전 vs 추세)"""
+        """
+        현재 모드 판단 (반전 vs 추세)
+        
+        우선순위: market_state['regime_mode'] (백테스트: RegimeClassifier.classify 결과)
+                → 연결된 분류기의 캐시 모드 (마감 봉 기준, 히스테리시스)
+                → 현재 RSI 50 기준
+        """
+        mode = market_state.get('regime_mode')
+        if mode:
+            return mode
+        if self.regime is not None and self.regime.mode:
+            return self.regime.mode
         rsi = market_state.get('rsi', 50)
         return 'TREND' if rsi >= 50 else 'REVERSAL'
     
+    def _fvg_gate(self, side, market_state):
+        """규칙 성립 후 FVG 필터 (CompiledRule.signal의 gate - 같은 방향 갭이면 사유에 추가)"""
+        fvg_ok, fvg_reason = self.check_fvg_filter(side, market_state.get('price'))
+        if not fvg_ok:
+            return False, f"{fvg_reason} - 진입 보류"
+        return True, fvg_reason
+    
     def check_long_signal(self, market_state, df=None):
-        """롱 진입 신호 확인"""
+        """
+        롱 진입 신호 확인 (rules.LONG_REVERSAL / LONG_TREND - 사유 문자열은 신호 성립 시에만 생성)
+        반전: RSI 과매도, BB% 0.15-0.6, 하강 추세 중 2개 / 추세: RSI 50-70, BB% 0.4-0.8, 상승 추세 중 2개
+        """
         if market_state is None:
             return False, "시장 데이터 없음"
         
-        rsi = market_state.get('rsi', 50)
-        bb_pct = market_state.get('bb_pct', 0.5)
-        trend = market_state.get('trend', 'NEUTRAL')
-        mode = self.determine_mode(market_state)
-        
-        checks = []
-        
-        # 모드별 조건
-        if mode == 'REVERSAL':
-            # 반전 모드: RSI < 30, BB% 0.15-0.6
-            if rsi < self.rsi_long:
-                checks.append(f"RSI 과매도: {rsi:.1f}")
-            if self.bb_low <= bb_pct <= 0.6:
-                checks.append(f"BB% 과매도: {bb_pct:.2f}")
-            if trend == 'DOWN':
-                checks.append(f"추세 하강")
-            
-            if len(checks) >= 2:
-                return True, f"반전 롱 ({', '.join(checks)})"
-                
-        else:
-            # 추세 추종 모드: RSI 50-70, BB% 0.4-0.8, 상승 추세
-            if self.tf_rsi_min <= rsi <= self.tf_rsi_max:
-                checks.append(f"RSI 추세: {rsi:.1f}")
-            if self.tf_bb_min <= bb_pct <= self.tf_bb_max:
-                checks.append(f"BB% 추세: {bb_pct:.2f}")
-            if trend == 'UP':
-                checks.append(f"추세 상승")
-            
-            if len(checks) >= 2:
-                return True, f"추세 롱 ({', '.join(checks)})"
-        
-        return False, f"대기 중 ({len(checks)}/3)"
+        reversal, trend = self._long_rules
+        rule = reversal if self.determine_mode(market_state) == 'REVERSAL' else trend
+        return rule.signal(market_state, self._long_gate if self.fvg_filter and self.fvg_index is not None else None)
     
     def check_short_signal(self, market_state, df=None):
-        """숏 진입 신호 확인"""
+        """
+        숏 진입 신호 확인 (rules.SHORT_REVERSAL / SHORT_TREND - 사유 문자열은 신호 성립 시에만 생성)
+        반전: RSI 과매수, BB% > 0.7, 상승 추세 중 2개 / 추세: RSI 50-70, BB% 0.4-0.8, EMA8 < EMA21 중 2개
+        """
         if market_state is None:
             return False, "시장 데이터 없음"
         
-        rsi = market_state.get('rsi', 50)
-        bb_pct = market_state.get('bb_pct', 0.5)
-        trend = market_state.get('trend', 'NEUTRAL')
-        mode = self.determine_mode(market_state)
-        
-        checks = []
-        
-        if mode == 'REVERSAL':
-            # 반전 모드: RSI > 70, BB% > 0.7
-            if rsi > self.rsi_short:
-                checks.append(f"RSI 과매수: {rsi:.1f}")
-            if bb_pct > 0.7:
-                checks.append(f"BB% 과매수: {bb_pct:.2f}")
-            if trend == 'UP':
-                checks.append(f"추세 상승")
-            
-            if len(checks) >= 2:
-                return True, f"반전 숏 ({', '.join(checks)})"
-                
-        else:
-            # 추세 추종 모드 - 롱과 대칭되게 2개 조건으로 수정
-            ema8 = market_state.get('ema8', 0)
-            ema21 = market_state.get('ema21', 0)
-            
-            if self.tf_rsi_min <= rsi <= self.tf_rsi_max:
-                checks.append(f"RSI 추세: {rsi:.1f}")
-            if self.tf_bb_min <= bb_pct <= self.tf_bb_max:
-                checks.append(f"BB% 추세: {bb_pct:.2f}")
-            if ema8 < ema21:
-                checks.append(f"EMA 하강")
-            
-            if len(checks) >= 2:
-                return True, f"추세 숏 ({', '.join(checks)})"
+        reversal, trend = self._short_rules
+        rule = reversal if self.determine_mode(market_state) == 'REVERSAL' else trend
+        return rule.signal(market_state, self._short_gate if self.fvg_filter and self.fvg_index is not None else None)
+    
+    def entry_masks(self, df):
+        """
+        백테스트용 봉별 진입 신호 (check_long_signal / check_short_signal의 벡터 버전)
+        
+        df: FeaturePipeline.compute 결과 (+ RegimeClassifier.classify의 regime_mode 컬럼 선택)
+        FVG 필터는 포함하지 않음 (봉 시점의 미체결 갭 인덱스가 필요)
         
-        return False, f"대기 중 ({len(checks)}/3)"
+        Returns:
+            dict: long, short, night_long, short_force (bool 배열), reversal (봉별 모드)
+        """
+        reversal = reversal_mask(df)
+        masks = {'reversal': reversal}
+        for side in ('LONG', 'SHORT'):
+            rules = self.entry_rules[side]
+            masks[side.lower()] = np.where(reversal, rules['REVERSAL'].mask(df), rules['TREND'].mask(df))
+        masks['night_long'] = self.night_long_rule.mask(df)
+        masks['short_force'] = self.short_force_rule.mask(df)
+        return masks
     
     def calculate_sl_tp(self, entry_price, side, mode='REVERSAL'):
         """SL/TP 가격 계산"""
@@ -240,7 +261,7 @@ class StrategyEngine:
             sl_pct = max(trailing_sl, min(sl_pct, 0.015))
             
             # 디버그 로그
-            print(f"   🎯 수익 기반 SL: 수익 {pnl_pct:.2f}% → SL {sl_pct*100:.2f}%")
+            log.debug("🎯 수익 기반 SL: 수익 %.2f%% → SL %.2f%%", pnl_pct, sl_pct * 100)
         
         # 안전 범위 제한 (0.5% ~ 1.5%)
         return max(0.005, min(0.015, sl_pct))  # 0.5% ~ 1.5% 사이
@@ -266,7 +287,7 @@ class StrategyEngine:
         if pnl_pct > self.peak_profit_tracker.get(position, 0):
             self.peak_profit_tracker[position] = pnl_pct
             if pnl_pct >= self.min_trailing_start:
-                print(f"   📈 최고 수익 갱신: {pnl_pct:.2f}% (드래그 스탑 활성화)")
+                log.info("   📈 최고 수익 갱신: %.2f%% (드래그 스탑 활성화)", pnl_pct)
         
         peak_pnl = self.peak_profit_tracker.get(position, 0)
         
@@ -374,10 +395,10 @@ class StrategyEngine:
             locked_profit = (peak_pnl // self.trailing_profit_per_step) * self.trailing_lock_ratio
             if position == 'LONG':
                 stop_price = entry_price * (1 + locked_profit / 100)
-                print(f"   🛡️ 드래그 스탑 감시 중: 현재 {pnl_pct:.2f}% / 최고 {peak_pnl:.2f}% / 스탑가 ${stop_price:.2f}")
             else:
                 stop_price = entry_price * (1 - locked_profit / 100)
-                print(f"   🛡️ 드래그 스탑 감시 중: 현재 {pnl_pct:.2f}% / 최고 {peak_pnl:.2f}% / 스탑가 ${stop_price:.2f}")
+            log.info("   🛡️ 드래그 스탑 감시 중: 현재 %.2f%% / 최고 %.2f%% / 스탑가 $%.2f",
+                     pnl_pct, peak_pnl, stop_price, extra={'sample_key': 'drag_stop_watch'})
         
         # 기본 TP 가격 계산
         base_tp_pct = self.tf_tp_pct if self.determine_mode(market_state or {}) == 'TREND' else self.tp_pct
@@ -393,7 +414,8 @@ class StrategyEngine:
             )
             if extension_reason:
                 # TP 확장됨 - 로그용 정보 반환 (체크 계속)
-                print(f"   💡 {extension_reason}: 새로운 TP ${adjusted_tp:.2f}")
+                log.info("   💡 %s: 새로운 TP $%.2f", extension_reason, adjusted_tp,
+                         extra={'sample_key': 'tp_extension'})
                 base_tp = adjusted_tp
         
         # 기본 TP vs 확장된 TP 중 더 높은/낮은 값 사용
@@ -412,23 +434,23 @@ class StrategyEngine:
             rsi = market_state.get('rsi', 50)
             trend = market_state.get('trend', 'NEUTRAL')
             
-            print(f"   🔍 PG 체크: EMA8(${ema8:.2f}) vs EMA21(${ema21:.2f}), 추세={trend}, RSI={rsi:.1f}")
+            log.debug("🔍 PG 체크: EMA8($%.2f) vs EMA21($%.2f), 추세=%s, RSI=%.1f", ema8, ema21, trend, rsi)
             
             # [필터 A] 추세 반전 (이평선 교차)
             if position == 'LONG' and ema8 < ema21:
-                print(f"   ⚠️ 데드크로스 감지! EMA8 < EMA21 → PG 청산")
+                log.info("   ⚠️ 데드크로스 감지! EMA8 < EMA21 → PG 청산")
                 return 'PG (추세 반전 보호)', pnl_pct
             if position == 'SHORT' and ema8 > ema21:
-                print(f"   ⚠️ 골든크로스 감지! EMA8 > EMA21 → PG 청산")
+                log.info("   ⚠️ 골든크로스 감지! EMA8 > EMA21 → PG 청산")
                 return 'PG (추세 반전 보호)', pnl_pct
             
             # [필터 B] 추세 반전 보조 확인 (여전히 유리한 추세인지)
             if position == 'LONG' and trend == 'DOWN':
-                print(f"   ⚠️ 롱 포지션 하락 추세 전환 → PG 청산")
+                log.info("   ⚠️ 롱 포지션 하락 추세 전환 → PG 청산")
                 # 상승 중인데 하락 추세로 바뀜
                 return 'PG (숏 추세 전환)', pnl_pct
             if position == 'SHORT' and trend == 'UP':
-                print(f"   ⚠️ 숏 포지션 상승 추세 전환 → PG 청산")
+                log.info("   ⚠️ 숏 포지션 상승 추세 전환 → PG 청산")
                 return 'PG (롱 추세 전환)', pnl_pct
         
         # 6️⃣ 고점/저점 꺾임 보호
@@ -443,8 +465,51 @@ class StrategyEngine:
         
         return None, pnl_pct
     
+    def simulate_exits(self, df, entries, sides, entry_prices=None, dynamic_sl=True, max_bars=0, backend=None):
+        """
+        백테스트용 포지션별 청산 (실거래 동적 손절 → should_exit와 같은 판정, kernels 청산 커널)
+        
+        진입 다음 봉부터 종가 기준으로 검사 (순차 반전 SEQ는 다중 시간대 데이터가 필요해 제외)
+        
+        Args:
+            df: FeaturePipeline.compute 결과 (+ RegimeClassifier.classify의 regime_mode 컬럼 선택)
+            entries: 진입 봉 인덱스 목록
+            sides: 'LONG' / 'SHORT' 목록
+            entry_prices: 기본값 진입 봉 종가
+            max_bars: 0보다 크면 진입 후 최대 검사 봉 수
+            backend: kernels.BACKENDS (기본: numba 있으면 'jit', 없으면 'numpy')
+        
+        Returns:
+            DataFrame: entry_index, side, entry_price, exit_index (미청산 -1), exit_price, pnl_pct, reason, bars
+        """
+        close = df['close'].to_numpy(dtype=float)
+        sides = np.asarray(sides, dtype=object)
+        direction = np.where(sides == 'LONG', 1, -1)
+        result = kernels.simulate_exits(
+            close, df['rsi'].to_numpy(dtype=float), kernels.trend_codes(df['trend']),
+            df['ema8'].to_numpy(dtype=float), df['ema21'].to_numpy(dtype=float),
+            df['bb_bandwidth'].to_numpy(dtype=float), ~reversal_mask(df),
+            entries, direction, kernels.exit_params(self), entry_prices=entry_prices,
+            dynamic_sl=dynamic_sl, max_bars=max_bars, backend=backend,
+        )
+        entries = np.asarray(entries, dtype=np.int64)
+        entry_prices = close[entries] if entry_prices is None else np.asarray(entry_prices, dtype=float)
+        exit_index = result['exit_index']
+        closed = exit_index >= 0
+        exit_price = np.where(closed, close[np.where(closed, exit_index, 0)], np.nan)
+        return pd.DataFrame({
+            'entry_index': entries,
+            'side': sides,
+            'entry_price': entry_prices,
+            'exit_index': exit_index,
+            'exit_price': exit_price,
+            'pnl_pct': (exit_price / entry_prices - 1) * 100 * direction,
+            'reason': kernels.exit_reasons(result['code'], result['peak']),
+            'bars': np.where(closed, exit_index - entries, -1),
+        })
+    
     def reset_position_tracking(self, position):
         """포지션 종료 시 추적 데이터 초기화"""
         if position in self.peak_profit_tracker:
             del self.peak_profit_tracker[position]
-            print(f"   🔄 {position} 포지션 추적 데이터 초기화 완료")
+            log.info("   🔄 %s 포지션 추적 데이터 초기화 완료", position)
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""
+modules/synthetic.py - 합성 시장 생성기 (GBM + 국면 전환 + 변동성 군집 + 점프, 벡터 연산)
+
+데모 모드/부하 테스트/전략 성질 검사용 - 같은 seed면 항상 같은 가격 경로
+
+봉 1개의 로그 수익률
+    r_t = (mu_k - sigma_t^2 / 2) dt + sigma_t sqrt(dt) z_t + J_t
+- 국면 k: 마르코프 전환 (국면마다 연 drift/vol, 평균 지속 시간(분) → 기하분포 지속 봉 수)
+- 변동성 군집: sigma_t = vol_k × exp(x_t - vol_of_vol^2 / 2), x_t = phi x_{t-1} + e_t (로그 변동성 AR(1))
+  AR(1)은 pandas ewm(adjust=False) 한 번으로 계산 (C 구현, 봉마다 Python 루프 없음)
+- 점프: 봉마다 확률 jumps_per_day / 하루 봉 수, 크기 N(0, jump_scale)
+- 고가/저가: 시가→종가 브라운 브리지의 최대/최소를 정확한 분포로 표집
+  (max = (a + b + sqrt((b - a)^2 - 2 s^2 ln U)) / 2) → 항상 고가 ≥ max(시가, 종가), 저가 ≤ min
+- 거래량: 변동성/수익률 크기와 같이 움직이는 로그정규
+- 시가 = 직전 종가 (갭 없음), 시각은 봉 간격에 맞춤
+
+SyntheticMarket.generate(n): 연속 스트림 (호출할수록 이어짐) [n × 6]
+  같은 seed + 같은 호출 순서면 같은 결과 (난수는 호출 단위로 뽑으므로 나눠 부르면 경로가 달라짐)
+SyntheticMarket.fetch_ohlcv(): ccxt와 같은 형식 - 1분 경로를 하루 블록 단위로 늘리고 시간대별로 묶음
+  (블록 단위라 폴링 간격과 무관 - 같은 seed + 같은 시작 시각(origin)이면 같은 시장)
+→ 3m/5m/15m 봉이 같은 시장에서 나온 값이라 다중 시간대 정렬 검사도 의미 있음
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from .features import timeframe_ms
+
+MINUTE_MS = 60_000
+YEAR_MINUTES = 365 * 1440
+
+# 국면: 연 drift, 연 변동성, 평균 지속 시간 (분)
+REGIMES = {
+    'bull': {'drift': 0.8, 'vol': 0.55, 'minutes': 720},
+    'bear': {'drift': -0.9, 'vol': 0.70, 'minutes': 600},
+    'range': {'drift': 0.0, 'vol': 0.40, 'minutes': 900},
+    'volatile': {'drift': 0.0, 'vol': 1.20, 'minutes': 180},
+}
+
+
+def resample(ohlcv, step):
+    """
+    봉 묶기 (정렬된 [n × 6] → step ms 봉, 버킷 경계는 시각 기준)
+
+    Returns:
+        ndarray: [m × 6]
+    """
+    if not len(ohlcv):
+        return np.empty((0, 6))
+    ts = ohlcv[:, 0].astype(np.int64)
+    bucket = ts // step
+    starts = np.r_[0, np.nonzero(np.diff(bucket))[0] + 1]
+    ends = np.r_[starts[1:], len(ts)] - 1
+    out = np.empty((len(starts), 6))
+    out[:, 0] = bucket[starts] * step
+    out[:, 1] = ohlcv[starts, 1]
+    out[:, 2] = np.maximum.reduceat(ohlcv[:, 2], starts)
+    out[:, 3] = np.minimum.reduceat(ohlcv[:, 3], starts)
+    out[:, 4] = ohlcv[ends, 4]
+    out[:, 5] = np.add.reduceat(ohlcv[:, 5], starts)
+    return out
+
+
+class SyntheticMarket:
+    """합성 시장 (seed 고정 시 결정적)"""
+
+    def __init__(self, seed=None, start_price=2000.0, regimes=None, transition=None, vol_of_vol=0.5,
+                 vol_persistence=0.995, jumps_per_day=2.0, jump_scale=0.008, base_volume=1500.0,
+                 warmup_days=7, origin=None, clock=time.time, symbol="ETH/USDT"):
+        """
+        Args:
+            seed: 난수 시드 (None이면 매번 다름)
+            start_price: 시작 가격
+            regimes: {이름: {'drift', 'vol', 'minutes'}} (기본 REGIMES)
+            transition: 국면 전환 확률 행렬 [k × k] (대각은 무시, 기본 = 다른 국면으로 균등)
+            vol_of_vol: 로그 변동성의 정상 표준편차
+            vol_persistence: 로그 변동성 AR(1) 계수 (1분 봉 기준, 클수록 군집이 길게)
+            jumps_per_day: 하루 평균 점프 수
+            jump_scale: 점프 크기 표준편차 (로그 수익률)
+            base_volume: 1분 봉 평균 거래량
+            warmup_days: fetch_ohlcv가 처음 만드는 과거 기간 (일)
+            origin: 1분 경로 시작 시각 (ms, 기본 = 첫 호출 시각 - warmup_days, 하루 경계로 내림)
+            clock: 현재 시각 (초) - fetch_ohlcv용
+        """
+        self.rng = np.random.default_rng(seed)
+        self.symbol = symbol
+        self.regimes = dict(regimes or REGIMES)
+        self.names = list(self.regimes)
+        k = len(self.names)
+        self.drift = np.array([self.regimes[r]['drift'] for r in self.names])
+        self.vol = np.array([self.regimes[r]['vol'] for r in self.names])
+        self.minutes = np.array([self.regimes[r]['minutes'] for r in self.names], dtype=np.float64)
+        if transition is None:
+            transition = np.ones((k, k))
+        transition = np.array(transition, dtype=np.float64)
+        np.fill_diagonal(transition, 0.0)
+        self.transition = transition / transition.sum(axis=1, keepdims=True)
+        self.vol_of_vol = vol_of_vol
+        self.vol_persistence = vol_persistence
+        self.jumps_per_day = jumps_per_day
+        self.jump_scale = jump_scale
+        self.base_volume = base_volume
+        self.warmup_days = warmup_days
+        self.clock = clock
+
+        # 스트림 상태 (generate 호출 사이에 이어짐)
+        self.price = float(start_price)
+        self.log_vol = 0.0
+        self.regime = int(self.rng.integers(k))
+        self.remaining = 0.0          # 현재 국면 남은 시간 (분)
+        self.last_regimes = None
+
+        # fetch_ohlcv용 1분 경로 (용량 두 배씩 늘리는 버퍼)
+        self._base = None
+        self._count = 0
+        self._origin = origin // 86_400_000 * 86_400_000 if origin is not None else None
+
+    # ------------------------------------------------------------------ 생성
+
+    def _regime_path(self, n, bar_minutes):
+        """봉별 국면 인덱스 (지속 시간은 기하분포, 구간 단위 루프 - 봉 수가 아니라 국면 전환 수만큼)"""
+        path = np.empty(n, dtype=np.int64)
+        i = 0
+        while i < n:
+            if self.remaining <= 0:
+                self.regime = int(self.rng.choice(len(self.names), p=self.transition[self.regime]))
+                mean_bars = max(self.minutes[self.regime] / bar_minutes, 1.0)
+                self.remaining = float(self.rng.geometric(1.0 / mean_bars)) * bar_minutes
+            bars = min(int(-(-self.remaining // bar_minutes)), n - i)
+            path[i:i + bars] = self.regime
+            i += bars
+            self.remaining -= bars * bar_minutes
+        return path
+
+    def _log_vol_path(self, n, bar_minutes):
+        """로그 변동성 AR(1) (이전 호출 마지막 값에서 이어짐)"""
+        phi = self.vol_persistence ** bar_minutes                  # 봉 간격에 맞춘 계수
+        noise = self.rng.standard_normal(n) * self.vol_of_vol * np.sqrt(1.0 - phi * phi)
+        alpha = 1.0 - phi
+        # ewm(adjust=False): y_t = phi y_{t-1} + alpha u_t, u = e / alpha → y_t = phi y_{t-1} + e_t
+        series = np.concatenate([[self.log_vol], noise / alpha])
+        path = pd.Series(series).ewm(alpha=alpha, adjust=False).mean().to_numpy()[1:]
+        self.log_vol = float(path[-1])
+        return path
+
+    def generate(self, n, start_ts=None, step=MINUTE_MS, return_regimes=False):
+        """
+        봉 n개 (이전 호출에 이어지는 연속 스트림)
+
+        Args:
+            n: 봉 수
+            start_ts: 첫 봉 시각 (ms, 기본 = 현재 - n봉, step에 맞춤)
+            step: 봉 간격 (ms)
+            return_regimes: True면 (봉, 국면 이름 배열) 반환
+
+        Returns:
+            ndarray: [n × 6] (timestamp, open, high, low, close, volume)
+        """
+        rng = self.rng
+        bar_minutes = step / MINUTE_MS
+        dt = bar_minutes / YEAR_MINUTES
+        regimes = self._regime_path(n, bar_minutes)
+        log_vol = self._log_vol_path(n, bar_minutes)
+        sigma = self.vol[regimes] * np.exp(log_vol - 0.5 * self.vol_of_vol ** 2)
+        diffusion = sigma * np.sqrt(dt)
+        z = rng.standard_normal(n)
+        jump_prob = self.jumps_per_day * bar_minutes / 1440
+        jumps = np.where(rng.random(n) < jump_prob, rng.normal(0.0, self.jump_scale, n), 0.0)
+        returns = (self.drift[regimes] - 0.5 * sigma * sigma) * dt + diffusion * z + jumps
+
+        log_close = np.log(self.price) + np.cumsum(returns)
+        log_open = np.r_[np.log(self.price), log_close[:-1]]
+        # 브라운 브리지 최대/최소 (분산 = 확산 부분, 점프는 시가 직후로 봄)
+        move2 = (log_close - log_open) ** 2
+        var2 = 2.0 * diffusion * diffusion
+        log_high = 0.5 * (log_open + log_close + np.sqrt(move2 - var2 * np.log(rng.random(n))))
+        log_low = 0.5 * (log_open + log_close - np.sqrt(move2 - var2 * np.log(rng.random(n))))
+
+        shock = np.abs(returns) / np.maximum(diffusion, 1e-12)
+        volume = (self.base_volume * bar_minutes * (sigma / self.vol.mean()) ** 1.2
+                  * (1.0 + 0.35 * np.minimum(shock, 10.0)) * rng.lognormal(-0.08, 0.4, n))
+
+        if start_ts is None:
+            start_ts = (int(self.clock() * 1000) // step - n) * step
+        out = np.empty((n, 6))
+        out[:, 0] = start_ts + np.arange(n, dtype=np.int64) * step
+        out[:, 1] = np.exp(log_open)
+        out[:, 2] = np.exp(log_high)
+        out[:, 3] = np.exp(log_low)
+        out[:, 4] = np.exp(log_close)
+        out[:, 5] = volume
+        # exp 반올림으로 고가/저가가 시가/종가를 넘지 않게
+        np.maximum(out[:, 2], np.maximum(out[:, 1], out[:, 4]), out=out[:, 2])
+        np.minimum(out[:, 3], np.minimum(out[:, 1], out[:, 4]), out=out[:, 3])
+        self.price = float(out[-1, 4]) if n else self.price
+        self.last_regimes = regimes
+        if return_regimes:
+            return out, np.array(self.names, dtype=object)[regimes]
+        return out
+
+    # ------------------------------------------------------------------ 거래소 형식
+
+    def _extend(self, until):
+        """1분 경로를 until(ms, 포함하는 1분 봉까지)로 늘림"""
+        if self._origin is None:
+            first = int(self.clock() * 1000) - int(self.warmup_days * 86_400_000)
+            self._origin = first // 86_400_000 * 86_400_000        # 하루 경계 → 모든 시간대 버킷 정렬
+        end = until // MINUTE_MS * MINUTE_MS + MINUTE_MS
+        missing = (end - self._origin) // MINUTE_MS - self._count
+        if missing <= 0:
+            return
+        # 하루 단위 블록으로 생성 → 호출 시점/간격과 무관하게 같은 seed면 같은 경로
+        blocks = -(-missing // 1440)
+        rows = np.concatenate([self.generate(1440, start_ts=self._origin + (self._count + b * 1440) * MINUTE_MS)
+                               for b in range(blocks)])
+        needed = self._count + len(rows)
+        if self._base is None or needed > len(self._base):
+            grown = np.empty((max(needed, 2 * (0 if self._base is None else len(self._base))), 6))
+            if self._count:
+                grown[:self._count] = self._base[:self._count]
+            self._base = grown
+        self._base[self._count:needed] = rows
+        self._count = needed
+
+    def fetch_ohlcv(self, symbol=None, timeframe='5m', since=None, limit=500, params=None):
+        """
+        ccxt fetch_ohlcv와 같은 형식 (마지막 봉은 진행 중)
+
+        경로 시작(현재 - warmup_days) 이전 구간은 없음 (상장 전처럼 빈 결과)
+        """
+        step = timeframe_ms(timeframe)
+        now = int(self.clock() * 1000)
+        self._extend(now)
+        limit = limit or 500
+        current = now // step * step
+        start = current - (limit - 1) * step if since is None else -(-since // step) * step
+        end = min(start + limit * step, current + step)
+        i = max((start - self._origin) // MINUTE_MS, 0)
+        j = min(max((end - self._origin) // MINUTE_MS, 0), self._count)
+        # 현재 1분 봉까지만 (미래 없음)
+        j = min(j, (now - self._origin) // MINUTE_MS + 1)
+        if i >= j:
+            return []
+        bars = resample(self._base[i:j], step)
+        return [[int(row[0]), *row[1:].tolist()] for row in bars[-limit:]]
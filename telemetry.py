@@ -0,0 +1,347 @@
+# -*- coding: utf-8 -*-
+"""
+modules/telemetry.py - 단계별 지연시간 계측 및 메트릭 엔드포인트
+
+- span(): 틱 내부 단계(fetch_data, indicators, should_exit, order, telegram ...) 시간 측정
+- Histogram: HDR 스타일 로그-선형 버킷 (고정 메모리, O(1) 기록)
+- Counter/Gauge: REST 호출, 오류, 재시도 카운트
+- MetricsServer: localhost HTTP로 Prometheus 텍스트 포맷 제공
+- 계측 오버헤드를 직접 측정해서 틱 시간 대비 비율로 노출
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from .logger import get_logger
+
+log = get_logger('telemetry')
+
+
+class Histogram:
+    """
+    HDR 스타일 히스토그램 (마이크로초 정수 단위)
+
+    2^k 구간마다 sub_bucket_count/2 개의 선형 버킷을 둬서
+    전 구간에서 상대 오차 약 1/sub_bucket_count 유지
+    """
+
+    QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+    def __init__(self, sub_bucket_bits=5, max_seconds=120.0):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.sub_bucket_count = 1 << sub_bucket_bits
+        self.half_count = self.sub_bucket_count // 2
+        self.max_value = int(max_seconds * 1_000_000)
+        self.counts = [0] * (self._index_of(self.max_value) + 1)
+        self.total_count = 0
+        self.total_sum = 0.0
+        self.max_seen = 0.0
+        self.lock = threading.Lock()
+
+    def _index_of(self, value):
+        """정수 값 → 버킷 인덱스"""
+        if value < self.sub_bucket_count:
+            return value
+        shift = value.bit_length() - self.sub_bucket_bits
+        sub = value >> shift
+        return self.sub_bucket_count + (shift - 1) * self.half_count + (sub - self.half_count)
+
+    def _value_of(self, index):
+        """버킷 인덱스 → 버킷 중앙값 (정수 단위)"""
+        if index < self.sub_bucket_count:
+            return index
+        k = index - self.sub_bucket_count
+        shift = k // self.half_count + 1
+        sub = k % self.half_count + self.half_count
+        return ((sub << shift) + ((sub + 1) << shift)) / 2
+
+    def record(self, seconds):
+        """값 기록 (초 단위)"""
+        value = min(max(int(seconds * 1_000_000), 0), self.max_value)
+        index = self._index_of(value)
+        with self.lock:
+            self.counts[index] += 1
+            self.total_count += 1
+            self.total_sum += seconds
+            if seconds > self.max_seen:
+                self.max_seen = seconds
+
+    def percentile(self, q):
+        """분위수 (초 단위)"""
+        with self.lock:
+            if self.total_count == 0:
+                return 0.0
+            target = max(1, int(q * self.total_count + 0.5))
+            running = 0
+            for index, count in enumerate(self.counts):
+                running += count
+                if running >= target:
+                    return self._value_of(index) / 1_000_000
+        return self.max_seen
+
+    def snapshot(self):
+        """요약 통계"""
+        result = {f"p{q * 100:g}": self.percentile(q) for q in self.QUANTILES}
+        result.update({
+            'count': self.total_count,
+            'sum': self.total_sum,
+            'max': self.max_seen
+        })
+        return result
+
+
+class _Span:
+    """단계 시간 측정 컨텍스트 (재사용 가능한 경량 객체)"""
+
+    __slots__ = ('registry', 'name', 'labels', 'start')
+
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        self.registry.observe('lumi_stage_latency_seconds', end - self.start,
+                              stage=self.name, **self.labels)
+        # 예외는 세지 않음 - lumi_errors_total은 예외를 처리하는 쪽(except)에서 한 번만
+        # 계측 자체에 쓴 시간 누적
+        self.registry._overhead += time.perf_counter() - end
+        return False
+
+
+class _NullSpan:
+    """비활성화 시 사용하는 no-op 컨텍스트"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Tick:
+    """틱 전체 시간 + 계측 오버헤드 비율 측정"""
+
+    __slots__ = ('registry', 'start', 'overhead_start')
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.start = 0.0
+        self.overhead_start = 0.0
+
+    def __enter__(self):
+        self.overhead_start = self.registry._overhead
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        registry = self.registry
+        elapsed = time.perf_counter() - self.start
+        overhead = registry._overhead - self.overhead_start
+        registry.observe('lumi_tick_latency_seconds', elapsed)
+        if elapsed > 0:
+            ratio = overhead / elapsed * 100
+            # EWMA로 평활화 (틱 단위 노이즈 제거)
+            registry.overhead_pct = registry.overhead_pct * 0.95 + ratio * 0.05
+            registry.set_gauge('lumi_metrics_overhead_percent', registry.overhead_pct)
+            if registry.overhead_pct > registry.overhead_budget_pct and not registry.budget_warned:
+                registry.budget_warned = True
+                log.warning("계측 오버헤드 %.2f%% > 예산 %s%%", registry.overhead_pct, registry.overhead_budget_pct)
+        return False
+
+
+class MetricsRegistry:
+    """카운터/게이지/히스토그램 저장소"""
+
+    HELP = {
+        'lumi_stage_latency_seconds': 'Latency of each tick stage',
+        'lumi_tick_latency_seconds': 'Latency of a full check_signals tick',
+        'lumi_rest_calls_total': 'REST calls issued to the exchange',
+        'lumi_errors_total': 'Errors by component',
+        'lumi_retries_total': 'Retried exchange calls (counted in the I/O policy retry loop)',
+        'lumi_io_retries_total': 'Exchange calls retried by the I/O policy',
+        'lumi_io_giveups_total': 'Exchange calls that exhausted retries',
+        'lumi_io_circuit_state': 'Exchange circuit breaker state (0 closed, 1 half-open, 2 open)',
+        'lumi_io_circuit_rejected_total': 'Exchange calls rejected while the circuit was open',
+        'lumi_io_hedges_total': 'Hedged duplicate reads issued',
+        'lumi_io_hedge_wins_total': 'Hedged reads that answered first',
+        'lumi_io_order_lookups_total': 'Order lookups by clientOrderId after an ambiguous failure',
+        'lumi_collector_dropped_total': 'Collector records dropped because the sidecar ring was full',
+        'lumi_risk_check_seconds': 'Risk limit check latency',
+        'lumi_risk_budget_exceeded_total': 'Risk limit checks that exceeded the latency budget',
+        'lumi_risk_blocks_total': 'Entries blocked by risk limits',
+        'lumi_risk_forced_exits_total': 'Positions closed by risk limits',
+        'lumi_candle_gaps_total': 'Missing candle ranges detected in fetched data',
+        'lumi_candle_duplicates_total': 'Duplicate candle timestamps dropped from fetched data',
+        'lumi_candle_backfill_requests_total': 'Backfill requests issued for missing candles',
+        'lumi_agg_trades_total': 'Aggregated trades ingested for CVD',
+        'lumi_metrics_overhead_percent': 'Instrumentation overhead as percent of tick time',
+    }
+
+    def __init__(self, enabled=True, overhead_budget_pct=1.0):
+        self.enabled = enabled
+        self.overhead_budget_pct = overhead_budget_pct
+        self.overhead_pct = 0.0
+        self.budget_warned = False
+        self._overhead = 0.0
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def span(self, name, **labels):
+        """단계 시간 측정: with metrics.span('fetch_data'): ..."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, labels)
+
+    def tick(self):
+        """틱 전체 측정: with metrics.tick(): ..."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Tick(self)
+
+    def inc(self, name, value=1, **labels):
+        """카운터 증가"""
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        """게이지 설정"""
+        if not self.enabled:
+            return
+        self.gauges[self._key(name, labels)] = value
+
+    def observe(self, name, seconds, **labels):
+        """히스토그램 기록"""
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        hist = self.histograms.get(key)
+        if hist is None:
+            with self.lock:
+                hist = self.histograms.setdefault(key, Histogram())
+        hist.record(seconds)
+
+    def get_counter(self, name, **labels):
+        """카운터 값 조회"""
+        return self.counters.get(self._key(name, labels), 0)
+
+    def get_histogram(self, name, **labels):
+        """히스토그램 조회 (없으면 None)"""
+        return self.histograms.get(self._key(name, labels))
+
+    def summary(self):
+        """단계별 지연시간 요약 (리포트용)"""
+        result = {}
+        for (name, labels), hist in list(self.histograms.items()):
+            label_str = ','.join(f"{k}={v}" for k, v in labels)
+            result[f"{name}{{{label_str}}}" if label_str else name] = hist.snapshot()
+        return result
+
+    @staticmethod
+    def _format_labels(labels, extra=None):
+        items = list(labels) + (list(extra.items()) if extra else [])
+        if not items:
+            return ''
+        body = ','.join(f'{k}="{str(v)}"' for k, v in items)
+        return '{' + body + '}'
+
+    def render_prometheus(self):
+        """Prometheus 텍스트 포맷 (0.0.4)"""
+        lines = []
+        seen = set()
+
+        def header(name, kind):
+            if name in seen:
+                return
+            seen.add(name)
+            lines.append(f"# HELP {name} {self.HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in sorted(list(self.counters.items())):
+            header(name, 'counter')
+            lines.append(f"{name}{self._format_labels(labels)} {value}")
+
+        for (name, labels), value in sorted(list(self.gauges.items())):
+            header(name, 'gauge')
+            lines.append(f"{name}{self._format_labels(labels)} {value}")
+
+        for (name, labels), hist in sorted(list(self.histograms.items()), key=lambda x: x[0]):
+            header(name, 'summary')
+            for q in Histogram.QUANTILES:
+                lines.append(f"{name}{self._format_labels(labels, {'quantile': q})} {hist.percentile(q):.6f}")
+            lines.append(f"{name}_sum{self._format_labels(labels)} {hist.total_sum:.6f}")
+            lines.append(f"{name}_count{self._format_labels(labels)} {hist.total_count}")
+
+        lines.append(f"lumi_uptime_seconds {time.time() - self.started_at:.0f}")
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsServer:
+    """localhost 메트릭 HTTP 서버 (GET /metrics)"""
+
+    def __init__(self, registry, host='127.0.0.1', port=9108):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.httpd = None
+        self.thread = None
+
+    def start(self):
+        """백그라운드 스레드로 서버 시작"""
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # 요청마다 로그 출력 금지
+
+        try:
+            self.httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+            self.httpd.daemon_threads = True
+            self.thread = threading.Thread(target=self.httpd.serve_forever, name='metrics-http', daemon=True)
+            self.thread.start()
+            return True, f"http://{self.host}:{self.port}/metrics"
+        except Exception as e:
+            return False, f"메트릭 서버 시작 실패: {e}"
+
+    def stop(self):
+        """서버 종료"""
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+
+# 전역 인스턴스
+metrics = MetricsRegistry()
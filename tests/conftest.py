@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+"""
+tests/conftest.py - pytest 공용 설정
+
+저장소 폴더가 modules 패키지 자체 → 상위 폴더를 경로에 넣어 `modules.xxx`로 임포트
+(config / data_collector 같은 최상위 모듈용으로 저장소 폴더도 추가, benchmarks/harness.py와 같음)
+"""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).absolute().parent.parent
+for path in (ROOT, ROOT.parent):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+tests/test_risk.py - RiskEngine 한도 집행 (SimulatedExchange 체결 기준)
+
+시뮬레이션 거래소에서 실제로 체결한 가격/수량을 리스크 엔진에 넣고
+강제 청산 사유 / 진입 차단 / 날짜 변경 초기화 / 재시작 복원을 확인
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from modules.risk import RiskEngine
+from modules.sim_exchange import SimulatedExchange
+
+FEE = 0.0005
+
+
+class Session:
+    """시뮬레이션 거래소 + 리스크 엔진 (시계는 테스트가 직접 진행)"""
+
+    def __init__(self, **limits):
+        self.now = datetime(2026, 3, 2, 10, 0).timestamp()
+        self.exchange = SimulatedExchange(balance=1000.0, taker_fee=FEE, seed=7)
+        self.risk = RiskEngine(fee_rate=FEE, clock=lambda: self.now, **limits)
+        self.risk.sync_equity(self.balance())
+        self.side = None
+
+    def balance(self):
+        return self.exchange.fetch_balance()['USDT']['total']
+
+    def move(self, mid):
+        """중간가 이동 (호가창 재구성)"""
+        self.exchange.book.mid = mid
+        self.exchange.book._rebuild()
+
+    def open(self, side, amount):
+        order = self.exchange.create_order('ETH/USDT', 'market', 'buy' if side == 'LONG' else 'sell', amount)
+        self.side = side
+        self.risk.on_entry(side, order['average'], order['filled'])
+        return order
+
+    def close(self):
+        order = self.exchange.create_order('ETH/USDT', 'market', 'sell' if self.side == 'LONG' else 'buy',
+                                           abs(self.exchange.position_amt), params={'reduceOnly': True})
+        self.side = None
+        return self.risk.on_exit(order['average'])
+
+    def tick(self, bar_ts=None):
+        return self.risk.on_tick(self.exchange.fetch_ticker('ETH/USDT')['last'], bar_ts)
+
+
+def test_entries_blocked_until_equity_synced():
+    risk = RiskEngine(max_daily_loss_pct=5.0)
+    ok, msg = risk.can_enter()
+    assert not ok and '자산 미확인' in msg
+    risk.sync_equity(SimulatedExchange(balance=500.0).fetch_balance()['USDT']['total'])
+    assert risk.can_enter() == (True, "")
+    assert risk.day_equity == pytest.approx(500.0)
+
+
+def test_daily_loss_forces_exit_and_blocks_entries():
+    s = Session(max_daily_loss_pct=5.0, max_consecutive_losses=0, timeout_bars=0)
+    s.open('LONG', 5.0)
+    s.move(1995.0)
+    assert s.tick() is None                       # 약 -25 USDT (2.5%)
+    s.move(1985.0)
+    reason = s.tick()                             # 약 -75 USDT (7.5%) → 미실현 포함 한도 초과
+    assert reason.startswith('RISK')
+
+    pnl = s.close()
+    assert pnl < 0
+    # 리스크 엔진 실현 손익 (수수료 포함) = 거래소 잔고 변화
+    assert s.risk.equity == pytest.approx(s.balance(), abs=1e-6)
+    ok, msg = s.risk.can_enter()
+    assert not ok and '일일 손실' in msg
+
+
+def test_daily_limit_resets_next_day():
+    s = Session(max_daily_loss_pct=5.0, max_consecutive_losses=0, timeout_bars=0)
+    s.open('SHORT', 5.0)
+    s.move(2015.0)
+    s.close()
+    assert not s.risk.can_enter()[0]
+
+    s.now = datetime.combine(datetime.fromtimestamp(s.now).date() + timedelta(days=1),
+                             datetime.min.time()).timestamp() + 1
+    assert s.risk.can_enter() == (True, "")
+    assert s.risk.day_equity == pytest.approx(s.balance(), abs=1e-6)
+    assert s.risk.snapshot()['daily_pnl'] == 0
+
+
+def test_timeout_exit_after_max_bars():
+    s = Session(max_daily_loss_pct=0, max_consecutive_losses=0, timeout_bars=3)
+    s.open('LONG', 0.5)
+    bar = 1_772_400_000_000
+    for i in range(3):
+        assert s.tick(bar + i * 300_000) is None
+        assert s.tick(bar + i * 300_000) is None  # 같은 봉 안의 틱은 봉 수를 늘리지 않음
+    reason = s.tick(bar + 3 * 300_000)
+    assert reason.startswith('TIMEOUT')
+    s.close()
+    assert s.risk.snapshot()['bars_in_trade'] is None
+
+
+def test_loss_streak_pauses_entries():
+    s = Session(max_daily_loss_pct=0, max_consecutive_losses=2, timeout_bars=0, streak_pause=600)
+    for _ in range(2):
+        # 가격 그대로 왕복 → 스프레드 + 수수료만큼 손실
+        s.open('LONG', 1.0)
+        s.move(2000.0)
+        assert s.close() < 0
+        assert s.risk.equity == pytest.approx(s.balance(), abs=1e-6)
+    ok, msg = s.risk.can_enter()
+    assert not ok and '연속 손실' in msg
+
+    s.now += 601
+    assert s.risk.can_enter() == (True, "")
+    assert s.risk.loss_streak == 0
+
+
+def test_replay_counts_losses_after_fees():
+    """재시작 복원도 on_exit과 같은 수수료 차감 기준 (수수료보다 작은 이익 = 손실)"""
+    s = Session(max_daily_loss_pct=5.0, max_consecutive_losses=2, timeout_bars=0, streak_pause=600)
+    stamp = datetime.fromtimestamp(s.now).isoformat()
+    history = [
+        {'type': 'exit', 'side': 'LONG', 'entry_price': 2000.0, 'exit_price': 2001.0, 'size': 1.0,
+         'pnl_pct': 0.05, 'time': stamp},
+        {'type': 'exit', 'side': 'SHORT', 'entry_price': 2000.0, 'exit_price': 1999.0, 'size': 1.0,
+         'pnl_pct': 0.05, 'time': stamp},
+    ]
+    restored = RiskEngine(max_consecutive_losses=2, streak_pause=600, fee_rate=FEE, clock=lambda: s.now)
+    restored.replay(history)
+    assert restored.loss_streak == 2
+    assert restored.paused_until == pytest.approx(s.now + 600)
+
+    # 같은 거래를 on_exit으로 처리한 결과와 같은 실현 손익
+    live = RiskEngine(max_consecutive_losses=2, fee_rate=FEE, clock=lambda: s.now)
+    live.sync_equity(1000.0)
+    for record in history:
+        live.on_entry(record['side'], record['entry_price'], record['size'])
+        live.on_exit(record['exit_price'])
+    assert restored.realized_today == pytest.approx(live.realized_today)
+    assert live.loss_streak == restored.loss_streak
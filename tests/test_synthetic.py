@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+tests/test_synthetic.py - SyntheticMarket 불변식 (seed 여러 개)
+
+- 봉: 고가 ≥ max(시가, 종가), 저가 ≤ min(시가, 종가), 저가 > 0, 거래량 ≥ 0, 시가 = 직전 종가, 시각 간격 일정
+- fetch_ohlcv의 다른 시간대 봉도 같은 성질 + 1분 경로를 묶은 값과 일치
+- StrategyEngine.entry_masks(벡터) = 봉마다 check_*_signal(스칼라) 결과
+"""
+
+import numpy as np
+import pytest
+
+from modules.features import FeaturePipeline, timeframe_ms
+from modules.regime import RegimeClassifier
+from modules.rules import FIELDS
+from modules.strategy import StrategyEngine
+from modules.synthetic import MINUTE_MS, SyntheticMarket, resample
+
+SEEDS = range(12)
+START = 1_767_225_600_000          # 2026-01-01 00:00 UTC
+
+STRATEGY_CONFIG = {
+    'RSI_LONG_THRESHOLD': 30, 'RSI_SHORT_THRESHOLD': 60,
+    'BB_PCT_B_LOW': 0.15, 'BB_PCT_B_HIGH': 0.85,
+    'TF_RSI_MIN': 50, 'TF_RSI_MAX': 70, 'TF_BB_PCT_MIN': 0.40, 'TF_BB_PCT_MAX': 0.80,
+}
+
+
+def assert_ohlc(bars, step):
+    ts, o, h, l, c, v = bars.T
+    assert np.all(h >= np.maximum(o, c))
+    assert np.all(l <= np.minimum(o, c))
+    assert np.all(l > 0)
+    assert np.all(v >= 0)
+    assert np.all(np.isfinite(bars))
+    assert np.all(np.diff(ts) == step)
+    assert np.all(ts % step == 0)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_generate_ohlc_consistent(seed):
+    market = SyntheticMarket(seed=seed)
+    bars = np.concatenate([market.generate(3000, start_ts=START),
+                           market.generate(2000, start_ts=START + 3000 * MINUTE_MS)])
+    assert_ohlc(bars, MINUTE_MS)
+    assert np.array_equal(bars[1:, 1], bars[:-1, 4])  # 갭 없음 (generate 호출 경계 포함)
+
+
+@pytest.mark.parametrize('seed', SEEDS[:4])
+def test_same_seed_same_path(seed):
+    a = SyntheticMarket(seed=seed).generate(1000, start_ts=START)
+    b = SyntheticMarket(seed=seed).generate(1000, start_ts=START)
+    assert np.array_equal(a, b)
+
+
+@pytest.mark.parametrize('seed', SEEDS[:4])
+def test_fetch_ohlcv_timeframes(seed):
+    now = START / 1000 + 86400 * 2
+    market = SyntheticMarket(seed=seed, warmup_days=1, origin=START, clock=lambda: now)
+    minute = np.array(market.fetch_ohlcv(timeframe='1m', since=START, limit=1500), dtype=float)
+    assert_ohlc(minute, MINUTE_MS)
+    for timeframe in ('3m', '5m', '15m'):
+        step = timeframe_ms(timeframe)
+        bars = np.array(market.fetch_ohlcv(timeframe=timeframe, since=START, limit=100), dtype=float)
+        assert_ohlc(bars, step)
+        expected = resample(minute, step)[:len(bars)]
+        assert np.array_equal(bars[:len(expected)], expected)
+
+
+def _state(features, i):
+    """피처 행 → market_state (get_current_market_state와 같은 키)"""
+    state = {key: features[column][i] for key, (_, column) in FIELDS.items()}
+    state['price'] = features['close'][i]
+    if 'regime_mode' in features:
+        state['regime_mode'] = features['regime_mode'][i]
+    return state
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('with_regime', [False, True], ids=['rsi-mode', 'regime-mode'])
+def test_entry_masks_match_scalar_checks(seed, with_regime):
+    bars = SyntheticMarket(seed=seed).generate(1500, start_ts=START, step=timeframe_ms('5m'))
+    frame = FeaturePipeline('5m').compute(bars)
+    if with_regime:
+        frame['regime_mode'] = RegimeClassifier().classify(frame)['regime_mode']
+    engine = StrategyEngine(STRATEGY_CONFIG)
+    masks = engine.entry_masks(frame)
+
+    features = {column: frame[column].to_numpy() for column in frame.columns}
+    checks = {
+        'long': engine.check_long_signal,
+        'short': engine.check_short_signal,
+        'night_long': engine.check_night_long_conditions,
+        'short_force': engine.check_enhanced_short_signal,
+    }
+    scalar = {name: np.zeros(len(frame), dtype=bool) for name in checks}
+    for i in range(len(frame)):
+        state = _state(features, i)
+        for name, check in checks.items():
+            scalar[name][i] = check(state)[0]
+    for name in checks:
+        mismatched = np.flatnonzero(scalar[name] != np.asarray(masks[name], dtype=bool))
+        assert not len(mismatched), f"{name}: 봉 {mismatched[:5].tolist()}"
+    # 비교가 의미 있도록 신호가 실제로 나오는지
+    assert scalar['long'].any() and scalar['short'].any()
@@ -0,0 +1,336 @@
+# -*- coding: utf-8 -*-
+"""
+modules/trades.py - 체결(aggTrade) 스트림 기반 CVD (누적 거래량 델타)
+
+Binance aggTrade의 m(isBuyerMaker) 필드로 공격 방향 판별
+- m = False: 매수자가 테이커 → 매수 체결 (+qty)
+- m = True : 매도자가 테이커 → 매도 체결 (-qty)
+
+CVDAggregator: 시간대별 고정 크기 NumPy 링 버퍼에 봉 단위 매수/매도 거래량·델타·CVD 누적
+- add_trades(): 배치를 np.add.reduceat로 봉별 합산 (체결마다 파이썬 루프 없음)
+- 거래 없는 봉도 0으로 채워서 캔들과 인덱스 정렬 유지, 이미 지난 봉의 늦은 체결은 버림
+
+체결 소스 (콜백: on_trades(ids, ts, price, qty, is_buyer_maker) - NumPy 배열)
+- AggTradeStream: 선물 REST aggTrades를 fromId로 이어 받기 (누락/중복 없음)
+  요청당 가중치 20 (분당 2400 중) → 최소 5초 간격 + 밀렸을 때 즉시 재조회는 분당 횟수 제한
+- AggTradeReplay: Binance 덤프 CSV (agg_trade_id,price,quantity,first_trade_id,
+  last_trade_id,transact_time,is_buyer_maker) 재생 - 백테스트/오프라인 대체용
+"""
+
+import csv
+import threading
+import time
+
+import numpy as np
+
+from .features import timeframe_ms
+from .telemetry import metrics
+from .logger import get_logger
+
+log = get_logger('trades')
+
+
+class _BarBuffer:
+    """한 시간대의 봉별 체결 집계 (링 버퍼)"""
+
+    def __init__(self, timeframe, capacity):
+        self.timeframe = timeframe
+        self.tf_ms = timeframe_ms(timeframe)
+        self.capacity = capacity
+        self.open_time = np.zeros(capacity, dtype=np.int64)
+        self.buy = np.zeros(capacity, dtype=np.float64)
+        self.sell = np.zeros(capacity, dtype=np.float64)
+        self.count = np.zeros(capacity, dtype=np.int64)
+        self.cvd = np.zeros(capacity, dtype=np.float64)   # 봉 마감(현재) 시점 누적 델타
+        self.head = -1        # 현재(진행 중) 봉 위치
+        self.size = 0
+        self.late = 0         # 이미 지난 봉으로 들어온 체결 수
+
+    def _advance(self, open_time):
+        """새 봉 시작 (중간 빈 봉은 0 거래량으로 채움, 최대 capacity개)"""
+        if self.head < 0:
+            steps, start_cvd = 1, 0.0
+            first = open_time
+        else:
+            current = self.open_time[self.head]
+            steps = int((open_time - current) // self.tf_ms)
+            start_cvd = self.cvd[self.head]
+            first = max(current + self.tf_ms, open_time - (self.capacity - 1) * self.tf_ms)
+            steps = min(steps, self.capacity)
+        for k in range(steps):
+            self.head = (self.head + 1) % self.capacity
+            self.open_time[self.head] = first + k * self.tf_ms
+            self.buy[self.head] = 0.0
+            self.sell[self.head] = 0.0
+            self.count[self.head] = 0
+            self.cvd[self.head] = start_cvd
+        self.size = min(self.size + steps, self.capacity)
+
+    def add(self, bar_times, buy, sell, count):
+        """봉별로 합산된 배치 반영 (bar_times 오름차순, 중복 없음)"""
+        for open_time, b, s, c in zip(bar_times.tolist(), buy.tolist(), sell.tolist(), count.tolist()):
+            if self.head >= 0 and open_time < self.open_time[self.head]:
+                self.late += c
+                continue
+            if self.head < 0 or open_time > self.open_time[self.head]:
+                self._advance(open_time)
+            h = self.head
+            self.buy[h] += b
+            self.sell[h] += s
+            self.count[h] += c
+            self.cvd[h] += b - s
+
+    def add_one(self, open_time, buy, sell):
+        """체결 1건 (스칼라 경로)"""
+        h = self.head
+        if h >= 0 and open_time < self.open_time[h]:
+            self.late += 1
+            return
+        if h < 0 or open_time > self.open_time[h]:
+            self._advance(open_time)
+            h = self.head
+        self.buy[h] += buy
+        self.sell[h] += sell
+        self.count[h] += 1
+        self.cvd[h] += buy - sell
+
+    def _order(self, n):
+        n = self.size if n is None else min(n, self.size)
+        return (np.arange(self.head - n + 1, self.head + 1)) % self.capacity
+
+    def bars(self, n=None):
+        """오래된 → 최신 순 복사본"""
+        idx = self._order(n)
+        return {
+            'open_time': self.open_time[idx],
+            'buy_volume': self.buy[idx],
+            'sell_volume': self.sell[idx],
+            'delta': self.buy[idx] - self.sell[idx],
+            'trades': self.count[idx],
+            'cvd': self.cvd[idx],
+        }
+
+
+class CVDAggregator:
+    """시간대별 체결 CVD 집계기"""
+
+    def __init__(self, timeframes=('5m',), capacity=1000):
+        self.buffers = {tf: _BarBuffer(tf, capacity) for tf in dict.fromkeys(timeframes)}
+        self.lock = threading.Lock()
+        self.last_id = None
+        self.last_ts = None
+        self.total = 0
+
+    def add_trades(self, ids, ts, price, qty, is_buyer_maker):
+        """
+        체결 배치 반영 (시간순 배열)
+
+        ids가 있으면 이미 반영한 agg_trade_id 이하는 건너뜀 (재연결/재생 중복 방지)
+        """
+        ts = np.asarray(ts, dtype=np.int64)
+        qty = np.asarray(qty, dtype=np.float64)
+        maker = np.asarray(is_buyer_maker, dtype=bool)
+        if ids is not None and self.last_id is not None:
+            keep = np.asarray(ids, dtype=np.int64) > self.last_id
+            if not keep.all():
+                ids, ts, qty, maker = np.asarray(ids)[keep], ts[keep], qty[keep], maker[keep]
+        if len(ts) == 0:
+            return 0
+
+        buy = np.where(maker, 0.0, qty)
+        sell = qty - buy
+        with self.lock:
+            for buf in self.buffers.values():
+                bar = ts - ts % buf.tf_ms
+                starts = np.flatnonzero(np.r_[True, bar[1:] != bar[:-1]])
+                ends = np.r_[starts[1:], len(bar)]
+                buf.add(bar[starts], np.add.reduceat(buy, starts), np.add.reduceat(sell, starts), ends - starts)
+            if ids is not None:
+                self.last_id = int(ids[-1])
+            self.last_ts = int(ts[-1])
+            self.total += len(ts)
+        metrics.inc('lumi_agg_trades_total', len(ts))
+        return len(ts)
+
+    def add_trade(self, trade_id, ts, price, qty, is_buyer_maker):
+        """체결 1건 (웹소켓 메시지 등 - 배열 생성 없이 스칼라로 반영)"""
+        if trade_id is not None and self.last_id is not None and trade_id <= self.last_id:
+            return 0
+        buy, sell = (0.0, qty) if is_buyer_maker else (qty, 0.0)
+        with self.lock:
+            for buf in self.buffers.values():
+                buf.add_one(ts - ts % buf.tf_ms, buy, sell)
+            if trade_id is not None:
+                self.last_id = trade_id
+            self.last_ts = ts
+            self.total += 1
+        metrics.inc('lumi_agg_trades_total')
+        return 1
+
+    def bars(self, timeframe, n=None):
+        with self.lock:
+            return self.buffers[timeframe].bars(n)
+
+    def delta(self, timeframe):
+        """진행 중인 봉의 델타"""
+        with self.lock:
+            buf = self.buffers[timeframe]
+            return float(buf.buy[buf.head] - buf.sell[buf.head]) if buf.head >= 0 else 0.0
+
+    def cvd_history(self, timeframe, n=60):
+        with self.lock:
+            return self.buffers[timeframe].bars(n)['cvd'].tolist()
+
+    def ready(self, timeframe):
+        return self.buffers[timeframe].size > 0
+
+    def stats(self):
+        return {
+            'trades': self.total,
+            'last_id': self.last_id,
+            'last_ts': self.last_ts,
+            'late': {tf: buf.late for tf, buf in self.buffers.items()},
+        }
+
+
+def _columns(rows):
+    """aggTrade dict 목록 → (ids, ts, price, qty, is_buyer_maker) 배열"""
+    n = len(rows)
+    ids = np.fromiter((int(r['a']) for r in rows), dtype=np.int64, count=n)
+    ts = np.fromiter((int(r['T']) for r in rows), dtype=np.int64, count=n)
+    price = np.fromiter((float(r['p']) for r in rows), dtype=np.float64, count=n)
+    qty = np.fromiter((float(r['q']) for r in rows), dtype=np.float64, count=n)
+    maker = np.fromiter((r['m'] in (True, 'true', 'True') for r in rows), dtype=bool, count=n)
+    return ids, ts, price, qty, maker
+
+
+class AggTradeStream:
+    """선물 aggTrades 폴링 스트림 (백그라운드 스레드, fromId 연속 조회)"""
+
+    MIN_INTERVAL = 5.0    # 초 - 1초 간격이면 가중치 20 × 60 = 분당 1200 (한도의 절반)
+
+    def __init__(self, exchange, symbol, on_trades, interval=5.0, batch=1000, start_time=None,
+                 catchup_per_min=6):
+        """
+        Args:
+            exchange: ccxt 인스턴스 (binance 선물)
+            on_trades: 콜백 (CVDAggregator.add_trades)
+            interval: 조회 간격 (초, MIN_INTERVAL 미만이면 MIN_INTERVAL)
+            start_time: 첫 조회 시작 시각 (ms, 진행 중인 봉 처음부터 채우기용 / None이면 최근 체결부터)
+            catchup_per_min: batch를 꽉 채웠을 때 간격 없이 바로 재조회하는 분당 최대 횟수
+                (다 쓰면 다음 간격까지 대기 - fromId로 이어 받으므로 늦어질 뿐 누락 없음)
+        """
+        self.exchange = exchange
+        self.symbol = symbol.replace('/', '')
+        self.on_trades = on_trades
+        self.interval = max(interval, self.MIN_INTERVAL)
+        self.batch = batch
+        self.start_time = start_time
+        self.catchup_per_min = catchup_per_min
+        self.catchup_left = catchup_per_min
+        self.catchup_window = 0.0
+        self.next_id = None
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self._run, name="aggtrade-stream", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread:
+            self.thread.join(timeout=2)
+
+    def poll(self):
+        """한 번 조회 → 받은 체결 수 (batch개를 꽉 채우면 밀린 것)"""
+        params = {'symbol': self.symbol, 'limit': self.batch}
+        if self.next_id is not None:
+            params['fromId'] = self.next_id
+        elif self.start_time is not None:
+            params['startTime'] = int(self.start_time)
+        metrics.inc('lumi_rest_calls_total', endpoint='agg_trades')
+        rows = self.exchange.fapiPublicGetAggTrades(params)
+        if not rows:
+            return 0
+        ids, ts, price, qty, maker = _columns(rows)
+        self.next_id = int(ids[-1]) + 1
+        self.on_trades(ids, ts, price, qty, maker)
+        return len(rows)
+
+    def _catchup(self, now):
+        """밀렸을 때 바로 재조회해도 되는지 (분당 catchup_per_min회까지)"""
+        if now - self.catchup_window >= 60:
+            self.catchup_window = now
+            self.catchup_left = self.catchup_per_min
+        if self.catchup_left <= 0:
+            metrics.inc('lumi_agg_trades_deferred_total')
+            return False
+        self.catchup_left -= 1
+        return True
+
+    def _run(self):
+        while not self.stopped.is_set():
+            try:
+                received = self.poll()
+            except Exception as e:
+                metrics.inc('lumi_errors_total', component='trades')
+                log.warning("aggTrades 조회 실패: %s", e, extra={'sample_key': 'agg_trades'})
+                received = 0
+            if received < self.batch or not self._catchup(time.monotonic()):
+                self.stopped.wait(self.interval)
+
+
+class AggTradeReplay:
+    """aggTrades 덤프 CSV 재생 (헤더 유무 모두 가능)"""
+
+    def __init__(self, path, on_trades, chunk=50_000):
+        self.path = path
+        self.on_trades = on_trades
+        self.chunk = chunk
+
+    def _chunks(self):
+        with open(self.path, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            rows = []
+            for row in reader:
+                if not row or not row[0].strip().lstrip('-').isdigit():
+                    continue
+                rows.append(row)
+                if len(rows) >= self.chunk:
+                    yield rows
+                    rows = []
+            if rows:
+                yield rows
+
+    def run(self, speed=None):
+        """
+        전체 재생
+
+        Args:
+            speed: None이면 최대 속도, 숫자면 실제 시간 대비 배속 (1.0 = 실시간)
+
+        Returns:
+            int: 재생한 체결 수
+        """
+        total = 0
+        started = time.monotonic()
+        first_ts = None
+        for rows in self._chunks():
+            data = np.array(rows, dtype=object)
+            ids = data[:, 0].astype(np.int64)
+            price = data[:, 1].astype(np.float64)
+            qty = data[:, 2].astype(np.float64)
+            ts = data[:, 5].astype(np.int64)
+            maker = np.char.lower(data[:, 6].astype(str)) == 'true'
+            if speed:
+                first_ts = ts[0] if first_ts is None else first_ts
+                ahead = (ts[-1] - first_ts) / 1000 / speed - (time.monotonic() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+            self.on_trades(ids, ts, price, qty, maker)
+            total += len(ids)
+        return total
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+modules/zones.py - 스트리밍 지지/저항 존 엔진 + TII/RMI
+
+마감된 봉 1개마다 O(1)~O(창 크기) 갱신, 전체 이력 재계산 없음 (메모리 상한 고정)
+- 스윙 포인트: 좌우 swing_bars개 봉보다 높은/낮은 고점·저점 확정 시 레벨 등록
+  중심이 가까운 레벨(level_tolerance_pct 이내)은 병합 → 터치 수 증가
+- 볼륨 프로파일: 최근 profile_bars개 봉의 가격대별 거래량 (봉이 창을 벗어나면 차감)
+  POC(최대 거래량 가격)와 레벨별 거래량을 존 강도에 반영
+- TII (Trend Intensity Index): 각 봉의 SMA 대비 편차 중 양(+)의 비율 (최근 period/2봉)
+- RMI (Relative Momentum Index): momentum봉 전 대비 변화량의 Wilder RSI
+
+snapshot(price): status.json의 zones(res_top/res_bottom/sup_top/sup_bottom), tii, rmi 형식
+"""
+
+import math
+from bisect import bisect_left, insort
+from collections import deque
+
+
+class ZoneEngine:
+    """지지/저항 존 + TII/RMI 증분 계산기 (한 시간대)"""
+
+    def __init__(self, swing_bars=3, level_tolerance_pct=0.3, max_levels=30, profile_bars=288,
+                 bin_pct=0.05, tii_period=60, rmi_period=14, rmi_momentum=5):
+        self.swing_bars = swing_bars
+        self.level_tolerance_pct = level_tolerance_pct
+        self.max_levels = max_levels
+        self.profile_bars = profile_bars
+        self.bin_pct = bin_pct
+        self.last_ts = None
+
+        # 스윙 포인트 확인용 창 (좌 + 기준 + 우)
+        self.window = deque(maxlen=swing_bars * 2 + 1)
+        # 레벨: mid(터치 가중 평균) 오름차순 [mid, low, high, touches, last_ts, kind]
+        self.levels = []
+
+        # 볼륨 프로파일
+        self.bin_size = None
+        self.profile = {}
+        self.profile_bars_q = deque()
+        self.poc = None
+
+        # TII
+        self.tii_period = tii_period
+        self.tii_closes = deque(maxlen=tii_period)
+        self.tii_sum = 0.0
+        self.tii_devs = deque(maxlen=max(1, tii_period // 2))
+        self.tii_pos = 0.0
+        self.tii_neg = 0.0
+        self.tii = None
+
+        # RMI
+        self.rmi_period = rmi_period
+        self.rmi_closes = deque(maxlen=rmi_momentum + 1)
+        self.rmi_up = None
+        self.rmi_dn = None
+        self.rmi_n = 0
+        self.rmi = None
+
+    # ------------------------------------------------------------------ 갱신
+
+    def on_bar(self, row):
+        """마감된 봉 1개 반영 (FeaturePipeline 리스너)"""
+        self.update(row['timestamp'], row['high'], row['low'], row['close'], row['volume'])
+
+    def update(self, ts, high, low, close, volume):
+        if self.last_ts is not None and ts <= self.last_ts:
+            return
+        self.last_ts = ts
+        self._update_swings(ts, high, low)
+        self._update_profile(high, low, volume)
+        self._update_tii(close)
+        self._update_rmi(close)
+
+    def _update_swings(self, ts, high, low):
+        self.window.append((ts, high, low))
+        if len(self.window) < self.window.maxlen:
+            return
+        k = self.swing_bars
+        pivot_ts, pivot_high, pivot_low = self.window[k]
+        others = [bar for i, bar in enumerate(self.window) if i != k]
+        if all(pivot_high > bar[1] for bar in others):
+            self._add_level(pivot_high, pivot_ts, 'R')
+        if all(pivot_low < bar[2] for bar in others):
+            self._add_level(pivot_low, pivot_ts, 'S')
+
+    def _add_level(self, price, ts, kind):
+        """가까운 레벨(중심 기준)이 있으면 병합, 없으면 추가 (상한 초과 시 가장 먼 레벨 제거)"""
+        tolerance = price * self.level_tolerance_pct / 100
+        level = [price, price, price, 1, ts, kind]
+        i = bisect_left(self.levels, [price])
+        # 병합 후 중심이 이동하면 이웃 레벨과도 다시 병합
+        while True:
+            near = [j for j in (i - 1, i) if 0 <= j < len(self.levels)
+                    and abs(self.levels[j][0] - level[0]) <= tolerance]
+            if not near:
+                break
+            j = near[0]
+            other = self.levels.pop(j)
+            touches = level[3] + other[3]
+            mid = (level[0] * level[3] + other[0] * other[3]) / touches
+            level = [mid, min(level[1], other[1]), max(level[2], other[2]), touches, max(ts, other[4]), kind]
+            i = bisect_left(self.levels, [mid])
+        insort(self.levels, level)
+        if len(self.levels) > self.max_levels:
+            # 새 피벗(현재가 근처)에서 가장 먼 레벨 제거 - 양 끝 중 하나
+            far = 0 if price - self.levels[0][0] > self.levels[-1][0] - price else -1
+            del self.levels[far]
+
+    def _bin_range(self, high, low):
+        return int(math.floor(low / self.bin_size)), int(math.floor(high / self.bin_size))
+
+    def _update_profile(self, high, low, volume):
+        if self.bin_size is None:
+            self.bin_size = max((high + low) / 2 * self.bin_pct / 100, 1e-9)
+        first, last = self._bin_range(high, low)
+        share = volume / (last - first + 1)
+        for b in range(first, last + 1):
+            self.profile[b] = self.profile.get(b, 0.0) + share
+        self.profile_bars_q.append((first, last, share))
+
+        if len(self.profile_bars_q) > self.profile_bars:
+            old_first, old_last, old_share = self.profile_bars_q.popleft()
+            for b in range(old_first, old_last + 1):
+                remaining = self.profile[b] - old_share
+                if remaining <= 1e-12:
+                    del self.profile[b]
+                else:
+                    self.profile[b] = remaining
+        if self.profile:
+            poc_bin = max(self.profile, key=self.profile.get)
+            self.poc = (poc_bin + 0.5) * self.bin_size
+
+    def _update_tii(self, close):
+        if len(self.tii_closes) == self.tii_closes.maxlen:
+            self.tii_sum -= self.tii_closes[0]
+        self.tii_closes.append(close)
+        self.tii_sum += close
+        if len(self.tii_closes) < self.tii_period:
+            return
+        deviation = close - self.tii_sum / self.tii_period
+        if len(self.tii_devs) == self.tii_devs.maxlen:
+            old = self.tii_devs[0]
+            if old > 0:
+                self.tii_pos -= old
+            else:
+                self.tii_neg += old
+        self.tii_devs.append(deviation)
+        if deviation > 0:
+            self.tii_pos += deviation
+        else:
+            self.tii_neg -= deviation
+        total = self.tii_pos + self.tii_neg
+        self.tii = 100.0 * self.tii_pos / total if total > 0 else 50.0
+
+    def _update_rmi(self, close):
+        self.rmi_closes.append(close)
+        if len(self.rmi_closes) < self.rmi_closes.maxlen:
+            return
+        momentum = close - self.rmi_closes[0]
+        up, dn = max(momentum, 0.0), max(-momentum, 0.0)
+        if self.rmi_up is None:
+            self.rmi_up, self.rmi_dn = up, dn
+        else:
+            alpha = 1.0 / self.rmi_period
+            self.rmi_up += alpha * (up - self.rmi_up)
+            self.rmi_dn += alpha * (dn - self.rmi_dn)
+        self.rmi_n += 1
+        if self.rmi_n >= self.rmi_period:
+            total = self.rmi_up + self.rmi_dn
+            self.rmi = 100.0 * self.rmi_up / total if total > 0 else 50.0
+
+    # ------------------------------------------------------------------ 조회
+
+    def level_volume(self, low, high):
+        """레벨 구간의 프로파일 거래량"""
+        if self.bin_size is None:
+            return 0.0
+        first, last = self._bin_range(high, low)
+        return sum(self.profile.get(b, 0.0) for b in range(first, last + 1))
+
+    def _bounds(self, level):
+        """단일 스윙 레벨은 허용 오차만큼 폭을 줌"""
+        pad = max(0.0, level[0] * self.level_tolerance_pct / 100 - (level[2] - level[1])) / 2
+        return level[1] - pad, level[2] + pad
+
+    def zones(self, price):
+        """현재가 위 가장 가까운 저항 / 아래 가장 가까운 지지"""
+        i = bisect_left(self.levels, [price])
+        res = self.levels[i] if i < len(self.levels) else None
+        sup = self.levels[i - 1] if i > 0 else None
+        return res, sup
+
+    def snapshot(self, price):
+        """
+        status.json / 전략용 스냅샷
+
+        Returns:
+            dict: zones(res_top/res_bottom/sup_top/sup_bottom + 터치/거래량), poc, tii, rmi
+        """
+        res, sup = self.zones(price)
+        zones = {'res_top': None, 'res_bottom': None, 'sup_top': None, 'sup_bottom': None}
+        for prefix, level in (('res', res), ('sup', sup)):
+            if level:
+                bottom, top = self._bounds(level)
+                zones.update({f'{prefix}_top': round(float(top), 2), f'{prefix}_bottom': round(float(bottom), 2),
+                              f'{prefix}_touches': level[3],
+                              f'{prefix}_volume': round(float(self.level_volume(bottom, top)), 3)})
+        return {
+            'zones': zones,
+            'poc': round(float(self.poc), 2) if self.poc is not None else None,
+            'tii': float(self.tii) if self.tii is not None else None,
+            'rmi': float(self.rmi) if self.rmi is not None else None,
+        }